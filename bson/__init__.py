@@ -74,15 +74,18 @@ from __future__ import annotations
 
 import datetime
 import itertools
+import mmap
 import os
 import re
 import struct
 import sys
+import threading
 import uuid
 from codecs import utf_8_decode as _utf_8_decode
 from codecs import utf_8_encode as _utf_8_encode
 from collections import abc as _abc
-from collections.abc import Generator, Iterator, Mapping, MutableMapping, Sequence
+from collections import deque as _deque
+from collections.abc import Generator, Iterable, Iterator, Mapping, MutableMapping, Sequence
 from typing import (
     IO,
     TYPE_CHECKING,
@@ -97,6 +100,7 @@ from typing import (
     overload,
 )
 
+from bson._dataclass_codec import _DataclassDocument, _document_plan, _field_names
 from bson.binary import (
     ALL_UUID_SUBTYPES,
     CSHARP_LEGACY,
@@ -104,7 +108,9 @@ from bson.binary import (
     OLD_UUID_SUBTYPE,
     STANDARD,
     UUID_SUBTYPE,
+    VECTOR_SUBTYPE,
     Binary,
+    BinaryVectorDtype,
     UuidRepresentation,
 )
 from bson.code import Code
@@ -135,6 +141,8 @@ from bson.tz_util import utc
 
 # Import some modules for type-checking only.
 if TYPE_CHECKING:
+    from concurrent.futures import Future, ThreadPoolExecutor
+
     from bson.raw_bson import RawBSONDocument
     from bson.typings import _DocumentType, _ReadableBuffer
 
@@ -186,6 +194,7 @@ __all__ = [
     "DatetimeConversion",
     "DatetimeMS",
     "Decimal128",
+    "DocumentTemplate",
     "Int64",
     "InvalidBSON",
     "InvalidDocument",
@@ -198,9 +207,14 @@ __all__ = [
     "UuidRepresentation",
     "decode",
     "decode_all",
+    "decode_columns",
     "decode_file_iter",
     "decode_iter",
+    "decode_mmap_iter",
+    "decode_vectors",
     "encode",
+    "encode_into",
+    "encoded_size",
     "gen_list_name",
     "get_data_and_view",
     "has_c",
@@ -323,6 +337,9 @@ def _get_object(
         and isinstance(obj.get("$db"), (str, type(None)))
     ):
         return (DBRef(obj.pop("$ref"), obj.pop("$id", None), obj.pop("$db", None), obj), position)
+    document_decoder = opts.type_registry._document_decoder
+    if document_decoder is not None:
+        obj = document_decoder(obj)
     return obj, position
 
 
@@ -573,6 +590,84 @@ else:
         return element_name, value, position
 
 
+# Sizes of the values of fixed length BSON types.
+_FIXED_VALUE_SIZES = {
+    ord(BSONNUM): 8,
+    ord(BSONUND): 0,
+    ord(BSONOID): 12,
+    ord(BSONBOO): 1,
+    ord(BSONDAT): 8,
+    ord(BSONNUL): 0,
+    ord(BSONINT): 4,
+    ord(BSONTIM): 8,
+    ord(BSONLON): 8,
+    ord(BSONDEC): 16,
+    ord(BSONMIN): 0,
+    ord(BSONMAX): 0,
+}
+
+
+def _skip_value(
+    data: Any, position: int, obj_end: int, element_type: int, element_name: str
+) -> int:
+    """Return the position following an element's value without decoding it."""
+    size = _FIXED_VALUE_SIZES.get(element_type)
+    if size is not None:
+        end = position + size
+    elif element_type in (ord(BSONSTR), ord(BSONCOD), ord(BSONSYM)):
+        end = position + 4 + _UNPACK_INT_FROM(data, position)[0]
+    elif element_type in (ord(BSONOBJ), ord(BSONARR), ord(BSONCWS)):
+        end = position + _UNPACK_INT_FROM(data, position)[0]
+    elif element_type == ord(BSONBIN):
+        end = position + 5 + _UNPACK_INT_FROM(data, position)[0]
+    elif element_type == ord(BSONRGX):
+        end = data.index(b"\x00", data.index(b"\x00", position) + 1) + 1
+    elif element_type == ord(BSONREF):
+        end = position + 16 + _UNPACK_INT_FROM(data, position)[0]
+    else:
+        _raise_unknown_type(element_type, element_name)
+    if end < position or end > obj_end:
+        raise InvalidBSON("invalid length or type code")
+    return end
+
+
+def _index_elements(data: Any, opts: CodecOptions[Any]) -> dict[str, int]:
+    """Map the top-level field names of a BSON document to their positions."""
+    data, view = get_data_and_view(data)
+    end = len(data) - 1
+    index: dict[str, int] = {}
+    position = 4
+    try:
+        while position < end:
+            element_start = position
+            element_type = data[position]
+            element_name, position = _get_c_string(data, view, position + 1, opts)
+            position = _skip_value(data, position, end, element_type, element_name)
+            index[element_name] = element_start
+    except InvalidBSON:
+        raise
+    except Exception:
+        # Change exception type to InvalidBSON but preserve traceback.
+        _, exc_value, exc_tb = sys.exc_info()
+        raise InvalidBSON(str(exc_value)).with_traceback(exc_tb) from None
+    if position != end:
+        raise InvalidBSON("bad object or element length")
+    return index
+
+
+if _USE_C:
+    _index_elements = _cbson._index_elements
+
+
+def _raw_element(data: Any, position: int, opts: CodecOptions[Any], raw_array: bool = False) -> Any:
+    """Decode the value of the element at position in a BSON document."""
+    if not _USE_C:
+        data, view = get_data_and_view(data)
+    else:
+        view = None
+    return _element_to_dict(data, view, position, len(data) - 1, opts, raw_array=raw_array)[1]
+
+
 _T = TypeVar("_T", bound=MutableMapping[str, Any])
 
 
@@ -613,14 +708,120 @@ def _elements_to_dict(
     return result
 
 
-def _bson_to_dict(data: Any, opts: CodecOptions[_DocumentType]) -> _DocumentType:
+def _compile_fields(fields: Iterable[str], opts: CodecOptions[Any]) -> dict[str, Any]:
+    """Compile dotted field names into a nested projection.
+
+    Each field name maps to ``True`` to decode the whole value, or to a nested
+    projection to decode only some fields of an embedded document.
+    """
+    if isinstance(fields, (str, bytes)):
+        raise TypeError(f"fields must be an iterable of field names, not {type(fields)}")
+    if _raw_document_class(opts.document_class):
+        raise ValueError("fields cannot be used with a RawBSONDocument document_class")
+    projection: dict[str, Any] = {}
+    for field in fields:
+        if not isinstance(field, str):
+            raise TypeError(f"field names must be instances of str, not {type(field)}")
+        node = projection
+        *parents, leaf = field.split(".")
+        for part in parents:
+            child = node.setdefault(part, {})
+            if child is True:
+                # The whole parent value was already requested.
+                break
+            node = child
+        else:
+            node[leaf] = True
+    return projection
+
+
+def _projected_value(
+    data: Any, view: Any, position: int, element_type: int, opts: CodecOptions[Any], fields: Any
+) -> Any:
+    """Decode an embedded document, or the documents in an array, using a
+    nested projection.
+    """
+    _, end = _get_object_size(data, position, len(data))
+    value: Any
+    if element_type == ord(BSONOBJ):
+        value = _elements_to_dict_projected(data, view, position + 4, end, opts, fields)
+        if (
+            isinstance(value.get("$ref"), str)
+            and "$id" in value
+            and isinstance(value.get("$db"), (str, type(None)))
+        ):
+            value = DBRef(value.pop("$ref"), value.pop("$id", None), value.pop("$db", None), value)
+        elif opts.type_registry._document_decoder is not None:
+            value = opts.type_registry._document_decoder(value)
+    else:
+        value = []
+        position += 4
+        while position < end:
+            item_type = data[position]
+            # Just skip the keys.
+            position = data.index(b"\x00", position + 1) + 1
+            item_end = _skip_value(data, position, end, item_type, "")
+            # Values that are not documents are omitted, as they are by a
+            # server-side projection.
+            if item_type == ord(BSONOBJ):
+                value.append(_projected_value(data, view, position, item_type, opts, fields))
+            position = item_end
+        if position != end:
+            raise InvalidBSON("bad array length")
+    if opts.type_registry._decoder_map:
+        custom_decoder = opts.type_registry._decoder_map.get(type(value))
+        if custom_decoder is not None:
+            value = custom_decoder(value)
+    return value
+
+
+def _elements_to_dict_projected(
+    data: Any, view: Any, position: int, obj_end: int, opts: CodecOptions[Any], fields: Any
+) -> Any:
+    """Decode the fields of a BSON document named in a compiled projection,
+    skipping all other elements.
+    """
+    result = opts.document_class()
+    end = obj_end - 1
+    while position < end:
+        element_type = data[position]
+        element_name, value_start = _get_c_string(data, view, position + 1, opts)
+        value_end = _skip_value(data, value_start, obj_end, element_type, element_name)
+        spec = fields.get(element_name)
+        if spec is True:
+            result[element_name] = _element_to_dict(data, view, position, obj_end, opts)[1]
+        elif spec is not None and element_type in (ord(BSONOBJ), ord(BSONARR)):
+            result[element_name] = _projected_value(
+                data, view, value_start, element_type, opts, spec
+            )
+        position = value_end
+    if position != obj_end:
+        raise InvalidBSON("bad object or element length")
+    return result
+
+
+def _bson_to_dict(
+    data: Any, opts: CodecOptions[_DocumentType], fields: Optional[dict[str, Any]] = None
+) -> _DocumentType:
     """Decode a BSON string to document_class."""
     data, view = get_data_and_view(data)
     try:
         if _raw_document_class(opts.document_class):
             return opts.document_class(data, opts)  # type:ignore[call-arg]
         _, end = _get_object_size(data, 0, len(data))
-        return cast("_DocumentType", _elements_to_dict(data, view, 4, end, opts))
+        plan = _document_plan(opts.document_class)
+        if plan is not None:
+            opts = opts.with_options(document_class=dict)
+        if fields is not None:
+            doc = _elements_to_dict_projected(data, view, 4, end, opts, fields)
+        else:
+            doc = _elements_to_dict(data, view, 4, end, opts)
+        if plan is not None:
+            doc = plan(doc)
+        document_decoder = opts.type_registry._document_decoder
+        if document_decoder is not None:
+            doc = document_decoder(doc)
+        return cast("_DocumentType", doc)
     except InvalidBSON:
         raise
     except Exception:
@@ -942,10 +1143,10 @@ def _name_value_to_bson(
         _ENCODERS[type(value)] = func
         return func(name, value, check_keys, opts)  # type: ignore
 
-    # Third, check if a type encoder is registered for this type.
-    # Note that subtypes of registered custom types are not auto-encoded.
+    # Third, check if a type encoder is registered for this type or one of
+    # its base classes.
     if not in_custom_call and opts.type_registry._encoder_map:
-        custom_encoder = opts.type_registry._encoder_map.get(type(value))
+        custom_encoder = opts.type_registry._resolve_encoder(type(value))
         if custom_encoder is not None:
             return _name_value_to_bson(
                 name, custom_encoder(value), check_keys, opts, in_custom_call=True
@@ -962,14 +1163,19 @@ def _name_value_to_bson(
             _ENCODERS[type(value)] = func
             return func(name, value, check_keys, opts)  # type: ignore
 
-    # As a last resort, try using the fallback encoder, if the user has
-    # provided one.
+    # Try using the fallback encoder, if the user has provided one.
     fallback_encoder = opts.type_registry._fallback_encoder
     if not in_fallback_call and fallback_encoder is not None:
         return _name_value_to_bson(
             name, fallback_encoder(value), check_keys, opts, in_fallback_call=True
         )
 
+    # Encode dataclass instances as embedded documents. This comes after the
+    # custom and fallback encoders so that they can encode dataclasses.
+    names = _field_names(type(value))
+    if names is not None:
+        return _encode_mapping(name, _DataclassDocument(value, names), check_keys, opts)
+
     if was_integer_overflow:
         raise OverflowError("BSON can only handle up to 8-byte ints")
     raise InvalidDocument(f"cannot encode object: {value!r}, of type: {type(value)!r}")
@@ -995,6 +1201,9 @@ def _dict_to_bson(
     """Encode a document to BSON."""
     if _raw_document_class(doc):
         return cast(bytes, doc.raw)
+    names = _field_names(type(doc))
+    if names is not None:
+        doc = _DataclassDocument(doc, names)
     try:
         elements = []
         if top_level and "_id" in doc:
@@ -1016,6 +1225,34 @@ if _USE_C:
     _dict_to_bson = _cbson._dict_to_bson
 
 
+def _dict_to_bson_into(
+    doc: Any, buffer: Any, offset: int, check_keys: bool, opts: CodecOptions[Any]
+) -> int:
+    """Encode a document to BSON at offset in a bytearray, which is extended
+    as needed, or in a writable buffer. Returns the size of the document.
+    """
+    data = _dict_to_bson(doc, check_keys, opts)
+    size = len(data)
+    if offset < 0:
+        raise ValueError("offset must not be negative")
+    if isinstance(buffer, bytearray):
+        if offset > len(buffer):
+            raise ValueError("offset is past the end of the buffer")
+        buffer[offset : offset + size] = data
+    else:
+        with memoryview(buffer) as view, view.cast("B") as target:
+            if target.readonly:
+                raise BufferError("buffer is not writable")
+            if offset > len(target) or size > len(target) - offset:
+                raise ValueError("buffer is too small for the encoded document")
+            target[offset : offset + size] = data
+    return size
+
+
+if _USE_C:
+    _dict_to_bson_into = _cbson._dict_to_bson_into
+
+
 _CODEC_OPTIONS_TYPE_ERROR = TypeError("codec_options must be an instance of CodecOptions")
 
 
@@ -1048,16 +1285,234 @@ def encode(
     return _dict_to_bson(document, check_keys, codec_options)
 
 
+def encode_into(
+    document: Mapping[str, Any],
+    buffer: Union[bytearray, memoryview],
+    offset: Optional[int] = None,
+    check_keys: bool = False,
+    codec_options: CodecOptions[Any] = DEFAULT_CODEC_OPTIONS,
+) -> int:
+    """Encode a document to BSON into an existing buffer.
+
+    Unlike :func:`encode`, no :class:`bytes` object is created for the
+    document, so a single buffer can be reused to serialize many documents::
+
+        >>> buf = bytearray()
+        >>> for doc in [{'a': 1}, {'b': 2}]:
+        ...     size = bson.encode_into(doc, buf)
+        ...
+        >>> bson.decode_all(buf)
+        [{'a': 1}, {'b': 2}]
+
+    Raises the same errors as :func:`encode`. Raises :class:`ValueError` if
+    the document does not fit in a buffer that is not a :class:`bytearray`.
+    Such buffers are encoded into directly, so the region after `offset` may
+    have been partly overwritten when an error is raised.
+
+    :param document: mapping type representing a document
+    :param buffer: A :class:`bytearray`, which is extended as needed, or any
+        other writable object that implements the buffer protocol, like a
+        :class:`memoryview` of a preallocated region.
+    :param offset: The position in `buffer` to write the document at. Defaults
+        to the end of a :class:`bytearray`, and to 0 for other buffers.
+    :param check_keys: check if keys start with '$' or
+        contain '.', raising :class:`~bson.errors.InvalidDocument` in
+        either case
+    :param codec_options: An instance of
+        :class:`~bson.codec_options.CodecOptions`.
+    :return: The number of bytes written.
+
+    .. versionadded:: 4.18
+    """
+    if not isinstance(codec_options, CodecOptions):
+        raise _CODEC_OPTIONS_TYPE_ERROR
+    if offset is None:
+        offset = len(buffer) if isinstance(buffer, bytearray) else 0
+
+    return _dict_to_bson_into(document, buffer, offset, check_keys, codec_options)
+
+
+def _encoded_size(doc: Any, opts: CodecOptions[Any]) -> int:
+    """Return the size of the BSON encoding of a document."""
+    return len(_dict_to_bson(doc, False, opts))
+
+
+if _USE_C:
+    _encoded_size = _cbson._encoded_size
+
+
+def encoded_size(
+    document: Mapping[str, Any],
+    codec_options: CodecOptions[Any] = DEFAULT_CODEC_OPTIONS,
+) -> int:
+    """Return the size in bytes of the BSON encoding of a document.
+
+    Equal to ``len(bson.encode(document, codec_options=codec_options))``.
+    With the C extension, documents made of common types are measured
+    without being encoded, which makes it cheap to plan batches of documents
+    that must fit under a size limit::
+
+        >>> bson.encoded_size({'a': 1})
+        12
+
+    Raises the same errors as :func:`encode`.
+
+    :param document: mapping type representing a document
+    :param codec_options: An instance of
+        :class:`~bson.codec_options.CodecOptions`.
+
+    .. versionadded:: 4.18
+    """
+    if not isinstance(codec_options, CodecOptions):
+        raise _CODEC_OPTIONS_TYPE_ERROR
+
+    return _encoded_size(document, codec_options)
+
+
+# Type codes for the field types that DocumentTemplate encodes without a
+# type lookup.
+_TEMPLATE_CODES = {int: "i", float: "d", str: "s", bool: "b"}
+
+
+def _encode_template(
+    names: tuple[bytes, ...], codes: bytes, values: tuple[Any, ...], opts: CodecOptions[Any]
+) -> bytes:
+    """Encode the values of a DocumentTemplate to BSON."""
+    if not len(names) == len(codes) == len(values):
+        raise ValueError("expected one value for each template field")
+    encoded = b"".join(
+        [_name_value_to_bson(name, value, False, opts) for name, value in zip(names, values)]
+    )
+    return _PACK_INT(len(encoded) + 5) + encoded + b"\x00"
+
+
+if _USE_C:
+    _encode_template = _cbson._encode_template
+
+
+class DocumentTemplate:
+    """An encoder for documents that all have the same fields.
+
+    The field names are validated and encoded once, when the template is
+    created, so that many documents with the same fields, like events or
+    order lines, can be encoded from their values alone::
+
+        >>> template = bson.DocumentTemplate(['name', 'qty'], [str, int])
+        >>> template.encode(('widget', 5)) == bson.encode({'name': 'widget', 'qty': 5})
+        True
+
+    The C extension writes values of the expected type for each field without
+    a type lookup. Values of any other type, like ``None``, are encoded just as
+    they are by :func:`encode`.
+
+    :meth:`document` returns a :class:`~bson.raw_bson.RawBSONDocument`, which
+    :meth:`~pymongo.collection.Collection.insert_many`,
+    :meth:`~pymongo.collection.Collection.insert_one` and
+    :class:`~pymongo.operations.InsertOne` send without encoding it again. As
+    with any :class:`~bson.raw_bson.RawBSONDocument`, no ``_id`` is added to
+    the document, so include an ``_id`` field in the template to choose the
+    ids of inserted documents.
+
+    :param keys: The field names, in the order they are encoded.
+    :param types: The expected type of the value of each field.
+    :param codec_options: An instance of
+        :class:`~bson.codec_options.CodecOptions`.
+
+    .. versionadded:: 4.18
+    """
+
+    __slots__ = ("__codec_options", "__codes", "__keys", "__names", "__raw_options", "__types")
+
+    def __init__(
+        self,
+        keys: Sequence[str],
+        types: Sequence[type],
+        codec_options: CodecOptions[Any] = DEFAULT_CODEC_OPTIONS,
+    ) -> None:
+        if not isinstance(codec_options, CodecOptions):
+            raise _CODEC_OPTIONS_TYPE_ERROR
+        keys = tuple(keys)
+        types = tuple(types)
+        if len(keys) != len(types):
+            raise ValueError("keys and types must have the same length")
+        for key in keys:
+            if not isinstance(key, str):
+                raise TypeError(f"keys must be instances of str, not {type(key)}")
+        if len(set(keys)) != len(keys):
+            raise ValueError("keys must be unique")
+        for field_type in types:
+            if not isinstance(field_type, type):
+                raise TypeError(f"types must be instances of type, not {field_type!r}")
+        self.__keys = keys
+        self.__types = types
+        self.__names = tuple(_make_name(key) for key in keys)
+        self.__codes = "".join(_TEMPLATE_CODES.get(t, "?") for t in types).encode()
+        self.__codec_options = codec_options
+        self.__raw_options: Optional[CodecOptions[RawBSONDocument]] = None
+
+    @property
+    def keys(self) -> tuple[str, ...]:
+        """The field names of this template."""
+        return self.__keys
+
+    @property
+    def types(self) -> tuple[type, ...]:
+        """The expected types of the values of this template's fields."""
+        return self.__types
+
+    def encode(self, values: Union[Sequence[Any], Mapping[str, Any]]) -> bytes:
+        """Encode a document to BSON.
+
+        :param values: The values of the fields, in the order of
+            :attr:`keys`, or a mapping with exactly the fields in
+            :attr:`keys`.
+        """
+        if isinstance(values, Mapping):
+            if len(values) != len(self.__keys):
+                raise ValueError(f"expected a mapping with the fields {list(self.__keys)}")
+            values = tuple([values[key] for key in self.__keys])
+        else:
+            values = tuple(values)
+            if len(values) != len(self.__keys):
+                raise ValueError(f"expected {len(self.__keys)} values, got {len(values)}")
+        return _encode_template(self.__names, self.__codes, values, self.__codec_options)
+
+    def document(self, values: Union[Sequence[Any], Mapping[str, Any]]) -> RawBSONDocument:
+        """Encode a document to a :class:`~bson.raw_bson.RawBSONDocument`.
+
+        :param values: The values of the fields, in the order of
+            :attr:`keys`, or a mapping with exactly the fields in
+            :attr:`keys`.
+        """
+        from bson.raw_bson import RawBSONDocument
+
+        if self.__raw_options is None:
+            self.__raw_options = self.__codec_options.with_options(document_class=RawBSONDocument)
+        return RawBSONDocument(self.encode(values), self.__raw_options)
+
+    def __repr__(self) -> str:
+        types = ", ".join(t.__name__ for t in self.__types)
+        return f"DocumentTemplate({list(self.__keys)!r}, [{types}])"
+
+
 @overload
-def decode(data: _ReadableBuffer, codec_options: None = None) -> dict[str, Any]: ...
+def decode(
+    data: _ReadableBuffer, codec_options: None = None, fields: Optional[Iterable[str]] = None
+) -> dict[str, Any]: ...
 
 
 @overload
-def decode(data: _ReadableBuffer, codec_options: CodecOptions[_DocumentType]) -> _DocumentType: ...
+def decode(
+    data: _ReadableBuffer,
+    codec_options: CodecOptions[_DocumentType],
+    fields: Optional[Iterable[str]] = None,
+) -> _DocumentType: ...
 
 
 def decode(
-    data: _ReadableBuffer, codec_options: Optional[CodecOptions[_DocumentType]] = None
+    data: _ReadableBuffer,
+    codec_options: Optional[CodecOptions[_DocumentType]] = None,
+    fields: Optional[Iterable[str]] = None,
 ) -> Union[dict[str, Any], _DocumentType]:
     """Decode BSON to a document.
 
@@ -1076,10 +1531,25 @@ def decode(
         >>> type(decoded_doc)
         <class 'collections.OrderedDict'>
 
+    To decode only some fields, pass their names in `fields`. Other fields
+    are skipped without being decoded::
+
+        >>> data = bson.encode({'a': 1, 'b': {'c': 2, 'd': 3}, 'e': 4})
+        >>> bson.decode(data, fields=['a', 'b.c'])
+        {'a': 1, 'b': {'c': 2}}
+
     :param data: the BSON to decode. Any bytes-like object that implements
         the buffer protocol.
     :param codec_options: An instance of
         :class:`~bson.codec_options.CodecOptions`.
+    :param fields: An optional iterable of field names to decode. Use dot
+        notation, like ``'b.c'``, to decode only some fields of an embedded
+        document or of each document in an array. As with a projection, other
+        values in those arrays are omitted. Cannot be used with
+        :class:`~bson.raw_bson.RawBSONDocument`.
+
+    .. versionchanged:: 4.18
+       Added the ``fields`` parameter.
 
     .. versionadded:: 3.9
     """
@@ -1087,10 +1557,19 @@ def decode(
     if not isinstance(opts, CodecOptions):
         raise _CODEC_OPTIONS_TYPE_ERROR
 
+    if fields is not None:
+        return cast(
+            "Union[dict[str, Any], _DocumentType]",
+            _bson_to_dict(data, opts, _compile_fields(fields, opts)),
+        )
     return cast("Union[dict[str, Any], _DocumentType]", _bson_to_dict(data, opts))
 
 
-def _decode_all(data: _ReadableBuffer, opts: CodecOptions[_DocumentType]) -> list[_DocumentType]:
+def _decode_all(
+    data: _ReadableBuffer,
+    opts: CodecOptions[_DocumentType],
+    fields: Optional[dict[str, Any]] = None,
+) -> list[_DocumentType]:
     """Decode a BSON data to multiple documents."""
     data, view = get_data_and_view(data)
     data_len = len(data)
@@ -1098,6 +1577,10 @@ def _decode_all(data: _ReadableBuffer, opts: CodecOptions[_DocumentType]) -> lis
     position = 0
     end = data_len - 1
     use_raw = _raw_document_class(opts.document_class)
+    document_decoder = opts.type_registry._document_decoder
+    plan = _document_plan(opts.document_class)
+    if plan is not None:
+        opts = opts.with_options(document_class=dict)
     try:
         while position < end:
             obj_size = _UNPACK_INT_FROM(data, position)[0]
@@ -1111,7 +1594,17 @@ def _decode_all(data: _ReadableBuffer, opts: CodecOptions[_DocumentType]) -> lis
             if use_raw:
                 docs.append(opts.document_class(data[position : obj_end + 1], opts))  # type: ignore
             else:
-                docs.append(_elements_to_dict(data, view, position + 4, obj_end, opts))
+                if fields is not None:
+                    doc = _elements_to_dict_projected(
+                        data, view, position + 4, obj_end, opts, fields
+                    )
+                else:
+                    doc = _elements_to_dict(data, view, position + 4, obj_end, opts)
+                if plan is not None:
+                    doc = plan(doc)
+                if document_decoder is not None:
+                    doc = document_decoder(doc)
+                docs.append(doc)
             position += obj_size
         return docs
     except InvalidBSON:
@@ -1126,18 +1619,111 @@ if _USE_C:
     _decode_all = _cbson._decode_all
 
 
+class _DecodePool:
+    """The thread pool shared by parallel decode_all calls, created on first
+    use.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def get(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                from concurrent.futures import ThreadPoolExecutor
+
+                self._executor = ThreadPoolExecutor(
+                    max_workers=os.cpu_count() or 1, thread_name_prefix="bson-decode"
+                )
+            return self._executor
+
+    def _after_fork(self) -> None:
+        # The decoding threads do not exist in the child.
+        self._lock = threading.Lock()
+        self._executor = None
+
+
+_DECODE_POOL = _DecodePool()
+
+
+def _gil_enabled() -> bool:
+    """Return False on free-threaded builds of CPython running without the
+    GIL, where decoding on several threads runs in parallel.
+    """
+    return getattr(sys, "_is_gil_enabled", lambda: True)()
+
+
+def _split_documents(data: Any, n_chunks: int) -> list[memoryview]:
+    """Split concatenated BSON documents into at most n_chunks runs of whole
+    documents of similar total size.
+
+    Invalid document sizes are not reported here, the rest of the data is left
+    in the last chunk for the decoder to reject.
+    """
+    view = memoryview(data).cast("B")
+    end = len(view)
+    target = max(1, end // n_chunks)
+    chunks: list[memoryview] = []
+    start = position = 0
+    while end - position >= 5 and len(chunks) < n_chunks - 1:
+        obj_size = _UNPACK_INT_FROM(view, position)[0]
+        if obj_size < 5 or obj_size > end - position:
+            break
+        position += obj_size
+        if position - start >= target:
+            chunks.append(view[start:position])
+            start = position
+    if start < end or not chunks:
+        chunks.append(view[start:])
+    return chunks
+
+
+def _decode_all_parallel(
+    data: Any, opts: CodecOptions[_DocumentType], fields: Optional[dict[str, Any]], workers: int
+) -> list[_DocumentType]:
+    """Decode BSON data to multiple documents, decoding runs of whole
+    documents concurrently on a thread pool.
+    """
+    chunks = _split_documents(data, workers)
+    if len(chunks) == 1:
+        return _decode_all(chunks[0], opts, fields)
+    executor = _DECODE_POOL.get()
+    futures = [executor.submit(_decode_all, chunk, opts, fields) for chunk in chunks]
+    docs: list[_DocumentType] = []
+    try:
+        for future in futures:
+            docs.extend(future.result())
+    except BaseException:
+        for future in futures:
+            future.cancel()
+        raise
+    return docs
+
+
 @overload
-def decode_all(data: _ReadableBuffer, codec_options: None = None) -> list[dict[str, Any]]: ...
+def decode_all(
+    data: _ReadableBuffer,
+    codec_options: None = None,
+    fields: Optional[Iterable[str]] = None,
+    workers: Optional[int] = None,
+) -> list[dict[str, Any]]: ...
 
 
 @overload
 def decode_all(
-    data: _ReadableBuffer, codec_options: CodecOptions[_DocumentType]
+    data: _ReadableBuffer,
+    codec_options: CodecOptions[_DocumentType],
+    fields: Optional[Iterable[str]] = None,
+    workers: Optional[int] = None,
 ) -> list[_DocumentType]: ...
 
 
 def decode_all(
-    data: _ReadableBuffer, codec_options: Optional[CodecOptions[_DocumentType]] = None
+    data: _ReadableBuffer,
+    codec_options: Optional[CodecOptions[_DocumentType]] = None,
+    fields: Optional[Iterable[str]] = None,
+    workers: Optional[int] = None,
 ) -> Union[list[dict[str, Any]], list[_DocumentType]]:
     """Decode BSON data to multiple documents.
 
@@ -1147,6 +1733,18 @@ def decode_all(
     :param data: BSON data
     :param codec_options: An instance of
         :class:`~bson.codec_options.CodecOptions`.
+    :param fields: An optional iterable of field names to decode. See
+        :func:`decode`.
+    :param workers: An optional number of threads to decode the documents
+        with. The data is split at document boundaries into this many parts
+        of similar size, which are decoded concurrently on a shared thread
+        pool. The documents are returned in their original order. This only
+        speeds up decoding on free-threaded builds of CPython running without
+        the GIL. It has no effect for
+        :class:`~bson.raw_bson.RawBSONDocument`.
+
+    .. versionchanged:: 4.18
+       Added the ``fields`` and ``workers`` parameters.
 
     .. versionchanged:: 3.9
        Supports bytes-like objects that implement the buffer protocol.
@@ -1161,20 +1759,35 @@ def decode_all(
        `codec_options`.
     """
     if codec_options is None:
-        return _decode_all(data, DEFAULT_CODEC_OPTIONS)
-
-    if not isinstance(codec_options, CodecOptions):
+        codec_options = DEFAULT_CODEC_OPTIONS  # type: ignore[assignment]
+    elif not isinstance(codec_options, CodecOptions):
         raise _CODEC_OPTIONS_TYPE_ERROR
 
-    return _decode_all(data, codec_options)
+    projection = None if fields is None else _compile_fields(fields, codec_options)  # type: ignore[arg-type]
+    if workers is not None:
+        if not isinstance(workers, int) or isinstance(workers, bool):
+            raise TypeError(f"workers must be an instance of int, not {type(workers)}")
+        if workers < 1:
+            raise ValueError(f"workers must be a positive integer, not {workers!r}")
+        if workers > 1 and not _raw_document_class(codec_options.document_class):  # type: ignore[union-attr]
+            return _decode_all_parallel(data, codec_options, projection, workers)  # type: ignore[arg-type]
+    if projection is not None:
+        return _decode_all(data, codec_options, projection)  # type: ignore[arg-type]
+    return _decode_all(data, codec_options)  # type: ignore[arg-type]
 
 
 def _decode_selective(
     rawdoc: Any, fields: Any, codec_options: CodecOptions[_DocumentType]
 ) -> _DocumentType:
-    if _raw_document_class(codec_options.document_class):
-        # If document_class is RawBSONDocument, use vanilla dictionary for
-        # decoding command response.
+    plan = _document_plan(codec_options.document_class)
+    element_options = codec_options
+    if plan is not None:
+        # Decode the documents in the field to dicts, then to the
+        # dataclass or Record.
+        element_options = codec_options.with_options(document_class=dict)
+    if _raw_document_class(codec_options.document_class) or plan is not None:
+        # If document_class is RawBSONDocument, a dataclass or a Record, use vanilla
+        # dictionary for decoding command response.
         doc: _DocumentType = {}  # type:ignore[assignment]
     else:
         # Else, use the specified document_class.
@@ -1182,7 +1795,18 @@ def _decode_selective(
     for key, value in rawdoc.items():
         if key in fields:
             if fields[key] == 1:
-                doc[key] = _bson_to_dict(rawdoc.raw, codec_options)[key]  # type:ignore[index]
+                # Decode only this field so that the document_decoder is
+                # not called for the enclosing document.
+                position = _index_elements(rawdoc.raw, codec_options)[key]
+                decoded = _raw_element(rawdoc.raw, position, element_options)
+                if plan is not None:
+                    if isinstance(decoded, list):
+                        decoded = [
+                            plan(item) if isinstance(item, dict) else item for item in decoded
+                        ]
+                    elif isinstance(decoded, dict):
+                        decoded = plan(decoded)
+                doc[key] = decoded  # type:ignore[index]
             else:
                 doc[key] = _decode_selective(  # type:ignore[index]
                     value, fields[key], codec_options
@@ -1256,10 +1880,16 @@ def _decode_all_selective(
 
     .. versionadded:: 3.8
     """
-    if not codec_options.type_registry._decoder_map:
+    type_registry = codec_options.type_registry
+    has_plan = _document_plan(codec_options.document_class) is not None
+    if not (type_registry._decoder_map or type_registry._document_decoder or has_plan):
         return decode_all(data, codec_options)
 
     if not fields:
+        if has_plan:
+            return decode_all(
+                data, codec_options.with_options(document_class=dict, type_registry=None)
+            )
         return decode_all(data, codec_options.with_options(type_registry=None))
 
     # Decode documents for internal use.
@@ -1279,17 +1909,23 @@ def _decode_all_selective(
 
 
 @overload
-def decode_iter(data: bytes, codec_options: None = None) -> Iterator[dict[str, Any]]: ...
+def decode_iter(
+    data: bytes, codec_options: None = None, fields: Optional[Iterable[str]] = None
+) -> Iterator[dict[str, Any]]: ...
 
 
 @overload
 def decode_iter(
-    data: bytes, codec_options: CodecOptions[_DocumentType]
+    data: bytes,
+    codec_options: CodecOptions[_DocumentType],
+    fields: Optional[Iterable[str]] = None,
 ) -> Iterator[_DocumentType]: ...
 
 
 def decode_iter(
-    data: bytes, codec_options: Optional[CodecOptions[_DocumentType]] = None
+    data: bytes,
+    codec_options: Optional[CodecOptions[_DocumentType]] = None,
+    fields: Optional[Iterable[str]] = None,
 ) -> Union[Iterator[dict[str, Any]], Iterator[_DocumentType]]:
     """Decode BSON data to multiple documents as a generator.
 
@@ -1302,6 +1938,11 @@ def decode_iter(
     :param data: BSON data
     :param codec_options: An instance of
         :class:`~bson.codec_options.CodecOptions`.
+    :param fields: An optional iterable of field names to decode. See
+        :func:`decode`.
+
+    .. versionchanged:: 4.18
+       Added the ``fields`` parameter.
 
     .. versionchanged:: 3.0
        Replaced `as_class`, `tz_aware`, and `uuid_subtype` options with
@@ -1312,6 +1953,7 @@ def decode_iter(
     opts = codec_options or DEFAULT_CODEC_OPTIONS
     if not isinstance(opts, CodecOptions):
         raise _CODEC_OPTIONS_TYPE_ERROR
+    projection = None if fields is None else _compile_fields(fields, opts)
 
     position = 0
     end = len(data) - 1
@@ -1320,24 +1962,29 @@ def decode_iter(
         elements = data[position : position + obj_size]
         position += obj_size
 
-        yield _bson_to_dict(elements, opts)
+        yield _bson_to_dict(elements, opts, projection)
 
 
 @overload
 def decode_file_iter(
-    file_obj: Union[BinaryIO, IO[bytes]], codec_options: None = None
+    file_obj: Union[BinaryIO, IO[bytes]],
+    codec_options: None = None,
+    fields: Optional[Iterable[str]] = None,
 ) -> Iterator[dict[str, Any]]: ...
 
 
 @overload
 def decode_file_iter(
-    file_obj: Union[BinaryIO, IO[bytes]], codec_options: CodecOptions[_DocumentType]
+    file_obj: Union[BinaryIO, IO[bytes]],
+    codec_options: CodecOptions[_DocumentType],
+    fields: Optional[Iterable[str]] = None,
 ) -> Iterator[_DocumentType]: ...
 
 
 def decode_file_iter(
     file_obj: Union[BinaryIO, IO[bytes]],
     codec_options: Optional[CodecOptions[_DocumentType]] = None,
+    fields: Optional[Iterable[str]] = None,
 ) -> Union[Iterator[dict[str, Any]], Iterator[_DocumentType]]:
     """Decode bson data from a file to multiple documents as a generator.
 
@@ -1347,6 +1994,11 @@ def decode_file_iter(
     :param file_obj: A file object containing BSON data.
     :param codec_options: An instance of
         :class:`~bson.codec_options.CodecOptions`.
+    :param fields: An optional iterable of field names to decode. See
+        :func:`decode`.
+
+    .. versionchanged:: 4.18
+       Added the ``fields`` parameter.
 
     .. versionchanged:: 3.0
        Replaced `as_class`, `tz_aware`, and `uuid_subtype` options with
@@ -1355,6 +2007,7 @@ def decode_file_iter(
     .. versionadded:: 2.8
     """
     opts = codec_options or DEFAULT_CODEC_OPTIONS
+    projection = None if fields is None else _compile_fields(fields, opts)
     while True:
         # Read size of next object.
         size_data: Any = file_obj.read(4)
@@ -1364,7 +2017,593 @@ def decode_file_iter(
             raise InvalidBSON("cut off in middle of objsize")
         obj_size = _UNPACK_INT_FROM(size_data, 0)[0] - 4
         elements = size_data + file_obj.read(max(0, obj_size))
-        yield _bson_to_dict(elements, opts)  # type:ignore[misc]
+        yield _bson_to_dict(elements, opts, projection)  # type:ignore[misc]
+
+
+# The amount of data decode_mmap_iter decodes at a time.
+_MMAP_REGION_SIZE = 1024 * 1024
+
+
+def _region_end(view: memoryview, position: int, size: int) -> int:
+    """Return the end of the run of whole documents of at least size bytes
+    starting at position.
+
+    Invalid document sizes are not reported here. A region ends before an
+    invalid document, or includes the rest of the data when it starts with
+    one, for the decoder to reject.
+    """
+    end = len(view)
+    start = position
+    while position - start < size and end - position >= 5:
+        obj_size = _UNPACK_INT_FROM(view, position)[0]
+        if obj_size < 5 or obj_size > end - position:
+            break
+        position += obj_size
+    if position == start:
+        return end
+    return position
+
+
+def _decode_region(
+    region: memoryview, opts: CodecOptions[Any], fields: Optional[dict[str, Any]]
+) -> list[Any]:
+    if len(region) < 5:
+        raise InvalidBSON("cut off in middle of objsize")
+    return _decode_all(region, opts, fields)
+
+
+def _mmap_raw_documents(view: memoryview, opts: CodecOptions[Any]) -> Iterator[Any]:
+    """Yield a RawBSONDocument for each document in view, without copying."""
+    position = 0
+    end = len(view)
+    while position < end:
+        if end - position < 4:
+            raise InvalidBSON("cut off in middle of objsize")
+        obj_size = _UNPACK_INT_FROM(view, position)[0]
+        if obj_size < 5 or obj_size > end - position:
+            raise InvalidBSON("invalid object length")
+        yield opts.document_class(view[position : position + obj_size], opts)
+        position += obj_size
+
+
+def _mmap_documents(
+    view: memoryview, opts: CodecOptions[Any], fields: Optional[dict[str, Any]], workers: int
+) -> Iterator[Any]:
+    """Decode the documents in view one region at a time, decoding up to
+    workers regions concurrently on the shared thread pool.
+    """
+    position = 0
+    end = len(view)
+    if workers == 1:
+        while position < end:
+            region_end = _region_end(view, position, _MMAP_REGION_SIZE)
+            yield from _decode_region(view[position:region_end], opts, fields)
+            position = region_end
+        return
+    executor = _DECODE_POOL.get()
+    pending: _deque[Future[list[Any]]] = _deque()
+    try:
+        while position < end or pending:
+            while position < end and len(pending) < workers:
+                region_end = _region_end(view, position, _MMAP_REGION_SIZE)
+                pending.append(
+                    executor.submit(_decode_region, view[position:region_end], opts, fields)
+                )
+                position = region_end
+            yield from pending.popleft().result()
+    finally:
+        for future in pending:
+            future.cancel()
+        # Wait for the regions still being decoded before the view is
+        # released.
+        for future in pending:
+            if not future.cancelled():
+                future.exception()
+
+
+@overload
+def decode_mmap_iter(
+    path: Union[str, os.PathLike[str]],
+    codec_options: None = None,
+    fields: Optional[Iterable[str]] = None,
+    workers: Optional[int] = None,
+) -> Iterator[dict[str, Any]]: ...
+
+
+@overload
+def decode_mmap_iter(
+    path: Union[str, os.PathLike[str]],
+    codec_options: CodecOptions[_DocumentType],
+    fields: Optional[Iterable[str]] = None,
+    workers: Optional[int] = None,
+) -> Iterator[_DocumentType]: ...
+
+
+def decode_mmap_iter(
+    path: Union[str, os.PathLike[str]],
+    codec_options: Optional[CodecOptions[_DocumentType]] = None,
+    fields: Optional[Iterable[str]] = None,
+    workers: Optional[int] = None,
+) -> Union[Iterator[dict[str, Any]], Iterator[_DocumentType]]:
+    """Decode a file of BSON documents to multiple documents as a generator,
+    using a memory map of the file.
+
+    Works similarly to :func:`decode_file_iter`, but the documents are
+    decoded directly from the mapped file instead of being read into a new
+    :class:`bytes` object each. When the ``document_class`` of
+    `codec_options` is :class:`~bson.raw_bson.RawBSONDocument`, each
+    document is a view of the mapped file and no data is copied. The file is
+    unmapped once the generator and all of these documents are released.
+
+    :param path: The path of a file containing BSON data, such as a
+        collection dumped by ``mongodump``.
+    :param codec_options: An instance of
+        :class:`~bson.codec_options.CodecOptions`.
+    :param fields: An optional iterable of field names to decode. See
+        :func:`decode`.
+    :param workers: An optional number of regions of the file to decode
+        concurrently on the thread pool shared with :func:`decode_all`. The
+        documents are yielded in their original order. This only speeds up
+        decoding on free-threaded builds of CPython running without the GIL.
+        It has no effect for :class:`~bson.raw_bson.RawBSONDocument`.
+
+    .. versionadded:: 4.18
+    """
+    opts = codec_options or DEFAULT_CODEC_OPTIONS
+    if not isinstance(opts, CodecOptions):
+        raise _CODEC_OPTIONS_TYPE_ERROR
+    if workers is None:
+        workers = 1
+    elif not isinstance(workers, int) or isinstance(workers, bool):
+        raise TypeError(f"workers must be an instance of int, not {type(workers)}")
+    elif workers < 1:
+        raise ValueError(f"workers must be a positive integer, not {workers!r}")
+    projection = None if fields is None else _compile_fields(fields, opts)
+    with open(path, "rb") as file_obj:
+        if os.fstat(file_obj.fileno()).st_size == 0:
+            # Empty files cannot be mapped.
+            return
+        mapping = mmap.mmap(file_obj.fileno(), 0, access=mmap.ACCESS_READ)
+    view = memoryview(mapping)
+    try:
+        if _raw_document_class(opts.document_class):
+            yield from _mmap_raw_documents(view, opts)
+        else:
+            yield from _mmap_documents(view, opts, projection, workers)
+    finally:
+        view.release()
+        try:
+            mapping.close()
+        except BufferError:
+            # RawBSONDocuments still reference the mapping, it is closed
+            # when they are garbage collected.
+            pass
+
+
+_COLUMN_ITEM_SIZES = {"b": 1, "i": 4, "q": 8, "d": 8, "t": 8, "o": 12, "m": 8}
+# Maps a column type code to the BSON types it accepts.
+_COLUMN_BSON_TYPES = {
+    "b": (ord(BSONBOO),),
+    "i": (ord(BSONINT), ord(BSONLON)),
+    "q": (ord(BSONINT), ord(BSONLON)),
+    "d": (ord(BSONNUM), ord(BSONINT), ord(BSONLON)),
+    "t": (ord(BSONDAT),),
+    "o": (ord(BSONOID),),
+    "m": (ord(BSONDEC),),
+}
+_COLUMN_DTYPES = {
+    "b": "?",
+    "i": "<i4",
+    "q": "<i8",
+    "d": "<f8",
+    "t": "<M8[ms]",
+    "o": "S12",
+    "m": "<i8",
+}
+_COLUMN_PACK_INTO = {
+    "i": struct.Struct("<i").pack_into,
+    "q": struct.Struct("<q").pack_into,
+    "d": struct.Struct("<d").pack_into,
+    "m": struct.Struct("<q").pack_into,
+}
+
+
+def _decimal128_to_fixed(data: Any, position: int, scale: int) -> Optional[int]:
+    """Return the Decimal128 value at position times 10**scale, or None if
+    it is not finite or that is not an integer.
+    """
+    low, high = struct.unpack_from("<QQ", data, position)
+    if (high >> 61) & 3 == 3:
+        if (high >> 59) & 3 == 3:
+            # Infinity or NaN.
+            return None
+        # The coefficient is non-canonical, and so is zero.
+        return 0
+    coefficient = ((high & 0x1FFFFFFFFFFFF) << 64) | low
+    exponent = ((high >> 49) & 0x3FFF) - 6176 + scale
+    if exponent < 0:
+        coefficient, remainder = divmod(coefficient, 10**-exponent)
+        if remainder:
+            return None
+    else:
+        coefficient *= 10**exponent
+    return -coefficient if high >> 63 else coefficient
+
+
+def _write_column_value(
+    code: str, scale: int, element_type: int, data: Any, position: int, out: bytearray, offset: int
+) -> bool:
+    """Store a BSON value in a column slot as little-endian data. Decimal128
+    values are stored as the int64 value * 10**scale.
+    """
+    if element_type not in _COLUMN_BSON_TYPES[code]:
+        return False
+    if code == "m":
+        value = _decimal128_to_fixed(data, position, scale)
+        if value is None or not -(2**63) <= value < 2**63:
+            return False
+        _COLUMN_PACK_INTO[code](out, offset, value)
+    elif code == "b":
+        out[offset] = 1 if data[position] else 0
+    elif code == "o":
+        out[offset : offset + 12] = data[position : position + 12]
+    elif element_type == ord(BSONINT):
+        value = _UNPACK_INT_FROM(data, position)[0]
+        _COLUMN_PACK_INTO[code](out, offset, value)
+    elif element_type == ord(BSONLON) and code != "q":
+        value = _UNPACK_LONG_FROM(data, position)[0]
+        if code == "i" and not -(2**31) <= value < 2**31:
+            return False
+        _COLUMN_PACK_INTO[code](out, offset, value)
+    else:
+        out[offset : offset + 8] = data[position : position + 8]
+    return True
+
+
+def _fill_columns(
+    data: Any,
+    position: int,
+    end: int,
+    prefix: bytes,
+    lookup: Mapping[bytes, list[int]],
+    column_codes: str,
+    scales: tuple[int, ...],
+    columns: list[tuple[bytearray, bytearray]],
+    doc_index: int,
+) -> None:
+    """Write the fields of the document between position and end (its
+    trailing null byte), whose paths start with prefix, to the matching
+    columns, walking embedded documents that column paths continue into.
+    """
+    while position < end:
+        element_type = data[position]
+        name_end = data.index(b"\x00", position + 1)
+        if name_end >= end:
+            raise InvalidBSON("invalid object size")
+        path = prefix + bytes(data[position + 1 : name_end])
+        value_position = name_end + 1
+        position = _skip_value(
+            data, value_position, end, element_type, path.decode("utf-8", "replace")
+        )
+        for i in lookup.get(path, ()):
+            code = column_codes[i]
+            values, mask = columns[i]
+            mask[doc_index] = not _write_column_value(
+                code,
+                scales[i],
+                element_type,
+                data,
+                value_position,
+                values,
+                doc_index * _COLUMN_ITEM_SIZES[code],
+            )
+        if element_type == ord(BSONOBJ) and path + b"." in lookup:
+            if data[position - 1]:
+                raise InvalidBSON("invalid object size")
+            _fill_columns(
+                data,
+                value_position + 4,
+                position - 1,
+                path + b".",
+                lookup,
+                column_codes,
+                scales,
+                columns,
+                doc_index,
+            )
+    if position != end:
+        raise InvalidBSON("invalid object size")
+
+
+def _decode_columns(
+    data: Any, names: tuple[bytes, ...], codes: bytes, scales: tuple[int, ...]
+) -> list[tuple[bytearray, bytearray]]:
+    """Decode fields of a stream of BSON documents, at paths that use dot
+    notation for fields of embedded documents, into typed columns of
+    little-endian values, with a mask that is set where a document has no
+    value for the field that can be stored in the column.
+    """
+    if len(names) != len(codes) or len(names) != len(scales):
+        raise ValueError("expected one type code per field name")
+    column_codes = codes.decode()
+    data, _ = get_data_and_view(data)
+    offsets = []
+    position = 0
+    end = len(data)
+    while position < end:
+        if end - position < 5:
+            raise InvalidBSON("invalid object size")
+        obj_size = _UNPACK_INT_FROM(data, position)[0]
+        if obj_size < 5 or end - position < obj_size or data[position + obj_size - 1]:
+            raise InvalidBSON("invalid object size")
+        offsets.append(position)
+        position += obj_size
+
+    n_docs = len(offsets)
+    columns = [
+        (bytearray(n_docs * _COLUMN_ITEM_SIZES[code]), bytearray(b"\x01" * n_docs))
+        for code in column_codes
+    ]
+    # Map each column path, and each prefix of it followed by a dot, to the
+    # columns at or below it.
+    lookup: dict[bytes, list[int]] = {}
+    for i, name in enumerate(names):
+        lookup.setdefault(name, []).append(i)
+        parts = name.split(b".")
+        for depth in range(1, len(parts)):
+            lookup.setdefault(b".".join(parts[:depth]) + b".", [])
+    try:
+        for doc_index, doc_start in enumerate(offsets):
+            obj_end = doc_start + _UNPACK_INT_FROM(data, doc_start)[0]
+            _fill_columns(
+                data,
+                doc_start + 4,
+                obj_end - 1,
+                b"",
+                lookup,
+                column_codes,
+                scales,
+                columns,
+                doc_index,
+            )
+    except InvalidBSON:
+        raise
+    except Exception:
+        # Change exception type to InvalidBSON but preserve traceback.
+        _, exc_value, exc_tb = sys.exc_info()
+        raise InvalidBSON(str(exc_value)).with_traceback(exc_tb) from None
+    return columns
+
+
+if _USE_C:
+    _decode_columns = _cbson._decode_columns
+
+
+def _column_code(spec: Any) -> tuple[str, int]:
+    """Map a column type in a decode_columns schema to its type code and
+    scale.
+    """
+    import numpy as np
+
+    if isinstance(spec, tuple) and len(spec) == 2 and spec[0] is Decimal128:
+        if not isinstance(spec[1], int) or isinstance(spec[1], bool):
+            raise TypeError(f"Decimal128 column scale must be an int, not {type(spec[1])}")
+        return "m", spec[1]
+    if spec is Decimal128:
+        return "m", 0
+    if spec is ObjectId:
+        return "o", 0
+    if spec is datetime.datetime:
+        return "t", 0
+    # Match in any byte order: the native int64 of a big-endian host is
+    # still an int64 column. The values are always decoded little-endian.
+    dtype = np.dtype(spec).newbyteorder("<")
+    for code, name in _COLUMN_DTYPES.items():
+        if code != "m" and dtype == np.dtype(name):
+            return code, 0
+    raise TypeError(
+        f"unsupported column type {spec!r}, must be one of bool, int32, int64, float64,"
+        " datetime64[ms], ObjectId or Decimal128"
+    )
+
+
+def decode_columns(data: _ReadableBuffer, schema: Mapping[str, Any]) -> dict[str, Any]:
+    """Decode fields of a batch of BSON documents into NumPy arrays.
+
+    `data` must be a stream of concatenated BSON documents, like a batch
+    returned by :meth:`~pymongo.collection.Collection.find_raw_batches`.
+    For each field in `schema` a :class:`numpy.ma.MaskedArray` with one
+    element per document is returned. Fields of embedded documents are
+    selected with dot notation, like ``'a.b'``. The values are written directly
+    into the arrays, without creating a Python object for each document or
+    value. An element is masked when the document is missing the field, or
+    when the value is null or has a BSON type that the column cannot hold::
+
+        >>> data = bson.encode({'x': 1, 'y': 1.5}) + bson.encode({'x': 2})
+        >>> columns = bson.decode_columns(data, {'x': 'int64', 'y': 'float64'})
+        >>> columns['x'].tolist()
+        [1, 2]
+        >>> columns['y'].tolist()
+        [1.5, None]
+
+    The supported column types are:
+
+    - ``bool``: BSON booleans.
+    - ``int32``: BSON int32 values, and int64 values that fit in 32 bits.
+    - ``int64``: BSON int32 and int64 values.
+    - ``float64``: BSON doubles, int32 and int64 values.
+    - ``datetime64[ms]`` or :class:`datetime.datetime`: BSON datetimes, as
+      milliseconds since the Unix epoch in UTC.
+    - :class:`~bson.objectid.ObjectId`: the 12 bytes of each ObjectId, as
+      ``S12``.
+    - :class:`~bson.decimal128.Decimal128`, or a ``(Decimal128, scale)``
+      tuple: BSON Decimal128 values as fixed-point ``int64`` values, that is
+      the value multiplied by ``10**scale``. For example, with a scale of 2,
+      ``Decimal128('12.34')`` is stored as ``1234``. Values that are not
+      finite, or are not exactly representable at the scale, are masked.
+      The values are converted without creating a :class:`decimal.Decimal`.
+
+    Requires `NumPy <https://numpy.org>`_ to be installed.
+
+    :param data: BSON data. Any bytes-like object that implements the buffer
+        protocol.
+    :param schema: A mapping of field names to column types. Any
+        value accepted by :class:`numpy.dtype` for one of the types above can
+        be used.
+
+    .. versionadded:: 4.18
+    """
+    try:
+        import numpy as np
+    except ImportError as exc:
+        raise ImportError("decode_columns requires numpy to be installed.") from exc
+
+    if not isinstance(schema, Mapping):
+        raise TypeError(f"schema must be a mapping, not {type(schema)}")
+    names = tuple(schema)
+    for name in names:
+        if not isinstance(name, str):
+            raise TypeError(f"field names must be instances of str, not {type(name)}")
+    specs = [_column_code(schema[name]) for name in names]
+    codes = "".join(code for code, _ in specs)
+    scales = tuple(scale for _, scale in specs)
+    columns = _decode_columns(
+        data, tuple(name.encode("utf-8") for name in names), codes.encode(), scales
+    )
+    result = {}
+    for name, code, (values, mask) in zip(names, codes, columns):
+        result[name] = np.ma.MaskedArray(
+            np.frombuffer(values, dtype=_COLUMN_DTYPES[code]), mask=np.frombuffer(mask, dtype="?")
+        )
+    return result
+
+
+def _decode_vectors(data: Any, name: bytes, dim: int) -> tuple[bytearray, bytearray, int]:
+    """Gather the FLOAT32 or INT8 vector in a top-level field of a stream of
+    BSON documents into the rows of a matrix of little-endian float32 values,
+    with a mask that is set where a document has no such vector. When `dim`
+    is negative, it is taken from the first vector found.
+    """
+    data, _ = get_data_and_view(data)
+    offsets = []
+    position = 0
+    end = len(data)
+    while position < end:
+        if end - position < 5:
+            raise InvalidBSON("invalid object size")
+        obj_size = _UNPACK_INT_FROM(data, position)[0]
+        if obj_size < 5 or end - position < obj_size or data[position + obj_size - 1]:
+            raise InvalidBSON("invalid object size")
+        offsets.append(position)
+        position += obj_size
+
+    vectors: list[Optional[Binary]] = [None] * len(offsets)
+    try:
+        for doc_index, doc_start in enumerate(offsets):
+            obj_end = doc_start + _UNPACK_INT_FROM(data, doc_start)[0]
+            position = doc_start + 4
+            while position < obj_end - 1:
+                element_type = data[position]
+                name_end = data.index(b"\x00", position + 1)
+                if name_end >= obj_end - 1:
+                    raise InvalidBSON("invalid object size")
+                element_name = bytes(data[position + 1 : name_end])
+                value_position = name_end + 1
+                position = _skip_value(
+                    data,
+                    value_position,
+                    obj_end - 1,
+                    element_type,
+                    element_name.decode("utf-8", "replace"),
+                )
+                if (
+                    element_name == name
+                    and element_type == ord(BSONBIN)
+                    and data[value_position + 4] == VECTOR_SUBTYPE
+                ):
+                    vectors[doc_index] = Binary(
+                        bytes(data[value_position + 5 : position]), VECTOR_SUBTYPE
+                    )
+            if position != obj_end - 1:
+                raise InvalidBSON("invalid object size")
+    except InvalidBSON:
+        raise
+    except Exception:
+        # Change exception type to InvalidBSON but preserve traceback.
+        _, exc_value, exc_tb = sys.exc_info()
+        raise InvalidBSON(str(exc_value)).with_traceback(exc_tb) from None
+
+    dtypes = (BinaryVectorDtype.FLOAT32.value, BinaryVectorDtype.INT8.value)
+    rows: list[Optional[bytes]] = []
+    for value in vectors:
+        if value is None or len(value) < 2 or value[:1] not in dtypes:
+            rows.append(None)
+            continue
+        vector = value.as_vector()
+        if dim < 0:
+            dim = len(vector)
+        if len(vector) != dim:
+            raise ValueError(
+                f"expected vectors of dimension {dim}, found one of dimension {len(vector)}"
+            )
+        rows.append(struct.pack(f"<{dim}f", *vector.data))
+    dim = max(dim, 0)
+    empty = bytes(dim * 4)
+    values = bytearray().join(empty if row is None else row for row in rows)
+    mask = bytearray(row is None for row in rows)
+    return values, mask, dim
+
+
+if _USE_C:
+    _decode_vectors = _cbson._decode_vectors
+
+
+def decode_vectors(data: _ReadableBuffer, field: str, dim: Optional[int] = None) -> Any:
+    """Gather a vector field of a batch of BSON documents into one 2-D NumPy
+    array.
+
+    `data` must be a stream of concatenated BSON documents, like a batch
+    returned by :meth:`~pymongo.collection.Collection.find_raw_batches`.
+    The :class:`~bson.binary.Binary` vector stored in the top-level `field`
+    of each document is written directly into one row of a preallocated
+    ``float32`` array of shape ``(number of documents, dim)``, without
+    creating a Python object for each document or vector. ``FLOAT32``
+    vectors are copied and ``INT8`` vectors are converted to ``float32``. A
+    row is masked when the document is missing the field, or when the value
+    is not a ``FLOAT32`` or ``INT8`` vector::
+
+        >>> vector = Binary.from_vector([1.0, 2.0], BinaryVectorDtype.FLOAT32)
+        >>> data = bson.encode({'v': vector}) + bson.encode({'x': 1})
+        >>> bson.decode_vectors(data, 'v').tolist()
+        [[1.0, 2.0], [None, None]]
+
+    Requires `NumPy <https://numpy.org>`_ to be installed.
+
+    :param data: BSON data. Any bytes-like object that implements the buffer
+        protocol.
+    :param field: The name of the top-level field holding the vectors.
+    :param dim: The number of values in each vector. By default, it is taken
+        from the first vector found. A :exc:`ValueError` is raised when a
+        vector has a different number of values.
+
+    .. versionadded:: 4.18
+    """
+    try:
+        import numpy as np
+    except ImportError as exc:
+        raise ImportError("decode_vectors requires numpy to be installed.") from exc
+
+    if not isinstance(field, str):
+        raise TypeError(f"field must be an instance of str, not {type(field)}")
+    if dim is not None and (not isinstance(dim, int) or dim < 0):
+        raise ValueError(f"dim must be a non-negative integer, not {dim!r}")
+    values, mask, dim = _decode_vectors(data, field.encode("utf-8"), -1 if dim is None else dim)
+    rows = np.frombuffer(values, dtype="<f4").reshape(len(mask), dim)
+    row_mask = np.frombuffer(mask, dtype="?")
+    if not row_mask.any():
+        # Skip building a mask of every value when no row is masked.
+        return np.ma.MaskedArray(rows, mask=np.ma.nomask)
+    return np.ma.MaskedArray(rows, mask=np.repeat(row_mask[:, None], dim, axis=1))
 
 
 def is_valid(bson: bytes) -> bool:
@@ -1463,9 +2702,10 @@ def has_c() -> bool:
 
 
 def _after_fork() -> None:
-    """Releases the ObjectID lock child."""
+    """Releases the ObjectID lock and drops the decoding thread pool in the child."""
     if ObjectId._inc_lock.locked():
         ObjectId._inc_lock.release()
+    _DECODE_POOL._after_fork()
 
 
 if hasattr(os, "register_at_fork"):
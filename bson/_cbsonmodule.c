@@ -41,6 +41,7 @@ struct module_state {
     PyObject* Binary;
     PyObject* Code;
     PyObject* ObjectId;
+    PyObject* ObjectIdSlot;
     PyObject* DBRef;
     PyObject* Regex;
     PyObject* UUID;
@@ -55,6 +56,9 @@ struct module_state {
     PyObject* DatetimeMS;
     PyObject* min_datetime;
     PyObject* max_datetime;
+    PyObject* DataclassFieldNames;
+    PyObject* dataclass_field_names;
+    PyObject* document_plan;
     PyObject* replace_args;
     PyObject* replace_kwargs;
     PyObject* _type_marker_str;
@@ -82,6 +86,15 @@ struct module_state {
     PyObject* _from_uuid_str;
     PyObject* _as_uuid_str;
     PyObject* _from_bid_str;
+    PyObject* _items_str;
+    PyObject* _iter_str;
+    PyObject* _compiled_codec_str;
+    PyObject* _encoder_cache_str;
+    PyObject* _document_decoder_str;
+    PyObject* _resolve_encoder_str;
+    PyObject* _build_str;
+    PyObject* _nested_str;
+    PyObject* _direct_str;
     int64_t min_millis;
     int64_t max_millis;
 };
@@ -238,6 +251,10 @@ static PyObject* elements_to_dict(PyObject* self, const char* string,
                                   unsigned max,
                                   const codec_options_t* options);
 
+static int _get_buffer(PyObject *exporter, Py_buffer *view);
+
+void handle_invalid_doc_error(PyObject* dict);
+
 static int _write_element_to_buffer(PyObject* self, buffer_t buffer,
                                     int type_byte, PyObject* value,
                                     unsigned char check_keys,
@@ -685,6 +702,23 @@ static int _load_object(PyObject** object, char* module_name, char* object_name)
 /* Load all Python objects to cache.
  *
  * Returns non-zero on failure. */
+/* Create an ObjectId from 12 bytes without calling ObjectId.__init__.
+ * Returns a new reference or NULL on failure. */
+static PyObject* _objectid_from_bytes(struct module_state* state, const char* data) {
+    PyTypeObject* type = (PyTypeObject*)state->ObjectId;
+    PyObject* oid;
+    PyObject* oid_bytes = PyBytes_FromStringAndSize(data, 12);
+    if (!oid_bytes) {
+        return NULL;
+    }
+    oid = type->tp_alloc(type, 0);
+    if (oid && Py_TYPE(state->ObjectIdSlot)->tp_descr_set(state->ObjectIdSlot, oid, oid_bytes) == -1) {
+        Py_CLEAR(oid);
+    }
+    Py_DECREF(oid_bytes);
+    return oid;
+}
+
 static int _load_python_objects(PyObject* module) {
     PyObject* empty_string = NULL;
     PyObject* re_compile = NULL;
@@ -721,7 +755,16 @@ static int _load_python_objects(PyObject* module) {
         (state->_utcoffset_str = PyUnicode_FromString("utcoffset")) &&
         (state->_from_uuid_str = PyUnicode_FromString("from_uuid")) &&
         (state->_as_uuid_str = PyUnicode_FromString("as_uuid")) &&
-        (state->_from_bid_str = PyUnicode_FromString("from_bid")))) {
+        (state->_from_bid_str = PyUnicode_FromString("from_bid")) &&
+        (state->_items_str = PyUnicode_FromString("items")) &&
+        (state->_iter_str = PyUnicode_FromString("__iter__")) &&
+        (state->_compiled_codec_str = PyUnicode_InternFromString("_compiled_codec")) &&
+        (state->_encoder_cache_str = PyUnicode_FromString("_encoder_cache")) &&
+        (state->_document_decoder_str = PyUnicode_FromString("_document_decoder")) &&
+        (state->_resolve_encoder_str = PyUnicode_FromString("_resolve_encoder")) &&
+        (state->_build_str = PyUnicode_FromString("build")) &&
+        (state->_nested_str = PyUnicode_FromString("nested")) &&
+        (state->_direct_str = PyUnicode_FromString("direct")))) {
             return 1;
     }
 
@@ -742,7 +785,22 @@ static int _load_python_objects(PyObject* module) {
         _load_object(&min_datetime_ms, "bson.datetime_ms", "_MIN_UTC_MS") ||
         _load_object(&max_datetime_ms, "bson.datetime_ms", "_MAX_UTC_MS") ||
         _load_object(&state->min_datetime, "bson.datetime_ms", "_MIN_UTC") ||
-        _load_object(&state->max_datetime, "bson.datetime_ms", "_MAX_UTC")) {
+        _load_object(&state->max_datetime, "bson.datetime_ms", "_MAX_UTC") ||
+        _load_object(&state->DataclassFieldNames, "bson._dataclass_codec", "_FIELD_NAMES") ||
+        _load_object(&state->dataclass_field_names, "bson._dataclass_codec", "_field_names") ||
+        _load_object(&state->document_plan, "bson._dataclass_codec", "_document_plan")) {
+        return 1;
+    }
+
+    /* The descriptor of the ObjectId.__id slot, used to create ObjectIds
+     * without calling ObjectId.__init__. */
+    state->ObjectIdSlot = PyObject_GetAttrString(state->ObjectId, "_ObjectId__id");
+    if (!state->ObjectIdSlot) {
+        return 1;
+    }
+    if (!Py_TYPE(state->ObjectIdSlot)->tp_descr_get ||
+        !Py_TYPE(state->ObjectIdSlot)->tp_descr_set) {
+        PyErr_SetString(PyExc_TypeError, "ObjectId.__id is not a slot");
         return 1;
     }
 
@@ -840,54 +898,150 @@ static long _type_marker(PyObject* object, PyObject* _type_marker_str) {
  * Return 1 on success. options->document_class is a new reference.
  * Return 0 on failure.
  */
-int cbson_convert_type_registry(PyObject* registry_obj, type_registry_t* registry, PyObject* _encoder_map_str, PyObject* _decoder_map_str, PyObject* _fallback_encoder_str) {
+int cbson_convert_type_registry(PyObject* registry_obj, type_registry_t* registry, struct module_state* state) {
     registry->encoder_map = NULL;
+    registry->encoder_cache = NULL;
     registry->decoder_map = NULL;
     registry->fallback_encoder = NULL;
+    registry->document_decoder = NULL;
     registry->registry_obj = NULL;
 
-    registry->encoder_map = PyObject_GetAttr(registry_obj, _encoder_map_str);
+    registry->encoder_map = PyObject_GetAttr(registry_obj, state->_encoder_map_str);
     if (registry->encoder_map == NULL) {
         goto fail;
     }
     registry->is_encoder_empty = (PyDict_Size(registry->encoder_map) == 0);
 
-    registry->decoder_map = PyObject_GetAttr(registry_obj, _decoder_map_str);
+    registry->encoder_cache = PyObject_GetAttr(registry_obj, state->_encoder_cache_str);
+    if (registry->encoder_cache == NULL) {
+        goto fail;
+    }
+    if (!PyDict_Check(registry->encoder_cache)) {
+        PyErr_SetString(PyExc_TypeError, "_encoder_cache must be a dict");
+        goto fail;
+    }
+
+    registry->decoder_map = PyObject_GetAttr(registry_obj, state->_decoder_map_str);
     if (registry->decoder_map == NULL) {
         goto fail;
     }
     registry->is_decoder_empty = (PyDict_Size(registry->decoder_map) == 0);
 
-    registry->fallback_encoder = PyObject_GetAttr(registry_obj, _fallback_encoder_str);
+    registry->fallback_encoder = PyObject_GetAttr(registry_obj, state->_fallback_encoder_str);
     if (registry->fallback_encoder == NULL) {
         goto fail;
     }
     registry->has_fallback_encoder = (registry->fallback_encoder != Py_None);
 
+    registry->document_decoder = PyObject_GetAttr(registry_obj, state->_document_decoder_str);
+    if (registry->document_decoder == NULL) {
+        goto fail;
+    }
+    registry->has_document_decoder = (registry->document_decoder != Py_None);
+
     registry->registry_obj = registry_obj;
     Py_INCREF(registry->registry_obj);
     return 1;
 
 fail:
     Py_XDECREF(registry->encoder_map);
+    Py_XDECREF(registry->encoder_cache);
     Py_XDECREF(registry->decoder_map);
     Py_XDECREF(registry->fallback_encoder);
+    Py_XDECREF(registry->document_decoder);
     return 0;
 }
 
+#define COMPILED_CODEC_NAME "bson._cbson.compiled_codec"
+
+/* Take new references to the objects of a codec_options_t. */
+static void _incref_codec_options(codec_options_t* options) {
+    Py_XINCREF(options->document_class);
+    Py_XINCREF(options->tzinfo);
+    Py_XINCREF(options->options_obj);
+    Py_XINCREF(options->document_plan);
+    Py_XINCREF(options->document_direct);
+    Py_XINCREF(options->type_registry.registry_obj);
+    Py_XINCREF(options->type_registry.encoder_map);
+    Py_XINCREF(options->type_registry.encoder_cache);
+    Py_XINCREF(options->type_registry.decoder_map);
+    Py_XINCREF(options->type_registry.fallback_encoder);
+    Py_XINCREF(options->type_registry.document_decoder);
+}
+
+static void _destroy_compiled_codec(PyObject* capsule) {
+    codec_options_t* options = PyCapsule_GetPointer(capsule, COMPILED_CODEC_NAME);
+    if (options) {
+        destroy_codec_options(options);
+        PyMem_Free(options);
+    }
+}
+
+/* Cache a copy of options in the _compiled_codec attribute of options_obj
+ * so that later calls with the same CodecOptions skip parsing it.
+ *
+ * The copy does not reference options_obj, which would be a reference
+ * cycle. Options that cannot store attributes, like plain tuples, are not
+ * cached.
+ */
+static void _cache_codec_options(struct module_state* state, PyObject* options_obj,
+                                 const codec_options_t* options) {
+    PyObject* capsule;
+    codec_options_t* compiled = PyMem_Malloc(sizeof(codec_options_t));
+    if (!compiled) {
+        return;
+    }
+    *compiled = *options;
+    compiled->options_obj = NULL;
+    _incref_codec_options(compiled);
+    capsule = PyCapsule_New(compiled, COMPILED_CODEC_NAME, _destroy_compiled_codec);
+    if (!capsule) {
+        destroy_codec_options(compiled);
+        PyMem_Free(compiled);
+        PyErr_Clear();
+        return;
+    }
+    if (PyObject_SetAttr(options_obj, state->_compiled_codec_str, capsule) == -1) {
+        PyErr_Clear();
+    }
+    Py_DECREF(capsule);
+}
+
 /* Fill out a codec_options_t* from a CodecOptions object.
+ *
+ * The parsed options are cached on the CodecOptions object, which is
+ * immutable, so this only copies the cached options after the first call.
  *
  * Return 1 on success. options->document_class is a new reference.
  * Return 0 on failure.
  */
 int convert_codec_options(PyObject* self, PyObject* options_obj, codec_options_t* options) {
     PyObject* type_registry_obj = NULL;
+    PyObject* compiled;
     struct module_state *state = GETSTATE(self);
     long type_marker;
     if (!state) {
         return 0;
     }
 
+    if (!PyTuple_CheckExact(options_obj)) {
+        compiled = PyObject_GetAttr(options_obj, state->_compiled_codec_str);
+        if (compiled) {
+            codec_options_t* cached = PyCapsule_GetPointer(compiled, COMPILED_CODEC_NAME);
+            if (cached) {
+                *options = *cached;
+                options->options_obj = options_obj;
+                /* The unicode_decode_error_handler string is owned by
+                 * options_obj, which outlives the copy. */
+                _incref_codec_options(options);
+                Py_DECREF(compiled);
+                return 1;
+            }
+            Py_DECREF(compiled);
+        }
+        PyErr_Clear();
+    }
+
     options->unicode_decode_error_handler = NULL;
 
     if (!PyArg_ParseTuple(options_obj, "ObbzOOb",
@@ -907,10 +1061,67 @@ int convert_codec_options(PyObject* self, PyObject* options_obj, codec_options_t
         return 0;
     }
 
-    if (!cbson_convert_type_registry(type_registry_obj,
-                               &options->type_registry, state->_encoder_map_str, state->_decoder_map_str, state->_fallback_encoder_str)) {
+    /* Dataclasses and Records are decoded as dicts, then built with their
+     * plan. */
+    options->document_plan = NULL;
+    options->document_plan_kwargs = 0;
+    options->document_plan_nested = 0;
+    options->document_direct = NULL;
+    options->key_cache = NULL;
+    if (type_marker != 101 && options->document_class != (PyObject*)&PyDict_Type) {
+        PyObject* plan = PyObject_CallOneArg(state->document_plan, options->document_class);
+        if (!plan) {
+            return 0;
+        }
+        if (plan != Py_None) {
+            PyObject* build = PyObject_GetAttr(plan, state->_build_str);
+            if (!build) {
+                Py_DECREF(plan);
+                return 0;
+            }
+            PyObject* nested = PyObject_GetAttr(plan, state->_nested_str);
+            if (!nested) {
+                Py_DECREF(build);
+                Py_DECREF(plan);
+                return 0;
+            }
+            options->document_plan_nested = PyObject_IsTrue(nested) == 1;
+            Py_DECREF(nested);
+            PyObject* direct = PyObject_GetAttr(plan, state->_direct_str);
+            if (!direct) {
+                Py_DECREF(build);
+                Py_DECREF(plan);
+                return 0;
+            }
+            if (direct == Py_None) {
+                Py_DECREF(direct);
+            } else {
+                options->document_direct = direct;
+            }
+            if (build == Py_None) {
+                /* Call the dataclass directly. */
+                Py_DECREF(build);
+                options->document_plan = options->document_class;
+                Py_INCREF(options->document_plan);
+                options->document_plan_kwargs = 1;
+            } else {
+                options->document_plan = build;
+            }
+            options->document_class = (PyObject*)&PyDict_Type;
+        }
+        Py_DECREF(plan);
+    }
+
+    if (!cbson_convert_type_registry(type_registry_obj, &options->type_registry, state)) {
+        Py_CLEAR(options->document_plan);
+        Py_CLEAR(options->document_direct);
         return 0;
     }
+    /* The document_decoder sees embedded documents as dicts before they are
+     * built, so build from dicts when there is one. */
+    if (options->type_registry.has_document_decoder) {
+        Py_CLEAR(options->document_direct);
+    }
 
     options->is_raw_bson = (101 == type_marker);
     options->is_dict_class = (options->document_class == (PyObject*)&PyDict_Type);
@@ -920,6 +1131,9 @@ int convert_codec_options(PyObject* self, PyObject* options_obj, codec_options_t
     Py_INCREF(options->document_class);
     Py_INCREF(options->tzinfo);
 
+    if (!PyTuple_CheckExact(options_obj)) {
+        _cache_codec_options(state, options_obj, options);
+    }
     return 1;
 }
 
@@ -927,10 +1141,14 @@ void destroy_codec_options(codec_options_t* options) {
     Py_CLEAR(options->document_class);
     Py_CLEAR(options->tzinfo);
     Py_CLEAR(options->options_obj);
+    Py_CLEAR(options->document_plan);
+    Py_CLEAR(options->document_direct);
     Py_CLEAR(options->type_registry.registry_obj);
     Py_CLEAR(options->type_registry.encoder_map);
+    Py_CLEAR(options->type_registry.encoder_cache);
     Py_CLEAR(options->type_registry.decoder_map);
     Py_CLEAR(options->type_registry.fallback_encoder);
+    Py_CLEAR(options->type_registry.document_decoder);
 }
 
 static int write_element_to_buffer(PyObject* self, buffer_t buffer,
@@ -1093,6 +1311,111 @@ static int _write_regex_to_buffer(
     return 1;
 }
 
+/* Return a new reference to the tuple of field names of the type of value
+ * if it is a dataclass, Py_None if it is not, or NULL on error. */
+static PyObject* _dataclass_field_names(struct module_state* state, PyObject* value) {
+    PyObject* value_type = (PyObject*)Py_TYPE(value);
+    PyObject* names = PyDict_GetItemWithError(state->DataclassFieldNames, value_type);
+    if (names) {
+        Py_INCREF(names);
+        return names;
+    }
+    if (PyErr_Occurred()) {
+        return NULL;
+    }
+    return PyObject_CallOneArg(state->dataclass_field_names, value_type);
+}
+
+/* Write the fields of a dataclass instance as a document, without building
+ * a dict of them.
+ *
+ * returns the length of the document, or 0 on failure */
+static int write_dataclass(PyObject* self, buffer_t buffer, PyObject* obj,
+                           PyObject* names, unsigned char check_keys,
+                           const codec_options_t* options, unsigned char top_level) {
+    char zero = 0;
+    int length;
+    int length_location;
+    Py_ssize_t i;
+    struct module_state *state = GETSTATE(self);
+    if (!state) {
+        return 0;
+    }
+
+    length_location = pymongo_buffer_save_space(buffer, 4);
+    if (length_location == -1) {
+        return 0;
+    }
+
+    /* Write _id first if this is a top level doc. */
+    if (top_level) {
+        int has_id = PySequence_Contains(names, state->_id_str);
+        if (has_id == -1) {
+            return 0;
+        }
+        if (has_id) {
+            PyObject* _id = PyObject_GetAttr(obj, state->_id_str);
+            if (!_id) {
+                return 0;
+            }
+            if (!write_pair(self, buffer, "_id", 3,
+                            _id, check_keys, options, 1)) {
+                Py_DECREF(_id);
+                return 0;
+            }
+            Py_DECREF(_id);
+        }
+    }
+
+    for (i = 0; i < PyTuple_GET_SIZE(names); i++) {
+        PyObject* name = PyTuple_GET_ITEM(names, i);
+        PyObject* value = PyObject_GetAttr(obj, name);
+        if (!value) {
+            return 0;
+        }
+        if (!decode_and_write_pair(self, buffer, name, value,
+                                   check_keys, options, top_level)) {
+            if (PyErr_Occurred() && top_level) {
+                handle_invalid_doc_error(obj);
+            }
+            Py_DECREF(value);
+            return 0;
+        }
+        Py_DECREF(value);
+    }
+
+    /* write null byte and fill in length */
+    if (!buffer_write_bytes(buffer, &zero, 1)) {
+        return 0;
+    }
+    length = pymongo_buffer_get_position(buffer) - length_location;
+    buffer_write_int32_at_position(
+        buffer, length_location, (int32_t)length);
+    return length;
+}
+
+/* Return a new reference to the type encoder for exactly the type of value,
+ * or Py_None if there is none. Returns NULL on error.
+ *
+ * The registry caches the encoder of each type the first time it is seen,
+ * after searching the type's MRO, so this is usually one dict lookup.
+ */
+static PyObject* _lookup_type_encoder(struct module_state* state, PyObject* value,
+                                      const codec_options_t* options) {
+    PyObject* value_type = (PyObject*)Py_TYPE(value);
+    PyObject* encoder = PyDict_GetItemWithError(
+        options->type_registry.encoder_cache, value_type);
+    if (encoder) {
+        Py_INCREF(encoder);
+        return encoder;
+    }
+    if (PyErr_Occurred()) {
+        return NULL;
+    }
+    PyObject* resolve_args[2] = {options->type_registry.registry_obj, value_type};
+    return PyObject_VectorcallMethod(state->_resolve_encoder_str, resolve_args, 2, NULL);
+}
+
 /* Write a single value to the buffer (also write its type_byte, for which
  * space has already been reserved.
  *
@@ -1123,6 +1446,30 @@ static int _write_element_to_buffer(PyObject* self, buffer_t buffer,
         PyTuple_CheckExact(value) || PyBytes_CheckExact(value) || value == Py_None) {
         type = 0;
     } else {
+        /* Try a custom encoder first if one is provided and we have not
+         * already attempted to use a type encoder. Type encoders cannot be
+         * registered for the built-in types checked below. */
+        if (!in_custom_call && !options->type_registry.is_encoder_empty) {
+            PyObject* converter = _lookup_type_encoder(state, value, options);
+            if (converter == NULL) {
+                return 0;
+            }
+            if (converter != Py_None) {
+                /* Transform types that have a registered converter.
+                 * A new reference is created upon transformation. */
+                PyObject* converter_args[1] = {value};
+                new_value = PyObject_Vectorcall(converter, converter_args, 1, NULL);
+                Py_DECREF(converter);
+                if (new_value == NULL) {
+                    return 0;
+                }
+                retval = write_element_to_buffer(self, buffer, type_byte, new_value,
+                                                 check_keys, options, 1, 0);
+                Py_DECREF(new_value);
+                return retval;
+            }
+            Py_DECREF(converter);
+        }
         type = _type_marker(value, state->_type_marker_str);
         if (type < 0) {
             return 0;
@@ -1187,7 +1534,14 @@ static int _write_element_to_buffer(PyObject* self, buffer_t buffer,
         {
             /* ObjectId */
             const char* data;
-            PyObject* pystring = PyObject_GetAttr(value, state->_binary_str);
+            PyObject* pystring;
+            if (PyObject_TypeCheck(value, (PyTypeObject*)state->ObjectId)) {
+                /* Read the slot directly instead of the binary property. */
+                pystring = Py_TYPE(state->ObjectIdSlot)->tp_descr_get(
+                    state->ObjectIdSlot, value, state->ObjectId);
+            } else {
+                pystring = PyObject_GetAttr(value, state->_binary_str);
+            }
             if (!pystring) {
                 return 0;
             }
@@ -1554,32 +1908,6 @@ static int _write_element_to_buffer(PyObject* self, buffer_t buffer,
         return result;
     }
 
-    /* Try a custom encoder if one is provided and we have not already
-     * attempted to use a type encoder. */
-    if (!in_custom_call && !options->type_registry.is_encoder_empty) {
-        PyObject* value_type = NULL;
-        PyObject* converter = NULL;
-        value_type = PyObject_Type(value);
-        if (value_type == NULL) {
-            return 0;
-        }
-        converter = PyDict_GetItem(options->type_registry.encoder_map, value_type);
-        Py_XDECREF(value_type);
-        if (converter != NULL) {
-            /* Transform types that have a registered converter.
-             * A new reference is created upon transformation. */
-            PyObject* converter_args[1] = {value};
-            new_value = PyObject_Vectorcall(converter, converter_args, 1, NULL);
-            if (new_value == NULL) {
-                return 0;
-            }
-            retval = write_element_to_buffer(self, buffer, type_byte, new_value,
-                                             check_keys, options, 1, 0);
-            Py_XDECREF(new_value);
-            return retval;
-        }
-    }
-
     /* Try the fallback encoder if one is provided and we have not already
      * attempted to use the fallback encoder. */
     if (!in_fallback_call && options->type_registry.has_fallback_encoder) {
@@ -1596,6 +1924,22 @@ static int _write_element_to_buffer(PyObject* self, buffer_t buffer,
         return retval;
     }
 
+    /* Encode dataclass instances as embedded documents. This comes after the
+     * custom and fallback encoders so that they can encode dataclasses. */
+    {
+        PyObject* names = _dataclass_field_names(state, value);
+        if (!names) {
+            return 0;
+        }
+        if (names != Py_None) {
+            *(pymongo_buffer_get_buffer(buffer) + type_byte) = 0x03;
+            retval = write_dataclass(self, buffer, value, names, check_keys, options, 0);
+            Py_DECREF(names);
+            return retval;
+        }
+        Py_DECREF(names);
+    }
+
     /* We can't determine value's type. Fail. */
     _set_cannot_encode(value);
     return 0;
@@ -1881,6 +2225,21 @@ int write_dict(PyObject* self, buffer_t buffer,
 
         if (!PyObject_IsInstance(dict, state->Mapping)) {
             PyObject* repr;
+            PyObject* names;
+            if (PyErr_Occurred()) {
+                return 0;
+            }
+            names = _dataclass_field_names(state, dict);
+            if (!names) {
+                return 0;
+            }
+            if (names != Py_None) {
+                int result = write_dataclass(self, buffer, dict, names,
+                                             check_keys, options, top_level);
+                Py_DECREF(names);
+                return result;
+            }
+            Py_DECREF(names);
             if ((repr = PyObject_Repr(dict))) {
                 PyObject* errmsg = PyUnicode_FromString(
                     "encoder expected a mapping type but got: ");
@@ -2054,1228 +2413,5833 @@ static PyObject* _cbson_dict_to_bson(PyObject* self, PyObject* args) {
     return result;
 }
 
+/* Returned by _value_size for values that must be encoded to be measured. */
+#define SIZE_BY_ENCODING -2
+
+static Py_ssize_t _document_size(PyObject* self, PyObject* dict,
+                                 const codec_options_t* options);
+
 /*
- * Hook for optional decoding BSON documents to DBRef.
+ * Get the size of the BSON encoding of a key, without the null terminator,
+ * or SIZE_BY_ENCODING if the key is not a str that can be a field name.
  */
-static PyObject *_dbref_hook(PyObject* self, PyObject* value) {
-    struct module_state *state = GETSTATE(self);
-    PyObject* ref = NULL;
-    PyObject* id = NULL;
-    PyObject* database = NULL;
-    PyObject* ret = NULL;
-    int db_present = 0;
-    if (!state) {
-        return NULL;
+static Py_ssize_t _key_size(PyObject* key) {
+    const char* data;
+    Py_ssize_t length;
+    if (!PyUnicode_CheckExact(key)) {
+        return SIZE_BY_ENCODING;
+    }
+    if (PyUnicode_IS_ASCII(key)) {
+        data = (const char*)PyUnicode_DATA(key);
+        length = PyUnicode_GET_LENGTH(key);
+    } else if (!(data = PyUnicode_AsUTF8AndSize(key, &length))) {
+        PyErr_Clear();
+        return SIZE_BY_ENCODING;
     }
+    if (memchr(data, 0, (size_t)length)) {
+        return SIZE_BY_ENCODING;
+    }
+    return length;
+}
 
-    /* Decoding for DBRefs */
-    if (PyMapping_HasKey(value, state->_dollar_ref_str) && PyMapping_HasKey(value, state->_dollar_id_str)) { /* DBRef */
-        ref = PyObject_GetItem(value, state->_dollar_ref_str);
-        /* PyObject_GetItem returns NULL to indicate error. */
-        if (!ref) {
-            goto invalid;
+/*
+ * Get the size of the BSON encoding of a value, without its type byte and
+ * name, for the most common types.
+ *
+ * Returns the size, SIZE_BY_ENCODING for any other value, or -1 on error.
+ */
+static Py_ssize_t _value_size(PyObject* self, PyObject* value,
+                              const codec_options_t* options) {
+    struct module_state *state;
+    if (PyUnicode_CheckExact(value)) {
+        Py_ssize_t length;
+        if (PyUnicode_IS_ASCII(value)) {
+            length = PyUnicode_GET_LENGTH(value);
+        } else if (!PyUnicode_AsUTF8AndSize(value, &length)) {
+            PyErr_Clear();
+            return SIZE_BY_ENCODING;
         }
-        id = PyObject_GetItem(value, state->_dollar_id_str);
-        /* PyObject_GetItem returns NULL to indicate error. */
-        if (!id) {
-            goto invalid;
+        return 4 + length + 1;
+    }
+    if (PyBool_Check(value)) {
+        return 1;
+    }
+    if (PyLong_CheckExact(value)) {
+        const long long long_long_value = PyLong_AsLongLong(value);
+        if (long_long_value == -1 && PyErr_Occurred()) {
+            /* Let the encoder raise, or give the fallback_encoder a chance. */
+            PyErr_Clear();
+            return SIZE_BY_ENCODING;
         }
-
-        if (PyMapping_HasKey(value, state->_dollar_db_str)) {
-            database = PyObject_GetItem(value, state->_dollar_db_str);
-            if (!database) {
-                goto invalid;
-            }
-            db_present = 1;
-        } else {
-            database = Py_None;
-            Py_INCREF(database);
+        if (-2147483648LL <= long_long_value && long_long_value <= 2147483647LL) {
+            return 4;
         }
-
-        // check types
-        if (!(PyUnicode_Check(ref) && (database == Py_None || PyUnicode_Check(database)))) {
-            ret = value;
-            goto invalid;
+        return 8;
+    }
+    if (PyFloat_CheckExact(value)) {
+        return 8;
+    }
+    if (value == Py_None) {
+        return 0;
+    }
+    if (PyDict_CheckExact(value)) {
+        return _document_size(self, value, options);
+    }
+    if (PyList_CheckExact(value) || PyTuple_CheckExact(value)) {
+        Py_ssize_t items = PySequence_Fast_GET_SIZE(value);
+        Py_ssize_t size = 4 + 1;
+        Py_ssize_t i;
+        if (items > BSON_MAX_SIZE) {
+            return SIZE_BY_ENCODING;
         }
-
-        PyMapping_DelItem(value, state->_dollar_ref_str);
-        PyMapping_DelItem(value, state->_dollar_id_str);
-        if (db_present) {
-            PyMapping_DelItem(value, state->_dollar_db_str);
+        if (Py_EnterRecursiveCall(" while sizing an object")) {
+            return -1;
+        }
+        for (i = 0; i < items; i++) {
+            char name[BUF_SIZE];
+            Py_ssize_t item_size;
+            if (LL2STR(name, (long long)i) == -1) {
+                Py_LeaveRecursiveCall();
+                return -1;
+            }
+            item_size = _value_size(self, PySequence_Fast_GET_ITEM(value, i), options);
+            if (item_size < 0) {
+                Py_LeaveRecursiveCall();
+                return item_size;
+            }
+            size += 1 + (Py_ssize_t)strlen(name) + 1 + item_size;
         }
+        Py_LeaveRecursiveCall();
+        return size;
+    }
+    if (PyBytes_CheckExact(value)) {
+        return 4 + 1 + PyBytes_GET_SIZE(value);
+    }
+    /* Type encoders take precedence over the types below. */
+    if (!options->type_registry.is_encoder_empty) {
+        return SIZE_BY_ENCODING;
+    }
+    state = GETSTATE(self);
+    if (!state) {
+        return -1;
+    }
+    if (Py_TYPE(value) == (PyTypeObject*)state->ObjectId) {
+        return 12;
+    }
+    if (PyDateTime_CheckExact(value)) {
+        return 8;
+    }
+    return SIZE_BY_ENCODING;
+}
 
-        PyObject* dbref_args[4] = {ref, id, database, value};
-        ret = PyObject_Vectorcall(state->DBRef, dbref_args, 4, NULL);
-        Py_DECREF(value);
+/*
+ * Get the size of an element by encoding it into a scratch buffer.
+ *
+ * Returns the size, or -1 on error.
+ */
+static Py_ssize_t _encoded_pair_size(PyObject* self, PyObject* key, PyObject* value,
+                                     const codec_options_t* options) {
+    Py_ssize_t size;
+    buffer_t buffer = pymongo_buffer_new();
+    if (!buffer) {
+        return -1;
+    }
+    if (decode_and_write_pair(self, buffer, key, value, 0, options, 0)) {
+        size = pymongo_buffer_get_position(buffer);
     } else {
-        ret = value;
+        size = -1;
     }
-invalid:
-    Py_XDECREF(ref);
-    Py_XDECREF(id);
-    Py_XDECREF(database);
-    return ret;
+    pymongo_buffer_free(buffer);
+    return size;
 }
 
-static PyObject* get_value(PyObject* self, PyObject* name, const char* buffer,
-                           unsigned* position, unsigned char type,
-                           unsigned max, const codec_options_t* options, int raw_array) {
-    struct module_state *state = GETSTATE(self);
-    PyObject* value = NULL;
-    if (!state) {
-        return NULL;
+/*
+ * Get the size of the BSON encoding of a dict. Elements that _value_size
+ * cannot measure are encoded one at a time.
+ *
+ * Returns the size, or -1 on error.
+ */
+static Py_ssize_t _document_size(PyObject* self, PyObject* dict,
+                                 const codec_options_t* options) {
+    PyObject* key;
+    PyObject* value;
+    Py_ssize_t pos = 0;
+    Py_ssize_t size = 4 + 1;
+    if (Py_EnterRecursiveCall(" while sizing an object")) {
+        return -1;
     }
+    while (PyDict_Next(dict, &pos, &key, &value)) {
+        Py_ssize_t key_size = _key_size(key);
+        Py_ssize_t value_size = SIZE_BY_ENCODING;
+        if (key_size != SIZE_BY_ENCODING) {
+            value_size = _value_size(self, value, options);
+            if (value_size == -1) {
+                Py_LeaveRecursiveCall();
+                return -1;
+            }
+        }
+        if (value_size == SIZE_BY_ENCODING) {
+            Py_ssize_t element_size = _encoded_pair_size(self, key, value, options);
+            if (element_size == -1) {
+                Py_LeaveRecursiveCall();
+                return -1;
+            }
+            size += element_size;
+        } else {
+            size += 1 + key_size + 1 + value_size;
+        }
+    }
+    Py_LeaveRecursiveCall();
+    return size;
+}
+
+static PyObject* _cbson_encoded_size(PyObject* self, PyObject* args) {
+    PyObject* dict;
+    PyObject* options_obj;
+    codec_options_t options;
+    buffer_t buffer;
+    Py_ssize_t size;
+    struct module_state *state = GETSTATE(self);
+    if (!state) {
+        return NULL;
+    }
+
+    if (!(PyArg_ParseTuple(args, "OO", &dict, &options_obj) &&
+            convert_codec_options(self, options_obj, &options))) {
+        return NULL;
+    }
+
+    if (PyDict_CheckExact(dict)) {
+        size = _document_size(self, dict, &options);
+        if (size == -1) {
+            /* Encode the document to raise the same error as the encoder. */
+            PyErr_Clear();
+            size = SIZE_BY_ENCODING;
+        }
+    } else {
+        long type_marker = _type_marker(dict, state->_type_marker_str);
+        if (type_marker < 0) {
+            destroy_codec_options(&options);
+            return NULL;
+        }
+        if (type_marker == 101) {
+            PyObject* raw = PyObject_GetAttr(dict, state->_raw_str);
+            destroy_codec_options(&options);
+            if (!raw) {
+                return NULL;
+            }
+            size = PyBytes_Size(raw);
+            Py_DECREF(raw);
+            if (size == -1) {
+                return NULL;
+            }
+            return PyLong_FromSsize_t(size);
+        }
+        size = SIZE_BY_ENCODING;
+    }
+    if (size == SIZE_BY_ENCODING) {
+        /* Other mappings and dataclasses are measured by encoding them. */
+        buffer = pymongo_buffer_new();
+        if (!buffer) {
+            destroy_codec_options(&options);
+            return NULL;
+        }
+        size = write_dict(self, buffer, dict, 0, &options, 1) ?
+            pymongo_buffer_get_position(buffer) : -1;
+        pymongo_buffer_free(buffer);
+    }
+    destroy_codec_options(&options);
+    if (size == -1) {
+        return NULL;
+    }
+    return PyLong_FromSsize_t(size);
+}
+
+/*
+ * Copy 'size' bytes of encoded BSON into 'target' at 'offset'. A bytearray
+ * target is extended as needed, any other target must be a writable buffer
+ * with enough room.
+ *
+ * Returns 1 on success, 0 on failure.
+ */
+static int _copy_into_target(PyObject* target, Py_ssize_t offset,
+                             const char* data, Py_ssize_t size) {
+    Py_buffer view;
+
+    if (offset < 0) {
+        PyErr_SetString(PyExc_ValueError, "offset must not be negative");
+        return 0;
+    }
+    if (PyByteArray_Check(target)) {
+        Py_ssize_t length = PyByteArray_GET_SIZE(target);
+        if (offset > length) {
+            PyErr_SetString(PyExc_ValueError, "offset is past the end of the buffer");
+            return 0;
+        }
+        if (size > PY_SSIZE_T_MAX - offset) {
+            PyErr_NoMemory();
+            return 0;
+        }
+        if (offset + size > length &&
+                PyByteArray_Resize(target, offset + size) < 0) {
+            return 0;
+        }
+        memcpy(PyByteArray_AS_STRING(target) + offset, data, (size_t)size);
+        return 1;
+    }
+    if (PyObject_GetBuffer(target, &view, PyBUF_WRITABLE | PyBUF_C_CONTIGUOUS) < 0) {
+        return 0;
+    }
+    if (offset > view.len || size > view.len - offset) {
+        PyErr_SetString(PyExc_ValueError, "buffer is too small for the encoded document");
+        PyBuffer_Release(&view);
+        return 0;
+    }
+    memcpy((char*)view.buf + offset, data, (size_t)size);
+    PyBuffer_Release(&view);
+    return 1;
+}
+
+static PyObject* _cbson_dict_to_bson_into(PyObject* self, PyObject* args) {
+    PyObject* dict;
+    PyObject* target;
+    Py_ssize_t offset;
+    unsigned char check_keys;
+    PyObject* options_obj = NULL;
+    codec_options_t options;
+    buffer_t buffer;
+    long type_marker;
+    int size;
+    struct module_state *state = GETSTATE(self);
+    if (!state) {
+        return NULL;
+    }
+
+    if (!(PyArg_ParseTuple(args, "OOnbO", &dict, &target, &offset,
+                          &check_keys, &options_obj) &&
+            convert_codec_options(self, options_obj, &options))) {
+        return NULL;
+    }
+
+    /* check for RawBSONDocument */
+    type_marker = _type_marker(dict, state->_type_marker_str);
+    if (type_marker < 0) {
+        destroy_codec_options(&options);
+        return NULL;
+    } else if (101 == type_marker) {
+        PyObject* raw;
+        Py_buffer raw_view;
+        Py_ssize_t raw_length;
+        int copied;
+        destroy_codec_options(&options);
+        raw = PyObject_GetAttr(dict, state->_raw_str);
+        if (NULL == raw) {
+            return NULL;
+        }
+        if (!_get_buffer(raw, &raw_view)) {
+            Py_DECREF(raw);
+            return NULL;
+        }
+        raw_length = raw_view.len;
+        copied = _copy_into_target(target, offset, raw_view.buf, raw_length);
+        PyBuffer_Release(&raw_view);
+        Py_DECREF(raw);
+        if (!copied) {
+            return NULL;
+        }
+        return PyLong_FromSsize_t(raw_length);
+    }
+
+    if (!PyByteArray_Check(target)) {
+        /* Encode straight into a buffer that does not grow, without an
+         * intermediate copy. */
+        Py_buffer view;
+        if (offset < 0) {
+            destroy_codec_options(&options);
+            PyErr_SetString(PyExc_ValueError, "offset must not be negative");
+            return NULL;
+        }
+        if (PyObject_GetBuffer(target, &view, PyBUF_WRITABLE | PyBUF_C_CONTIGUOUS) < 0) {
+            destroy_codec_options(&options);
+            return NULL;
+        }
+        if (offset > view.len) {
+            destroy_codec_options(&options);
+            PyBuffer_Release(&view);
+            PyErr_SetString(PyExc_ValueError, "buffer is too small for the encoded document");
+            return NULL;
+        }
+        buffer = pymongo_buffer_new_fixed(
+            (char*)view.buf + offset,
+            (int)(view.len - offset < INT_MAX ? view.len - offset : INT_MAX));
+        if (!buffer) {
+            destroy_codec_options(&options);
+            PyBuffer_Release(&view);
+            return NULL;
+        }
+        size = write_dict(self, buffer, dict, check_keys, &options, 1) ?
+            pymongo_buffer_get_position(buffer) : -1;
+        destroy_codec_options(&options);
+        pymongo_buffer_free(buffer);
+        PyBuffer_Release(&view);
+        if (size == -1) {
+            return NULL;
+        }
+        return PyLong_FromLong(size);
+    }
+
+    buffer = pymongo_buffer_new();
+    if (!buffer) {
+        destroy_codec_options(&options);
+        return NULL;
+    }
+
+    if (!write_dict(self, buffer, dict, check_keys, &options, 1)) {
+        destroy_codec_options(&options);
+        pymongo_buffer_free(buffer);
+        return NULL;
+    }
+    destroy_codec_options(&options);
+
+    size = pymongo_buffer_get_position(buffer);
+    if (!_copy_into_target(target, offset, pymongo_buffer_get_buffer(buffer), size)) {
+        pymongo_buffer_free(buffer);
+        return NULL;
+    }
+    pymongo_buffer_free(buffer);
+    return PyLong_FromLong(size);
+}
+
+/*
+ * Write one element of a document encoded from a DocumentTemplate. Values
+ * of the template's type for the field are written directly, any other
+ * value is encoded with write_pair.
+ *
+ * Returns 1 on success, 0 on failure.
+ */
+static int _write_template_element(PyObject* self, buffer_t buffer, char code,
+                                   const char* name, int name_length,
+                                   PyObject* value,
+                                   const codec_options_t* options) {
+    char type;
+    switch (code) {
+    case 'i':
+        if (PyLong_CheckExact(value)) {
+            int overflow;
+            long long long_value = PyLong_AsLongLongAndOverflow(value, &overflow);
+            if (long_value == -1 && PyErr_Occurred()) {
+                return 0;
+            }
+            if (overflow) {
+                /* Let write_pair try the fallback encoder. */
+                break;
+            }
+            type = (long_value >= INT32_MIN && long_value <= INT32_MAX) ? 0x10 : 0x12;
+            if (!buffer_write_bytes(buffer, &type, 1) ||
+                    !buffer_write_bytes(buffer, name, name_length + 1)) {
+                return 0;
+            }
+            if (type == 0x10) {
+                return buffer_write_int32(buffer, (int32_t)long_value);
+            }
+            return buffer_write_int64(buffer, (int64_t)long_value);
+        }
+        break;
+    case 'd':
+        if (PyFloat_CheckExact(value)) {
+            type = 0x01;
+            return (buffer_write_bytes(buffer, &type, 1) &&
+                    buffer_write_bytes(buffer, name, name_length + 1) &&
+                    buffer_write_double(buffer, PyFloat_AS_DOUBLE(value)));
+        }
+        break;
+    case 's':
+        if (PyUnicode_CheckExact(value)) {
+            type = 0x02;
+            return (buffer_write_bytes(buffer, &type, 1) &&
+                    buffer_write_bytes(buffer, name, name_length + 1) &&
+                    write_unicode(buffer, value));
+        }
+        break;
+    case 'b':
+        if (PyBool_Check(value)) {
+            char flag = (value == Py_True) ? 0x01 : 0x00;
+            type = 0x08;
+            return (buffer_write_bytes(buffer, &type, 1) &&
+                    buffer_write_bytes(buffer, name, name_length + 1) &&
+                    buffer_write_bytes(buffer, &flag, 1));
+        }
+        break;
+    default:
+        break;
+    }
+    return write_pair(self, buffer, name, name_length, value, 0, options, 1);
+}
+
+static PyObject* _cbson_encode_template(PyObject* self, PyObject* args) {
+    PyObject* names;
+    PyObject* values;
+    PyObject* options_obj;
+    PyObject* result = NULL;
+    const char* codes;
+    Py_ssize_t codes_length;
+    Py_ssize_t i;
+    codec_options_t options;
+    buffer_t buffer;
+    int length_location;
+    int length;
+
+    if (!(PyArg_ParseTuple(args, "O!y#O!O", &PyTuple_Type, &names, &codes,
+                          &codes_length, &PyTuple_Type, &values, &options_obj) &&
+            convert_codec_options(self, options_obj, &options))) {
+        return NULL;
+    }
+    if (PyTuple_GET_SIZE(names) != codes_length ||
+            PyTuple_GET_SIZE(values) != codes_length) {
+        PyErr_SetString(PyExc_ValueError, "expected one value for each template field");
+        destroy_codec_options(&options);
+        return NULL;
+    }
+
+    buffer = pymongo_buffer_new();
+    if (!buffer) {
+        destroy_codec_options(&options);
+        return NULL;
+    }
+    length_location = pymongo_buffer_save_space(buffer, 4);
+    if (length_location == -1) {
+        goto done;
+    }
+    for (i = 0; i < codes_length; i++) {
+        /* Names are encoded C strings, including the trailing NUL. */
+        PyObject* name = PyTuple_GET_ITEM(names, i);
+        if (!PyBytes_Check(name) || PyBytes_GET_SIZE(name) < 1) {
+            PyErr_SetString(PyExc_TypeError, "template field names must be encoded C strings");
+            goto done;
+        }
+        if (!_write_template_element(self, buffer, codes[i], PyBytes_AS_STRING(name),
+                                     (int)PyBytes_GET_SIZE(name) - 1,
+                                     PyTuple_GET_ITEM(values, i), &options)) {
+            goto done;
+        }
+    }
+    if (!buffer_write_bytes(buffer, "\x00", 1)) {
+        goto done;
+    }
+    length = pymongo_buffer_get_position(buffer);
+    buffer_write_int32_at_position(buffer, length_location, (int32_t)length);
+    result = Py_BuildValue("y#", pymongo_buffer_get_buffer(buffer), (Py_ssize_t)length);
+
+done:
+    destroy_codec_options(&options);
+    pymongo_buffer_free(buffer);
+    return result;
+}
+
+/*
+ * Hook for optional decoding BSON documents to DBRef.
+ */
+static PyObject *_dbref_hook(PyObject* self, PyObject* value) {
+    struct module_state *state = GETSTATE(self);
+    PyObject* ref = NULL;
+    PyObject* id = NULL;
+    PyObject* database = NULL;
+    PyObject* ret = NULL;
+    int db_present = 0;
+    if (!state) {
+        return NULL;
+    }
+
+    /* Decoding for DBRefs */
+    if (PyMapping_HasKey(value, state->_dollar_ref_str) && PyMapping_HasKey(value, state->_dollar_id_str)) { /* DBRef */
+        ref = PyObject_GetItem(value, state->_dollar_ref_str);
+        /* PyObject_GetItem returns NULL to indicate error. */
+        if (!ref) {
+            goto invalid;
+        }
+        id = PyObject_GetItem(value, state->_dollar_id_str);
+        /* PyObject_GetItem returns NULL to indicate error. */
+        if (!id) {
+            goto invalid;
+        }
+
+        if (PyMapping_HasKey(value, state->_dollar_db_str)) {
+            database = PyObject_GetItem(value, state->_dollar_db_str);
+            if (!database) {
+                goto invalid;
+            }
+            db_present = 1;
+        } else {
+            database = Py_None;
+            Py_INCREF(database);
+        }
+
+        // check types
+        if (!(PyUnicode_Check(ref) && (database == Py_None || PyUnicode_Check(database)))) {
+            ret = value;
+            goto invalid;
+        }
+
+        PyMapping_DelItem(value, state->_dollar_ref_str);
+        PyMapping_DelItem(value, state->_dollar_id_str);
+        if (db_present) {
+            PyMapping_DelItem(value, state->_dollar_db_str);
+        }
+
+        PyObject* dbref_args[4] = {ref, id, database, value};
+        ret = PyObject_Vectorcall(state->DBRef, dbref_args, 4, NULL);
+        Py_DECREF(value);
+    } else {
+        ret = value;
+    }
+invalid:
+    Py_XDECREF(ref);
+    Py_XDECREF(id);
+    Py_XDECREF(database);
+    return ret;
+}
+
+/*
+ * Call the type registry's document_decoder, if there is one, with a decoded
+ * document. Documents decoded as RawBSONDocument are returned unchanged.
+ * Steals the reference to 'document', which may be NULL.
+ *
+ * Returns a new reference, or NULL on error.
+ */
+static PyObject* _apply_document_decoder(PyObject* document, const codec_options_t* options) {
+    PyObject* new_document;
+    if (!document || !options->type_registry.has_document_decoder || options->is_raw_bson) {
+        return document;
+    }
+    PyObject* decoder_args[1] = {document};
+    new_document = PyObject_Vectorcall(
+        options->type_registry.document_decoder, decoder_args, 1, NULL);
+    Py_DECREF(document);
+    return new_document;
+}
+
+/*
+ * Build an instance of a dataclass or Record document_class from a decoded
+ * document. Steals the reference to 'document', which may be NULL.
+ *
+ * Returns a new reference, or NULL on error.
+ */
+static PyObject* _apply_document_plan(PyObject* document, const codec_options_t* options) {
+    PyObject* instance;
+    if (!document || !options->document_plan) {
+        return document;
+    }
+    if (options->document_plan_kwargs) {
+        instance = PyObject_VectorcallDict(options->document_plan, NULL, 0, document);
+    } else {
+        PyObject* plan_args[1] = {document};
+        instance = PyObject_Vectorcall(options->document_plan, plan_args, 1, NULL);
+    }
+    Py_DECREF(document);
+    if (!instance) {
+        /* Report unknown and missing fields like the pure Python decoder. */
+        _rewrap_as_invalid_bson();
+    }
+    return instance;
+}
+
+/*
+ * Finish decoding an embedded document: convert it to a DBRef if it is one,
+ * otherwise pass it to the document_decoder, then build it with a nested
+ * document plan. Steals the reference to 'value'.
+ *
+ * Returns a new reference, or NULL on error.
+ */
+static PyObject* _embedded_document_hook(PyObject* self, PyObject* value,
+                                         const codec_options_t* options) {
+    PyObject* result = _dbref_hook(self, value);
+    if (result != value) {
+        return result;
+    }
+    result = _apply_document_decoder(result, options);
+    if (result && options->document_plan_nested && PyDict_CheckExact(result)) {
+        return _apply_document_plan(result, options);
+    }
+    return result;
+}
+
+/*
+ * Convert a decoded value with the type registry's decoder for its type, if
+ * there is one. Steals the reference to 'value'.
+ *
+ * Returns a new reference, or NULL on error.
+ */
+static PyObject* _apply_type_decoder(PyObject* value, const codec_options_t* options) {
+    PyObject* converter;
+    PyObject* new_value;
+    if (options->type_registry.is_decoder_empty) {
+        return value;
+    }
+    converter = PyDict_GetItem(options->type_registry.decoder_map,
+                               (PyObject*)Py_TYPE(value));
+    if (converter == NULL) {
+        return value;
+    }
+    PyObject* converter_args[1] = {value};
+    new_value = PyObject_Vectorcall(converter, converter_args, 1, NULL);
+    Py_DECREF(value);
+    return new_value;
+}
+
+static PyObject* get_value(PyObject* self, PyObject* name, const char* buffer,
+                           unsigned* position, unsigned char type,
+                           unsigned max, const codec_options_t* options, int raw_array) {
+    struct module_state *state = GETSTATE(self);
+    PyObject* value = NULL;
+    if (!state) {
+        return NULL;
+    }
+    switch (type) {
+    case 1:
+        {
+            double d;
+            if (max < 8) {
+                goto invalid;
+            }
+            memcpy(&d, buffer + *position, 8);
+            value = PyFloat_FromDouble(BSON_DOUBLE_FROM_LE(d));
+            *position += 8;
+            break;
+        }
+    case 2:
+    case 14:
+        {
+            uint32_t value_length;
+            if (max < 4) {
+                goto invalid;
+            }
+            memcpy(&value_length, buffer + *position, 4);
+            value_length = BSON_UINT32_FROM_LE(value_length);
+            /* Encoded string length + string */
+            if (!value_length || max < value_length || max < 4 + value_length) {
+                goto invalid;
+            }
+            *position += 4;
+            /* Strings must end in \0 */
+            if (buffer[*position + value_length - 1]) {
+                goto invalid;
+            }
+            value = PyUnicode_DecodeUTF8(
+                buffer + *position, value_length - 1,
+                options->unicode_decode_error_handler);
+            if (!value) {
+                goto invalid;
+            }
+            *position += value_length;
+            break;
+        }
+    case 3:
+        {
+            uint32_t size;
+
+            if (max < 4) {
+                goto invalid;
+            }
+            memcpy(&size, buffer + *position, 4);
+            size = BSON_UINT32_FROM_LE(size);
+            if (size < BSON_MIN_SIZE || max < size) {
+                goto invalid;
+            }
+            /* Check for bad eoo */
+            if (buffer[*position + size - 1]) {
+                goto invalid;
+            }
+
+            value = elements_to_dict(self, buffer + *position,
+                                     size, options);
+            if (!value) {
+                goto invalid;
+            }
+
+            if (options->is_raw_bson) {
+                *position += size;
+                break;
+            }
+
+            /* Hook for DBRefs and the document_decoder */
+            value = _embedded_document_hook(self, value, options);
+            if (!value) {
+                goto invalid;
+            }
+
+            *position += size;
+            break;
+        }
+    case 4:
+        {
+            uint32_t size, end;
+
+            if (max < 4) {
+                goto invalid;
+            }
+            memcpy(&size, buffer + *position, 4);
+            size = BSON_UINT32_FROM_LE(size);
+            if (size < BSON_MIN_SIZE || max < size) {
+                goto invalid;
+            }
+
+            end = *position + size - 1;
+            /* Check for bad eoo */
+            if (buffer[end]) {
+                goto invalid;
+            }
+
+            if (raw_array != 0) {
+                // Treat it as a binary buffer.
+                value = PyBytes_FromStringAndSize(buffer + *position, size);
+                *position += size;
+                break;
+            }
+
+            *position += 4;
+
+            value = PyList_New(0);
+            if (!value) {
+                goto invalid;
+            }
+            while (*position < end) {
+                PyObject* to_append;
+
+                unsigned char bson_type = (unsigned char)buffer[(*position)++];
+
+                size_t key_size = strlen(buffer + *position);
+                if (max < key_size) {
+                    Py_DECREF(value);
+                    goto invalid;
+                }
+                /* just skip the key, they're in order. */
+                *position += (unsigned)key_size + 1;
+                if (Py_EnterRecursiveCall(" while decoding a list value")) {
+                    Py_DECREF(value);
+                    goto invalid;
+                }
+                to_append = get_value(self, name, buffer, position, bson_type,
+                                      max - (unsigned)key_size, options, raw_array);
+                Py_LeaveRecursiveCall();
+                if (!to_append) {
+                    Py_DECREF(value);
+                    goto invalid;
+                }
+                if (PyList_Append(value, to_append) < 0) {
+                    Py_DECREF(value);
+                    Py_DECREF(to_append);
+                    goto invalid;
+                }
+                Py_DECREF(to_append);
+            }
+            if (*position != end) {
+                goto invalid;
+            }
+            (*position)++;
+            break;
+        }
+    case 5:
+        {
+            PyObject* data;
+            PyObject* st;
+            uint32_t length, length2;
+            unsigned char subtype;
+
+            if (max < 5) {
+                goto invalid;
+            }
+            memcpy(&length, buffer + *position, 4);
+            length = BSON_UINT32_FROM_LE(length);
+            if (max - 5 < length) { // Account for 5-byte header. max >= 5 guaranteed above
+                goto invalid;
+            }
+
+            subtype = (unsigned char)buffer[*position + 4];
+            *position += 5;
+            if (subtype == 2) {
+                if (length < 4) {
+                    goto invalid;
+                }
+                memcpy(&length2, buffer + *position, 4);
+                length2 = BSON_UINT32_FROM_LE(length2);
+                if (length2 != length - 4) {
+                    goto invalid;
+                }
+            }
+            /* Python3 special case. Decode BSON binary subtype 0 to bytes. */
+            if (subtype == 0) {
+                value = PyBytes_FromStringAndSize(buffer + *position, length);
+                *position += length;
+                break;
+            }
+            if (subtype == 2) {
+                data = PyBytes_FromStringAndSize(buffer + *position + 4, length - 4);
+            } else {
+                data = PyBytes_FromStringAndSize(buffer + *position, length);
+            }
+            if (!data) {
+                goto invalid;
+            }
+            /* Encode as UUID or Binary based on options->uuid_rep */
+            if (subtype == 3 || subtype == 4) {
+                PyObject* binary_value = NULL;
+                char uuid_rep = options->uuid_rep;
+
+                /* UUID should always be 16 bytes */
+                if (length != 16) {
+                    goto uuiderror;
+                }
+
+                PyObject* subtype_obj = PyLong_FromLong(subtype);
+                if (!subtype_obj) {
+                    goto uuiderror;
+                }
+                PyObject* binary_args[2] = {data, subtype_obj};
+                binary_value = PyObject_Vectorcall(state->Binary, binary_args, 2, NULL);
+                Py_DECREF(subtype_obj);
+                if (binary_value == NULL) {
+                    goto uuiderror;
+                }
+
+                if ((uuid_rep == UNSPECIFIED) ||
+                        (subtype == 4 && uuid_rep != STANDARD) ||
+                        (subtype == 3 && uuid_rep == STANDARD)) {
+                    value = binary_value;
+                    Py_INCREF(value);
+                } else {
+                    PyObject *uuid_rep_obj = PyLong_FromLong(uuid_rep);
+                    if (!uuid_rep_obj) {
+                        goto uuiderror;
+                    }
+                    PyObject* as_uuid_args[2] = {binary_value, uuid_rep_obj};
+                    value = PyObject_VectorcallMethod(
+                        state->_as_uuid_str, as_uuid_args, 2, NULL);
+                    Py_DECREF(uuid_rep_obj);
+                }
+
+            uuiderror:
+                Py_XDECREF(binary_value);
+                Py_DECREF(data);
+                if (!value) {
+                    goto invalid;
+                }
+                *position += length;
+                break;
+            }
+
+            st = PyLong_FromLong(subtype);
+            if (!st) {
+                Py_DECREF(data);
+                goto invalid;
+            }
+            PyObject* binary_args[2] = {data, st};
+            value = PyObject_Vectorcall(state->Binary, binary_args, 2, NULL);
+            Py_DECREF(st);
+            Py_DECREF(data);
+            if (!value) {
+                goto invalid;
+            }
+            *position += length;
+            break;
+        }
+    case 6:
+    case 10:
+        {
+            value = Py_None;
+            Py_INCREF(value);
+            break;
+        }
+    case 7:
+        {
+            if (max < 12) {
+                goto invalid;
+            }
+            value = _objectid_from_bytes(state, buffer + *position);
+            *position += 12;
+            break;
+        }
+    case 8:
+        {
+            char boolean_raw = buffer[(*position)++];
+            if (0 == boolean_raw) {
+                value = Py_False;
+            } else if (1 == boolean_raw) {
+                value = Py_True;
+            } else {
+                PyObject* InvalidBSON = _error("InvalidBSON");
+                if (InvalidBSON) {
+                    PyErr_Format(InvalidBSON, "invalid boolean value: %x", boolean_raw);
+                    Py_DECREF(InvalidBSON);
+                }
+                return NULL;
+            }
+            Py_INCREF(value);
+            break;
+        }
+    case 9:
+        {
+            int64_t millis;
+            if (max < 8) {
+                goto invalid;
+            }
+            memcpy(&millis, buffer + *position, 8);
+            millis = (int64_t)BSON_UINT64_FROM_LE(millis);
+            *position += 8;
+
+            value = decode_datetime(self, millis, options);
+            break;
+        }
+    case 11:
+        {
+            PyObject* pattern;
+            int flags;
+            size_t flags_length, i;
+            size_t pattern_length = strlen(buffer + *position);
+            if (pattern_length > BSON_MAX_SIZE || max < pattern_length) {
+                goto invalid;
+            }
+            pattern = PyUnicode_DecodeUTF8(
+                buffer + *position, pattern_length,
+                options->unicode_decode_error_handler);
+            if (!pattern) {
+                goto invalid;
+            }
+            *position += (unsigned)pattern_length + 1;
+            flags_length = strlen(buffer + *position);
+            if (flags_length > BSON_MAX_SIZE ||
+                    (BSON_MAX_SIZE - pattern_length) < flags_length) {
+                Py_DECREF(pattern);
+                goto invalid;
+            }
+            if (max < pattern_length + flags_length) {
+                Py_DECREF(pattern);
+                goto invalid;
+            }
+            flags = 0;
+            for (i = 0; i < flags_length; i++) {
+                if (buffer[*position + i] == 'i') {
+                    flags |= 2;
+                } else if (buffer[*position + i] == 'l') {
+                    flags |= 4;
+                } else if (buffer[*position + i] == 'm') {
+                    flags |= 8;
+                } else if (buffer[*position + i] == 's') {
+                    flags |= 16;
+                } else if (buffer[*position + i] == 'u') {
+                    flags |= 32;
+                } else if (buffer[*position + i] == 'x') {
+                    flags |= 64;
+                }
+            }
+            *position += (unsigned)flags_length + 1;
+
+            PyObject* flags_obj = PyLong_FromLong(flags);
+            if (!flags_obj) {
+                Py_DECREF(pattern);
+                goto invalid;
+            }
+            PyObject* regex_args[2] = {pattern, flags_obj};
+            value = PyObject_Vectorcall(state->Regex, regex_args, 2, NULL);
+            Py_DECREF(flags_obj);
+            Py_DECREF(pattern);
+            break;
+        }
+    case 12:
+        {
+            uint32_t coll_length;
+            PyObject* collection;
+            PyObject* id = NULL;
+
+            if (max < 4) {
+                goto invalid;
+            }
+            memcpy(&coll_length, buffer + *position, 4);
+            coll_length = BSON_UINT32_FROM_LE(coll_length);
+            /* Encoded string length + string + 12 byte ObjectId */
+            if (!coll_length || max < coll_length || max < 4 + coll_length + 12) {
+                goto invalid;
+            }
+            *position += 4;
+            /* Strings must end in \0 */
+            if (buffer[*position + coll_length - 1]) {
+                goto invalid;
+            }
+
+            collection = PyUnicode_DecodeUTF8(
+                buffer + *position, coll_length - 1,
+                options->unicode_decode_error_handler);
+            if (!collection) {
+                goto invalid;
+            }
+            *position += coll_length;
+
+            id = _objectid_from_bytes(state, buffer + *position);
+            if (!id) {
+                Py_DECREF(collection);
+                goto invalid;
+            }
+            *position += 12;
+            PyObject* dbref_args[2] = {collection, id};
+            value = PyObject_Vectorcall(state->DBRef, dbref_args, 2, NULL);
+            Py_DECREF(collection);
+            Py_DECREF(id);
+            break;
+        }
+    case 13:
+        {
+            PyObject* code;
+            uint32_t value_length;
+            if (max < 4) {
+                goto invalid;
+            }
+            memcpy(&value_length, buffer + *position, 4);
+            value_length = BSON_UINT32_FROM_LE(value_length);
+            /* Encoded string length + string */
+            if (!value_length || max < value_length || max < 4 + value_length) {
+                goto invalid;
+            }
+            *position += 4;
+            /* Strings must end in \0 */
+            if (buffer[*position + value_length - 1]) {
+                goto invalid;
+            }
+            code = PyUnicode_DecodeUTF8(
+                buffer + *position, value_length - 1,
+                options->unicode_decode_error_handler);
+            if (!code) {
+                goto invalid;
+            }
+            *position += value_length;
+            PyObject* code_args[1] = {code};
+            value = PyObject_Vectorcall(state->Code, code_args, 1, NULL);
+            Py_DECREF(code);
+            break;
+        }
+    case 15:
+        {
+            uint32_t c_w_s_size;
+            uint32_t code_size;
+            uint32_t scope_size;
+            uint32_t len;
+            PyObject* code;
+            PyObject* scope;
+
+            if (max < 8) {
+                goto invalid;
+            }
+
+            memcpy(&c_w_s_size, buffer + *position, 4);
+            c_w_s_size = BSON_UINT32_FROM_LE(c_w_s_size);
+            *position += 4;
+
+            if (max < c_w_s_size) {
+                goto invalid;
+            }
+
+            memcpy(&code_size, buffer + *position, 4);
+            code_size = BSON_UINT32_FROM_LE(code_size);
+            /* code_w_scope length + code length + code + scope length */
+            len = 4 + 4 + code_size + 4;
+            if (!code_size || max < code_size || max < len || len < code_size) {
+                goto invalid;
+            }
+            *position += 4;
+            /* Strings must end in \0 */
+            if (buffer[*position + code_size - 1]) {
+                goto invalid;
+            }
+            code = PyUnicode_DecodeUTF8(
+                buffer + *position, code_size - 1,
+                options->unicode_decode_error_handler);
+            if (!code) {
+                goto invalid;
+            }
+            *position += code_size;
+
+            memcpy(&scope_size, buffer + *position, 4);
+            scope_size = BSON_UINT32_FROM_LE(scope_size);
+            /* code length + code + scope length + scope */
+            len = 4 + 4 + code_size + scope_size;
+            if (scope_size < BSON_MIN_SIZE || len != c_w_s_size || len < scope_size) {
+                Py_DECREF(code);
+                goto invalid;
+            }
+
+            /* Check for bad eoo */
+            if (buffer[*position + scope_size - 1]) {
+                goto invalid;
+            }
+            scope = elements_to_dict(self, buffer + *position,
+                                 scope_size, options);
+            if (!scope) {
+                Py_DECREF(code);
+                goto invalid;
+            }
+            *position += scope_size;
+
+            PyObject* code_scope_args[2] = {code, scope};
+            value = PyObject_Vectorcall(state->Code, code_scope_args, 2, NULL);
+            Py_DECREF(code);
+            Py_DECREF(scope);
+            break;
+        }
+    case 16:
+        {
+            int32_t i;
+            if (max < 4) {
+                goto invalid;
+            }
+            memcpy(&i, buffer + *position, 4);
+            i = (int32_t)BSON_UINT32_FROM_LE(i);
+            value = PyLong_FromLong(i);
+            if (!value) {
+                goto invalid;
+            }
+            *position += 4;
+            break;
+        }
+    case 17:
+        {
+            uint32_t time, inc;
+            if (max < 8) {
+                goto invalid;
+            }
+            memcpy(&inc, buffer + *position, 4);
+            memcpy(&time, buffer + *position + 4, 4);
+            inc = BSON_UINT32_FROM_LE(inc);
+            time = BSON_UINT32_FROM_LE(time);
+            PyObject* time_obj = PyLong_FromUnsignedLong(time);
+            if (!time_obj) {
+                goto invalid;
+            }
+            PyObject* inc_obj = PyLong_FromUnsignedLong(inc);
+            if (!inc_obj) {
+                Py_DECREF(time_obj);
+                goto invalid;
+            }
+            PyObject* ts_args[2] = {time_obj, inc_obj};
+            value = PyObject_Vectorcall(state->Timestamp, ts_args, 2, NULL);
+            Py_DECREF(time_obj);
+            Py_DECREF(inc_obj);
+            *position += 8;
+            break;
+        }
+    case 18:
+        {
+            int64_t ll;
+            if (max < 8) {
+                goto invalid;
+            }
+            memcpy(&ll, buffer + *position, 8);
+            ll = (int64_t)BSON_UINT64_FROM_LE(ll);
+            PyObject* ll_obj = PyLong_FromLongLong(ll);
+            if (!ll_obj) {
+                goto invalid;
+            }
+            PyObject* int64_args[1] = {ll_obj};
+            value = PyObject_Vectorcall(state->BSONInt64, int64_args, 1, NULL);
+            Py_DECREF(ll_obj);
+            *position += 8;
+            break;
+        }
+    case 19:
+        {
+            if (max < 16) {
+                goto invalid;
+            }
+            PyObject *_bytes_obj = PyBytes_FromStringAndSize(buffer + *position, (Py_ssize_t)16);
+            if (!_bytes_obj) {
+                goto invalid;
+            }
+            PyObject* dec128_args[2] = {state->Decimal128, _bytes_obj};
+            value = PyObject_VectorcallMethod(
+                state->_from_bid_str, dec128_args, 2, NULL);
+            Py_DECREF(_bytes_obj);
+            *position += 16;
+            break;
+        }
+    case 255:
+        {
+            value = PyObject_Vectorcall(state->MinKey, NULL, 0, NULL);
+            break;
+        }
+    case 127:
+        {
+            value = PyObject_Vectorcall(state->MaxKey, NULL, 0, NULL);
+            break;
+        }
+    default:
+        {
+            PyObject* InvalidBSON = _error("InvalidBSON");
+            if (InvalidBSON) {
+                PyObject* bobj = PyBytes_FromFormat("%c", type);
+                if (bobj) {
+                    PyObject* repr = PyObject_Repr(bobj);
+                    Py_DECREF(bobj);
+                    /*
+                     * See http://bugs.python.org/issue22023 for why we can't
+                     * just use PyUnicode_FromFormat with %S or %R to do this
+                     * work.
+                     */
+                    if (repr) {
+                        PyObject* left = PyUnicode_FromString(
+                            "Detected unknown BSON type ");
+                        if (left) {
+                            PyObject* lmsg = PyUnicode_Concat(left, repr);
+                            Py_DECREF(left);
+                            if (lmsg) {
+                                PyObject* errmsg = PyUnicode_FromFormat(
+                                    "%U for fieldname '%U'. Are you using the "
+                                    "latest driver version?", lmsg, name);
+                                if (errmsg) {
+                                    PyErr_SetObject(InvalidBSON, errmsg);
+                                    Py_DECREF(errmsg);
+                                }
+                                Py_DECREF(lmsg);
+                            }
+                        }
+                        Py_DECREF(repr);
+                    }
+                }
+                Py_DECREF(InvalidBSON);
+            }
+            goto invalid;
+        }
+    }
+
+    if (value) {
+        return _apply_type_decoder(value, options);
+    }
+
+    invalid:
+
+    /*
+     * Wrap any non-InvalidBSON errors in InvalidBSON.
+     */
+    if (PyErr_Occurred()) {
+        _rewrap_as_invalid_bson();
+    } else {
+        PyObject *InvalidBSON = _error("InvalidBSON");
+        if (InvalidBSON) {
+            PyErr_SetString(InvalidBSON, "invalid length or type code");
+            Py_DECREF(InvalidBSON);
+        }
+    }
+    return NULL;
+}
+
+#define KEY_CACHE_SIZE 256
+#define KEY_CACHE_MAX_LENGTH 64
+
+/* Field names decoded by one decode_all call. Each slot holds the last ASCII
+ * name that hashed to it, so documents with the same fields share their key
+ * strings instead of allocating new ones, while the cache stays bounded. */
+typedef struct key_cache_t {
+    PyObject* keys[KEY_CACHE_SIZE];
+} key_cache_t;
+
+static void _clear_key_cache(key_cache_t* cache) {
+    int i;
+    for (i = 0; i < KEY_CACHE_SIZE; i++) {
+        Py_CLEAR(cache->keys[i]);
+    }
+}
+
+/*
+ * Decode the field name of an element, reusing the string from the key cache
+ * if options has one.
+ *
+ * Returns a new reference, or NULL on error.
+ */
+static PyObject* _decode_key(const char* name, size_t name_length,
+                             const codec_options_t* options) {
+    key_cache_t* cache = options->key_cache;
+    PyObject** slot;
+    PyObject* key;
+    size_t hash = name_length;
+    size_t i;
+    if (!cache || name_length > KEY_CACHE_MAX_LENGTH) {
+        return PyUnicode_DecodeUTF8(name, name_length,
+                                    options->unicode_decode_error_handler);
+    }
+    for (i = 0; i < name_length; i++) {
+        hash = hash * 31 + (unsigned char)name[i];
+    }
+    slot = &cache->keys[hash & (KEY_CACHE_SIZE - 1)];
+    key = *slot;
+    /* Only ASCII names are cached, so their data is the encoded name. */
+    if (key && PyUnicode_GET_LENGTH(key) == (Py_ssize_t)name_length &&
+            memcmp(PyUnicode_DATA(key), name, name_length) == 0) {
+        Py_INCREF(key);
+        return key;
+    }
+    key = PyUnicode_DecodeUTF8(name, name_length,
+                               options->unicode_decode_error_handler);
+    if (key && PyUnicode_IS_ASCII(key)) {
+        Py_INCREF(key);
+        Py_XSETREF(*slot, key);
+    }
+    return key;
+}
+
+/*
+ * Get the next 'name' and 'value' from a document in a string, whose position
+ * is provided.
+ *
+ * Returns the position of the next element in the document, or -1 on error.
+ */
+static int _element_to_dict(PyObject* self, const char* string,
+                            unsigned position, unsigned max,
+                            const codec_options_t* options,
+                            int raw_array,
+                            PyObject** name, PyObject** value) {
+    unsigned char type = (unsigned char)string[position++];
+    size_t name_length = strlen(string + position);
+    if (name_length > BSON_MAX_SIZE || position + name_length >= max) {
+        PyObject* InvalidBSON = _error("InvalidBSON");
+        if (InvalidBSON) {
+            PyErr_SetString(InvalidBSON, "field name too large");
+            Py_DECREF(InvalidBSON);
+        }
+        return -1;
+    }
+    *name = _decode_key(string + position, name_length, options);
+    if (!*name) {
+        /* If NULL is returned then wrap the UnicodeDecodeError
+           in an InvalidBSON error */
+        _rewrap_as_invalid_bson();
+        return -1;
+    }
+    position += (unsigned)name_length + 1;
+    *value = get_value(self, *name, string, &position, type,
+                       max - position, options, raw_array);
+    if (!*value) {
+        Py_DECREF(*name);
+        return -1;
+    }
+    return position;
+}
+
+/*
+ * Get the size of the value of an element of the given type, whose position
+ * is provided, without decoding it. 'max' is the number of bytes available
+ * from 'position' to the end of the enclosing document.
+ *
+ * Returns the size of the value, or -1 on error.
+ */
+static int _element_value_size(const char* string, unsigned position,
+                               unsigned char type, unsigned max,
+                               const char* name) {
+    uint32_t size;
     switch (type) {
+    case 6:
+    case 10:
+    case 127:
+    case 255:
+        size = 0;
+        break;
+    case 8:
+        size = 1;
+        break;
+    case 16:
+        size = 4;
+        break;
     case 1:
+    case 9:
+    case 17:
+    case 18:
+        size = 8;
+        break;
+    case 7:
+        size = 12;
+        break;
+    case 19:
+        size = 16;
+        break;
+    case 2:
+    case 13:
+    case 14:
+        /* Encoded string length + string */
+        if (max < 4) {
+            goto invalid;
+        }
+        memcpy(&size, string + position, 4);
+        size = BSON_UINT32_FROM_LE(size);
+        if (!size || max - 4 < size) {
+            goto invalid;
+        }
+        size += 4;
+        break;
+    case 3:
+    case 4:
+    case 15:
+        /* The length prefix covers the whole value. */
+        if (max < 4) {
+            goto invalid;
+        }
+        memcpy(&size, string + position, 4);
+        size = BSON_UINT32_FROM_LE(size);
+        if (size < BSON_MIN_SIZE) {
+            goto invalid;
+        }
+        break;
+    case 5:
+        /* Binary length + subtype + data */
+        if (max < 5) {
+            goto invalid;
+        }
+        memcpy(&size, string + position, 4);
+        size = BSON_UINT32_FROM_LE(size);
+        if (max - 5 < size) {
+            goto invalid;
+        }
+        size += 5;
+        break;
+    case 11:
         {
-            double d;
-            if (max < 8) {
+            /* Pattern and flags C strings */
+            size_t pattern_length = strlen(string + position);
+            size_t flags_length;
+            if (pattern_length >= max) {
+                goto invalid;
+            }
+            flags_length = strlen(string + position + pattern_length + 1);
+            if (flags_length >= max - pattern_length - 1) {
+                goto invalid;
+            }
+            size = (uint32_t)(pattern_length + flags_length + 2);
+            break;
+        }
+    case 12:
+        /* Collection string length + string + 12 byte ObjectId */
+        if (max < 4) {
+            goto invalid;
+        }
+        memcpy(&size, string + position, 4);
+        size = BSON_UINT32_FROM_LE(size);
+        if (!size || max < 16 || max - 16 < size) {
+            goto invalid;
+        }
+        size += 16;
+        break;
+    default:
+        {
+            PyObject* InvalidBSON = _error("InvalidBSON");
+            if (InvalidBSON) {
+                PyObject* bobj = PyBytes_FromFormat("%c", type);
+                if (bobj) {
+                    PyErr_Format(InvalidBSON,
+                                 "Detected unknown BSON type %R for fieldname '%s'. "
+                                 "Are you using the latest driver version?",
+                                 bobj, name);
+                    Py_DECREF(bobj);
+                }
+                Py_DECREF(InvalidBSON);
+            }
+            return -1;
+        }
+    }
+    if (size <= max) {
+        return (int)size;
+    }
+
+invalid:
+    {
+        PyObject* InvalidBSON = _error("InvalidBSON");
+        if (InvalidBSON) {
+            PyErr_SetString(InvalidBSON, "invalid length or type code");
+            Py_DECREF(InvalidBSON);
+        }
+    }
+    return -1;
+}
+
+static PyObject* _cbson_element_to_dict(PyObject* self, PyObject* args) {
+    const char* string;
+    PyObject* bson;
+    PyObject* options_obj = NULL;
+    codec_options_t options;
+    unsigned position;
+    unsigned max;
+    int new_position;
+    int raw_array = 0;
+    PyObject* name;
+    PyObject* value;
+    PyObject* result_tuple = NULL;
+    Py_buffer view = {0};
+
+    if (!(PyArg_ParseTuple(args, "OIIOp", &bson, &position, &max,
+                          &options_obj, &raw_array) &&
+            convert_codec_options(self, options_obj, &options))) {
+        return NULL;
+    }
+
+    if (!_get_buffer(bson, &view)) {
+        destroy_codec_options(&options);
+        return NULL;
+    }
+
+    if (max > view.len || position >= max) {
+        PyObject* InvalidBSON = _error("InvalidBSON");
+        if (InvalidBSON) {
+            PyErr_SetString(InvalidBSON, "invalid element position");
+            Py_DECREF(InvalidBSON);
+        }
+        goto done;
+    }
+    string = (const char*)view.buf;
+
+    new_position = _element_to_dict(self, string, position, max, &options, raw_array, &name, &value);
+    if (new_position < 0) {
+        goto done;
+    }
+
+    result_tuple = Py_BuildValue("NNi", name, value, new_position);
+    if (!result_tuple) {
+        Py_DECREF(name);
+        Py_DECREF(value);
+    }
+
+done:
+    PyBuffer_Release(&view);
+    destroy_codec_options(&options);
+    return result_tuple;
+}
+
+/*
+ * Build an index of the top-level elements of a BSON document, mapping each
+ * field name to the position of its element, by skipping over the values
+ * without decoding them.
+ */
+static PyObject* _cbson_index_elements(PyObject* self, PyObject* args) {
+    int32_t size;
+    unsigned position = 4;
+    unsigned end;
+    const char* string;
+    PyObject* bson;
+    PyObject* options_obj;
+    PyObject* index = NULL;
+    codec_options_t options;
+    Py_buffer view = {0};
+
+    if (!(PyArg_ParseTuple(args, "OO", &bson, &options_obj) &&
+            convert_codec_options(self, options_obj, &options))) {
+        return NULL;
+    }
+
+    if (!_get_buffer(bson, &view)) {
+        destroy_codec_options(&options);
+        return NULL;
+    }
+
+    string = (const char*)view.buf;
+    if (view.len < BSON_MIN_SIZE || view.len > BSON_MAX_SIZE) {
+        goto invalid;
+    }
+    memcpy(&size, string, 4);
+    size = (int32_t)BSON_UINT32_FROM_LE(size);
+    if (size != view.len || string[size - 1]) {
+        goto invalid;
+    }
+    end = (unsigned)size - 1;
+
+    if (!(index = PyDict_New())) {
+        goto done;
+    }
+
+    while (position < end) {
+        PyObject* name;
+        PyObject* offset;
+        unsigned element_start = position;
+        unsigned char type = (unsigned char)string[position++];
+        size_t name_length = strlen(string + position);
+        int value_size;
+
+        if (name_length > BSON_MAX_SIZE || position + name_length >= end) {
+            PyObject* InvalidBSON = _error("InvalidBSON");
+            if (InvalidBSON) {
+                PyErr_SetString(InvalidBSON, "field name too large");
+                Py_DECREF(InvalidBSON);
+            }
+            goto fail;
+        }
+        value_size = _element_value_size(string, position + (unsigned)name_length + 1,
+                                         type, end - position - (unsigned)name_length - 1,
+                                         string + position);
+        if (value_size < 0) {
+            goto fail;
+        }
+        name = PyUnicode_DecodeUTF8(string + position, name_length,
+                                    options.unicode_decode_error_handler);
+        if (!name) {
+            _rewrap_as_invalid_bson();
+            goto fail;
+        }
+        offset = PyLong_FromUnsignedLong(element_start);
+        if (!offset) {
+            Py_DECREF(name);
+            goto fail;
+        }
+        if (PyDict_SetItem(index, name, offset) < 0) {
+            Py_DECREF(name);
+            Py_DECREF(offset);
+            goto fail;
+        }
+        Py_DECREF(name);
+        Py_DECREF(offset);
+        position += (unsigned)name_length + 1 + (unsigned)value_size;
+    }
+    if (position == end) {
+        goto done;
+    }
+
+invalid:
+    {
+        PyObject* InvalidBSON = _error("InvalidBSON");
+        if (InvalidBSON) {
+            PyErr_SetString(InvalidBSON, "bad object or element length");
+            Py_DECREF(InvalidBSON);
+        }
+    }
+fail:
+    Py_CLEAR(index);
+done:
+    PyBuffer_Release(&view);
+    destroy_codec_options(&options);
+    return index;
+}
+
+/*
+ * Find the entry for a field name in a projection.
+ *
+ * Returns 1 and sets 'spec' to a borrowed reference if the field is
+ * requested, 0 if it is not, or -1 on error.
+ */
+static int _find_field(PyObject* fields, const char* name, size_t name_length,
+                       PyObject** spec) {
+    Py_ssize_t pos = 0;
+    PyObject* key;
+    PyObject* value;
+    while (PyDict_Next(fields, &pos, &key, &value)) {
+        Py_ssize_t key_length;
+        const char* key_utf8 = PyUnicode_AsUTF8AndSize(key, &key_length);
+        if (!key_utf8) {
+            return -1;
+        }
+        if ((size_t)key_length == name_length && !memcmp(key_utf8, name, name_length)) {
+            *spec = value;
+            return 1;
+        }
+    }
+    return 0;
+}
+
+static PyObject* _elements_to_dict_projected(PyObject* self, const char* string,
+                                             unsigned max,
+                                             const codec_options_t* options,
+                                             PyObject* fields);
+
+/*
+ * Decode an embedded document, or the documents in an array, keeping only
+ * the fields in the nested projection 'fields'. Values of any other type are
+ * omitted, as they would be by a server-side projection.
+ *
+ * Returns a new reference, Py_None if the value is omitted, or NULL on error.
+ */
+static PyObject* _projected_value(PyObject* self, const char* string,
+                                  unsigned position, unsigned char type,
+                                  unsigned size, const codec_options_t* options,
+                                  PyObject* fields) {
+    PyObject* value;
+    if (type == 3) {
+        value = _elements_to_dict_projected(self, string + position, size, options, fields);
+        if (!value) {
+            return NULL;
+        }
+        if (!options->is_raw_bson) {
+            value = _embedded_document_hook(self, value, options);
+            if (!value) {
+                return NULL;
+            }
+        }
+        return _apply_type_decoder(value, options);
+    }
+    if (type == 4) {
+        unsigned end = position + size - 1;
+        position += 4;
+        if (!(value = PyList_New(0))) {
+            return NULL;
+        }
+        while (position < end) {
+            unsigned char bson_type = (unsigned char)string[position++];
+            size_t key_size = strlen(string + position);
+            int value_size;
+            if (position + key_size >= end) {
+                goto invalid;
+            }
+            /* just skip the key, they're in order. */
+            position += (unsigned)key_size + 1;
+            value_size = _element_value_size(string, position, bson_type,
+                                             end - position, string + position - key_size - 1);
+            if (value_size < 0) {
+                Py_DECREF(value);
+                return NULL;
+            }
+            if (bson_type == 3) {
+                PyObject* item = _projected_value(self, string, position, bson_type,
+                                                  (unsigned)value_size, options, fields);
+                if (!item) {
+                    Py_DECREF(value);
+                    return NULL;
+                }
+                if (PyList_Append(value, item) < 0) {
+                    Py_DECREF(item);
+                    Py_DECREF(value);
+                    return NULL;
+                }
+                Py_DECREF(item);
+            }
+            position += (unsigned)value_size;
+        }
+        if (position != end) {
+            goto invalid;
+        }
+        return _apply_type_decoder(value, options);
+    }
+    Py_RETURN_NONE;
+
+invalid:
+    Py_DECREF(value);
+    {
+        PyObject* InvalidBSON = _error("InvalidBSON");
+        if (InvalidBSON) {
+            PyErr_SetString(InvalidBSON, "invalid length or type code");
+            Py_DECREF(InvalidBSON);
+        }
+    }
+    return NULL;
+}
+
+/*
+ * Decode only the elements of a BSON document named in 'fields', a dict
+ * mapping field names to True, to decode the whole value, or to a nested
+ * dict, to decode only those fields of an embedded document or of each
+ * document in an array. Other elements are skipped by length without being
+ * decoded.
+ */
+static PyObject* _elements_to_dict_projected(PyObject* self, const char* string,
+                                             unsigned max,
+                                             const codec_options_t* options,
+                                             PyObject* fields) {
+    unsigned position = 4;
+    unsigned end = max - 1;
+    PyObject* dict;
+
+    if (Py_EnterRecursiveCall(" while decoding a BSON document")) {
+        return NULL;
+    }
+    if (options->is_dict_class) {
+        dict = PyDict_New();
+    } else {
+        dict = PyObject_CallObject(options->document_class, NULL);
+    }
+    if (!dict) {
+        goto done;
+    }
+
+    while (position < end) {
+        PyObject* spec = NULL;
+        PyObject* name;
+        PyObject* value;
+        unsigned char type = (unsigned char)string[position++];
+        size_t name_length = strlen(string + position);
+        unsigned value_position;
+        int value_size;
+        int found;
+
+        if (name_length > BSON_MAX_SIZE || position + name_length >= end) {
+            PyObject* InvalidBSON = _error("InvalidBSON");
+            if (InvalidBSON) {
+                PyErr_SetString(InvalidBSON, "field name too large");
+                Py_DECREF(InvalidBSON);
+            }
+            goto fail;
+        }
+        value_position = position + (unsigned)name_length + 1;
+        value_size = _element_value_size(string, value_position, type,
+                                         end - value_position, string + position);
+        if (value_size < 0) {
+            goto fail;
+        }
+        found = _find_field(fields, string + position, name_length, &spec);
+        if (found < 0) {
+            goto fail;
+        }
+        if (found) {
+            name = _decode_key(string + position, name_length, options);
+            if (!name) {
+                _rewrap_as_invalid_bson();
+                goto fail;
+            }
+            if (PyDict_Check(spec)) {
+                value = _projected_value(self, string, value_position, type,
+                                         (unsigned)value_size, options, spec);
+            } else {
+                value = get_value(self, name, string, &value_position, type,
+                                  end - value_position, options, 0);
+            }
+            if (!value) {
+                Py_DECREF(name);
+                goto fail;
+            }
+            /* A nested projection omits values that are not documents. */
+            if (!PyDict_Check(spec) || type == 3 || type == 4) {
+                if (PyObject_SetItem(dict, name, value) < 0) {
+                    Py_DECREF(name);
+                    Py_DECREF(value);
+                    goto fail;
+                }
+            }
+            Py_DECREF(name);
+            Py_DECREF(value);
+        }
+        position += (unsigned)name_length + 1 + (unsigned)value_size;
+    }
+    if (position != end) {
+        PyObject* InvalidBSON = _error("InvalidBSON");
+        if (InvalidBSON) {
+            PyErr_SetString(InvalidBSON, "bad object or element length");
+            Py_DECREF(InvalidBSON);
+        }
+        goto fail;
+    }
+    goto done;
+
+fail:
+    Py_CLEAR(dict);
+done:
+    Py_LeaveRecursiveCall();
+    return dict;
+}
+
+static PyObject* _elements_to_dict(PyObject* self, const char* string,
+                                   unsigned max,
+                                   const codec_options_t* options) {
+    unsigned position = 0;
+    PyObject* dict;
+    int raw_array = 0;
+
+    /* Use PyDict_New() directly when document_class is dict.
+     * This avoids the overhead of PyObject_CallObject() for the common case. */
+    if (options->is_dict_class) {
+        dict = PyDict_New();
+    } else {
+        dict = PyObject_CallObject(options->document_class, NULL);
+    }
+    if (!dict) {
+        return NULL;
+    }
+
+    while (position < max) {
+        PyObject* name = NULL;
+        PyObject* value = NULL;
+        int new_position;
+
+        new_position = _element_to_dict(
+            self, string, position, max, options, raw_array, &name, &value);
+        if (new_position < 0) {
+            Py_DECREF(dict);
+            return NULL;
+        } else {
+            position = (unsigned)new_position;
+        }
+
+        /* Use PyDict_SetItem() when document_class is dict.
+         * PyDict_SetItem() is faster than PyObject_SetItem() because it
+         * avoids method lookup overhead. */
+        if (options->is_dict_class) {
+            if (PyDict_SetItem(dict, name, value) < 0) {
+                Py_DECREF(name);
+                Py_DECREF(value);
+                Py_DECREF(dict);
+                return NULL;
+            }
+        } else {
+            if (PyObject_SetItem(dict, name, value) < 0) {
+                Py_DECREF(name);
+                Py_DECREF(value);
+                Py_DECREF(dict);
+                return NULL;
+            }
+        }
+        Py_DECREF(name);
+        Py_DECREF(value);
+    }
+    return dict;
+}
+
+static PyObject* elements_to_dict(PyObject* self, const char* string,
+                                  unsigned max,
+                                  const codec_options_t* options) {
+    PyObject* result;
+    if (options->is_raw_bson) {
+        PyObject* bson_bytes = PyBytes_FromStringAndSize(string, max);
+        if (!bson_bytes) {
+            return NULL;
+        }
+        PyObject* raw_args[2] = {bson_bytes, options->options_obj};
+        result = PyObject_Vectorcall(options->document_class, raw_args, 2, NULL);
+        Py_DECREF(bson_bytes);
+        return result;
+    }
+    if (Py_EnterRecursiveCall(" while decoding a BSON document"))
+        return NULL;
+    result = _elements_to_dict(self, string + 4, max - 5, options);
+    Py_LeaveRecursiveCall();
+    return result;
+}
+
+static PyObject* _elements_to_instance(PyObject* self, const char* string,
+                                       unsigned max,
+                                       const codec_options_t* options,
+                                       PyObject* direct);
+
+/*
+ * Return 1 if the BSON document of 'size' bytes at 'string' may hold a
+ * "$ref" key, so that it may decode to a DBRef. Matches any "$ref" C string
+ * in the document, which only costs a false positive the slower path.
+ */
+static int _may_be_dbref(const char* string, uint32_t size) {
+    const char* end = string + size - 5;
+    const char* p;
+    for (p = string; p <= end; p++) {
+        p = memchr(p, '$', (size_t)(end - p) + 1);
+        if (!p) {
+            return 0;
+        }
+        if (memcmp(p, "$ref", 5) == 0) {
+            return 1;
+        }
+    }
+    return 0;
+}
+
+/*
+ * Decode the value of a field annotated with a dataclass, building the
+ * dataclass from an embedded document with its plan.
+ *
+ * Returns a new reference, or NULL on error.
+ */
+static PyObject* _model_value(PyObject* self, PyObject* name, const char* buffer,
+                              unsigned* position, unsigned char type,
+                              unsigned max, const codec_options_t* options,
+                              PyObject* plan) {
+    struct module_state *state = GETSTATE(self);
+    PyObject* direct;
+    PyObject* value;
+    uint32_t size;
+    if (type != 3) {
+        return get_value(self, name, buffer, position, type, max, options, 0);
+    }
+    direct = PyObject_GetAttr(plan, state->_direct_str);
+    if (!direct) {
+        return NULL;
+    }
+    if (direct != Py_None && max >= 4) {
+        memcpy(&size, buffer + *position, 4);
+        size = BSON_UINT32_FROM_LE(size);
+        /* DBRefs are decoded by _dbref_hook and left unconverted. */
+        if (size >= BSON_MIN_SIZE && size <= max && _may_be_dbref(buffer + *position, size)) {
+            Py_DECREF(direct);
+            direct = Py_None;
+            Py_INCREF(direct);
+        }
+    }
+    if (direct == Py_None) {
+        Py_DECREF(direct);
+        value = get_value(self, name, buffer, position, type, max, options, 0);
+        if (value && PyDict_Check(value)) {
+            PyObject* plan_args[1] = {value};
+            PyObject* instance = PyObject_Vectorcall(plan, plan_args, 1, NULL);
+            Py_DECREF(value);
+            return instance;
+        }
+        return value;
+    }
+    if (max < 4) {
+        goto invalid;
+    }
+    memcpy(&size, buffer + *position, 4);
+    size = BSON_UINT32_FROM_LE(size);
+    if (size < BSON_MIN_SIZE || max < size || buffer[*position + size - 1]) {
+        goto invalid;
+    }
+    value = _elements_to_instance(self, buffer + *position, size, options, direct);
+    Py_DECREF(direct);
+    if (value) {
+        *position += size;
+    }
+    return value;
+
+invalid:
+    Py_DECREF(direct);
+    {
+        PyObject *InvalidBSON = _error("InvalidBSON");
+        if (InvalidBSON) {
+            PyErr_SetString(InvalidBSON, "invalid length or type code");
+            Py_DECREF(InvalidBSON);
+        }
+    }
+    return NULL;
+}
+
+/*
+ * Decode the value of a field annotated with a list of dataclasses, building
+ * each embedded document in the array with the dataclass's plan.
+ *
+ * Returns a new reference, or NULL on error.
+ */
+static PyObject* _model_list_value(PyObject* self, PyObject* name, const char* buffer,
+                                   unsigned* position, unsigned char type,
+                                   unsigned max, const codec_options_t* options,
+                                   PyObject* plan) {
+    PyObject* value;
+    uint32_t size, end;
+    if (type != 4) {
+        return get_value(self, name, buffer, position, type, max, options, 0);
+    }
+    if (max < 4) {
+        goto invalid;
+    }
+    memcpy(&size, buffer + *position, 4);
+    size = BSON_UINT32_FROM_LE(size);
+    if (size < BSON_MIN_SIZE || max < size) {
+        goto invalid;
+    }
+    end = *position + size - 1;
+    if (buffer[end]) {
+        goto invalid;
+    }
+    *position += 4;
+    value = PyList_New(0);
+    if (!value) {
+        return NULL;
+    }
+    while (*position < end) {
+        PyObject* item;
+        unsigned char item_type = (unsigned char)buffer[(*position)++];
+        size_t key_size = strlen(buffer + *position);
+        if (max < key_size) {
+            Py_DECREF(value);
+            goto invalid;
+        }
+        /* Skip the key, the items are in order. */
+        *position += (unsigned)key_size + 1;
+        item = _model_value(self, name, buffer, position, item_type,
+                            max - (unsigned)key_size, options, plan);
+        if (!item) {
+            Py_DECREF(value);
+            return NULL;
+        }
+        if (PyList_Append(value, item) < 0) {
+            Py_DECREF(item);
+            Py_DECREF(value);
+            return NULL;
+        }
+        Py_DECREF(item);
+    }
+    if (*position != end) {
+        Py_DECREF(value);
+        goto invalid;
+    }
+    (*position)++;
+    return value;
+
+invalid:
+    {
+        PyObject *InvalidBSON = _error("InvalidBSON");
+        if (InvalidBSON) {
+            PyErr_SetString(InvalidBSON, "invalid length or type code");
+            Py_DECREF(InvalidBSON);
+        }
+    }
+    return NULL;
+}
+
+/*
+ * Call a dataclass with the fields of a document that does not hold exactly
+ * its fields: some are missing, or there are 'unknown' ones, which the
+ * dataclass rejects like it would from keyword arguments.
+ *
+ * Returns a new reference, or NULL on error.
+ */
+static PyObject* _call_with_fields(PyObject* cls, PyObject* names, PyObject** values,
+                                   Py_ssize_t present, PyObject* unknown) {
+    Py_ssize_t count = PyTuple_GET_SIZE(names);
+    Py_ssize_t total = present + (unknown ? PyDict_GET_SIZE(unknown) : 0);
+    Py_ssize_t i, j = 0, pos = 0;
+    PyObject* key;
+    PyObject* value;
+    PyObject* kwnames;
+    PyObject** args;
+    PyObject* instance;
+    if (total == 0) {
+        return PyObject_Vectorcall(cls, NULL, 0, NULL);
+    }
+    args = PyMem_Malloc(total * sizeof(PyObject*));
+    if (!args) {
+        return PyErr_NoMemory();
+    }
+    kwnames = PyTuple_New(total);
+    if (!kwnames) {
+        PyMem_Free(args);
+        return NULL;
+    }
+    for (i = 0; i < count; i++) {
+        if (values[i]) {
+            key = PyTuple_GET_ITEM(names, i);
+            Py_INCREF(key);
+            PyTuple_SET_ITEM(kwnames, j, key);
+            args[j++] = values[i];
+        }
+    }
+    while (unknown && PyDict_Next(unknown, &pos, &key, &value)) {
+        Py_INCREF(key);
+        PyTuple_SET_ITEM(kwnames, j, key);
+        args[j++] = value;
+    }
+    instance = PyObject_Vectorcall(cls, args, 0, kwnames);
+    Py_DECREF(kwnames);
+    PyMem_Free(args);
+    return instance;
+}
+
+/*
+ * Build a dataclass instance directly from a BSON document, passing the
+ * value of each element to the dataclass as a keyword argument instead of
+ * decoding the document to a dict first. 'direct' is the direct attribute
+ * of the dataclass's document plan.
+ *
+ * Returns a new reference, or NULL on error.
+ */
+static PyObject* _elements_to_instance(PyObject* self, const char* string,
+                                       unsigned max,
+                                       const codec_options_t* options,
+                                       PyObject* direct) {
+    PyObject* cls = PyTuple_GET_ITEM(direct, 0);
+    PyObject* names = PyTuple_GET_ITEM(direct, 1);
+    PyObject* index = PyTuple_GET_ITEM(direct, 2);
+    PyObject* fields = PyTuple_GET_ITEM(direct, 3);
+    Py_ssize_t count = PyTuple_GET_SIZE(names);
+    Py_ssize_t present = 0;
+    Py_ssize_t i;
+    PyObject** values;
+    PyObject* unknown = NULL;
+    PyObject* instance = NULL;
+    unsigned position = 4;
+    unsigned end = max - 1;
+
+    if (Py_EnterRecursiveCall(" while decoding a BSON document")) {
+        return NULL;
+    }
+    values = PyMem_Calloc(count ? count : 1, sizeof(PyObject*));
+    if (!values) {
+        PyErr_NoMemory();
+        goto done;
+    }
+    while (position < end) {
+        PyObject* name;
+        PyObject* value;
+        PyObject* field = Py_None;
+        PyObject* field_index;
+        unsigned char type = (unsigned char)string[position++];
+        size_t name_length = strlen(string + position);
+        if (name_length > BSON_MAX_SIZE || position + name_length >= end) {
+            PyObject* InvalidBSON = _error("InvalidBSON");
+            if (InvalidBSON) {
+                PyErr_SetString(InvalidBSON, "field name too large");
+                Py_DECREF(InvalidBSON);
+            }
+            goto done;
+        }
+        name = _decode_key(string + position, name_length, options);
+        if (!name) {
+            goto done;
+        }
+        position += (unsigned)name_length + 1;
+        field_index = PyDict_GetItemWithError(index, name);
+        if (field_index) {
+            i = PyLong_AsSsize_t(field_index);
+            field = PyTuple_GET_ITEM(fields, i);
+        } else if (PyErr_Occurred()) {
+            Py_DECREF(name);
+            goto done;
+        } else {
+            i = -1;
+        }
+        if (field == Py_None) {
+            value = get_value(self, name, string, &position, type,
+                              end - position, options, 0);
+        } else if (PyTuple_GET_ITEM(field, 1) == Py_True) {
+            value = _model_list_value(self, name, string, &position, type,
+                                      end - position, options,
+                                      PyTuple_GET_ITEM(field, 0));
+        } else {
+            value = _model_value(self, name, string, &position, type,
+                                 end - position, options,
+                                 PyTuple_GET_ITEM(field, 0));
+        }
+        if (!value) {
+            Py_DECREF(name);
+            goto done;
+        }
+        if (i >= 0) {
+            if (!values[i]) {
+                present++;
+            }
+            Py_XSETREF(values[i], value);
+            Py_DECREF(name);
+        } else {
+            int status;
+            if (!unknown && !(unknown = PyDict_New())) {
+                Py_DECREF(name);
+                Py_DECREF(value);
+                goto done;
+            }
+            status = PyDict_SetItem(unknown, name, value);
+            Py_DECREF(name);
+            Py_DECREF(value);
+            if (status < 0) {
+                goto done;
+            }
+        }
+    }
+    if (present == count && !unknown) {
+        /* The common case: the values are already in the order of names. */
+        instance = PyObject_Vectorcall(cls, values, 0, count ? names : NULL);
+    } else {
+        instance = _call_with_fields(cls, names, values, present, unknown);
+    }
+done:
+    if (values) {
+        for (i = 0; i < count; i++) {
+            Py_XDECREF(values[i]);
+        }
+        PyMem_Free(values);
+    }
+    Py_XDECREF(unknown);
+    if (!instance) {
+        /* Report unknown and missing fields like the pure Python decoder. */
+        _rewrap_as_invalid_bson();
+    }
+    Py_LeaveRecursiveCall();
+    return instance;
+}
+
+static int _get_buffer(PyObject *exporter, Py_buffer *view) {
+    if (PyObject_GetBuffer(exporter, view, PyBUF_SIMPLE) == -1) {
+        return 0;
+    }
+    if (!PyBuffer_IsContiguous(view, 'C')) {
+        PyErr_SetString(PyExc_ValueError,
+                        "must be a contiguous buffer");
+        goto fail;
+    }
+    if (!view->buf || view->len < 0) {
+        PyErr_SetString(PyExc_ValueError, "invalid buffer");
+        goto fail;
+    }
+    if (view->itemsize != 1) {
+        PyErr_SetString(PyExc_ValueError,
+                        "buffer data must be ascii or utf8");
+        goto fail;
+    }
+    return 1;
+fail:
+    PyBuffer_Release(view);
+    return 0;
+}
+
+static PyObject* _cbson_bson_to_dict(PyObject* self, PyObject* args) {
+    int32_t size;
+    Py_ssize_t total_size;
+    const char* string;
+    PyObject* bson = NULL;
+    codec_options_t options;
+    PyObject* result = NULL;
+    PyObject* options_obj;
+    PyObject* fields = Py_None;
+    Py_buffer view = {0};
+
+    if (! (PyArg_ParseTuple(args, "OO|O", &bson, &options_obj, &fields) &&
+            convert_codec_options(self, options_obj, &options))) {
+        return result;
+    }
+
+    if (!_get_buffer(bson, &view)) {
+        destroy_codec_options(&options);
+        return result;
+    }
+
+    total_size = view.len;
+
+    if (total_size < BSON_MIN_SIZE) {
+        PyObject* InvalidBSON = _error("InvalidBSON");
+        if (InvalidBSON) {
+            PyErr_SetString(InvalidBSON,
+                            "not enough data for a BSON document");
+            Py_DECREF(InvalidBSON);
+        }
+        goto done;;
+    }
+
+    string = (char*)view.buf;
+    memcpy(&size, string, 4);
+    size = (int32_t)BSON_UINT32_FROM_LE(size);
+    if (size < BSON_MIN_SIZE) {
+        PyObject* InvalidBSON = _error("InvalidBSON");
+        if (InvalidBSON) {
+            PyErr_SetString(InvalidBSON, "invalid message size");
+            Py_DECREF(InvalidBSON);
+        }
+        goto done;
+    }
+
+    if (total_size < size || total_size > BSON_MAX_SIZE) {
+        PyObject* InvalidBSON = _error("InvalidBSON");
+        if (InvalidBSON) {
+            PyErr_SetString(InvalidBSON, "objsize too large");
+            Py_DECREF(InvalidBSON);
+        }
+        goto done;
+    }
+
+    if (size != total_size || string[size - 1]) {
+        PyObject* InvalidBSON = _error("InvalidBSON");
+        if (InvalidBSON) {
+            PyErr_SetString(InvalidBSON, "bad eoo");
+            Py_DECREF(InvalidBSON);
+        }
+        goto done;
+    }
+
+    if (fields != Py_None && !options.is_raw_bson) {
+        result = _elements_to_dict_projected(self, string, (unsigned)size, &options, fields);
+        result = _apply_document_plan(result, &options);
+    } else if (options.document_direct) {
+        result = _elements_to_instance(self, string, (unsigned)size, &options,
+                                       options.document_direct);
+    } else {
+        result = elements_to_dict(self, string, (unsigned)size, &options);
+        result = _apply_document_plan(result, &options);
+    }
+    result = _apply_document_decoder(result, &options);
+done:
+    PyBuffer_Release(&view);
+    destroy_codec_options(&options);
+    return result;
+}
+
+static PyObject* _cbson_decode_all(PyObject* self, PyObject* args) {
+    int32_t size;
+    Py_ssize_t total_size;
+    const char* string;
+    PyObject* bson;
+    PyObject* dict;
+    PyObject* result = NULL;
+    codec_options_t options;
+    PyObject* options_obj = NULL;
+    PyObject* fields = Py_None;
+    Py_buffer view = {0};
+    key_cache_t key_cache = {{NULL}};
+
+    if (!(PyArg_ParseTuple(args, "OO|O", &bson, &options_obj, &fields) &&
+            convert_codec_options(self, options_obj, &options))) {
+        return NULL;
+    }
+
+    if (!_get_buffer(bson, &view)) {
+        destroy_codec_options(&options);
+        return NULL;
+    }
+    options.key_cache = &key_cache;
+    total_size = view.len;
+    string = (char*)view.buf;
+
+    if (!(result = PyList_New(0))) {
+        goto fail;
+    }
+
+    while (total_size > 0) {
+        if (total_size < BSON_MIN_SIZE) {
+            PyObject* InvalidBSON = _error("InvalidBSON");
+            if (InvalidBSON) {
+                PyErr_SetString(InvalidBSON,
+                                "not enough data for a BSON document");
+                Py_DECREF(InvalidBSON);
+            }
+            Py_DECREF(result);
+            goto fail;
+        }
+
+        memcpy(&size, string, 4);
+        size = (int32_t)BSON_UINT32_FROM_LE(size);
+        if (size < BSON_MIN_SIZE) {
+            PyObject* InvalidBSON = _error("InvalidBSON");
+            if (InvalidBSON) {
+                PyErr_SetString(InvalidBSON, "invalid message size");
+                Py_DECREF(InvalidBSON);
+            }
+            Py_DECREF(result);
+            goto fail;
+        }
+
+        if (total_size < size) {
+            PyObject* InvalidBSON = _error("InvalidBSON");
+            if (InvalidBSON) {
+                PyErr_SetString(InvalidBSON, "objsize too large");
+                Py_DECREF(InvalidBSON);
+            }
+            Py_DECREF(result);
+            goto fail;
+        }
+
+        if (string[size - 1]) {
+            PyObject* InvalidBSON = _error("InvalidBSON");
+            if (InvalidBSON) {
+                PyErr_SetString(InvalidBSON, "bad eoo");
+                Py_DECREF(InvalidBSON);
+            }
+            Py_DECREF(result);
+            goto fail;
+        }
+
+        if (fields != Py_None && !options.is_raw_bson) {
+            dict = _elements_to_dict_projected(self, string, (unsigned)size, &options, fields);
+            dict = _apply_document_plan(dict, &options);
+        } else if (options.document_direct) {
+            dict = _elements_to_instance(self, string, (unsigned)size, &options,
+                                         options.document_direct);
+        } else {
+            dict = elements_to_dict(self, string, (unsigned)size, &options);
+            dict = _apply_document_plan(dict, &options);
+        }
+        dict = _apply_document_decoder(dict, &options);
+        if (!dict) {
+            Py_DECREF(result);
+            goto fail;
+        }
+        if (PyList_Append(result, dict) < 0) {
+            Py_DECREF(dict);
+            Py_DECREF(result);
+            goto fail;
+        }
+        Py_DECREF(dict);
+        string += size;
+        total_size -= size;
+    }
+    goto done;
+fail:
+    result = NULL;
+done:
+    _clear_key_cache(&key_cache);
+    PyBuffer_Release(&view);
+    destroy_codec_options(&options);
+    return result;
+}
+
+
+static PyObject* _cbson_array_of_documents_to_buffer(PyObject* self, PyObject* args) {
+    uint32_t size;
+    uint32_t value_length;
+    uint32_t position = 0;
+    buffer_t buffer;
+    const char* string;
+    PyObject* arr;
+    PyObject* result = NULL;
+    Py_buffer view = {0};
+
+    if (!PyArg_ParseTuple(args, "O", &arr)) {
+        return NULL;
+    }
+
+    if (!_get_buffer(arr, &view)) {
+        return NULL;
+    }
+
+    buffer = pymongo_buffer_new();
+    if (!buffer) {
+        PyBuffer_Release(&view);
+        return NULL;
+    }
+
+    string = (char*)view.buf;
+
+    if (view.len < BSON_MIN_SIZE) {
+        PyObject* InvalidBSON = _error("InvalidBSON");
+        if (InvalidBSON) {
+            PyErr_SetString(InvalidBSON,
+                            "not enough data for a BSON document");
+            Py_DECREF(InvalidBSON);
+        }
+        goto fail;
+    }
+
+    memcpy(&size, string, 4);
+    size = BSON_UINT32_FROM_LE(size);
+
+    /* validate the size of the array */
+    if (view.len != (int32_t)size || (int32_t)size < BSON_MIN_SIZE) {
+        PyObject* InvalidBSON = _error("InvalidBSON");
+        if (InvalidBSON) {
+            PyErr_SetString(InvalidBSON, "objsize too large");
+            Py_DECREF(InvalidBSON);
+        }
+        goto fail;
+    }
+
+    if (string[size - 1]) {
+        PyObject* InvalidBSON = _error("InvalidBSON");
+        if (InvalidBSON) {
+            PyErr_SetString(InvalidBSON, "bad eoo");
+            Py_DECREF(InvalidBSON);
+        }
+        goto fail;
+    }
+
+    /* save space for length */
+    if (pymongo_buffer_save_space(buffer, size) == -1) {
+        goto fail;
+    }
+    pymongo_buffer_update_position(buffer, 0);
+
+    position += 4;
+    while (position < size - 1) {
+        // Verify the value is an object.
+        unsigned char type = (unsigned char)string[position];
+        if (type != 3) {
+            PyObject* InvalidBSON = _error("InvalidBSON");
+            if (InvalidBSON) {
+                PyErr_SetString(InvalidBSON, "array element was not an object");
+                Py_DECREF(InvalidBSON);
+            }
+            goto fail;
+        }
+
+        // Just skip the keys.
+        position = position + strlen(string + position) + 1;
+
+        if (position >= size || (size - position) < BSON_MIN_SIZE) {
+            PyObject* InvalidBSON = _error("InvalidBSON");
+            if (InvalidBSON) {
+                PyErr_SetString(InvalidBSON, "invalid array content");
+                Py_DECREF(InvalidBSON);
+            }
+            goto fail;
+         }
+
+        memcpy(&value_length, string + position, 4);
+        value_length = BSON_UINT32_FROM_LE(value_length);
+        if (value_length < BSON_MIN_SIZE) {
+            PyObject* InvalidBSON = _error("InvalidBSON");
+            if (InvalidBSON) {
+                PyErr_SetString(InvalidBSON, "invalid message size");
+                Py_DECREF(InvalidBSON);
+            }
+            goto fail;
+         }
+
+        if (pymongo_buffer_write(buffer, string + position, value_length) == 1) {
+            goto fail;
+        }
+        position += value_length;
+    }
+
+    if (position != size - 1) {
+        PyObject* InvalidBSON = _error("InvalidBSON");
+        if (InvalidBSON) {
+            PyErr_SetString(InvalidBSON,
+                            "bad object or element length");
+            Py_DECREF(InvalidBSON);
+        }
+        goto fail;
+    }
+
+    /* objectify buffer */
+    result = Py_BuildValue("y#", pymongo_buffer_get_buffer(buffer),
+                           (Py_ssize_t)pymongo_buffer_get_position(buffer));
+    goto done;
+fail:
+    result = NULL;
+done:
+    PyBuffer_Release(&view);
+    pymongo_buffer_free(buffer);
+    return result;
+}
+
+
+/*
+ * Returns the number of bytes used by one value of a column with the given
+ * type code, or 0 if the code is unknown.
+ */
+static int _column_item_size(char code) {
+    switch (code) {
+    case 'b':
+        return 1;
+    case 'i':
+        return 4;
+    case 'q':
+    case 'd':
+    case 't':
+    case 'm':
+        return 8;
+    case 'o':
+        return 12;
+    default:
+        return 0;
+    }
+}
+
+/*
+ * Divide the 128-bit unsigned integer (*high, *low) by 10 in place.
+ *
+ * Returns the remainder.
+ */
+static unsigned _uint128_divide_by_10(uint64_t* high, uint64_t* low) {
+    uint32_t limbs[4];
+    uint64_t remainder = 0;
+    int i;
+
+    limbs[0] = (uint32_t)(*high >> 32);
+    limbs[1] = (uint32_t)*high;
+    limbs[2] = (uint32_t)(*low >> 32);
+    limbs[3] = (uint32_t)*low;
+    for (i = 0; i < 4; i++) {
+        uint64_t dividend = (remainder << 32) | limbs[i];
+        limbs[i] = (uint32_t)(dividend / 10);
+        remainder = dividend % 10;
+    }
+    *high = ((uint64_t)limbs[0] << 32) | limbs[1];
+    *low = ((uint64_t)limbs[2] << 32) | limbs[3];
+    return (unsigned)remainder;
+}
+
+/*
+ * Convert the little-endian Decimal128 at 'value' to the integer
+ * value * 10**scale, without creating a decimal.Decimal.
+ *
+ * Returns 1 on success, or 0 if the value is not finite, or is not
+ * exactly representable as an int64 at this scale.
+ */
+static int _decimal128_to_fixed(const char* value, long scale, int64_t* out) {
+    uint64_t low;
+    uint64_t high;
+    uint64_t limit;
+    int negative;
+    long exponent;
+
+    memcpy(&low, value, 8);
+    memcpy(&high, value + 8, 8);
+    low = BSON_UINT64_FROM_LE(low);
+    high = BSON_UINT64_FROM_LE(high);
+    negative = (int)(high >> 63);
+    if (((high >> 61) & 3) == 3) {
+        if (((high >> 59) & 3) == 3) {
+            /* Infinity or NaN. */
+            return 0;
+        }
+        /* The coefficient is non-canonical, and so is zero. */
+        *out = 0;
+        return 1;
+    }
+    exponent = (long)((high >> 49) & 0x3FFF) - 6176 + scale;
+    high &= 0x1FFFFFFFFFFFFULL;
+    while (exponent < 0 && (high || low)) {
+        if (_uint128_divide_by_10(&high, &low)) {
+            return 0;
+        }
+        exponent++;
+    }
+    if (high) {
+        return 0;
+    }
+    limit = negative ? (uint64_t)INT64_MAX + 1 : (uint64_t)INT64_MAX;
+    if (low > limit) {
+        return 0;
+    }
+    for (; exponent > 0 && low; exponent--) {
+        if (low > limit / 10) {
+            return 0;
+        }
+        low *= 10;
+    }
+    *out = negative ? (int64_t)(0 - low) : (int64_t)low;
+    return 1;
+}
+
+/*
+ * Store the BSON value at 'value' in a column slot as little-endian data.
+ * Decimal128 values are stored as the int64 value * 10**scale.
+ *
+ * Returns 1 if the value was stored, or 0 if a value of this BSON type
+ * cannot be stored in the column.
+ */
+static int _write_column_value(char code, unsigned char type,
+                               const char* value, long scale, char* out) {
+    int32_t i32;
+    int64_t i64;
+    double d;
+
+    switch (code) {
+    case 'm':
+        if (type != 19 || !_decimal128_to_fixed(value, scale, &i64)) {
+            return 0;
+        }
+        i64 = (int64_t)BSON_UINT64_TO_LE(i64);
+        memcpy(out, &i64, 8);
+        return 1;
+    case 'b':
+        if (type != 8) {
+            return 0;
+        }
+        *out = value[0] ? 1 : 0;
+        return 1;
+    case 'i':
+        if (type == 16) {
+            memcpy(out, value, 4);
+            return 1;
+        }
+        if (type != 18) {
+            return 0;
+        }
+        memcpy(&i64, value, 8);
+        i64 = (int64_t)BSON_UINT64_FROM_LE(i64);
+        if (i64 < INT32_MIN || i64 > INT32_MAX) {
+            return 0;
+        }
+        i32 = (int32_t)BSON_UINT32_TO_LE((int32_t)i64);
+        memcpy(out, &i32, 4);
+        return 1;
+    case 'q':
+        if (type == 18) {
+            memcpy(out, value, 8);
+            return 1;
+        }
+        if (type != 16) {
+            return 0;
+        }
+        memcpy(&i32, value, 4);
+        i64 = (int64_t)BSON_UINT64_TO_LE((int64_t)(int32_t)BSON_UINT32_FROM_LE(i32));
+        memcpy(out, &i64, 8);
+        return 1;
+    case 'd':
+        if (type == 1) {
+            memcpy(out, value, 8);
+            return 1;
+        }
+        if (type == 16) {
+            memcpy(&i32, value, 4);
+            d = (double)(int32_t)BSON_UINT32_FROM_LE(i32);
+        } else if (type == 18) {
+            memcpy(&i64, value, 8);
+            d = (double)(int64_t)BSON_UINT64_FROM_LE(i64);
+        } else {
+            return 0;
+        }
+        d = BSON_DOUBLE_TO_LE(d);
+        memcpy(out, &d, 8);
+        return 1;
+    case 't':
+        if (type != 9) {
+            return 0;
+        }
+        memcpy(out, value, 8);
+        return 1;
+    case 'o':
+        if (type != 7) {
+            return 0;
+        }
+        memcpy(out, value, 12);
+        return 1;
+    default:
+        return 0;
+    }
+}
+
+/*
+ * Write the values of the fields of the document between 'position' and
+ * 'end' (the position of its trailing null byte) to the columns whose path
+ * in 'names' matches. The elements of this document are at the path that
+ * is the first 'prefix_length' bytes of 'prefix', so only the columns that
+ * start with it are considered, and embedded documents are walked when a
+ * column path continues into them.
+ *
+ * Returns 0 on success, or -1 with an exception set.
+ */
+static int _fill_columns(const char* string, unsigned position, unsigned end,
+                         PyObject* names, const char* codes, const long* scales,
+                         const char* prefix, Py_ssize_t prefix_length,
+                         char** values, char** masks, Py_ssize_t doc_index) {
+    Py_ssize_t n_columns = PyTuple_GET_SIZE(names);
+    Py_ssize_t i;
+
+    while (position < end) {
+        unsigned char type = (unsigned char)string[position++];
+        const char* name = string + position;
+        size_t name_length = strlen(name);
+        unsigned value_position;
+        int value_size;
+        int descended = 0;
+
+        if (name_length > BSON_MAX_SIZE || position + name_length >= end) {
+            goto invalid;
+        }
+        value_position = position + (unsigned)name_length + 1;
+        value_size = _element_value_size(string, value_position, type,
+                                         end - value_position, name);
+        if (value_size < 0) {
+            return -1;
+        }
+        for (i = 0; i < n_columns; i++) {
+            PyObject* column_name = PyTuple_GET_ITEM(names, i);
+            const char* path = PyBytes_AS_STRING(column_name);
+            Py_ssize_t path_length = PyBytes_GET_SIZE(column_name);
+
+            if (path_length < prefix_length ||
+                    (size_t)(path_length - prefix_length) < name_length ||
+                    memcmp(path, prefix, (size_t)prefix_length) ||
+                    memcmp(path + prefix_length, name, name_length)) {
+                continue;
+            }
+            if ((size_t)(path_length - prefix_length) == name_length) {
+                Py_ssize_t item_size = _column_item_size(codes[i]);
+                masks[i][doc_index] = !_write_column_value(
+                    codes[i], type, string + value_position, scales[i],
+                    values[i] + doc_index * item_size);
+            } else if (path[prefix_length + name_length] == '.' && type == 3 &&
+                       !descended) {
+                /* Walk the embedded document once for every column below it. */
+                int32_t size;
+                memcpy(&size, string + value_position, 4);
+                size = (int32_t)BSON_UINT32_FROM_LE(size);
+                if (size < BSON_MIN_SIZE || string[value_position + size - 1]) {
+                    goto invalid;
+                }
+                if (_fill_columns(string, value_position + 4,
+                                  value_position + (unsigned)size - 1, names,
+                                  codes, scales, path,
+                                  prefix_length + (Py_ssize_t)name_length + 1,
+                                  values, masks, doc_index) < 0) {
+                    return -1;
+                }
+                descended = 1;
+            }
+        }
+        position = value_position + (unsigned)value_size;
+    }
+    if (position != end) {
+        goto invalid;
+    }
+    return 0;
+
+invalid:
+    {
+        PyObject* InvalidBSON = _error("InvalidBSON");
+        if (InvalidBSON) {
+            PyErr_SetString(InvalidBSON, "invalid object size");
+            Py_DECREF(InvalidBSON);
+        }
+    }
+    return -1;
+}
+
+/*
+ * Decode the fields at the paths in 'names' (a tuple of UTF-8 encoded bytes,
+ * using dot notation for fields of embedded documents) from a stream of
+ * BSON documents into typed columns, without creating any per-document
+ * objects. 'codes' holds one column type code per name and 'scales' one
+ * scale per name, used by Decimal128 columns.
+ *
+ * Returns a list with a (values, mask) pair of bytearrays for each column. A
+ * mask byte is 1 when the document has no value for the field that can be
+ * stored in the column.
+ */
+static PyObject* _cbson_decode_columns(PyObject* self, PyObject* args) {
+    PyObject* bson;
+    PyObject* names;
+    PyObject* scales_tuple;
+    const char* codes;
+    Py_ssize_t n_columns;
+    Py_ssize_t codes_length;
+    Py_ssize_t n_docs = 0;
+    Py_ssize_t doc_index;
+    Py_ssize_t total_size;
+    Py_ssize_t i;
+    const char* string;
+    char** values = NULL;
+    char** masks = NULL;
+    long* scales = NULL;
+    PyObject* result = NULL;
+    Py_buffer view = {0};
+
+    if (!PyArg_ParseTuple(args, "OO!y#O!", &bson, &PyTuple_Type, &names,
+                          &codes, &codes_length, &PyTuple_Type, &scales_tuple)) {
+        return NULL;
+    }
+    n_columns = PyTuple_GET_SIZE(names);
+    if (n_columns != codes_length || n_columns != PyTuple_GET_SIZE(scales_tuple)) {
+        PyErr_SetString(PyExc_ValueError, "expected one type code per field name");
+        return NULL;
+    }
+    for (i = 0; i < n_columns; i++) {
+        if (!PyBytes_Check(PyTuple_GET_ITEM(names, i)) || !_column_item_size(codes[i])) {
+            PyErr_SetString(PyExc_ValueError, "invalid column specification");
+            return NULL;
+        }
+    }
+    scales = PyMem_Calloc(n_columns ? n_columns : 1, sizeof(long));
+    if (!scales) {
+        return PyErr_NoMemory();
+    }
+    for (i = 0; i < n_columns; i++) {
+        scales[i] = PyLong_AsLong(PyTuple_GET_ITEM(scales_tuple, i));
+        if (scales[i] == -1 && PyErr_Occurred()) {
+            PyMem_Free(scales);
+            return NULL;
+        }
+    }
+
+    if (!_get_buffer(bson, &view)) {
+        PyMem_Free(scales);
+        return NULL;
+    }
+
+    /* Validate the document sizes and count the documents. */
+    string = (const char*)view.buf;
+    total_size = view.len;
+    while (total_size > 0) {
+        int32_t size;
+        if (total_size < BSON_MIN_SIZE) {
+            goto invalid;
+        }
+        memcpy(&size, string, 4);
+        size = (int32_t)BSON_UINT32_FROM_LE(size);
+        if (size < BSON_MIN_SIZE || total_size < size || string[size - 1]) {
+            goto invalid;
+        }
+        n_docs++;
+        string += size;
+        total_size -= size;
+    }
+
+    values = PyMem_Calloc(n_columns ? n_columns : 1, sizeof(char*));
+    masks = PyMem_Calloc(n_columns ? n_columns : 1, sizeof(char*));
+    if (!values || !masks) {
+        PyErr_NoMemory();
+        goto fail;
+    }
+    if (!(result = PyList_New(n_columns))) {
+        goto fail;
+    }
+    for (i = 0; i < n_columns; i++) {
+        PyObject* column_values;
+        PyObject* column_mask;
+        PyObject* pair;
+        Py_ssize_t item_size = _column_item_size(codes[i]);
+
+        if (n_docs > PY_SSIZE_T_MAX / item_size) {
+            PyErr_NoMemory();
+            goto fail;
+        }
+        column_values = PyByteArray_FromStringAndSize(NULL, n_docs * item_size);
+        if (!column_values) {
+            goto fail;
+        }
+        column_mask = PyByteArray_FromStringAndSize(NULL, n_docs);
+        if (!column_mask) {
+            Py_DECREF(column_values);
+            goto fail;
+        }
+        values[i] = PyByteArray_AS_STRING(column_values);
+        masks[i] = PyByteArray_AS_STRING(column_mask);
+        memset(values[i], 0, (size_t)(n_docs * item_size));
+        memset(masks[i], 1, (size_t)n_docs);
+        pair = PyTuple_Pack(2, column_values, column_mask);
+        Py_DECREF(column_values);
+        Py_DECREF(column_mask);
+        if (!pair) {
+            goto fail;
+        }
+        PyList_SET_ITEM(result, i, pair);
+    }
+
+    string = (const char*)view.buf;
+    for (doc_index = 0; doc_index < n_docs; doc_index++) {
+        int32_t size;
+
+        memcpy(&size, string, 4);
+        size = (int32_t)BSON_UINT32_FROM_LE(size);
+        if (_fill_columns(string, 4, (unsigned)size - 1, names, codes, scales,
+                          "", 0, values, masks, doc_index) < 0) {
+            goto fail;
+        }
+        string += size;
+    }
+
+    PyMem_Free(values);
+    PyMem_Free(masks);
+    PyMem_Free(scales);
+    PyBuffer_Release(&view);
+    return result;
+
+invalid:
+    {
+        PyObject* InvalidBSON = _error("InvalidBSON");
+        if (InvalidBSON) {
+            PyErr_SetString(InvalidBSON, "invalid object size");
+            Py_DECREF(InvalidBSON);
+        }
+    }
+fail:
+    PyMem_Free(values);
+    PyMem_Free(masks);
+    PyMem_Free(scales);
+    Py_XDECREF(result);
+    PyBuffer_Release(&view);
+    return NULL;
+}
+
+/*
+ * Gather the vector stored in the top-level field 'name' of each document
+ * of a stream of BSON documents into the rows of one float32 matrix. FLOAT32
+ * vectors are copied as they are and INT8 vectors are converted. When 'dim'
+ * is negative, the number of columns is taken from the first vector found.
+ *
+ * Returns a (values, mask, dim) tuple, where values is a bytearray of
+ * n_docs * dim little-endian float32 values and a mask byte is 1 when the
+ * document has no FLOAT32 or INT8 vector in the field.
+ */
+static PyObject* _cbson_decode_vectors(PyObject* self, PyObject* args) {
+    PyObject* bson;
+    const char* name;
+    Py_ssize_t name_length;
+    Py_ssize_t dim;
+    Py_ssize_t n_docs = 0;
+    Py_ssize_t doc_index;
+    Py_ssize_t total_size;
+    const char* string;
+    char* values = NULL;
+    char* mask;
+    PyObject* column_values = NULL;
+    PyObject* column_mask = NULL;
+    PyObject* result = NULL;
+    Py_buffer view = {0};
+
+    if (!PyArg_ParseTuple(args, "Oy#n", &bson, &name, &name_length, &dim)) {
+        return NULL;
+    }
+    if (!_get_buffer(bson, &view)) {
+        return NULL;
+    }
+
+    /* Validate the document sizes and count the documents. */
+    string = (const char*)view.buf;
+    total_size = view.len;
+    while (total_size > 0) {
+        int32_t size;
+        if (total_size < BSON_MIN_SIZE) {
+            goto invalid;
+        }
+        memcpy(&size, string, 4);
+        size = (int32_t)BSON_UINT32_FROM_LE(size);
+        if (size < BSON_MIN_SIZE || total_size < size || string[size - 1]) {
+            goto invalid;
+        }
+        n_docs++;
+        string += size;
+        total_size -= size;
+    }
+
+    if (!(column_mask = PyByteArray_FromStringAndSize(NULL, n_docs))) {
+        goto fail;
+    }
+    mask = PyByteArray_AS_STRING(column_mask);
+    memset(mask, 1, (size_t)n_docs);
+
+    string = (const char*)view.buf;
+    for (doc_index = 0; doc_index < n_docs; doc_index++) {
+        int32_t size;
+        unsigned position = 4;
+        unsigned end;
+
+        memcpy(&size, string, 4);
+        size = (int32_t)BSON_UINT32_FROM_LE(size);
+        end = (unsigned)size - 1;
+        while (position < end) {
+            unsigned char type = (unsigned char)string[position++];
+            const char* element_name = string + position;
+            size_t element_name_length = strlen(element_name);
+            unsigned value_position;
+            int value_size;
+            const char* data;
+            int32_t data_length;
+            Py_ssize_t length;
+            Py_ssize_t i;
+            float* row;
+
+            if (element_name_length > BSON_MAX_SIZE ||
+                    position + element_name_length >= end) {
                 goto invalid;
             }
-            memcpy(&d, buffer + *position, 8);
-            value = PyFloat_FromDouble(BSON_DOUBLE_FROM_LE(d));
-            *position += 8;
-            break;
+            value_position = position + (unsigned)element_name_length + 1;
+            value_size = _element_value_size(string, value_position, type,
+                                             end - value_position, element_name);
+            if (value_size < 0) {
+                goto fail;
+            }
+            position = value_position + (unsigned)value_size;
+            if ((size_t)name_length != element_name_length ||
+                    memcmp(name, element_name, element_name_length)) {
+                continue;
+            }
+            /* Only Binary values of the Vector subtype with a header. */
+            if (type != 5 || string[value_position + 4] != 9) {
+                continue;
+            }
+            memcpy(&data_length, string + value_position, 4);
+            data_length = (int32_t)BSON_UINT32_FROM_LE(data_length);
+            if (data_length < 2) {
+                continue;
+            }
+            data = string + value_position + 5;
+            if (data[0] != 0x27 && data[0] != 0x03) {
+                continue;
+            }
+            /* Check the padding first, like Binary.as_vector. */
+            if (data[1]) {
+                PyErr_Format(PyExc_ValueError,
+                             "Corrupt data. Padding (%d) must be 0 for all but PACKED_BIT dtypes.",
+                             (int)(unsigned char)data[1]);
+                goto fail;
+            }
+            if (data[0] == 0x27) {
+                if ((data_length - 2) % 4) {
+                    PyErr_SetString(PyExc_ValueError,
+                                    "Corrupt data. N bytes for a float32 vector must be a multiple of 4.");
+                    goto fail;
+                }
+                length = (data_length - 2) / 4;
+            } else {
+                length = data_length - 2;
+            }
+            if (!values) {
+                if (dim < 0) {
+                    dim = length;
+                }
+                if (dim && n_docs > PY_SSIZE_T_MAX / 4 / dim) {
+                    PyErr_NoMemory();
+                    goto fail;
+                }
+                column_values = PyByteArray_FromStringAndSize(NULL, n_docs * dim * 4);
+                if (!column_values) {
+                    goto fail;
+                }
+                values = PyByteArray_AS_STRING(column_values);
+                memset(values, 0, (size_t)(n_docs * dim * 4));
+            }
+            if (length != dim) {
+                PyErr_Format(PyExc_ValueError,
+                             "expected vectors of dimension %zd, found one of dimension %zd",
+                             dim, length);
+                goto fail;
+            }
+            row = (float*)(values + doc_index * dim * 4);
+            if (data[0] == 0x27) {
+                memcpy(row, data + 2, (size_t)(dim * 4));
+            } else {
+                for (i = 0; i < dim; i++) {
+                    float value = (float)(int8_t)data[2 + i];
+                    uint32_t bits;
+                    memcpy(&bits, &value, 4);
+                    bits = BSON_UINT32_TO_LE(bits);
+                    memcpy(row + i, &bits, 4);
+                }
+            }
+            mask[doc_index] = 0;
+        }
+        if (position != end) {
+            goto invalid;
+        }
+        string += size;
+    }
+
+    if (!values) {
+        /* No vector was found, every row is masked. */
+        if (dim < 0) {
+            dim = 0;
+        }
+        if (dim && n_docs > PY_SSIZE_T_MAX / 4 / dim) {
+            PyErr_NoMemory();
+            goto fail;
+        }
+        if (!(column_values = PyByteArray_FromStringAndSize(NULL, n_docs * dim * 4))) {
+            goto fail;
+        }
+        memset(PyByteArray_AS_STRING(column_values), 0, (size_t)(n_docs * dim * 4));
+    }
+    result = Py_BuildValue("OOn", column_values, column_mask, dim);
+
+fail:
+    Py_XDECREF(column_values);
+    Py_XDECREF(column_mask);
+    PyBuffer_Release(&view);
+    return result;
+
+invalid:
+    {
+        PyObject* InvalidBSON = _error("InvalidBSON");
+        if (InvalidBSON) {
+            PyErr_SetString(InvalidBSON, "invalid object size");
+            Py_DECREF(InvalidBSON);
+        }
+    }
+    goto fail;
+}
+
+/* Extended JSON modes and datetime representations, see bson/json_util.py. */
+#define JSON_MODE_LEGACY 0
+#define JSON_MODE_CANONICAL 2
+#define JSON_DATETIME_LEGACY 0
+#define JSON_DATETIME_ISO8601 2
+
+typedef struct {
+    PyObject* json_options;
+    PyObject* default_func;
+    long json_mode;
+    long datetime_representation;
+    int strict_number_long;
+} json_options_t;
+
+static int _json_long_attr(PyObject* object, const char* name, long* out) {
+    PyObject* value = PyObject_GetAttrString(object, name);
+    if (!value) {
+        return 0;
+    }
+    *out = PyLong_AsLong(value);
+    Py_DECREF(value);
+    return !(*out == -1 && PyErr_Occurred());
+}
+
+static int _json_bool_attr(PyObject* object, const char* name, int* out) {
+    PyObject* value = PyObject_GetAttrString(object, name);
+    if (!value) {
+        return 0;
+    }
+    *out = PyObject_IsTrue(value);
+    Py_DECREF(value);
+    return *out != -1;
+}
+
+/* Return a new {key: value} dict. Steals the reference to value. */
+static PyObject* _json_wrap(const char* key, PyObject* value) {
+    PyObject* dict;
+    if (!value) {
+        return NULL;
+    }
+    dict = PyDict_New();
+    if (dict && PyDict_SetItemString(dict, key, value) < 0) {
+        Py_CLEAR(dict);
+    }
+    Py_DECREF(value);
+    return dict;
+}
+
+/* Call json_util.default, returning obj unchanged when it raises TypeError. */
+static PyObject* _json_default(PyObject* obj, const json_options_t* options) {
+    PyObject* args[2] = {obj, options->json_options};
+    PyObject* result = PyObject_Vectorcall(options->default_func, args, 2, NULL);
+    if (!result && PyErr_ExceptionMatches(PyExc_TypeError)) {
+        PyErr_Clear();
+        Py_INCREF(obj);
+        return obj;
+    }
+    return result;
+}
+
+static PyObject* _json_encode_int(PyObject* obj, const json_options_t* options) {
+    int overflow;
+    long long value;
+    if (options->json_mode != JSON_MODE_CANONICAL) {
+        Py_INCREF(obj);
+        return obj;
+    }
+    value = PyLong_AsLongLongAndOverflow(obj, &overflow);
+    if (value == -1 && PyErr_Occurred()) {
+        return NULL;
+    }
+    if (!overflow && value >= -2147483648LL && value < 2147483648LL) {
+        return _json_wrap("$numberInt", PyObject_Str(obj));
+    }
+    return _json_wrap("$numberLong", PyObject_Str(obj));
+}
+
+static PyObject* _json_encode_float(PyObject* obj, const json_options_t* options) {
+    double value = PyFloat_AS_DOUBLE(obj);
+    if (options->json_mode != JSON_MODE_LEGACY) {
+        if (isnan(value)) {
+            return _json_wrap("$numberDouble", PyUnicode_FromString("NaN"));
+        } else if (isinf(value)) {
+            return _json_wrap("$numberDouble",
+                              PyUnicode_FromString(value > 0 ? "Infinity" : "-Infinity"));
+        } else if (options->json_mode == JSON_MODE_CANONICAL) {
+            return _json_wrap("$numberDouble", PyObject_Repr(obj));
+        }
+    }
+    Py_INCREF(obj);
+    return obj;
+}
+
+static PyObject* _json_encode_datetime(PyObject* self, PyObject* obj,
+                                       const json_options_t* options) {
+    struct module_state *state = GETSTATE(self);
+    PyObject* tzinfo;
+    PyObject* utcoffset;
+    long long millis;
+    char millis_str[21];
+    char iso[40];
+
+    if (!state) {
+        return NULL;
+    }
+    if (options->datetime_representation == JSON_DATETIME_ISO8601) {
+        tzinfo = PyObject_GetAttr(obj, state->_tzinfo_str);
+        if (!tzinfo) {
+            return NULL;
+        }
+        Py_DECREF(tzinfo);
+        /* Other timezones are formatted with strftime("%z") in Python. */
+        if (tzinfo != Py_None && tzinfo != state->UTC && tzinfo != PyDateTime_TimeZone_UTC) {
+            return _json_default(obj, options);
+        }
+        millis = millis_from_datetime(obj);
+        if (PyDateTime_GET_YEAR(obj) >= 1970) {
+            int millis_part = PyDateTime_DATE_GET_MICROSECOND(obj) / 1000;
+            int length = snprintf(iso, sizeof iso, "%04d-%02d-%02dT%02d:%02d:%02d",
+                                  PyDateTime_GET_YEAR(obj), PyDateTime_GET_MONTH(obj),
+                                  PyDateTime_GET_DAY(obj), PyDateTime_DATE_GET_HOUR(obj),
+                                  PyDateTime_DATE_GET_MINUTE(obj),
+                                  PyDateTime_DATE_GET_SECOND(obj));
+            if (millis_part) {
+                length += snprintf(iso + length, sizeof iso - length, ".%03d", millis_part);
+            }
+            snprintf(iso + length, sizeof iso - length, "Z");
+            return _json_wrap("$date", PyUnicode_FromString(iso));
+        }
+    } else {
+        PyObject* utcoffset_args[1] = {obj};
+        utcoffset = PyObject_VectorcallMethod(state->_utcoffset_str, utcoffset_args, 1, NULL);
+        if (!utcoffset) {
+            return NULL;
+        }
+        if (utcoffset != Py_None) {
+            PyObject* utc_obj = PyNumber_Subtract(obj, utcoffset);
+            Py_DECREF(utcoffset);
+            if (!utc_obj) {
+                return NULL;
+            }
+            millis = millis_from_datetime(utc_obj);
+            Py_DECREF(utc_obj);
+        } else {
+            Py_DECREF(utcoffset);
+            millis = millis_from_datetime(obj);
+        }
+        if (options->datetime_representation == JSON_DATETIME_LEGACY) {
+            return _json_wrap("$date", PyLong_FromLongLong(millis));
+        }
+    }
+    if (cbson_long_long_to_str(millis, millis_str, sizeof millis_str) == -1) {
+        return NULL;
+    }
+    return _json_wrap("$date", _json_wrap("$numberLong", PyUnicode_FromString(millis_str)));
+}
+
+static PyObject* _json_convert(PyObject* self, PyObject* obj, const json_options_t* options);
+
+/* Convert the (key, value) pairs from iterating obj.items(). */
+static PyObject* _json_convert_items(PyObject* self, PyObject* items_method,
+                                     const json_options_t* options) {
+    PyObject* result = NULL;
+    PyObject* iter = NULL;
+    PyObject* item;
+    PyObject* items = PyObject_CallNoArgs(items_method);
+    if (!items) {
+        return NULL;
+    }
+    iter = PyObject_GetIter(items);
+    Py_DECREF(items);
+    if (!iter || !(result = PyDict_New())) {
+        Py_XDECREF(iter);
+        return NULL;
+    }
+    while ((item = PyIter_Next(iter))) {
+        PyObject* pair = PySequence_Tuple(item);
+        PyObject* value;
+        Py_DECREF(item);
+        if (!pair) {
+            goto fail;
+        }
+        if (PyTuple_GET_SIZE(pair) != 2) {
+            PyErr_Format(PyExc_ValueError,
+                         "expected 2 values to unpack, got %zd", PyTuple_GET_SIZE(pair));
+            Py_DECREF(pair);
+            goto fail;
+        }
+        value = _json_convert(self, PyTuple_GET_ITEM(pair, 1), options);
+        if (!value || PyDict_SetItem(result, PyTuple_GET_ITEM(pair, 0), value) < 0) {
+            Py_XDECREF(value);
+            Py_DECREF(pair);
+            goto fail;
+        }
+        Py_DECREF(value);
+        Py_DECREF(pair);
+    }
+    if (PyErr_Occurred()) {
+        goto fail;
+    }
+    Py_DECREF(iter);
+    return result;
+fail:
+    Py_DECREF(iter);
+    Py_DECREF(result);
+    return NULL;
+}
+
+static PyObject* _json_convert_iter(PyObject* self, PyObject* obj,
+                                    const json_options_t* options) {
+    PyObject* result;
+    PyObject* item;
+    PyObject* iter = PyObject_GetIter(obj);
+    if (!iter || !(result = PyList_New(0))) {
+        Py_XDECREF(iter);
+        return NULL;
+    }
+    while ((item = PyIter_Next(iter))) {
+        PyObject* value = _json_convert(self, item, options);
+        Py_DECREF(item);
+        if (!value || PyList_Append(result, value) < 0) {
+            Py_XDECREF(value);
+            goto fail;
+        }
+        Py_DECREF(value);
+    }
+    if (PyErr_Occurred()) {
+        goto fail;
+    }
+    Py_DECREF(iter);
+    return result;
+fail:
+    Py_DECREF(iter);
+    Py_DECREF(result);
+    return NULL;
+}
+
+/* Return 1 if obj has the attribute name, storing it in *attr, 0 if not and
+ * -1 on error. */
+static int _json_get_optional_attr(PyObject* obj, PyObject* name, PyObject** attr) {
+    #if PY_VERSION_HEX >= 0x030D0000
+        // 3.13
+        return PyObject_GetOptionalAttr(obj, name, attr);
+    #else
+        *attr = PyObject_GetAttr(obj, name);
+        if (*attr) {
+            return 1;
+        }
+        if (PyErr_ExceptionMatches(PyExc_AttributeError)) {
+            PyErr_Clear();
+            return 0;
+        }
+        return -1;
+    #endif
+}
+
+/*
+ * Same as json_util._json_convert: containers are converted recursively and
+ * the common BSON types are converted here, everything else goes through
+ * json_util.default.
+ */
+static PyObject* _json_convert_object(PyObject* self, PyObject* obj,
+                                      const json_options_t* options) {
+    struct module_state *state = GETSTATE(self);
+    PyObject* attr = NULL;
+    PyObject* type;
+    int found;
+
+    if (!state) {
+        return NULL;
+    }
+    if (PyUnicode_CheckExact(obj) || obj == Py_None || PyBool_Check(obj)) {
+        Py_INCREF(obj);
+        return obj;
+    }
+    if (PyLong_CheckExact(obj)) {
+        return _json_encode_int(obj, options);
+    }
+    if (PyFloat_CheckExact(obj)) {
+        return _json_encode_float(obj, options);
+    }
+    if (PyDict_CheckExact(obj)) {
+        PyObject* result = PyDict_New();
+        PyObject* key;
+        PyObject* value;
+        Py_ssize_t pos = 0;
+        if (!result) {
+            return NULL;
+        }
+        while (PyDict_Next(obj, &pos, &key, &value)) {
+            PyObject* converted;
+            Py_INCREF(key);
+            Py_INCREF(value);
+            converted = _json_convert(self, value, options);
+            Py_DECREF(value);
+            if (!converted || PyDict_SetItem(result, key, converted) < 0) {
+                Py_XDECREF(converted);
+                Py_DECREF(key);
+                Py_DECREF(result);
+                return NULL;
+            }
+            Py_DECREF(converted);
+            Py_DECREF(key);
+        }
+        return result;
+    }
+    if (PyList_CheckExact(obj) || PyTuple_CheckExact(obj)) {
+        return _json_convert_iter(self, obj, options);
+    }
+    type = (PyObject*)Py_TYPE(obj);
+    if (type == state->ObjectId) {
+        return _json_wrap("$oid", PyObject_Str(obj));
+    }
+    if (type == state->BSONInt64) {
+        if (options->strict_number_long) {
+            return _json_wrap("$numberLong", PyObject_Str(obj));
+        }
+        return PyNumber_Long(obj);
+    }
+    if (PyDateTime_CheckExact(obj)) {
+        return _json_encode_datetime(self, obj, options);
+    }
+    if (type == state->Decimal128) {
+        return _json_wrap("$numberDecimal", PyObject_Str(obj));
+    }
+    if (type == state->MinKey) {
+        return _json_wrap("$minKey", PyLong_FromLong(1));
+    }
+    if (type == state->MaxKey) {
+        return _json_wrap("$maxKey", PyLong_FromLong(1));
+    }
+    if (type == state->Timestamp) {
+        PyObject* timestamp = PyDict_New();
+        PyObject* time = PyObject_GetAttr(obj, state->_time_str);
+        PyObject* inc = PyObject_GetAttr(obj, state->_inc_str);
+        if (!timestamp || !time || !inc ||
+            PyDict_SetItemString(timestamp, "t", time) < 0 ||
+            PyDict_SetItemString(timestamp, "i", inc) < 0) {
+            Py_CLEAR(timestamp);
+        }
+        Py_XDECREF(time);
+        Py_XDECREF(inc);
+        return _json_wrap("$timestamp", timestamp);
+    }
+    found = _json_get_optional_attr(obj, state->_items_str, &attr);
+    if (found == -1) {
+        return NULL;
+    }
+    if (found) {
+        PyObject* result = _json_convert_items(self, attr, options);
+        Py_DECREF(attr);
+        return result;
+    }
+    found = _json_get_optional_attr(obj, state->_iter_str, &attr);
+    if (found == -1) {
+        return NULL;
+    }
+    if (found) {
+        Py_DECREF(attr);
+        if (!PyUnicode_Check(obj) && !PyBytes_Check(obj)) {
+            return _json_convert_iter(self, obj, options);
+        }
+    }
+    return _json_default(obj, options);
+}
+
+static PyObject* _json_convert(PyObject* self, PyObject* obj, const json_options_t* options) {
+    PyObject* result;
+    if (Py_EnterRecursiveCall(" while converting an object to Extended JSON")) {
+        return NULL;
+    }
+    result = _json_convert_object(self, obj, options);
+    Py_LeaveRecursiveCall();
+    return result;
+}
+
+static PyObject* _cbson_json_convert(PyObject* self, PyObject* args) {
+    json_options_t options;
+    PyObject* obj;
+    if (!PyArg_ParseTuple(args, "OOO", &obj, &options.json_options, &options.default_func)) {
+        return NULL;
+    }
+    if (!_json_long_attr(options.json_options, "json_mode", &options.json_mode) ||
+        !_json_long_attr(options.json_options, "datetime_representation",
+                         &options.datetime_representation) ||
+        !_json_bool_attr(options.json_options, "strict_number_long",
+                         &options.strict_number_long)) {
+        return NULL;
+    }
+    return _json_convert(self, obj, &options);
+}
+
+/* Return the parser for the first key of dct that is in parsers, or NULL. */
+static PyObject* _json_find_parser(PyObject* parsers, PyObject* key) {
+    if (PyUnicode_Check(key) && PyUnicode_GET_LENGTH(key) > 1 &&
+        PyUnicode_READ_CHAR(key, 0) == '$') {
+        return PyDict_GetItemWithError(parsers, key);
+    }
+    return NULL;
+}
+
+static int _json_digits(const char* str, int count, int* out) {
+    int i;
+    *out = 0;
+    for (i = 0; i < count; i++) {
+        if (str[i] < '0' || str[i] > '9') {
+            return 0;
+        }
+        *out = *out * 10 + (str[i] - '0');
+    }
+    return 1;
+}
+
+/*
+ * Decode {"$date": "<ISO-8601>"} in UTC without the strptime call made by
+ * json_util._parse_canonical_datetime. Returns NULL without an exception set
+ * for anything but the common formats, which are left to the Python parser.
+ */
+static PyObject* _json_parse_iso_date(PyObject* self, PyObject* dtm, PyObject* json_options) {
+    struct module_state *state = GETSTATE(self);
+    const char* str;
+    Py_ssize_t length;
+    Py_ssize_t end;
+    int year, month, day, hour, minute, second;
+    int microsecond = 0;
+    int tz_aware;
+    PyObject* attr;
+    PyObject* tzinfo = Py_None;
+    PyObject* result;
+
+    if (!state || !PyUnicode_CheckExact(dtm) || !PyUnicode_IS_ASCII(dtm)) {
+        return NULL;
+    }
+    str = PyUnicode_AsUTF8AndSize(dtm, &length);
+    if (!str || length < 19) {
+        return NULL;
+    }
+    end = str[length - 1] == 'Z' ? length - 1 : length;
+    if (!_json_digits(str, 4, &year) || str[4] != '-' ||
+        !_json_digits(str + 5, 2, &month) || str[7] != '-' ||
+        !_json_digits(str + 8, 2, &day) || str[10] != 'T' ||
+        !_json_digits(str + 11, 2, &hour) || str[13] != ':' ||
+        !_json_digits(str + 14, 2, &minute) || str[16] != ':' ||
+        !_json_digits(str + 17, 2, &second)) {
+        return NULL;
+    }
+    if (end > 19) {
+        /* Fractional seconds, converted like int(float(".123") * 1000000). */
+        Py_ssize_t i;
+        double fraction;
+        char* fraction_end;
+        if (str[19] != '.' || end == 20 || end - 19 > 64) {
+            return NULL;
+        }
+        for (i = 20; i < end; i++) {
+            if (str[i] < '0' || str[i] > '9') {
+                return NULL;
+            }
         }
-    case 2:
-    case 14:
         {
-            uint32_t value_length;
-            if (max < 4) {
-                goto invalid;
-            }
-            memcpy(&value_length, buffer + *position, 4);
-            value_length = BSON_UINT32_FROM_LE(value_length);
-            /* Encoded string length + string */
-            if (!value_length || max < value_length || max < 4 + value_length) {
-                goto invalid;
+            char buf[66];
+            memcpy(buf, str + 19, end - 19);
+            buf[end - 19] = '\0';
+            fraction = PyOS_string_to_double(buf, &fraction_end, NULL);
+        }
+        if (fraction == -1.0 && PyErr_Occurred()) {
+            PyErr_Clear();
+            return NULL;
+        }
+        fraction *= 1000000;
+        if (fraction >= 1000000) {
+            return NULL;
+        }
+        microsecond = (int)fraction;
+    } else if (end != 19) {
+        return NULL;
+    }
+
+    attr = PyObject_GetAttrString(json_options, "datetime_conversion");
+    if (!attr) {
+        return NULL;
+    }
+    if (PyLong_Check(attr) && PyLong_AsLong(attr) == DATETIME_MS) {
+        Py_DECREF(attr);
+        return NULL;
+    }
+    Py_DECREF(attr);
+    if (PyErr_Occurred()) {
+        return NULL;
+    }
+    attr = PyObject_GetAttrString(json_options, "tz_aware");
+    if (!attr) {
+        return NULL;
+    }
+    tz_aware = PyObject_IsTrue(attr);
+    Py_DECREF(attr);
+    if (tz_aware == -1) {
+        return NULL;
+    }
+    if (tz_aware) {
+        attr = PyObject_GetAttrString(json_options, "tzinfo");
+        if (!attr) {
+            return NULL;
+        }
+        Py_DECREF(attr);
+        /* Converting to other timezones is left to Python. */
+        if (attr != state->UTC) {
+            return NULL;
+        }
+        tzinfo = state->UTC;
+    }
+    result = PyDateTimeAPI->DateTime_FromDateAndTime(
+        year, month, day, hour, minute, second, microsecond, tzinfo,
+        PyDateTimeAPI->DateTimeType);
+    if (!result && PyErr_ExceptionMatches(PyExc_ValueError)) {
+        /* Let the Python parser report invalid dates. */
+        PyErr_Clear();
+    }
+    return result;
+}
+
+/* Same as json_util.object_hook. */
+static PyObject* _cbson_json_object_hook(PyObject* self, PyObject* args) {
+    PyObject* parsers;
+    PyObject* json_options;
+    PyObject* dct;
+    PyObject* key;
+    PyObject* value;
+    PyObject* date = NULL;
+    PyObject* parser = NULL;
+
+    if (!PyArg_ParseTuple(args, "O!OO", &PyDict_Type, &parsers, &json_options, &dct)) {
+        return NULL;
+    }
+    if (PyDict_CheckExact(dct)) {
+        Py_ssize_t pos = 0;
+        while (!parser && !PyErr_Occurred() && PyDict_Next(dct, &pos, &key, &value)) {
+            parser = _json_find_parser(parsers, key);
+        }
+        if (parser && PyDict_GET_SIZE(dct) == 1 &&
+            PyUnicode_CompareWithASCIIString(key, "$date") == 0) {
+            date = value;
+        }
+        Py_XINCREF(parser);
+    } else {
+        PyObject* iter = PyObject_GetIter(dct);
+        if (!iter) {
+            return NULL;
+        }
+        while (!parser && !PyErr_Occurred() && (key = PyIter_Next(iter))) {
+            parser = _json_find_parser(parsers, key);
+            Py_XINCREF(parser);
+            Py_DECREF(key);
+        }
+        Py_DECREF(iter);
+    }
+    if (PyErr_Occurred()) {
+        Py_XDECREF(parser);
+        return NULL;
+    }
+    if (parser) {
+        PyObject* parser_args[2] = {dct, json_options};
+        PyObject* result = NULL;
+        if (date) {
+            result = _json_parse_iso_date(self, date, json_options);
+            if (!result && PyErr_Occurred()) {
+                Py_DECREF(parser);
+                return NULL;
             }
-            *position += 4;
-            /* Strings must end in \0 */
-            if (buffer[*position + value_length - 1]) {
-                goto invalid;
+        }
+        if (!result) {
+            result = PyObject_Vectorcall(parser, parser_args, 2, NULL);
+        }
+        Py_DECREF(parser);
+        return result;
+    }
+    Py_INCREF(dct);
+    return dct;
+}
+
+/*
+ * Transcoding between BSON and Extended JSON without creating Python objects
+ * for the document. Unless noted otherwise, the functions below return 1 on
+ * success, -1 with an exception set, or 0 when the input must be converted by
+ * the Python implementation instead, which handles rare cases like DBRefs and
+ * duplicate keys and raises the appropriate errors for invalid input.
+ */
+#define JSON_MAX_DEPTH 100
+
+/* The positions of the keys of a document, to detect duplicate keys. */
+typedef struct {
+    Py_ssize_t small[16];
+    Py_ssize_t* offsets;
+    Py_ssize_t count;
+    Py_ssize_t capacity;
+} json_keys_t;
+
+static void _json_keys_init(json_keys_t* keys) {
+    keys->offsets = keys->small;
+    keys->count = 0;
+    keys->capacity = 16;
+}
+
+static void _json_keys_free(json_keys_t* keys) {
+    if (keys->offsets != keys->small) {
+        PyMem_Free(keys->offsets);
+    }
+}
+
+static int _json_keys_add(json_keys_t* keys, Py_ssize_t offset) {
+    if (keys->count == keys->capacity) {
+        Py_ssize_t* offsets;
+        if (keys->offsets == keys->small) {
+            offsets = PyMem_New(Py_ssize_t, keys->capacity * 2);
+            if (offsets) {
+                memcpy(offsets, keys->small, sizeof keys->small);
             }
-            value = PyUnicode_DecodeUTF8(
-                buffer + *position, value_length - 1,
-                options->unicode_decode_error_handler);
-            if (!value) {
-                goto invalid;
+        } else {
+            offsets = PyMem_Resize(keys->offsets, Py_ssize_t, keys->capacity * 2);
+        }
+        if (!offsets) {
+            PyErr_NoMemory();
+            return -1;
+        }
+        keys->offsets = offsets;
+        keys->capacity *= 2;
+    }
+    keys->offsets[keys->count++] = offset;
+    return 0;
+}
+
+static int _json_compare_keys(const void* a, const void* b) {
+    return strcmp(*(const char* const*)a, *(const char* const*)b);
+}
+
+/*
+ * Returns 1 if two of the NUL terminated keys at base + offset are equal, 0
+ * if they are all different, or -1 on error.
+ */
+static int _json_keys_duplicated(const json_keys_t* keys, const char* base) {
+    Py_ssize_t i, j;
+    const char** sorted;
+    int result = 0;
+    if (keys->count <= 16) {
+        for (i = 1; i < keys->count; i++) {
+            for (j = 0; j < i; j++) {
+                if (strcmp(base + keys->offsets[i], base + keys->offsets[j]) == 0) {
+                    return 1;
+                }
             }
-            *position += value_length;
+        }
+        return 0;
+    }
+    sorted = PyMem_New(const char*, keys->count);
+    if (!sorted) {
+        PyErr_NoMemory();
+        return -1;
+    }
+    for (i = 0; i < keys->count; i++) {
+        sorted[i] = base + keys->offsets[i];
+    }
+    qsort(sorted, keys->count, sizeof(const char*), _json_compare_keys);
+    for (i = 1; i < keys->count; i++) {
+        if (strcmp(sorted[i - 1], sorted[i]) == 0) {
+            result = 1;
             break;
         }
-    case 3:
-        {
-            uint32_t size;
+    }
+    PyMem_Free(sorted);
+    return result;
+}
 
-            if (max < 4) {
-                goto invalid;
-            }
-            memcpy(&size, buffer + *position, 4);
-            size = BSON_UINT32_FROM_LE(size);
-            if (size < BSON_MIN_SIZE || max < size) {
-                goto invalid;
-            }
-            /* Check for bad eoo */
-            if (buffer[*position + size - 1]) {
-                goto invalid;
-            }
+/*
+ * Returns the length of the UTF-8 encoded character at data, storing its code
+ * point, or 0 if it is not accepted by Python's strict UTF-8 decoder.
+ */
+static int _utf8_char(const unsigned char* data, Py_ssize_t available, uint32_t* code_point) {
+    unsigned char c = data[0];
+    if (c < 0x80) {
+        *code_point = c;
+        return 1;
+    }
+    if (c >= 0xC2 && c <= 0xDF) {
+        if (available < 2 || (data[1] & 0xC0) != 0x80) {
+            return 0;
+        }
+        *code_point = ((uint32_t)(c & 0x1F) << 6) | (data[1] & 0x3F);
+        return 2;
+    }
+    if (c >= 0xE0 && c <= 0xEF) {
+        if (available < 3 || (data[1] & 0xC0) != 0x80 || (data[2] & 0xC0) != 0x80 ||
+            (c == 0xE0 && data[1] < 0xA0) || (c == 0xED && data[1] > 0x9F)) {
+            return 0;
+        }
+        *code_point = ((uint32_t)(c & 0x0F) << 12) | ((uint32_t)(data[1] & 0x3F) << 6) |
+                      (data[2] & 0x3F);
+        return 3;
+    }
+    if (c >= 0xF0 && c <= 0xF4) {
+        if (available < 4 || (data[1] & 0xC0) != 0x80 || (data[2] & 0xC0) != 0x80 ||
+            (data[3] & 0xC0) != 0x80 || (c == 0xF0 && data[1] < 0x90) ||
+            (c == 0xF4 && data[1] > 0x8F)) {
+            return 0;
+        }
+        *code_point = ((uint32_t)(c & 0x07) << 18) | ((uint32_t)(data[1] & 0x3F) << 12) |
+                      ((uint32_t)(data[2] & 0x3F) << 6) | (data[3] & 0x3F);
+        return 4;
+    }
+    return 0;
+}
 
-            value = elements_to_dict(self, buffer + *position,
-                                     size, options);
-            if (!value) {
-                goto invalid;
-            }
+static int _json_write(buffer_t buffer, const char* data, Py_ssize_t size) {
+    return pymongo_buffer_write(buffer, data, (int)size) ? -1 : 1;
+}
 
-            if (options->is_raw_bson) {
-                *position += size;
-                break;
-            }
+#define _json_write_literal(buffer, literal) \
+    _json_write((buffer), (literal), sizeof(literal) - 1)
 
-            /* Hook for DBRefs */
-            value = _dbref_hook(self, value);
-            if (!value) {
-                goto invalid;
-            }
+/* Write UTF-8 data as a JSON string, escaped like json.dumps(ensure_ascii=True). */
+static int _json_write_string(buffer_t buffer, const char* data, Py_ssize_t length) {
+    static const char hex[] = "0123456789abcdef";
+    const unsigned char* string = (const unsigned char*)data;
+    Py_ssize_t i = 0;
+    Py_ssize_t run = 0;
 
-            *position += size;
+    if (_json_write_literal(buffer, "\"") < 0) {
+        return -1;
+    }
+    while (i < length) {
+        unsigned char c = string[i];
+        uint32_t code_point = c;
+        char escape[12];
+        int escape_length = 2;
+        int n = 1;
+
+        if (c >= ' ' && c <= '~' && c != '"' && c != '\\') {
+            i++;
+            continue;
+        }
+        if (i > run && _json_write(buffer, data + run, i - run) < 0) {
+            return -1;
+        }
+        if (c >= 0x80 && !(n = _utf8_char(string + i, length - i, &code_point))) {
+            return 0;
+        }
+        escape[0] = '\\';
+        switch (code_point) {
+        case '"':
+        case '\\':
+            escape[1] = (char)code_point;
+            break;
+        case '\b':
+            escape[1] = 'b';
+            break;
+        case '\f':
+            escape[1] = 'f';
+            break;
+        case '\n':
+            escape[1] = 'n';
+            break;
+        case '\r':
+            escape[1] = 'r';
             break;
+        case '\t':
+            escape[1] = 't';
+            break;
+        default:
+            escape_length = 0;
+            if (code_point >= 0x10000) {
+                uint32_t v = code_point - 0x10000;
+                uint32_t high = 0xD800 | (v >> 10);
+                escape[0] = '\\';
+                escape[1] = 'u';
+                escape[2] = hex[(high >> 12) & 0xF];
+                escape[3] = hex[(high >> 8) & 0xF];
+                escape[4] = hex[(high >> 4) & 0xF];
+                escape[5] = hex[high & 0xF];
+                escape_length = 6;
+                code_point = 0xDC00 | (v & 0x3FF);
+            }
+            escape[escape_length] = '\\';
+            escape[escape_length + 1] = 'u';
+            escape[escape_length + 2] = hex[(code_point >> 12) & 0xF];
+            escape[escape_length + 3] = hex[(code_point >> 8) & 0xF];
+            escape[escape_length + 4] = hex[(code_point >> 4) & 0xF];
+            escape[escape_length + 5] = hex[code_point & 0xF];
+            escape_length += 6;
         }
-    case 4:
-        {
-            uint32_t size, end;
+        if (_json_write(buffer, escape, escape_length) < 0) {
+            return -1;
+        }
+        i += n;
+        run = i;
+    }
+    if (i > run && _json_write(buffer, data + run, i - run) < 0) {
+        return -1;
+    }
+    return _json_write_literal(buffer, "\"");
+}
+
+typedef struct {
+    PyObject* self;
+    buffer_t buffer;
+    codec_options_t options;
+    long json_mode;
+    long datetime_representation;
+    int strict_number_long;
+    int strict_uuid;
+    int depth;
+} bson_json_writer_t;
+
+static int _bson_write_json_document(bson_json_writer_t* writer, const char* data,
+                                     uint32_t max, int is_array, uint32_t* size);
+
+static int _json_write_long_long(buffer_t buffer, long long value) {
+    char str[21];
+    if (cbson_long_long_to_str(value, str, sizeof str) == -1) {
+        return -1;
+    }
+    return _json_write(buffer, str, (Py_ssize_t)strlen(str));
+}
+
+static int _json_write_double(buffer_t buffer, double value) {
+    char* repr;
+    int result;
+    if (isnan(value)) {
+        return _json_write_literal(buffer, "NaN");
+    }
+    if (isinf(value)) {
+        return value > 0 ? _json_write_literal(buffer, "Infinity")
+                         : _json_write_literal(buffer, "-Infinity");
+    }
+    /* Same as float.__repr__. */
+    repr = PyOS_double_to_string(value, 'r', 0, Py_DTSF_ADD_DOT_0, NULL);
+    if (!repr) {
+        return -1;
+    }
+    result = _json_write(buffer, repr, (Py_ssize_t)strlen(repr));
+    PyMem_Free(repr);
+    return result;
+}
+
+static int _json_write_base64(buffer_t buffer, const unsigned char* data, uint32_t length) {
+    static const char alphabet[] =
+        "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/";
+    char chunk[256];
+    int used = 0;
+    uint32_t i;
+
+    for (i = 0; i < length; i += 3) {
+        uint32_t remaining = length - i;
+        uint32_t triple = (uint32_t)data[i] << 16;
+        if (remaining > 1) {
+            triple |= (uint32_t)data[i + 1] << 8;
+        }
+        if (remaining > 2) {
+            triple |= data[i + 2];
+        }
+        chunk[used++] = alphabet[(triple >> 18) & 0x3F];
+        chunk[used++] = alphabet[(triple >> 12) & 0x3F];
+        chunk[used++] = remaining > 1 ? alphabet[(triple >> 6) & 0x3F] : '=';
+        chunk[used++] = remaining > 2 ? alphabet[triple & 0x3F] : '=';
+        if (used == sizeof chunk) {
+            if (_json_write(buffer, chunk, used) < 0) {
+                return -1;
+            }
+            used = 0;
+        }
+    }
+    return _json_write(buffer, chunk, used);
+}
+
+static int _bson_write_json_binary(bson_json_writer_t* writer, const char* data,
+                                   uint32_t length, unsigned char subtype) {
+    char type[3];
+    snprintf(type, sizeof type, "%02x", subtype);
+    if (writer->json_mode == JSON_MODE_LEGACY) {
+        if (_json_write_literal(writer->buffer, "{\"$binary\": \"") < 0 ||
+            _json_write_base64(writer->buffer, (const unsigned char*)data, length) < 0 ||
+            _json_write_literal(writer->buffer, "\", \"$type\": \"") < 0 ||
+            _json_write(writer->buffer, type, 2) < 0) {
+            return -1;
+        }
+        return _json_write_literal(writer->buffer, "\"}");
+    }
+    if (_json_write_literal(writer->buffer, "{\"$binary\": {\"base64\": \"") < 0 ||
+        _json_write_base64(writer->buffer, (const unsigned char*)data, length) < 0 ||
+        _json_write_literal(writer->buffer, "\", \"subType\": \"") < 0 ||
+        _json_write(writer->buffer, type, 2) < 0) {
+        return -1;
+    }
+    return _json_write_literal(writer->buffer, "\"}}");
+}
+
+/* Write a UUID decoded with the uuid_representation as {"$uuid": <hex>}. */
+static int _bson_write_json_uuid(bson_json_writer_t* writer, const char* data) {
+    static const char hex[] = "0123456789abcdef";
+    unsigned char uuid[16];
+    char str[32];
+    int i;
+
+    memcpy(uuid, data, 16);
+    if (writer->options.uuid_rep == JAVA_LEGACY) {
+        for (i = 0; i < 8; i++) {
+            uuid[i] = (unsigned char)data[7 - i];
+            uuid[8 + i] = (unsigned char)data[15 - i];
+        }
+    } else if (writer->options.uuid_rep == CSHARP_LEGACY) {
+        for (i = 0; i < 4; i++) {
+            uuid[i] = (unsigned char)data[3 - i];
+        }
+        uuid[4] = (unsigned char)data[5];
+        uuid[5] = (unsigned char)data[4];
+        uuid[6] = (unsigned char)data[7];
+        uuid[7] = (unsigned char)data[6];
+    }
+    for (i = 0; i < 16; i++) {
+        str[2 * i] = hex[uuid[i] >> 4];
+        str[2 * i + 1] = hex[uuid[i] & 0xF];
+    }
+    if (_json_write_literal(writer->buffer, "{\"$uuid\": \"") < 0 ||
+        _json_write(writer->buffer, str, 32) < 0) {
+        return -1;
+    }
+    return _json_write_literal(writer->buffer, "\"}");
+}
+
+static int _bson_write_json_datetime(bson_json_writer_t* writer, int64_t millis) {
+    struct module_state *state = GETSTATE(writer->self);
+    if (!state) {
+        return -1;
+    }
+    /* Out of range datetimes depend on the datetime_conversion. */
+    if (millis < state->min_millis || millis > state->max_millis) {
+        return 0;
+    }
+    if (writer->datetime_representation == JSON_DATETIME_ISO8601 && millis >= 0) {
+        Time64_T seconds = millis / 1000;
+        int millis_part = (int)(millis % 1000);
+        struct TM timeinfo;
+        char iso[40];
+        int length;
+
+        cbson_gmtime64_r(&seconds, &timeinfo);
+        length = snprintf(iso, sizeof iso, "{\"$date\": \"%04d-%02d-%02dT%02d:%02d:%02d",
+                          (int)timeinfo.tm_year + 1900, timeinfo.tm_mon + 1,
+                          timeinfo.tm_mday, timeinfo.tm_hour, timeinfo.tm_min,
+                          timeinfo.tm_sec);
+        if (millis_part) {
+            length += snprintf(iso + length, sizeof iso - length, ".%03d", millis_part);
+        }
+        length += snprintf(iso + length, sizeof iso - length, "Z\"}");
+        return _json_write(writer->buffer, iso, length);
+    }
+    if (writer->datetime_representation == JSON_DATETIME_LEGACY) {
+        if (_json_write_literal(writer->buffer, "{\"$date\": ") < 0 ||
+            _json_write_long_long(writer->buffer, millis) < 0) {
+            return -1;
+        }
+        return _json_write_literal(writer->buffer, "}");
+    }
+    if (_json_write_literal(writer->buffer, "{\"$date\": {\"$numberLong\": \"") < 0 ||
+        _json_write_long_long(writer->buffer, millis) < 0) {
+        return -1;
+    }
+    return _json_write_literal(writer->buffer, "\"}}");
+}
+
+static int _bson_write_json_regex(bson_json_writer_t* writer, const char* value,
+                                  uint32_t max, uint32_t* size) {
+    static const char all_flags[] = "ilmsux";
+    const char* pattern_end = memchr(value, 0, max);
+    const char* options;
+    const char* options_end;
+    char flags[sizeof all_flags];
+    size_t pattern_length, options_length;
+    int i, n = 0, status;
+
+    if (!pattern_end) {
+        return 0;
+    }
+    pattern_length = pattern_end - value;
+    options = pattern_end + 1;
+    options_end = memchr(options, 0, max - pattern_length - 1);
+    if (!options_end) {
+        return 0;
+    }
+    options_length = options_end - options;
+    *size = (uint32_t)(pattern_length + options_length + 2);
+    /* Unknown flags are ignored by Regex, the known ones are sorted. */
+    for (i = 0; all_flags[i]; i++) {
+        if (memchr(options, all_flags[i], options_length)) {
+            flags[n++] = all_flags[i];
+        }
+    }
+    if (writer->json_mode == JSON_MODE_LEGACY) {
+        if (_json_write_literal(writer->buffer, "{\"$regex\": ") < 0) {
+            return -1;
+        }
+        if ((status = _json_write_string(writer->buffer, value, pattern_length)) != 1) {
+            return status;
+        }
+        if (_json_write_literal(writer->buffer, ", \"$options\": \"") < 0 ||
+            _json_write(writer->buffer, flags, n) < 0) {
+            return -1;
+        }
+        return _json_write_literal(writer->buffer, "\"}");
+    }
+    if (_json_write_literal(writer->buffer, "{\"$regularExpression\": {\"pattern\": ") < 0) {
+        return -1;
+    }
+    if ((status = _json_write_string(writer->buffer, value, pattern_length)) != 1) {
+        return status;
+    }
+    if (_json_write_literal(writer->buffer, ", \"options\": \"") < 0 ||
+        _json_write(writer->buffer, flags, n) < 0) {
+        return -1;
+    }
+    return _json_write_literal(writer->buffer, "\"}}");
+}
 
-            if (max < 4) {
-                goto invalid;
-            }
-            memcpy(&size, buffer + *position, 4);
-            size = BSON_UINT32_FROM_LE(size);
-            if (size < BSON_MIN_SIZE || max < size) {
-                goto invalid;
-            }
+static int _bson_write_json_decimal128(bson_json_writer_t* writer, const char* value) {
+    struct module_state *state = GETSTATE(writer->self);
+    PyObject* bid;
+    PyObject* decimal;
+    PyObject* str;
+    const char* data;
+    Py_ssize_t length;
+    int result = -1;
 
-            end = *position + size - 1;
-            /* Check for bad eoo */
-            if (buffer[end]) {
-                goto invalid;
-            }
+    if (!state) {
+        return -1;
+    }
+    bid = PyBytes_FromStringAndSize(value, 16);
+    if (!bid) {
+        return -1;
+    }
+    PyObject* from_bid_args[2] = {state->Decimal128, bid};
+    decimal = PyObject_VectorcallMethod(state->_from_bid_str, from_bid_args, 2, NULL);
+    Py_DECREF(bid);
+    if (!decimal) {
+        return -1;
+    }
+    str = PyObject_Str(decimal);
+    Py_DECREF(decimal);
+    if (!str) {
+        return -1;
+    }
+    data = PyUnicode_AsUTF8AndSize(str, &length);
+    if (data && _json_write_literal(writer->buffer, "{\"$numberDecimal\": ") == 1 &&
+        (result = _json_write_string(writer->buffer, data, length)) == 1) {
+        result = _json_write_literal(writer->buffer, "}");
+    }
+    Py_DECREF(str);
+    return result;
+}
 
-            if (raw_array != 0) {
-                // Treat it as a binary buffer.
-                value = PyBytes_FromStringAndSize(buffer + *position, size);
-                *position += size;
-                break;
-            }
+/* Write the length prefixed BSON string at value, storing its size. */
+static int _bson_write_json_bson_string(bson_json_writer_t* writer, const char* value,
+                                        uint32_t max, uint32_t* size) {
+    uint32_t length;
+    if (max < 4) {
+        return 0;
+    }
+    memcpy(&length, value, 4);
+    length = BSON_UINT32_FROM_LE(length);
+    if (!length || length > max - 4 || value[4 + length - 1]) {
+        return 0;
+    }
+    *size = 4 + length;
+    return _json_write_string(writer->buffer, value + 4, length - 1);
+}
 
-            *position += 4;
+/*
+ * Write the BSON value of the given type at value, with max bytes available,
+ * as Extended JSON, storing the size of the BSON value.
+ */
+static int _bson_write_json_value(bson_json_writer_t* writer, unsigned char type,
+                                  const char* value, uint32_t max, uint32_t* size) {
+    buffer_t buffer = writer->buffer;
+    int status;
 
-            value = PyList_New(0);
-            if (!value) {
-                goto invalid;
+    *size = 0;
+    switch (type) {
+    case 1:
+        {
+            double d;
+            if (max < 8) {
+                return 0;
             }
-            while (*position < end) {
-                PyObject* to_append;
-
-                unsigned char bson_type = (unsigned char)buffer[(*position)++];
-
-                size_t key_size = strlen(buffer + *position);
-                if (max < key_size) {
-                    Py_DECREF(value);
-                    goto invalid;
-                }
-                /* just skip the key, they're in order. */
-                *position += (unsigned)key_size + 1;
-                if (Py_EnterRecursiveCall(" while decoding a list value")) {
-                    Py_DECREF(value);
-                    goto invalid;
-                }
-                to_append = get_value(self, name, buffer, position, bson_type,
-                                      max - (unsigned)key_size, options, raw_array);
-                Py_LeaveRecursiveCall();
-                if (!to_append) {
-                    Py_DECREF(value);
-                    goto invalid;
-                }
-                if (PyList_Append(value, to_append) < 0) {
-                    Py_DECREF(value);
-                    Py_DECREF(to_append);
-                    goto invalid;
-                }
-                Py_DECREF(to_append);
+            memcpy(&d, value, 8);
+            d = BSON_DOUBLE_FROM_LE(d);
+            *size = 8;
+            if (writer->json_mode == JSON_MODE_LEGACY || (isfinite(d) &&
+                                                          writer->json_mode != JSON_MODE_CANONICAL)) {
+                return _json_write_double(buffer, d);
             }
-            if (*position != end) {
-                goto invalid;
+            if (_json_write_literal(buffer, "{\"$numberDouble\": \"") < 0 ||
+                _json_write_double(buffer, d) < 0) {
+                return -1;
             }
-            (*position)++;
-            break;
+            return _json_write_literal(buffer, "\"}");
         }
+    case 2:
+    case 14:
+        return _bson_write_json_bson_string(writer, value, max, size);
+    case 3:
+        return _bson_write_json_document(writer, value, max, 0, size);
+    case 4:
+        return _bson_write_json_document(writer, value, max, 1, size);
     case 5:
         {
-            PyObject* data;
-            PyObject* st;
             uint32_t length, length2;
             unsigned char subtype;
-
+            const char* data = value + 5;
             if (max < 5) {
-                goto invalid;
+                return 0;
             }
-            memcpy(&length, buffer + *position, 4);
+            memcpy(&length, value, 4);
             length = BSON_UINT32_FROM_LE(length);
-            if (max - 5 < length) { // Account for 5-byte header. max >= 5 guaranteed above
-                goto invalid;
+            if (max - 5 < length) {
+                return 0;
             }
-
-            subtype = (unsigned char)buffer[*position + 4];
-            *position += 5;
+            subtype = (unsigned char)value[4];
+            *size = 5 + length;
             if (subtype == 2) {
                 if (length < 4) {
-                    goto invalid;
+                    return 0;
                 }
-                memcpy(&length2, buffer + *position, 4);
+                memcpy(&length2, data, 4);
                 length2 = BSON_UINT32_FROM_LE(length2);
                 if (length2 != length - 4) {
-                    goto invalid;
+                    return 0;
                 }
-            }
-            /* Python3 special case. Decode BSON binary subtype 0 to bytes. */
-            if (subtype == 0) {
-                value = PyBytes_FromStringAndSize(buffer + *position, length);
-                *position += length;
-                break;
-            }
-            if (subtype == 2) {
-                data = PyBytes_FromStringAndSize(buffer + *position + 4, length - 4);
-            } else {
-                data = PyBytes_FromStringAndSize(buffer + *position, length);
-            }
-            if (!data) {
-                goto invalid;
-            }
-            /* Encode as UUID or Binary based on options->uuid_rep */
-            if (subtype == 3 || subtype == 4) {
-                PyObject* binary_value = NULL;
-                char uuid_rep = options->uuid_rep;
-
-                /* UUID should always be 16 bytes */
+                data += 4;
+                length -= 4;
+            } else if (subtype == 3 || subtype == 4) {
+                char uuid_rep = writer->options.uuid_rep;
                 if (length != 16) {
-                    goto uuiderror;
-                }
-
-                PyObject* subtype_obj = PyLong_FromLong(subtype);
-                if (!subtype_obj) {
-                    goto uuiderror;
-                }
-                PyObject* binary_args[2] = {data, subtype_obj};
-                binary_value = PyObject_Vectorcall(state->Binary, binary_args, 2, NULL);
-                Py_DECREF(subtype_obj);
-                if (binary_value == NULL) {
-                    goto uuiderror;
-                }
-
-                if ((uuid_rep == UNSPECIFIED) ||
-                        (subtype == 4 && uuid_rep != STANDARD) ||
-                        (subtype == 3 && uuid_rep == STANDARD)) {
-                    value = binary_value;
-                    Py_INCREF(value);
-                } else {
-                    PyObject *uuid_rep_obj = PyLong_FromLong(uuid_rep);
-                    if (!uuid_rep_obj) {
-                        goto uuiderror;
-                    }
-                    PyObject* as_uuid_args[2] = {binary_value, uuid_rep_obj};
-                    value = PyObject_VectorcallMethod(
-                        state->_as_uuid_str, as_uuid_args, 2, NULL);
-                    Py_DECREF(uuid_rep_obj);
-                }
-
-            uuiderror:
-                Py_XDECREF(binary_value);
-                Py_DECREF(data);
-                if (!value) {
-                    goto invalid;
-                }
-                *position += length;
-                break;
-            }
-
-            st = PyLong_FromLong(subtype);
-            if (!st) {
-                Py_DECREF(data);
-                goto invalid;
-            }
-            PyObject* binary_args[2] = {data, st};
-            value = PyObject_Vectorcall(state->Binary, binary_args, 2, NULL);
-            Py_DECREF(st);
-            Py_DECREF(data);
-            if (!value) {
-                goto invalid;
-            }
-            *position += length;
-            break;
-        }
-    case 6:
-    case 10:
-        {
-            value = Py_None;
-            Py_INCREF(value);
-            break;
-        }
-    case 7:
-        {
-            if (max < 12) {
-                goto invalid;
-            }
-            PyObject* oid_bytes = PyBytes_FromStringAndSize(buffer + *position, 12);
-            if (!oid_bytes) {
-                goto invalid;
-            }
-            PyObject* oid_args[1] = {oid_bytes};
-            value = PyObject_Vectorcall(state->ObjectId, oid_args, 1, NULL);
-            Py_DECREF(oid_bytes);
-            *position += 12;
-            break;
-        }
-    case 8:
-        {
-            char boolean_raw = buffer[(*position)++];
-            if (0 == boolean_raw) {
-                value = Py_False;
-            } else if (1 == boolean_raw) {
-                value = Py_True;
-            } else {
-                PyObject* InvalidBSON = _error("InvalidBSON");
-                if (InvalidBSON) {
-                    PyErr_Format(InvalidBSON, "invalid boolean value: %x", boolean_raw);
-                    Py_DECREF(InvalidBSON);
+                    return 0;
+                }
+                /* Only UUIDs decoded as uuid.UUID are written as $uuid. */
+                if (!writer->strict_uuid && uuid_rep != UNSPECIFIED &&
+                    (subtype == 4) == (uuid_rep == STANDARD)) {
+                    return _bson_write_json_uuid(writer, data);
                 }
-                return NULL;
-            }
-            Py_INCREF(value);
-            break;
-        }
-    case 9:
-        {
-            int64_t millis;
-            if (max < 8) {
-                goto invalid;
-            }
-            memcpy(&millis, buffer + *position, 8);
-            millis = (int64_t)BSON_UINT64_FROM_LE(millis);
-            *position += 8;
-
-            value = decode_datetime(self, millis, options);
-            break;
-        }
-    case 11:
-        {
-            PyObject* pattern;
-            int flags;
-            size_t flags_length, i;
-            size_t pattern_length = strlen(buffer + *position);
-            if (pattern_length > BSON_MAX_SIZE || max < pattern_length) {
-                goto invalid;
-            }
-            pattern = PyUnicode_DecodeUTF8(
-                buffer + *position, pattern_length,
-                options->unicode_decode_error_handler);
-            if (!pattern) {
-                goto invalid;
-            }
-            *position += (unsigned)pattern_length + 1;
-            flags_length = strlen(buffer + *position);
-            if (flags_length > BSON_MAX_SIZE ||
-                    (BSON_MAX_SIZE - pattern_length) < flags_length) {
-                Py_DECREF(pattern);
-                goto invalid;
             }
-            if (max < pattern_length + flags_length) {
-                Py_DECREF(pattern);
-                goto invalid;
+            return _bson_write_json_binary(writer, data, length, subtype);
+        }
+    case 6:
+    case 10:
+        return _json_write_literal(buffer, "null");
+    case 7:
+        {
+            static const char hex[] = "0123456789abcdef";
+            char oid[34];
+            int i;
+            if (max < 12) {
+                return 0;
             }
-            flags = 0;
-            for (i = 0; i < flags_length; i++) {
-                if (buffer[*position + i] == 'i') {
-                    flags |= 2;
-                } else if (buffer[*position + i] == 'l') {
-                    flags |= 4;
-                } else if (buffer[*position + i] == 'm') {
-                    flags |= 8;
-                } else if (buffer[*position + i] == 's') {
-                    flags |= 16;
-                } else if (buffer[*position + i] == 'u') {
-                    flags |= 32;
-                } else if (buffer[*position + i] == 'x') {
-                    flags |= 64;
-                }
+            *size = 12;
+            for (i = 0; i < 12; i++) {
+                oid[2 * i] = hex[(unsigned char)value[i] >> 4];
+                oid[2 * i + 1] = hex[(unsigned char)value[i] & 0xF];
             }
-            *position += (unsigned)flags_length + 1;
-
-            PyObject* flags_obj = PyLong_FromLong(flags);
-            if (!flags_obj) {
-                Py_DECREF(pattern);
-                goto invalid;
+            memcpy(oid + 24, "\"}", 2);
+            if (_json_write_literal(buffer, "{\"$oid\": \"") < 0) {
+                return -1;
             }
-            PyObject* regex_args[2] = {pattern, flags_obj};
-            value = PyObject_Vectorcall(state->Regex, regex_args, 2, NULL);
-            Py_DECREF(flags_obj);
-            Py_DECREF(pattern);
-            break;
+            return _json_write(buffer, oid, 26);
         }
-    case 12:
+    case 8:
+        if (max < 1 || (value[0] != 0 && value[0] != 1)) {
+            return 0;
+        }
+        *size = 1;
+        return value[0] ? _json_write_literal(buffer, "true")
+                        : _json_write_literal(buffer, "false");
+    case 9:
         {
-            uint32_t coll_length;
-            PyObject* collection;
-            PyObject* id = NULL;
-
-            if (max < 4) {
-                goto invalid;
+            int64_t millis;
+            if (max < 8) {
+                return 0;
             }
-            memcpy(&coll_length, buffer + *position, 4);
-            coll_length = BSON_UINT32_FROM_LE(coll_length);
-            /* Encoded string length + string + 12 byte ObjectId */
-            if (!coll_length || max < coll_length || max < 4 + coll_length + 12) {
-                goto invalid;
+            memcpy(&millis, value, 8);
+            millis = (int64_t)BSON_UINT64_FROM_LE(millis);
+            *size = 8;
+            return _bson_write_json_datetime(writer, millis);
+        }
+    case 11:
+        return _bson_write_json_regex(writer, value, max, size);
+    case 13:
+        if (_json_write_literal(buffer, "{\"$code\": ") < 0) {
+            return -1;
+        }
+        if ((status = _bson_write_json_bson_string(writer, value, max, size)) != 1) {
+            return status;
+        }
+        return _json_write_literal(buffer, "}");
+    case 15:
+        {
+            uint32_t code_w_scope_size, code_size, scope_size, document_size;
+            if (max < 8) {
+                return 0;
             }
-            *position += 4;
-            /* Strings must end in \0 */
-            if (buffer[*position + coll_length - 1]) {
-                goto invalid;
+            memcpy(&code_w_scope_size, value, 4);
+            code_w_scope_size = BSON_UINT32_FROM_LE(code_w_scope_size);
+            memcpy(&code_size, value + 4, 4);
+            code_size = BSON_UINT32_FROM_LE(code_size);
+            if (code_w_scope_size > max ||
+                (uint64_t)code_size + 8 + BSON_MIN_SIZE > code_w_scope_size) {
+                return 0;
             }
-
-            collection = PyUnicode_DecodeUTF8(
-                buffer + *position, coll_length - 1,
-                options->unicode_decode_error_handler);
-            if (!collection) {
-                goto invalid;
+            memcpy(&scope_size, value + 8 + code_size, 4);
+            scope_size = BSON_UINT32_FROM_LE(scope_size);
+            if ((uint64_t)code_size + 8 + scope_size != code_w_scope_size) {
+                return 0;
             }
-            *position += coll_length;
-
-            PyObject* oid_bytes = PyBytes_FromStringAndSize(buffer + *position, 12);
-            if (!oid_bytes) {
-                Py_DECREF(collection);
-                goto invalid;
+            *size = code_w_scope_size;
+            if (_json_write_literal(buffer, "{\"$code\": ") < 0) {
+                return -1;
             }
-            PyObject* oid_args[1] = {oid_bytes};
-            id = PyObject_Vectorcall(state->ObjectId, oid_args, 1, NULL);
-            Py_DECREF(oid_bytes);
-            if (!id) {
-                Py_DECREF(collection);
-                goto invalid;
+            if ((status = _bson_write_json_bson_string(writer, value + 4, code_size + 4,
+                                                       &document_size)) != 1) {
+                return status;
             }
-            *position += 12;
-            PyObject* dbref_args[2] = {collection, id};
-            value = PyObject_Vectorcall(state->DBRef, dbref_args, 2, NULL);
-            Py_DECREF(collection);
-            Py_DECREF(id);
-            break;
+            if (_json_write_literal(buffer, ", \"$scope\": ") < 0) {
+                return -1;
+            }
+            if ((status = _bson_write_json_document(writer, value + 8 + code_size, scope_size,
+                                                    0, &document_size)) != 1) {
+                return status;
+            }
+            return _json_write_literal(buffer, "}");
         }
-    case 13:
+    case 16:
         {
-            PyObject* code;
-            uint32_t value_length;
+            int32_t i;
             if (max < 4) {
-                goto invalid;
+                return 0;
             }
-            memcpy(&value_length, buffer + *position, 4);
-            value_length = BSON_UINT32_FROM_LE(value_length);
-            /* Encoded string length + string */
-            if (!value_length || max < value_length || max < 4 + value_length) {
-                goto invalid;
+            memcpy(&i, value, 4);
+            i = (int32_t)BSON_UINT32_FROM_LE(i);
+            *size = 4;
+            if (writer->json_mode != JSON_MODE_CANONICAL) {
+                return _json_write_long_long(buffer, i);
             }
-            *position += 4;
-            /* Strings must end in \0 */
-            if (buffer[*position + value_length - 1]) {
-                goto invalid;
+            if (_json_write_literal(buffer, "{\"$numberInt\": \"") < 0 ||
+                _json_write_long_long(buffer, i) < 0) {
+                return -1;
             }
-            code = PyUnicode_DecodeUTF8(
-                buffer + *position, value_length - 1,
-                options->unicode_decode_error_handler);
-            if (!code) {
-                goto invalid;
+            return _json_write_literal(buffer, "\"}");
+        }
+    case 17:
+        {
+            uint32_t time, inc;
+            char timestamp[64];
+            if (max < 8) {
+                return 0;
             }
-            *position += value_length;
-            PyObject* code_args[1] = {code};
-            value = PyObject_Vectorcall(state->Code, code_args, 1, NULL);
-            Py_DECREF(code);
-            break;
+            memcpy(&inc, value, 4);
+            memcpy(&time, value + 4, 4);
+            *size = 8;
+            snprintf(timestamp, sizeof timestamp, "{\"$timestamp\": {\"t\": %lu, \"i\": %lu}}",
+                     (unsigned long)BSON_UINT32_FROM_LE(time),
+                     (unsigned long)BSON_UINT32_FROM_LE(inc));
+            return _json_write(buffer, timestamp, (Py_ssize_t)strlen(timestamp));
         }
-    case 15:
+    case 18:
         {
-            uint32_t c_w_s_size;
-            uint32_t code_size;
-            uint32_t scope_size;
-            uint32_t len;
-            PyObject* code;
-            PyObject* scope;
-
+            int64_t ll;
             if (max < 8) {
-                goto invalid;
+                return 0;
             }
-
-            memcpy(&c_w_s_size, buffer + *position, 4);
-            c_w_s_size = BSON_UINT32_FROM_LE(c_w_s_size);
-            *position += 4;
-
-            if (max < c_w_s_size) {
-                goto invalid;
+            memcpy(&ll, value, 8);
+            ll = (int64_t)BSON_UINT64_FROM_LE(ll);
+            *size = 8;
+            if (!writer->strict_number_long) {
+                return _json_write_long_long(buffer, ll);
+            }
+            if (_json_write_literal(buffer, "{\"$numberLong\": \"") < 0 ||
+                _json_write_long_long(buffer, ll) < 0) {
+                return -1;
             }
+            return _json_write_literal(buffer, "\"}");
+        }
+    case 19:
+        if (max < 16) {
+            return 0;
+        }
+        *size = 16;
+        return _bson_write_json_decimal128(writer, value);
+    case 255:
+        return _json_write_literal(buffer, "{\"$minKey\": 1}");
+    case 127:
+        return _json_write_literal(buffer, "{\"$maxKey\": 1}");
+    default:
+        /* DBPointers are decoded as DBRefs. */
+        return 0;
+    }
+}
 
-            memcpy(&code_size, buffer + *position, 4);
-            code_size = BSON_UINT32_FROM_LE(code_size);
-            /* code_w_scope length + code length + code + scope length */
-            len = 4 + 4 + code_size + 4;
-            if (!code_size || max < code_size || max < len || len < code_size) {
-                goto invalid;
+/*
+ * Write the BSON document or array at data, with max bytes available, as
+ * Extended JSON, storing its size.
+ */
+static int _bson_write_json_document(bson_json_writer_t* writer, const char* data,
+                                     uint32_t max, int is_array, uint32_t* size) {
+    uint32_t length, end;
+    uint32_t position = 4;
+    json_keys_t keys;
+    int first = 1;
+    int status = 0;
+
+    if (max < BSON_MIN_SIZE) {
+        return 0;
+    }
+    memcpy(&length, data, 4);
+    length = BSON_UINT32_FROM_LE(length);
+    if (length < BSON_MIN_SIZE || length > max || data[length - 1] ||
+        writer->depth >= JSON_MAX_DEPTH) {
+        return 0;
+    }
+    end = length - 1;
+    if (_json_write(writer->buffer, is_array ? "[" : "{", 1) < 0) {
+        return -1;
+    }
+    _json_keys_init(&keys);
+    writer->depth++;
+    while (position < end) {
+        unsigned char type = (unsigned char)data[position++];
+        const char* key = data + position;
+        const char* key_end = memchr(key, 0, end - position);
+        uint32_t value_size;
+
+        if (!key_end) {
+            status = 0;
+            goto done;
+        }
+        position += (uint32_t)(key_end - key) + 1;
+        if (!first && _json_write_literal(writer->buffer, ", ") < 0) {
+            status = -1;
+            goto done;
+        }
+        first = 0;
+        if (!is_array) {
+            /* DBRefs are decoded by _dbref_hook. */
+            if (strcmp(key, "$ref") == 0) {
+                status = 0;
+                goto done;
             }
-            *position += 4;
-            /* Strings must end in \0 */
-            if (buffer[*position + code_size - 1]) {
-                goto invalid;
+            if (_json_keys_add(&keys, key - data) < 0) {
+                status = -1;
+                goto done;
             }
-            code = PyUnicode_DecodeUTF8(
-                buffer + *position, code_size - 1,
-                options->unicode_decode_error_handler);
-            if (!code) {
-                goto invalid;
+            if ((status = _json_write_string(writer->buffer, key, key_end - key)) != 1) {
+                goto done;
             }
-            *position += code_size;
-
-            memcpy(&scope_size, buffer + *position, 4);
-            scope_size = BSON_UINT32_FROM_LE(scope_size);
-            /* code length + code + scope length + scope */
-            len = 4 + 4 + code_size + scope_size;
-            if (scope_size < BSON_MIN_SIZE || len != c_w_s_size || len < scope_size) {
-                Py_DECREF(code);
-                goto invalid;
+            if (_json_write_literal(writer->buffer, ": ") < 0) {
+                status = -1;
+                goto done;
             }
+        }
+        status = _bson_write_json_value(writer, type, data + position, end - position,
+                                        &value_size);
+        if (status != 1) {
+            goto done;
+        }
+        position += value_size;
+    }
+    if (!is_array && (status = _json_keys_duplicated(&keys, data)) != 0) {
+        /* Decoding keeps the last value of a duplicated key. */
+        status = status == 1 ? 0 : -1;
+        goto done;
+    }
+    status = _json_write(writer->buffer, is_array ? "]" : "}", 1);
+    *size = length;
+done:
+    writer->depth--;
+    _json_keys_free(&keys);
+    return status;
+}
 
-            /* Check for bad eoo */
-            if (buffer[*position + scope_size - 1]) {
-                goto invalid;
-            }
-            scope = elements_to_dict(self, buffer + *position,
-                                 scope_size, options);
-            if (!scope) {
-                Py_DECREF(code);
-                goto invalid;
-            }
-            *position += scope_size;
+/*
+ * Same as json_util.dumps(bson.decode(data, json_options),
+ * json_options=json_options).encode(), or None when the document must be
+ * converted by the Python implementation.
+ */
+static PyObject* _cbson_bson_to_json(PyObject* self, PyObject* args) {
+    PyObject* bson;
+    PyObject* options_obj;
+    PyObject* result = NULL;
+    bson_json_writer_t writer;
+    Py_buffer view = {0};
+    uint32_t size;
+    int status = 0;
+
+    if (!PyArg_ParseTuple(args, "OO", &bson, &options_obj)) {
+        return NULL;
+    }
+    if (!_json_long_attr(options_obj, "json_mode", &writer.json_mode) ||
+        !_json_long_attr(options_obj, "datetime_representation",
+                         &writer.datetime_representation) ||
+        !_json_bool_attr(options_obj, "strict_number_long", &writer.strict_number_long) ||
+        !_json_bool_attr(options_obj, "strict_uuid", &writer.strict_uuid)) {
+        return NULL;
+    }
+    if (!convert_codec_options(self, options_obj, &writer.options)) {
+        return NULL;
+    }
+    if (!_get_buffer(bson, &view)) {
+        destroy_codec_options(&writer.options);
+        return NULL;
+    }
+    writer.self = self;
+    writer.depth = 0;
+    writer.buffer = pymongo_buffer_new();
+    if (!writer.buffer) {
+        goto done;
+    }
+    if (view.len <= BSON_MAX_SIZE) {
+        status = _bson_write_json_document(&writer, (const char*)view.buf,
+                                           (uint32_t)view.len, 0, &size);
+    }
+    if (status == 1 && size == view.len) {
+        result = PyBytes_FromStringAndSize(pymongo_buffer_get_buffer(writer.buffer),
+                                           pymongo_buffer_get_position(writer.buffer));
+    } else if (status != -1) {
+        result = Py_None;
+        Py_INCREF(result);
+    }
+done:
+    if (writer.buffer) {
+        pymongo_buffer_free(writer.buffer);
+    }
+    PyBuffer_Release(&view);
+    destroy_codec_options(&writer.options);
+    return result;
+}
+
+typedef struct {
+    PyObject* self;
+    const char* pos;
+    const char* end;
+    buffer_t buffer;
+    PyObject* parsers;
+    PyObject* loads;
+    codec_options_t options;
+    int depth;
+} json_bson_reader_t;
+
+static int _json_read_value(json_bson_reader_t* reader, int type_position);
+
+static void _json_skip_whitespace(json_bson_reader_t* reader) {
+    while (reader->pos < reader->end &&
+           (*reader->pos == ' ' || *reader->pos == '\t' || *reader->pos == '\n' ||
+            *reader->pos == '\r')) {
+        reader->pos++;
+    }
+}
+
+static int _json_hex4(const char* data, uint32_t* out) {
+    int i;
+    *out = 0;
+    for (i = 0; i < 4; i++) {
+        char c = data[i];
+        *out <<= 4;
+        if (c >= '0' && c <= '9') {
+            *out |= c - '0';
+        } else if (c >= 'a' && c <= 'f') {
+            *out |= c - 'a' + 10;
+        } else if (c >= 'A' && c <= 'F') {
+            *out |= c - 'A' + 10;
+        } else {
+            return 0;
+        }
+    }
+    return 1;
+}
 
-            PyObject* code_scope_args[2] = {code, scope};
-            value = PyObject_Vectorcall(state->Code, code_scope_args, 2, NULL);
-            Py_DECREF(code);
-            Py_DECREF(scope);
-            break;
+/*
+ * Decode the JSON string at the reader position to UTF-8. Keys are written
+ * NUL terminated, values are written as a BSON string.
+ */
+static int _json_read_string(json_bson_reader_t* reader, int is_key) {
+    const char* p = reader->pos + 1;
+    const char* run = p;
+    int length_position = 0;
+
+    if (!is_key && (length_position = pymongo_buffer_save_space(reader->buffer, 4)) == -1) {
+        return -1;
+    }
+    for (;;) {
+        unsigned char c;
+        uint32_t code_point;
+        char utf8[4];
+        int n;
+
+        if (p >= reader->end) {
+            return 0;
         }
-    case 16:
-        {
-            int32_t i;
-            if (max < 4) {
-                goto invalid;
-            }
-            memcpy(&i, buffer + *position, 4);
-            i = (int32_t)BSON_UINT32_FROM_LE(i);
-            value = PyLong_FromLong(i);
-            if (!value) {
-                goto invalid;
+        c = (unsigned char)*p;
+        if (c >= 0x20 && c != '"' && c != '\\') {
+            if (c >= 0x80) {
+                /* json.loads decodes bytes with surrogatepass, which can't be encoded. */
+                if (!(n = _utf8_char((const unsigned char*)p, reader->end - p, &code_point))) {
+                    return 0;
+                }
+                p += n;
+            } else {
+                p++;
             }
-            *position += 4;
-            break;
+            continue;
         }
-    case 17:
-        {
-            uint32_t time, inc;
-            if (max < 8) {
-                goto invalid;
-            }
-            memcpy(&inc, buffer + *position, 4);
-            memcpy(&time, buffer + *position + 4, 4);
-            inc = BSON_UINT32_FROM_LE(inc);
-            time = BSON_UINT32_FROM_LE(time);
-            PyObject* time_obj = PyLong_FromUnsignedLong(time);
-            if (!time_obj) {
-                goto invalid;
-            }
-            PyObject* inc_obj = PyLong_FromUnsignedLong(inc);
-            if (!inc_obj) {
-                Py_DECREF(time_obj);
-                goto invalid;
-            }
-            PyObject* ts_args[2] = {time_obj, inc_obj};
-            value = PyObject_Vectorcall(state->Timestamp, ts_args, 2, NULL);
-            Py_DECREF(time_obj);
-            Py_DECREF(inc_obj);
-            *position += 8;
+        if (p > run && _json_write(reader->buffer, run, p - run) < 0) {
+            return -1;
+        }
+        if (c == '"') {
             break;
         }
-    case 18:
-        {
-            int64_t ll;
-            if (max < 8) {
-                goto invalid;
+        if (c < 0x20 || reader->end - p < 2) {
+            return 0;
+        }
+        switch (p[1]) {
+        case '"':
+        case '\\':
+        case '/':
+            code_point = (unsigned char)p[1];
+            break;
+        case 'b':
+            code_point = '\b';
+            break;
+        case 'f':
+            code_point = '\f';
+            break;
+        case 'n':
+            code_point = '\n';
+            break;
+        case 'r':
+            code_point = '\r';
+            break;
+        case 't':
+            code_point = '\t';
+            break;
+        case 'u':
+            if (reader->end - p < 6 || !_json_hex4(p + 2, &code_point)) {
+                return 0;
             }
-            memcpy(&ll, buffer + *position, 8);
-            ll = (int64_t)BSON_UINT64_FROM_LE(ll);
-            PyObject* ll_obj = PyLong_FromLongLong(ll);
-            if (!ll_obj) {
-                goto invalid;
+            if (code_point >= 0xD800 && code_point <= 0xDBFF) {
+                uint32_t low;
+                /* Lone surrogates can't be encoded to BSON. */
+                if (reader->end - p < 12 || p[6] != '\\' || p[7] != 'u' ||
+                    !_json_hex4(p + 8, &low) || low < 0xDC00 || low > 0xDFFF) {
+                    return 0;
+                }
+                code_point = 0x10000 + ((code_point - 0xD800) << 10) + (low - 0xDC00);
+                p += 6;
+            } else if (code_point >= 0xDC00 && code_point <= 0xDFFF) {
+                return 0;
             }
-            PyObject* int64_args[1] = {ll_obj};
-            value = PyObject_Vectorcall(state->BSONInt64, int64_args, 1, NULL);
-            Py_DECREF(ll_obj);
-            *position += 8;
+            p += 4;
             break;
+        default:
+            return 0;
         }
-    case 19:
-        {
-            if (max < 16) {
-                goto invalid;
-            }
-            PyObject *_bytes_obj = PyBytes_FromStringAndSize(buffer + *position, (Py_ssize_t)16);
-            if (!_bytes_obj) {
-                goto invalid;
+        p += 2;
+        run = p;
+        if (code_point < 0x80) {
+            /* Key names must not contain the NULL byte. */
+            if (is_key && code_point == 0) {
+                return 0;
             }
-            PyObject* dec128_args[2] = {state->Decimal128, _bytes_obj};
-            value = PyObject_VectorcallMethod(
-                state->_from_bid_str, dec128_args, 2, NULL);
-            Py_DECREF(_bytes_obj);
-            *position += 16;
-            break;
+            utf8[0] = (char)code_point;
+            n = 1;
+        } else if (code_point < 0x800) {
+            utf8[0] = (char)(0xC0 | (code_point >> 6));
+            utf8[1] = (char)(0x80 | (code_point & 0x3F));
+            n = 2;
+        } else if (code_point < 0x10000) {
+            utf8[0] = (char)(0xE0 | (code_point >> 12));
+            utf8[1] = (char)(0x80 | ((code_point >> 6) & 0x3F));
+            utf8[2] = (char)(0x80 | (code_point & 0x3F));
+            n = 3;
+        } else {
+            utf8[0] = (char)(0xF0 | (code_point >> 18));
+            utf8[1] = (char)(0x80 | ((code_point >> 12) & 0x3F));
+            utf8[2] = (char)(0x80 | ((code_point >> 6) & 0x3F));
+            utf8[3] = (char)(0x80 | (code_point & 0x3F));
+            n = 4;
         }
-    case 255:
-        {
-            value = PyObject_Vectorcall(state->MinKey, NULL, 0, NULL);
-            break;
+        if (_json_write(reader->buffer, utf8, n) < 0) {
+            return -1;
         }
-    case 127:
-        {
-            value = PyObject_Vectorcall(state->MaxKey, NULL, 0, NULL);
-            break;
+    }
+    if (_json_write(reader->buffer, "", 1) < 0) {
+        return -1;
+    }
+    if (!is_key) {
+        buffer_write_int32_at_position(
+            reader->buffer, length_position,
+            (int32_t)(pymongo_buffer_get_position(reader->buffer) - length_position - 4));
+    }
+    reader->pos = p + 1;
+    return 1;
+}
+
+/* Returns the end of the JSON number at p, or NULL if there is none. */
+static const char* _json_number_end(const char* p, const char* end, int* is_float) {
+    *is_float = 0;
+    if (p < end && *p == '-') {
+        p++;
+    }
+    if (p >= end || *p < '0' || *p > '9') {
+        return NULL;
+    }
+    if (*p == '0') {
+        p++;
+    } else {
+        while (p < end && *p >= '0' && *p <= '9') {
+            p++;
         }
-    default:
-        {
-            PyObject* InvalidBSON = _error("InvalidBSON");
-            if (InvalidBSON) {
-                PyObject* bobj = PyBytes_FromFormat("%c", type);
-                if (bobj) {
-                    PyObject* repr = PyObject_Repr(bobj);
-                    Py_DECREF(bobj);
-                    /*
-                     * See http://bugs.python.org/issue22023 for why we can't
-                     * just use PyUnicode_FromFormat with %S or %R to do this
-                     * work.
-                     */
-                    if (repr) {
-                        PyObject* left = PyUnicode_FromString(
-                            "Detected unknown BSON type ");
-                        if (left) {
-                            PyObject* lmsg = PyUnicode_Concat(left, repr);
-                            Py_DECREF(left);
-                            if (lmsg) {
-                                PyObject* errmsg = PyUnicode_FromFormat(
-                                    "%U for fieldname '%U'. Are you using the "
-                                    "latest driver version?", lmsg, name);
-                                if (errmsg) {
-                                    PyErr_SetObject(InvalidBSON, errmsg);
-                                    Py_DECREF(errmsg);
-                                }
-                                Py_DECREF(lmsg);
-                            }
-                        }
-                        Py_DECREF(repr);
-                    }
-                }
-                Py_DECREF(InvalidBSON);
-            }
-            goto invalid;
+    }
+    if (p < end && *p == '.') {
+        *is_float = 1;
+        if (++p >= end || *p < '0' || *p > '9') {
+            return NULL;
+        }
+        while (p < end && *p >= '0' && *p <= '9') {
+            p++;
+        }
+    }
+    if (p < end && (*p == 'e' || *p == 'E')) {
+        *is_float = 1;
+        p++;
+        if (p < end && (*p == '+' || *p == '-')) {
+            p++;
+        }
+        if (p >= end || *p < '0' || *p > '9') {
+            return NULL;
+        }
+        while (p < end && *p >= '0' && *p <= '9') {
+            p++;
         }
     }
+    return p;
+}
 
-    if (value) {
-        if (!options->type_registry.is_decoder_empty) {
-            PyObject* value_type = NULL;
-            PyObject* converter = NULL;
-            value_type = PyObject_Type(value);
-            if (value_type == NULL) {
-                goto invalid;
-            }
-            converter = PyDict_GetItem(options->type_registry.decoder_map, value_type);
-            if (converter != NULL) {
-                PyObject* converter_args[1] = {value};
-                PyObject* new_value = PyObject_Vectorcall(converter, converter_args, 1, NULL);
-                Py_DECREF(value_type);
-                Py_DECREF(value);
-                return new_value;
-            } else {
-                Py_DECREF(value_type);
-                return value;
-            }
+/* Parse -?[0-9]+ within the range of an int64. */
+static int _json_parse_int64(const char* p, const char* end, long long* out) {
+    int negative = p < end && *p == '-';
+    unsigned long long value = 0;
+    if (negative) {
+        p++;
+    }
+    if (p >= end || end - p > 19) {
+        return 0;
+    }
+    for (; p < end; p++) {
+        if (*p < '0' || *p > '9') {
+            return 0;
         }
-        return value;
+        value = value * 10 + (unsigned long long)(*p - '0');
     }
+    if (value > (negative ? 9223372036854775808ULL : 9223372036854775807ULL)) {
+        return 0;
+    }
+    *out = negative ? (long long)(0 - value) : (long long)value;
+    return 1;
+}
 
-    invalid:
+/* Same as float(text) for a JSON number, NaN, Infinity or -Infinity. */
+static int _json_parse_double(const char* p, const char* end, double* out) {
+    char small[64];
+    char* text = small;
+    Py_ssize_t length = end - p;
 
-    /*
-     * Wrap any non-InvalidBSON errors in InvalidBSON.
-     */
-    if (PyErr_Occurred()) {
-        _rewrap_as_invalid_bson();
-    } else {
-        PyObject *InvalidBSON = _error("InvalidBSON");
-        if (InvalidBSON) {
-            PyErr_SetString(InvalidBSON, "invalid length or type code");
-            Py_DECREF(InvalidBSON);
+    if (length == 3 && memcmp(p, "NaN", 3) == 0) {
+        *out = Py_NAN;
+        return 1;
+    }
+    if (length == 8 && memcmp(p, "Infinity", 8) == 0) {
+        *out = HUGE_VAL;
+        return 1;
+    }
+    if (length == 9 && memcmp(p, "-Infinity", 9) == 0) {
+        *out = -HUGE_VAL;
+        return 1;
+    }
+    if (length >= (Py_ssize_t)sizeof small && !(text = PyMem_Malloc(length + 1))) {
+        PyErr_NoMemory();
+        return -1;
+    }
+    memcpy(text, p, length);
+    text[length] = '\0';
+    *out = PyOS_string_to_double(text, NULL, NULL);
+    if (text != small) {
+        PyMem_Free(text);
+    }
+    return (*out == -1.0 && PyErr_Occurred()) ? -1 : 1;
+}
+
+/* Write an integer as an int32 if it fits, like bson.encode. */
+static int _json_write_integer(json_bson_reader_t* reader, long long value, int type_position) {
+    char* data;
+    if (value >= INT32_MIN && value <= INT32_MAX) {
+        if (!buffer_write_int32(reader->buffer, (int32_t)value)) {
+            return -1;
         }
+        data = pymongo_buffer_get_buffer(reader->buffer);
+        data[type_position] = 16;
+        return 1;
     }
-    return NULL;
+    if (!buffer_write_int64(reader->buffer, (int64_t)value)) {
+        return -1;
+    }
+    data = pymongo_buffer_get_buffer(reader->buffer);
+    data[type_position] = 18;
+    return 1;
 }
 
-/*
- * Get the next 'name' and 'value' from a document in a string, whose position
- * is provided.
- *
- * Returns the position of the next element in the document, or -1 on error.
- */
-static int _element_to_dict(PyObject* self, const char* string,
-                            unsigned position, unsigned max,
-                            const codec_options_t* options,
-                            int raw_array,
-                            PyObject** name, PyObject** value) {
-    unsigned char type = (unsigned char)string[position++];
-    size_t name_length = strlen(string + position);
-    if (name_length > BSON_MAX_SIZE || position + name_length >= max) {
-        PyObject* InvalidBSON = _error("InvalidBSON");
-        if (InvalidBSON) {
-            PyErr_SetString(InvalidBSON, "field name too large");
-            Py_DECREF(InvalidBSON);
+static int _json_read_number(json_bson_reader_t* reader, int type_position) {
+    const char* end;
+    int is_float;
+    double d;
+    int status;
+
+    if (reader->end - reader->pos >= 3 && memcmp(reader->pos, "NaN", 3) == 0) {
+        end = reader->pos + 3;
+    } else if (reader->end - reader->pos >= 8 && memcmp(reader->pos, "Infinity", 8) == 0) {
+        end = reader->pos + 8;
+    } else if (reader->end - reader->pos >= 9 && memcmp(reader->pos, "-Infinity", 9) == 0) {
+        end = reader->pos + 9;
+    } else if (!(end = _json_number_end(reader->pos, reader->end, &is_float))) {
+        return 0;
+    } else if (!is_float) {
+        long long value;
+        /* Integers that don't fit in an int64 can't be encoded. */
+        if (!_json_parse_int64(reader->pos, end, &value)) {
+            return 0;
         }
+        reader->pos = end;
+        return _json_write_integer(reader, value, type_position);
+    }
+    if ((status = _json_parse_double(reader->pos, end, &d)) != 1) {
+        return status;
+    }
+    if (!buffer_write_double(reader->buffer, d)) {
         return -1;
     }
-    *name = PyUnicode_DecodeUTF8(
-        string + position, name_length,
-        options->unicode_decode_error_handler);
-    if (!*name) {
-        /* If NULL is returned then wrap the UnicodeDecodeError
-           in an InvalidBSON error */
-        _rewrap_as_invalid_bson();
+    pymongo_buffer_get_buffer(reader->buffer)[type_position] = 1;
+    reader->pos = end;
+    return 1;
+}
+
+/* Returns 1 if key is one of the Extended JSON type wrapper keys. */
+static int _json_is_parser_key(json_bson_reader_t* reader, const char* key) {
+    PyObject* name;
+    int result;
+    if (key[0] != '$' || !key[1]) {
+        return 0;
+    }
+    name = PyUnicode_FromString(key);
+    if (!name) {
         return -1;
     }
-    position += (unsigned)name_length + 1;
-    *value = get_value(self, *name, string, &position, type,
-                       max - position, options, raw_array);
-    if (!*value) {
-        Py_DECREF(*name);
-        return -1;
+    result = PyDict_Contains(reader->parsers, name);
+    Py_DECREF(name);
+    return result;
+}
+
+/*
+ * Read a JSON object into the buffer as a BSON document. Returns 2 when the
+ * object has a key of an Extended JSON type wrapper.
+ */
+static int _json_read_object(json_bson_reader_t* reader, int top_level) {
+    json_keys_t keys;
+    int length_position;
+    int wrapper = 0;
+    int status = 0;
+
+    if (reader->depth >= JSON_MAX_DEPTH) {
+        return 0;
+    }
+    if ((length_position = pymongo_buffer_save_space(reader->buffer, 4)) == -1) {
+        return -1;
+    }
+    _json_keys_init(&keys);
+    reader->depth++;
+    reader->pos++;
+    _json_skip_whitespace(reader);
+    if (reader->pos < reader->end && *reader->pos == '}') {
+        reader->pos++;
+    } else {
+        for (;;) {
+            int type_position;
+            const char* key;
+
+            if (reader->pos >= reader->end || *reader->pos != '"') {
+                status = 0;
+                goto done;
+            }
+            if ((type_position = pymongo_buffer_save_space(reader->buffer, 1)) == -1 ||
+                _json_keys_add(&keys, type_position + 1) < 0) {
+                status = -1;
+                goto done;
+            }
+            if ((status = _json_read_string(reader, 1)) != 1) {
+                goto done;
+            }
+            key = pymongo_buffer_get_buffer(reader->buffer) + type_position + 1;
+            /* bson.encode moves _id to the front of the document. */
+            if (top_level && keys.count > 1 && strcmp(key, "_id") == 0) {
+                status = 0;
+                goto done;
+            }
+            if (!wrapper && (wrapper = _json_is_parser_key(reader, key)) == -1) {
+                status = -1;
+                goto done;
+            }
+            _json_skip_whitespace(reader);
+            if (reader->pos >= reader->end || *reader->pos != ':') {
+                status = 0;
+                goto done;
+            }
+            reader->pos++;
+            _json_skip_whitespace(reader);
+            if ((status = _json_read_value(reader, type_position)) != 1) {
+                goto done;
+            }
+            _json_skip_whitespace(reader);
+            if (reader->pos < reader->end && *reader->pos == ',') {
+                reader->pos++;
+                _json_skip_whitespace(reader);
+                continue;
+            }
+            if (reader->pos < reader->end && *reader->pos == '}') {
+                reader->pos++;
+                break;
+            }
+            status = 0;
+            goto done;
+        }
+    }
+    /* json.loads keeps the last value of a duplicated key. */
+    if ((status = _json_keys_duplicated(&keys, pymongo_buffer_get_buffer(reader->buffer))) != 0) {
+        status = status == 1 ? 0 : -1;
+        goto done;
+    }
+    if (_json_write(reader->buffer, "", 1) < 0) {
+        status = -1;
+        goto done;
     }
-    return position;
+    buffer_write_int32_at_position(
+        reader->buffer, length_position,
+        (int32_t)(pymongo_buffer_get_position(reader->buffer) - length_position));
+    status = wrapper ? 2 : 1;
+done:
+    reader->depth--;
+    _json_keys_free(&keys);
+    return status;
 }
 
-static PyObject* _cbson_element_to_dict(PyObject* self, PyObject* args) {
-    /* TODO: Support buffer protocol */
-    char* string;
-    PyObject* bson;
-    PyObject* options_obj = NULL;
-    codec_options_t options;
-    unsigned position;
-    unsigned max;
-    int new_position;
-    int raw_array = 0;
-    PyObject* name;
-    PyObject* value;
-    PyObject* result_tuple;
+static int _json_read_array(json_bson_reader_t* reader) {
+    int length_position;
+    int index = 0;
+    int status = 0;
 
-    if (!(PyArg_ParseTuple(args, "OIIOp", &bson, &position, &max,
-                          &options_obj, &raw_array) &&
-            convert_codec_options(self, options_obj, &options))) {
-        return NULL;
+    if (reader->depth >= JSON_MAX_DEPTH) {
+        return 0;
+    }
+    if ((length_position = pymongo_buffer_save_space(reader->buffer, 4)) == -1) {
+        return -1;
+    }
+    reader->depth++;
+    reader->pos++;
+    _json_skip_whitespace(reader);
+    if (reader->pos < reader->end && *reader->pos == ']') {
+        reader->pos++;
+    } else {
+        for (;;) {
+            char name[16];
+            int type_position;
+
+            if ((type_position = pymongo_buffer_save_space(reader->buffer, 1)) == -1 ||
+                _json_write(reader->buffer, name,
+                            snprintf(name, sizeof name, "%d", index++) + 1) < 0) {
+                status = -1;
+                goto done;
+            }
+            if ((status = _json_read_value(reader, type_position)) != 1) {
+                goto done;
+            }
+            _json_skip_whitespace(reader);
+            if (reader->pos < reader->end && *reader->pos == ',') {
+                reader->pos++;
+                _json_skip_whitespace(reader);
+                continue;
+            }
+            if (reader->pos < reader->end && *reader->pos == ']') {
+                reader->pos++;
+                break;
+            }
+            status = 0;
+            goto done;
+        }
+    }
+    if (_json_write(reader->buffer, "", 1) < 0) {
+        status = -1;
+        goto done;
     }
+    buffer_write_int32_at_position(
+        reader->buffer, length_position,
+        (int32_t)(pymongo_buffer_get_position(reader->buffer) - length_position));
+    status = 1;
+done:
+    reader->depth--;
+    return status;
+}
 
-    if (!PyBytes_Check(bson)) {
-        PyErr_SetString(PyExc_TypeError, "argument to _element_to_dict must be a bytes object");
-        return NULL;
+/* Skip whitespace and match the character c. */
+static int _json_match_char(const char** p, const char* end, char c) {
+    const char* s = *p;
+    while (s < end && (*s == ' ' || *s == '\t' || *s == '\n' || *s == '\r')) {
+        s++;
     }
-    string = PyBytes_AS_STRING(bson);
+    if (s >= end || *s != c) {
+        return 0;
+    }
+    *p = s + 1;
+    return 1;
+}
 
-    new_position = _element_to_dict(self, string, position, max, &options, raw_array, &name, &value);
-    if (new_position < 0) {
-        return NULL;
+/* Skip whitespace and match a string without escapes, storing its contents. */
+static int _json_match_plain_string(const char** p, const char* end, const char** start,
+                                    const char** stop) {
+    const char* s;
+    if (!_json_match_char(p, end, '"')) {
+        return 0;
     }
+    *start = s = *p;
+    while (s < end && *s != '"') {
+        if (*s == '\\' || (unsigned char)*s < 0x20 || (unsigned char)*s >= 0x80) {
+            return 0;
+        }
+        s++;
+    }
+    if (s >= end) {
+        return 0;
+    }
+    *stop = s;
+    *p = s + 1;
+    return 1;
+}
 
-    result_tuple = Py_BuildValue("NNi", name, value, new_position);
-    if (!result_tuple) {
-        Py_DECREF(name);
-        Py_DECREF(value);
-        return NULL;
+/*
+ * Match an object with n members whose values are plain strings, storing
+ * the start and end of each key and value in spans.
+ */
+static int _json_match_object(const char** p, const char* end, int n, const char** spans) {
+    int i;
+    if (!_json_match_char(p, end, '{')) {
+        return 0;
+    }
+    for (i = 0; i < n; i++) {
+        if ((i && !_json_match_char(p, end, ',')) ||
+            !_json_match_plain_string(p, end, &spans[4 * i], &spans[4 * i + 1]) ||
+            !_json_match_char(p, end, ':') ||
+            !_json_match_plain_string(p, end, &spans[4 * i + 2], &spans[4 * i + 3])) {
+            return 0;
+        }
     }
+    return _json_match_char(p, end, '}');
+}
 
-    destroy_codec_options(&options);
-    return result_tuple;
+static int _json_key_equals(const char* key, const char* key_end, const char* name) {
+    size_t length = strlen(name);
+    return (size_t)(key_end - key) == length && memcmp(key, name, length) == 0;
 }
 
-static PyObject* _elements_to_dict(PyObject* self, const char* string,
-                                   unsigned max,
-                                   const codec_options_t* options) {
-    unsigned position = 0;
-    PyObject* dict;
-    int raw_array = 0;
+/*
+ * Same as json_util._parse_canonical_datetime for "YYYY-MM-DDTHH:MM:SS[.f]Z",
+ * in milliseconds.
+ */
+static int _json_parse_iso_millis(const char* str, const char* end, long long* millis) {
+    static const int days_in_month[] = {31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31};
+    Py_ssize_t length = end - str - 1;
+    int year, month, day, hour, minute, second, leap;
+    long long microsecond = 0;
+    struct TM timeinfo;
 
-    /* Use PyDict_New() directly when document_class is dict.
-     * This avoids the overhead of PyObject_CallObject() for the common case. */
-    if (options->is_dict_class) {
-        dict = PyDict_New();
-    } else {
-        dict = PyObject_CallObject(options->document_class, NULL);
+    if (length < 19 || end[-1] != 'Z' ||
+        !_json_digits(str, 4, &year) || str[4] != '-' ||
+        !_json_digits(str + 5, 2, &month) || str[7] != '-' ||
+        !_json_digits(str + 8, 2, &day) || str[10] != 'T' ||
+        !_json_digits(str + 11, 2, &hour) || str[13] != ':' ||
+        !_json_digits(str + 14, 2, &minute) || str[16] != ':' ||
+        !_json_digits(str + 17, 2, &second)) {
+        return 0;
     }
-    if (!dict) {
-        return NULL;
+    leap = (year % 4 == 0 && year % 100 != 0) || year % 400 == 0;
+    if (year < 1 || month < 1 || month > 12 || day < 1 ||
+        day > days_in_month[month - 1] + (month == 2 && leap) ||
+        hour > 23 || minute > 59 || second > 59) {
+        return 0;
     }
-
-    while (position < max) {
-        PyObject* name = NULL;
-        PyObject* value = NULL;
-        int new_position;
-
-        new_position = _element_to_dict(
-            self, string, position, max, options, raw_array, &name, &value);
-        if (new_position < 0) {
-            Py_DECREF(dict);
-            return NULL;
-        } else {
-            position = (unsigned)new_position;
+    if (length > 19) {
+        /* Converted like int(float(".123") * 1000000). */
+        double fraction;
+        int status;
+        Py_ssize_t i;
+        if (str[19] != '.' || length == 20) {
+            return 0;
         }
-
-        /* Use PyDict_SetItem() when document_class is dict.
-         * PyDict_SetItem() is faster than PyObject_SetItem() because it
-         * avoids method lookup overhead. */
-        if (options->is_dict_class) {
-            if (PyDict_SetItem(dict, name, value) < 0) {
-                Py_DECREF(name);
-                Py_DECREF(value);
-                Py_DECREF(dict);
-                return NULL;
-            }
-        } else {
-            if (PyObject_SetItem(dict, name, value) < 0) {
-                Py_DECREF(name);
-                Py_DECREF(value);
-                Py_DECREF(dict);
-                return NULL;
+        for (i = 20; i < length; i++) {
+            if (str[i] < '0' || str[i] > '9') {
+                return 0;
             }
         }
-        Py_DECREF(name);
-        Py_DECREF(value);
-    }
-    return dict;
+        if ((status = _json_parse_double(str + 19, str + length, &fraction)) != 1) {
+            return status;
+        }
+        fraction *= 1000000;
+        if (fraction >= 1000000) {
+            return 0;
+        }
+        microsecond = (long long)fraction;
+    }
+    timeinfo.tm_year = year - 1900;
+    timeinfo.tm_mon = month - 1;
+    timeinfo.tm_mday = day;
+    timeinfo.tm_hour = hour;
+    timeinfo.tm_min = minute;
+    timeinfo.tm_sec = second;
+    *millis = cbson_timegm64(&timeinfo) * 1000 + microsecond / 1000;
+    return 1;
 }
 
-static PyObject* elements_to_dict(PyObject* self, const char* string,
-                                  unsigned max,
-                                  const codec_options_t* options) {
-    PyObject* result;
-    if (options->is_raw_bson) {
-        PyObject* bson_bytes = PyBytes_FromStringAndSize(string, max);
-        if (!bson_bytes) {
-            return NULL;
+/* Write the common single-valued type wrappers without calling json_util. */
+static int _json_write_wrapper(json_bson_reader_t* reader, const char* key,
+                               const char* key_end, const char* value,
+                               const char* value_end, int type_position) {
+    long long integer;
+    double d;
+    int status;
+    char type;
+
+    if (_json_key_equals(key, key_end, "$oid")) {
+        char oid[12];
+        uint32_t byte;
+        int i;
+        if (value_end - value != 24) {
+            return 0;
         }
-        PyObject* raw_args[2] = {bson_bytes, options->options_obj};
-        result = PyObject_Vectorcall(options->document_class, raw_args, 2, NULL);
-        Py_DECREF(bson_bytes);
-        return result;
+        for (i = 0; i < 12; i++) {
+            char hex[4] = {'0', '0', value[2 * i], value[2 * i + 1]};
+            if (!_json_hex4(hex, &byte)) {
+                return 0;
+            }
+            oid[i] = (char)byte;
+        }
+        if (_json_write(reader->buffer, oid, 12) < 0) {
+            return -1;
+        }
+        type = 7;
+    } else if (_json_key_equals(key, key_end, "$numberInt")) {
+        if (!_json_parse_int64(value, value_end, &integer)) {
+            return 0;
+        }
+        return _json_write_integer(reader, integer, type_position);
+    } else if (_json_key_equals(key, key_end, "$numberLong")) {
+        if (!_json_parse_int64(value, value_end, &integer)) {
+            return 0;
+        }
+        if (!buffer_write_int64(reader->buffer, (int64_t)integer)) {
+            return -1;
+        }
+        type = 18;
+    } else if (_json_key_equals(key, key_end, "$numberDouble")) {
+        int is_float;
+        if (!(value_end - value == 3 && memcmp(value, "NaN", 3) == 0) &&
+            !(value_end - value == 8 && memcmp(value, "Infinity", 8) == 0) &&
+            !(value_end - value == 9 && memcmp(value, "-Infinity", 9) == 0) &&
+            _json_number_end(value, value_end, &is_float) != value_end) {
+            return 0;
+        }
+        if ((status = _json_parse_double(value, value_end, &d)) != 1) {
+            return status;
+        }
+        if (!buffer_write_double(reader->buffer, d)) {
+            return -1;
+        }
+        type = 1;
+    } else if (_json_key_equals(key, key_end, "$date")) {
+        if ((status = _json_parse_iso_millis(value, value_end, &integer)) != 1) {
+            return status;
+        }
+        if (!buffer_write_int64(reader->buffer, (int64_t)integer)) {
+            return -1;
+        }
+        type = 9;
+    } else {
+        return 0;
     }
-    if (Py_EnterRecursiveCall(" while decoding a BSON document"))
-        return NULL;
-    result = _elements_to_dict(self, string + 4, max - 5, options);
-    Py_LeaveRecursiveCall();
-    return result;
+    pymongo_buffer_get_buffer(reader->buffer)[type_position] = type;
+    return 1;
 }
 
-static int _get_buffer(PyObject *exporter, Py_buffer *view) {
-    if (PyObject_GetBuffer(exporter, view, PyBUF_SIMPLE) == -1) {
-        return 0;
+static int _json_base64_value(char c) {
+    if (c >= 'A' && c <= 'Z') {
+        return c - 'A';
     }
-    if (!PyBuffer_IsContiguous(view, 'C')) {
-        PyErr_SetString(PyExc_ValueError,
-                        "must be a contiguous buffer");
-        goto fail;
+    if (c >= 'a' && c <= 'z') {
+        return c - 'a' + 26;
     }
-    if (!view->buf || view->len < 0) {
-        PyErr_SetString(PyExc_ValueError, "invalid buffer");
-        goto fail;
+    if (c >= '0' && c <= '9') {
+        return c - '0' + 52;
     }
-    if (view->itemsize != 1) {
-        PyErr_SetString(PyExc_ValueError,
-                        "buffer data must be ascii or utf8");
-        goto fail;
+    if (c == '+') {
+        return 62;
     }
-    return 1;
-fail:
-    PyBuffer_Release(view);
-    return 0;
+    return c == '/' ? 63 : -1;
 }
 
-static PyObject* _cbson_bson_to_dict(PyObject* self, PyObject* args) {
-    int32_t size;
-    Py_ssize_t total_size;
-    const char* string;
-    PyObject* bson = NULL;
-    codec_options_t options;
-    PyObject* result = NULL;
-    PyObject* options_obj;
-    Py_buffer view = {0};
-
-    if (! (PyArg_ParseTuple(args, "OO", &bson, &options_obj) &&
-            convert_codec_options(self, options_obj, &options))) {
-        return result;
+/* Same as json_util._parse_binary for valid base64 that isn't a UUID. */
+static int _json_write_binary(json_bson_reader_t* reader, const char* b64,
+                              const char* b64_end, const char* subtype_str,
+                              const char* subtype_end, int type_position) {
+    Py_ssize_t length = b64_end - b64;
+    Py_ssize_t data_length;
+    Py_ssize_t i;
+    uint32_t subtype;
+    int padding = 0;
+    int position;
+    char hex[4] = {'0', '0', '0', '0'};
+    char* out;
+
+    if (subtype_end - subtype_str < 1 || subtype_end - subtype_str > 2) {
+        return 0;
     }
-
-    if (!_get_buffer(bson, &view)) {
-        destroy_codec_options(&options);
-        return result;
+    memcpy(hex + 4 - (subtype_end - subtype_str), subtype_str, subtype_end - subtype_str);
+    /* UUIDs depend on the uuid_representation. */
+    if (!_json_hex4(hex, &subtype) || subtype == 3 || subtype == 4) {
+        return 0;
     }
-
-    total_size = view.len;
-
-    if (total_size < BSON_MIN_SIZE) {
-        PyObject* InvalidBSON = _error("InvalidBSON");
-        if (InvalidBSON) {
-            PyErr_SetString(InvalidBSON,
-                            "not enough data for a BSON document");
-            Py_DECREF(InvalidBSON);
+    if (length % 4) {
+        return 0;
+    }
+    if (length && b64_end[-1] == '=') {
+        padding = b64_end[-2] == '=' ? 2 : 1;
+    }
+    data_length = length / 4 * 3 - padding;
+    if (data_length > BSON_MAX_SIZE - 4) {
+        return 0;
+    }
+    if (subtype == 2) {
+        if (!buffer_write_int32(reader->buffer, (int32_t)data_length + 4) ||
+            !buffer_write_bytes(reader->buffer, "\x02", 1)) {
+            return -1;
         }
-        goto done;;
     }
-
-    string = (char*)view.buf;
-    memcpy(&size, string, 4);
-    size = (int32_t)BSON_UINT32_FROM_LE(size);
-    if (size < BSON_MIN_SIZE) {
-        PyObject* InvalidBSON = _error("InvalidBSON");
-        if (InvalidBSON) {
-            PyErr_SetString(InvalidBSON, "invalid message size");
-            Py_DECREF(InvalidBSON);
+    if (!buffer_write_int32(reader->buffer, (int32_t)data_length)) {
+        return -1;
+    }
+    if (subtype != 2) {
+        char subtype_byte = (char)subtype;
+        if (!buffer_write_bytes(reader->buffer, &subtype_byte, 1)) {
+            return -1;
         }
-        goto done;
     }
-
-    if (total_size < size || total_size > BSON_MAX_SIZE) {
-        PyObject* InvalidBSON = _error("InvalidBSON");
-        if (InvalidBSON) {
-            PyErr_SetString(InvalidBSON, "objsize too large");
-            Py_DECREF(InvalidBSON);
+    if ((position = pymongo_buffer_save_space(reader->buffer, (int)data_length)) == -1) {
+        return -1;
+    }
+    out = pymongo_buffer_get_buffer(reader->buffer) + position;
+    for (i = 0; i < length; i += 4) {
+        int last = i + 4 == length;
+        int a = _json_base64_value(b64[i]);
+        int b = _json_base64_value(b64[i + 1]);
+        int c = (last && padding == 2) ? 0 : _json_base64_value(b64[i + 2]);
+        int d = (last && padding) ? 0 : _json_base64_value(b64[i + 3]);
+        uint32_t triple;
+        if (a < 0 || b < 0 || c < 0 || d < 0) {
+            return 0;
         }
-        goto done;
+        triple = ((uint32_t)a << 18) | ((uint32_t)b << 12) | ((uint32_t)c << 6) | (uint32_t)d;
+        *out++ = (char)(triple >> 16);
+        if (!(last && padding == 2)) {
+            *out++ = (char)((triple >> 8) & 0xFF);
+        }
+        if (!(last && padding)) {
+            *out++ = (char)(triple & 0xFF);
+        }
+    }
+    pymongo_buffer_get_buffer(reader->buffer)[type_position] = 5;
+    return 1;
+}
+
+/* Write a datetime given in milliseconds, if it is in the range of datetime. */
+static int _json_write_millis(json_bson_reader_t* reader, const char* value,
+                              const char* value_end, int type_position) {
+    struct module_state *state = GETSTATE(reader->self);
+    long long millis;
+    if (!state) {
+        return -1;
+    }
+    /* Other datetimes depend on the datetime_conversion. */
+    if (!_json_parse_int64(value, value_end, &millis) || millis < state->min_millis ||
+        millis > state->max_millis) {
+        return 0;
+    }
+    if (!buffer_write_int64(reader->buffer, (int64_t)millis)) {
+        return -1;
     }
+    pymongo_buffer_get_buffer(reader->buffer)[type_position] = 9;
+    return 1;
+}
 
-    if (size != total_size || string[size - 1]) {
-        PyObject* InvalidBSON = _error("InvalidBSON");
-        if (InvalidBSON) {
-            PyErr_SetString(InvalidBSON, "bad eoo");
-            Py_DECREF(InvalidBSON);
+/*
+ * Find the values of the two members named first and second, in any order,
+ * in spans matched by _json_match_object.
+ */
+static int _json_match_members(const char** spans, const char* first, const char* second,
+                               const char** values) {
+    int i;
+    for (i = 0; i < 2; i++) {
+        const char** a = spans + 4 * i;
+        const char** b = spans + 4 * (1 - i);
+        if (_json_key_equals(a[0], a[1], first) && _json_key_equals(b[0], b[1], second)) {
+            values[0] = a[2];
+            values[1] = a[3];
+            values[2] = b[2];
+            values[3] = b[3];
+            return 1;
         }
-        goto done;
     }
-
-    result = elements_to_dict(self, string, (unsigned)size, &options);
-done:
-    PyBuffer_Release(&view);
-    destroy_codec_options(&options);
-    return result;
+    return 0;
 }
 
-static PyObject* _cbson_decode_all(PyObject* self, PyObject* args) {
-    int32_t size;
-    Py_ssize_t total_size;
-    const char* string;
-    PyObject* bson;
-    PyObject* dict;
-    PyObject* result = NULL;
-    codec_options_t options;
-    PyObject* options_obj = NULL;
-    Py_buffer view = {0};
-
-    if (!(PyArg_ParseTuple(args, "OO", &bson, &options_obj) &&
-            convert_codec_options(self, options_obj, &options))) {
-        return NULL;
+/*
+ * Write the Extended JSON type wrapper object between start and the reader
+ * position. The wrappers written by mongoexport for ObjectIds, numbers, dates
+ * and binary data are converted here, the others are decoded by
+ * json_util.loads.
+ */
+static int _json_read_wrapper(json_bson_reader_t* reader, const char* start,
+                              int type_position) {
+    const char* end = reader->pos;
+    const char* p = start;
+    const char* spans[8];
+    const char* values[4];
+    const char* key;
+    const char* key_end;
+    int position = pymongo_buffer_get_position(reader->buffer);
+    PyObject* json;
+    PyObject* obj;
+    int status = 0;
+
+    if (_json_match_object(&p, end, 1, spans)) {
+        status = _json_write_wrapper(reader, spans[0], spans[1], spans[2], spans[3],
+                                     type_position);
+    } else if ((p = start, _json_match_object(&p, end, 2, spans))) {
+        if (_json_match_members(spans, "$binary", "$type", values)) {
+            status = _json_write_binary(reader, values[0], values[1], values[2], values[3],
+                                        type_position);
+        }
+    } else if ((p = start, _json_match_char(&p, end, '{')) &&
+               _json_match_plain_string(&p, end, &key, &key_end) &&
+               _json_match_char(&p, end, ':')) {
+        if (_json_key_equals(key, key_end, "$binary")) {
+            if (_json_match_object(&p, end, 2, spans) && _json_match_char(&p, end, '}') &&
+                _json_match_members(spans, "base64", "subType", values)) {
+                status = _json_write_binary(reader, values[0], values[1], values[2], values[3],
+                                            type_position);
+            }
+        } else if (_json_key_equals(key, key_end, "$date")) {
+            /* {"$date": {"$numberLong": "<millis>"}} or {"$date": <millis>}. */
+            const char* number = p;
+            if (_json_match_object(&p, end, 1, spans)) {
+                if (_json_key_equals(spans[0], spans[1], "$numberLong") &&
+                    _json_match_char(&p, end, '}')) {
+                    status = _json_write_millis(reader, spans[2], spans[3], type_position);
+                }
+            } else {
+                int is_float;
+                p = number;
+                while (number < end && (*number == ' ' || *number == '\t' ||
+                                        *number == '\n' || *number == '\r')) {
+                    number++;
+                }
+                if ((p = _json_number_end(number, end, &is_float)) && !is_float &&
+                    _json_match_char(&p, end, '}')) {
+                    status = _json_write_millis(reader, number, p - 1, type_position);
+                }
+            }
+        }
     }
-
-    if (!_get_buffer(bson, &view)) {
-        destroy_codec_options(&options);
-        return NULL;
+    if (status != 0) {
+        return status;
     }
-    total_size = view.len;
-    string = (char*)view.buf;
-
-    if (!(result = PyList_New(0))) {
-        goto fail;
+    pymongo_buffer_update_position(reader->buffer, position);
+    json = PyBytes_FromStringAndSize(start, end - start);
+    if (!json) {
+        return -1;
     }
-
-    while (total_size > 0) {
-        if (total_size < BSON_MIN_SIZE) {
-            PyObject* InvalidBSON = _error("InvalidBSON");
-            if (InvalidBSON) {
-                PyErr_SetString(InvalidBSON,
-                                "not enough data for a BSON document");
-                Py_DECREF(InvalidBSON);
-            }
-            Py_DECREF(result);
-            goto fail;
+    obj = PyObject_Vectorcall(reader->loads, &json, 1, NULL);
+    Py_DECREF(json);
+    if (obj) {
+        status = write_element_to_buffer(reader->self, reader->buffer, type_position, obj, 0,
+                                         &reader->options, 0, 0);
+        Py_DECREF(obj);
+        if (status) {
+            return 1;
         }
+    }
+    /* Leave reporting invalid Extended JSON to the Python implementation. */
+    if (PyErr_ExceptionMatches(PyExc_Exception)) {
+        PyErr_Clear();
+        return 0;
+    }
+    return -1;
+}
 
-        memcpy(&size, string, 4);
-        size = (int32_t)BSON_UINT32_FROM_LE(size);
-        if (size < BSON_MIN_SIZE) {
-            PyObject* InvalidBSON = _error("InvalidBSON");
-            if (InvalidBSON) {
-                PyErr_SetString(InvalidBSON, "invalid message size");
-                Py_DECREF(InvalidBSON);
-            }
-            Py_DECREF(result);
-            goto fail;
-        }
+static int _json_read_value(json_bson_reader_t* reader, int type_position) {
+    const char* start = reader->pos;
+    char type;
+    int status;
 
-        if (total_size < size) {
-            PyObject* InvalidBSON = _error("InvalidBSON");
-            if (InvalidBSON) {
-                PyErr_SetString(InvalidBSON, "objsize too large");
-                Py_DECREF(InvalidBSON);
+    if (start >= reader->end) {
+        return 0;
+    }
+    switch (*start) {
+    case '{':
+        {
+            int position = pymongo_buffer_get_position(reader->buffer);
+            status = _json_read_object(reader, 0);
+            if (status == 2) {
+                pymongo_buffer_update_position(reader->buffer, position);
+                return _json_read_wrapper(reader, start, type_position);
             }
-            Py_DECREF(result);
-            goto fail;
+            type = 3;
+            break;
         }
-
-        if (string[size - 1]) {
-            PyObject* InvalidBSON = _error("InvalidBSON");
-            if (InvalidBSON) {
-                PyErr_SetString(InvalidBSON, "bad eoo");
-                Py_DECREF(InvalidBSON);
+    case '[':
+        status = _json_read_array(reader);
+        type = 4;
+        break;
+    case '"':
+        status = _json_read_string(reader, 0);
+        type = 2;
+        break;
+    case 't':
+    case 'f':
+        {
+            int value = *start == 't';
+            const char* literal = value ? "true" : "false";
+            size_t length = strlen(literal);
+            if ((size_t)(reader->end - start) < length || memcmp(start, literal, length)) {
+                return 0;
             }
-            Py_DECREF(result);
-            goto fail;
-        }
-
-        dict = elements_to_dict(self, string, (unsigned)size, &options);
-        if (!dict) {
-            Py_DECREF(result);
-            goto fail;
+            if (_json_write(reader->buffer, value ? "\x01" : "\x00", 1) < 0) {
+                return -1;
+            }
+            reader->pos += length;
+            status = 1;
+            type = 8;
+            break;
         }
-        if (PyList_Append(result, dict) < 0) {
-            Py_DECREF(dict);
-            Py_DECREF(result);
-            goto fail;
+    case 'n':
+        if (reader->end - start < 4 || memcmp(start, "null", 4)) {
+            return 0;
         }
-        Py_DECREF(dict);
-        string += size;
-        total_size -= size;
+        reader->pos += 4;
+        status = 1;
+        type = 10;
+        break;
+    default:
+        return _json_read_number(reader, type_position);
     }
-    goto done;
-fail:
-    result = NULL;
-done:
-    PyBuffer_Release(&view);
-    destroy_codec_options(&options);
-    return result;
+    if (status == 1) {
+        pymongo_buffer_get_buffer(reader->buffer)[type_position] = type;
+    }
+    return status;
 }
 
-
-static PyObject* _cbson_array_of_documents_to_buffer(PyObject* self, PyObject* args) {
-    uint32_t size;
-    uint32_t value_length;
-    uint32_t position = 0;
-    buffer_t buffer;
-    const char* string;
-    PyObject* arr;
+/*
+ * Same as bson.encode(json_util.loads(data, json_options=json_options),
+ * codec_options=json_options), or None when the document must be converted by
+ * the Python implementation. loads is called to decode the Extended JSON
+ * type wrappers that aren't handled here.
+ */
+static PyObject* _cbson_json_to_bson(PyObject* self, PyObject* args) {
+    PyObject* data;
+    PyObject* options_obj;
     PyObject* result = NULL;
+    json_bson_reader_t reader;
     Py_buffer view = {0};
+    const char* text;
+    Py_ssize_t length;
+    int status = 0;
 
-    if (!PyArg_ParseTuple(args, "O", &arr)) {
+    if (!PyArg_ParseTuple(args, "OO!OO", &data, &PyDict_Type, &reader.parsers,
+                          &options_obj, &reader.loads)) {
         return NULL;
     }
-
-    if (!_get_buffer(arr, &view)) {
-        return NULL;
+    if (PyUnicode_Check(data)) {
+        text = PyUnicode_AsUTF8AndSize(data, &length);
+        if (!text) {
+            if (PyErr_ExceptionMatches(PyExc_UnicodeEncodeError)) {
+                PyErr_Clear();
+                Py_RETURN_NONE;
+            }
+            return NULL;
+        }
+    } else {
+        if (!_get_buffer(data, &view)) {
+            return NULL;
+        }
+        text = (const char*)view.buf;
+        length = view.len;
+        /* json.loads detects UTF-16 and UTF-32 and skips a UTF-8 BOM. */
+        if (length < 2 || !text[0] || !text[1] || (unsigned char)text[0] >= 0x80) {
+            PyBuffer_Release(&view);
+            Py_RETURN_NONE;
+        }
     }
-
-    buffer = pymongo_buffer_new();
-    if (!buffer) {
+    if (!convert_codec_options(self, options_obj, &reader.options)) {
         PyBuffer_Release(&view);
         return NULL;
     }
-
-    string = (char*)view.buf;
-
-    if (view.len < BSON_MIN_SIZE) {
-        PyObject* InvalidBSON = _error("InvalidBSON");
-        if (InvalidBSON) {
-            PyErr_SetString(InvalidBSON,
-                            "not enough data for a BSON document");
-            Py_DECREF(InvalidBSON);
-        }
-        goto fail;
+    reader.self = self;
+    reader.pos = text;
+    reader.end = text + length;
+    reader.depth = 0;
+    reader.buffer = pymongo_buffer_new();
+    if (!reader.buffer) {
+        goto done;
     }
-
-    memcpy(&size, string, 4);
-    size = BSON_UINT32_FROM_LE(size);
-
-    /* validate the size of the array */
-    if (view.len != (int32_t)size || (int32_t)size < BSON_MIN_SIZE) {
-        PyObject* InvalidBSON = _error("InvalidBSON");
-        if (InvalidBSON) {
-            PyErr_SetString(InvalidBSON, "objsize too large");
-            Py_DECREF(InvalidBSON);
+    _json_skip_whitespace(&reader);
+    if (reader.pos < reader.end && *reader.pos == '{') {
+        status = _json_read_object(&reader, 1);
+        /* A type wrapper at the top level isn't a document. */
+        if (status == 2) {
+            status = 0;
         }
-        goto fail;
-    }
-
-    if (string[size - 1]) {
-        PyObject* InvalidBSON = _error("InvalidBSON");
-        if (InvalidBSON) {
-            PyErr_SetString(InvalidBSON, "bad eoo");
-            Py_DECREF(InvalidBSON);
+        _json_skip_whitespace(&reader);
+        if (status == 1 && reader.pos != reader.end) {
+            status = 0;
         }
-        goto fail;
     }
-
-    /* save space for length */
-    if (pymongo_buffer_save_space(buffer, size) == -1) {
-        goto fail;
+    if (status == 1) {
+        result = PyBytes_FromStringAndSize(pymongo_buffer_get_buffer(reader.buffer),
+                                           pymongo_buffer_get_position(reader.buffer));
+    } else if (status == 0) {
+        result = Py_None;
+        Py_INCREF(result);
     }
-    pymongo_buffer_update_position(buffer, 0);
-
-    position += 4;
-    while (position < size - 1) {
-        // Verify the value is an object.
-        unsigned char type = (unsigned char)string[position];
-        if (type != 3) {
-            PyObject* InvalidBSON = _error("InvalidBSON");
-            if (InvalidBSON) {
-                PyErr_SetString(InvalidBSON, "array element was not an object");
-                Py_DECREF(InvalidBSON);
-            }
-            goto fail;
-        }
-
-        // Just skip the keys.
-        position = position + strlen(string + position) + 1;
-
-        if (position >= size || (size - position) < BSON_MIN_SIZE) {
-            PyObject* InvalidBSON = _error("InvalidBSON");
-            if (InvalidBSON) {
-                PyErr_SetString(InvalidBSON, "invalid array content");
-                Py_DECREF(InvalidBSON);
-            }
-            goto fail;
-         }
-
-        memcpy(&value_length, string + position, 4);
-        value_length = BSON_UINT32_FROM_LE(value_length);
-        if (value_length < BSON_MIN_SIZE) {
-            PyObject* InvalidBSON = _error("InvalidBSON");
-            if (InvalidBSON) {
-                PyErr_SetString(InvalidBSON, "invalid message size");
-                Py_DECREF(InvalidBSON);
-            }
-            goto fail;
-         }
-
-        if (pymongo_buffer_write(buffer, string + position, value_length) == 1) {
-            goto fail;
-        }
-        position += value_length;
+done:
+    if (reader.buffer) {
+        pymongo_buffer_free(reader.buffer);
     }
+    PyBuffer_Release(&view);
+    destroy_codec_options(&reader.options);
+    return result;
+}
 
-    if (position != size - 1) {
-        PyObject* InvalidBSON = _error("InvalidBSON");
-        if (InvalidBSON) {
-            PyErr_SetString(InvalidBSON,
-                            "bad object or element length");
-            Py_DECREF(InvalidBSON);
+/* Create n ObjectIds with consecutive counter values, starting at inc,
+ * after the 4 byte timestamp and 5 byte random value in prefix. */
+static PyObject* _cbson_objectid_batch(PyObject* self, PyObject* args) {
+    struct module_state* state = GETSTATE(self);
+    const char* prefix;
+    Py_ssize_t prefix_length;
+    unsigned long inc;
+    Py_ssize_t n;
+    Py_ssize_t i;
+    char data[12];
+    PyObject* result;
+    if (!PyArg_ParseTuple(args, "y#kn", &prefix, &prefix_length, &inc, &n)) {
+        return NULL;
+    }
+    if (prefix_length != 9 || n < 0) {
+        PyErr_SetString(PyExc_ValueError, "invalid ObjectId batch");
+        return NULL;
+    }
+    result = PyList_New(n);
+    if (!result) {
+        return NULL;
+    }
+    memcpy(data, prefix, 9);
+    for (i = 0; i < n; i++) {
+        unsigned long counter = (inc + (unsigned long)i) & 0xFFFFFF;
+        PyObject* oid;
+        data[9] = (char)(counter >> 16);
+        data[10] = (char)(counter >> 8);
+        data[11] = (char)counter;
+        oid = _objectid_from_bytes(state, data);
+        if (!oid) {
+            Py_DECREF(result);
+            return NULL;
         }
-        goto fail;
+        PyList_SET_ITEM(result, i, oid);
     }
-
-    /* objectify buffer */
-    result = Py_BuildValue("y#", pymongo_buffer_get_buffer(buffer),
-                           (Py_ssize_t)pymongo_buffer_get_position(buffer));
-    goto done;
-fail:
-    result = NULL;
-done:
-    PyBuffer_Release(&view);
-    pymongo_buffer_free(buffer);
     return result;
 }
 
-
 static PyMethodDef _CBSONMethods[] = {
     {"_dict_to_bson", _cbson_dict_to_bson, METH_VARARGS,
      "convert a dictionary to a string containing its BSON representation."},
+    {"_dict_to_bson_into", _cbson_dict_to_bson_into, METH_VARARGS,
+     "encode a dictionary into a writable buffer, returning the size written."},
+    {"_encoded_size", _cbson_encoded_size, METH_VARARGS,
+     "get the size of the BSON encoding of a document without encoding it."},
+    {"_encode_template", _cbson_encode_template, METH_VARARGS,
+     "encode the values of a document template to BSON."},
     {"_bson_to_dict", _cbson_bson_to_dict, METH_VARARGS,
      "convert a BSON string to a SON object."},
     {"_decode_all", _cbson_decode_all, METH_VARARGS,
      "convert binary data to a sequence of documents."},
     {"_element_to_dict", _cbson_element_to_dict, METH_VARARGS,
      "Decode a single key, value pair."},
+    {"_index_elements", _cbson_index_elements, METH_VARARGS,
+     "Map the top-level field names of a BSON document to their positions."},
+    {"_decode_columns", _cbson_decode_columns, METH_VARARGS,
+     "Decode fields of a stream of BSON documents into typed columns."},
+    {"_decode_vectors", _cbson_decode_vectors, METH_VARARGS,
+     "Gather a vector field of a stream of BSON documents into a float32 matrix."},
+    {"_json_convert", _cbson_json_convert, METH_VARARGS,
+     "convert BSON types in an object to JSON compatible objects."},
+    {"_json_object_hook", _cbson_json_object_hook, METH_VARARGS,
+     "decode an Extended JSON object to a BSON type."},
+    {"_bson_to_json", _cbson_bson_to_json, METH_VARARGS,
+     "convert a BSON document to Extended JSON bytes."},
+    {"_json_to_bson", _cbson_json_to_bson, METH_VARARGS,
+     "convert an Extended JSON document to BSON."},
+    {"_objectid_batch", _cbson_objectid_batch, METH_VARARGS,
+     "create a list of new ObjectIds with consecutive counter values."},
     {"_array_of_documents_to_buffer", _cbson_array_of_documents_to_buffer, METH_VARARGS, "Convert raw array of documents to a stream of BSON documents"},
     {"_test_long_long_to_str", _test_long_long_to_str, METH_VARARGS, "Test conversion of extreme and common Py_ssize_t values to str."},
     {NULL, NULL, 0, NULL}
@@ -3290,6 +8254,7 @@ static int _cbson_traverse(PyObject *m, visitproc visit, void *arg) {
     Py_VISIT(state->Binary);
     Py_VISIT(state->Code);
     Py_VISIT(state->ObjectId);
+    Py_VISIT(state->ObjectIdSlot);
     Py_VISIT(state->DBRef);
     Py_VISIT(state->Regex);
     Py_VISIT(state->UUID);
@@ -3323,8 +8288,20 @@ static int _cbson_traverse(PyObject *m, visitproc visit, void *arg) {
     Py_VISIT(state->_from_uuid_str);
     Py_VISIT(state->_as_uuid_str);
     Py_VISIT(state->_from_bid_str);
+    Py_VISIT(state->_items_str);
+    Py_VISIT(state->_iter_str);
+    Py_VISIT(state->_compiled_codec_str);
+    Py_VISIT(state->_encoder_cache_str);
+    Py_VISIT(state->_document_decoder_str);
+    Py_VISIT(state->_resolve_encoder_str);
+    Py_VISIT(state->_build_str);
+    Py_VISIT(state->_nested_str);
+    Py_VISIT(state->_direct_str);
     Py_VISIT(state->min_datetime);
     Py_VISIT(state->max_datetime);
+    Py_VISIT(state->DataclassFieldNames);
+    Py_VISIT(state->dataclass_field_names);
+    Py_VISIT(state->document_plan);
     Py_VISIT(state->replace_args);
     Py_VISIT(state->replace_kwargs);
     return 0;
@@ -3338,6 +8315,7 @@ static int _cbson_clear(PyObject *m) {
     Py_CLEAR(state->Binary);
     Py_CLEAR(state->Code);
     Py_CLEAR(state->ObjectId);
+    Py_CLEAR(state->ObjectIdSlot);
     Py_CLEAR(state->DBRef);
     Py_CLEAR(state->Regex);
     Py_CLEAR(state->UUID);
@@ -3371,8 +8349,20 @@ static int _cbson_clear(PyObject *m) {
     Py_CLEAR(state->_from_uuid_str);
     Py_CLEAR(state->_as_uuid_str);
     Py_CLEAR(state->_from_bid_str);
+    Py_CLEAR(state->_items_str);
+    Py_CLEAR(state->_iter_str);
+    Py_CLEAR(state->_compiled_codec_str);
+    Py_CLEAR(state->_encoder_cache_str);
+    Py_CLEAR(state->_document_decoder_str);
+    Py_CLEAR(state->_resolve_encoder_str);
+    Py_CLEAR(state->_build_str);
+    Py_CLEAR(state->_nested_str);
+    Py_CLEAR(state->_direct_str);
     Py_CLEAR(state->min_datetime);
     Py_CLEAR(state->max_datetime);
+    Py_CLEAR(state->DataclassFieldNames);
+    Py_CLEAR(state->dataclass_field_names);
+    Py_CLEAR(state->document_plan);
     Py_CLEAR(state->replace_args);
     Py_CLEAR(state->replace_kwargs);
     return 0;
@@ -54,14 +54,20 @@ extern int cbson_long_long_to_str(long long int num, char* str, size_t size);
 
 typedef struct type_registry_t {
     PyObject* encoder_map;
+    PyObject* encoder_cache;
     PyObject* decoder_map;
     PyObject* fallback_encoder;
+    PyObject* document_decoder;
     PyObject* registry_obj;
     unsigned char is_encoder_empty;
     unsigned char is_decoder_empty;
     unsigned char has_fallback_encoder;
+    unsigned char has_document_decoder;
 } type_registry_t;
 
+/* A bounded cache of decoded field names, see _decode_key. */
+struct key_cache_t;
+
 typedef struct codec_options_t {
     PyObject* document_class;
     unsigned char tz_aware;
@@ -73,6 +79,19 @@ typedef struct codec_options_t {
     PyObject* options_obj;
     unsigned char is_raw_bson;
     unsigned char is_dict_class;
+    /* Builds a dataclass document_class instance from a decoded dict, or
+     * NULL. document_class is dict when this is set. */
+    PyObject* document_plan;
+    /* Whether document_plan is the dataclass itself, called with the
+     * decoded dict as keyword arguments. */
+    unsigned char document_plan_kwargs;
+    /* Whether document_plan also builds embedded documents. */
+    unsigned char document_plan_nested;
+    /* The direct attribute of the dataclass's document plan, used to build
+     * instances directly from BSON instead of from a decoded dict, or NULL. */
+    PyObject* document_direct;
+    /* Field names shared by the documents of one decode call, or NULL. */
+    struct key_cache_t* key_cache;
 } codec_options_t;
 
 /* C API functions */
@@ -0,0 +1,291 @@
+# Copyright 2026-present MongoDB, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Encode dataclass instances and decode documents to dataclasses and
+records.
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import sys
+import typing
+from collections.abc import ItemsView, Iterator, Mapping, Sequence
+from typing import Any, Callable, Optional, Union
+
+from bson.errors import InvalidBSON
+from bson.record import Record
+
+if sys.version_info >= (3, 10):
+    from types import UnionType
+
+    _UNION_TYPES: tuple[Any, ...] = (Union, UnionType)
+else:
+    _UNION_TYPES = (Union,)
+
+# Maps each type seen by the encoder to the names of its dataclass fields,
+# or to None if it is not a dataclass. Read directly by the C extension.
+_FIELD_NAMES: dict[Any, Optional[tuple[str, ...]]] = {}
+
+# Maps each document_class to its _DocumentPlan, or to None if it is neither
+# a dataclass nor a Record.
+_DOCUMENT_PLANS: dict[Any, Optional[_DocumentPlan]] = {}
+
+
+def _is_dataclass_type(cls: Any) -> bool:
+    return isinstance(cls, type) and dataclasses.is_dataclass(cls)
+
+
+def _field_names(cls: Any) -> Optional[tuple[str, ...]]:
+    """Return the field names of the dataclass cls, or None if cls is not a
+    dataclass.
+    """
+    try:
+        return _FIELD_NAMES[cls]
+    except KeyError:
+        pass
+    names = None
+    if _is_dataclass_type(cls):
+        names = tuple(field.name for field in dataclasses.fields(cls))
+    _FIELD_NAMES[cls] = names
+    return names
+
+
+class _DataclassDocument(Mapping[str, Any]):
+    """A read-only mapping view of the fields of a dataclass instance, used by
+    the pure Python encoder.
+    """
+
+    __slots__ = ("__names", "__obj")
+
+    def __init__(self, obj: Any, names: tuple[str, ...]) -> None:
+        self.__obj = obj
+        self.__names = names
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self.__names:
+            raise KeyError(key)
+        return getattr(self.__obj, key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.__names)
+
+    def __len__(self) -> int:
+        return len(self.__names)
+
+    def items(self) -> ItemsView[str, Any]:
+        return ItemsView(self)
+
+    def __repr__(self) -> str:
+        return repr(self.__obj)
+
+
+def _value_converter(annotation: Any) -> Optional[Callable[[Any], Any]]:
+    """Compile the conversion of a decoded field value to the dataclass named
+    by its annotation, or return None if the field holds no dataclass.
+
+    Supports ``Model``, ``Optional[Model]`` and ``list[Model]`` annotations.
+    """
+    if _is_dataclass_type(annotation):
+
+        def convert(value: Any) -> Any:
+            if isinstance(value, dict):
+                # Look up the plan on each call to support recursive models.
+                return _document_plan(annotation)(value)  # type: ignore[misc]
+            return value
+
+        return convert
+    origin = typing.get_origin(annotation)
+    args = typing.get_args(annotation)
+    if origin in _UNION_TYPES:
+        members = [arg for arg in args if arg is not type(None)]
+        if len(members) == 1:
+            return _value_converter(members[0])
+    elif origin in (list, Sequence) and args:
+        convert_item = _value_converter(args[0])
+        if convert_item is not None:
+
+            def convert_list(value: Any) -> Any:
+                if isinstance(value, list):
+                    return [convert_item(item) for item in value]
+                return value
+
+            return convert_list
+    return None
+
+
+def _nested_model(annotation: Any) -> Optional[tuple[Any, bool]]:
+    """Return the dataclass named by a ``Model``, ``Optional[Model]`` or
+    ``list[Model]`` annotation and whether it is a list, or None for any
+    other annotation.
+    """
+    if _is_dataclass_type(annotation):
+        return annotation, False
+    origin = typing.get_origin(annotation)
+    args = typing.get_args(annotation)
+    if origin in _UNION_TYPES:
+        members = [arg for arg in args if arg is not type(None)]
+        if len(members) == 1:
+            return _nested_model(members[0])
+    elif origin in (list, Sequence) and args:
+        item = _nested_model(args[0])
+        if item is not None and not item[1]:
+            return item[0], True
+    return None
+
+
+class _DocumentPlan:
+    """Builds instances of a dataclass or Record from decoded dicts.
+
+    When none of the fields need converting, ``build`` is None and the C
+    extension calls ``document_class`` with the dict as keyword arguments.
+    When ``nested`` is True, embedded documents are built by the plan too:
+    the C extension builds each one as it is decoded, while calling the plan
+    builds the embedded documents of an already decoded dict.
+
+    ``direct`` lets the C extension build dataclass instances directly from
+    BSON, passing each field value to the dataclass as it is decoded instead
+    of decoding a dict first. It is ``(document_class, names, index, fields)``,
+    where ``index`` maps each name in ``names`` to its position and each item
+    of ``fields`` is None, or ``(plan, is_list)`` for a field that holds
+    another dataclass. It is None when the dataclass has fields that are not
+    passed to ``__init__`` or annotations that only ``build`` can convert.
+    """
+
+    __slots__ = ("build", "direct", "document_class", "nested")
+
+    def __init__(
+        self,
+        document_class: Any,
+        build: Optional[Callable[[dict[str, Any]], Any]],
+        nested: bool = False,
+    ) -> None:
+        self.document_class = document_class
+        self.build = build
+        self.nested = nested
+        self.direct: Optional[tuple[Any, ...]] = None
+
+    def __call__(self, document: dict[str, Any]) -> Any:
+        try:
+            if self.nested:
+                return self._build_nested(document)
+            if self.build is not None:
+                return self.build(document)
+            return self.document_class(**document)
+        except InvalidBSON:
+            raise
+        except Exception as exc:
+            # Report unknown and missing fields like the decoders do.
+            raise InvalidBSON(str(exc)).with_traceback(exc.__traceback__) from None
+
+    def _build_nested(self, value: Any) -> Any:
+        if type(value) is dict:
+            for key, item in value.items():
+                if type(item) is dict or type(item) is list:
+                    value[key] = self._build_nested(item)
+            return self.build(value)  # type: ignore[misc]
+        if type(value) is list:
+            return [
+                self._build_nested(item) if type(item) is dict or type(item) is list else item
+                for item in value
+            ]
+        return value
+
+
+def _compile_plan(cls: Any) -> _DocumentPlan:
+    plan = _DocumentPlan(cls, None)
+    # Register the plan first so that recursive models find it.
+    _DOCUMENT_PLANS[cls] = plan
+    try:
+        _compile_fields(plan)
+    except BaseException:
+        del _DOCUMENT_PLANS[cls]
+        raise
+    return plan
+
+
+def _compile_fields(plan: _DocumentPlan) -> None:
+    cls = plan.document_class
+    try:
+        hints = typing.get_type_hints(cls)
+    except Exception:
+        # Unresolvable forward references: use the annotations as written.
+        hints = {}
+    converters = []
+    non_init = set()
+    names = []
+    fields: list[Optional[tuple[_DocumentPlan, bool]]] = []
+    direct = True
+    for field in dataclasses.fields(cls):
+        if not field.init:
+            non_init.add(field.name)
+            direct = False
+            continue
+        annotation = hints.get(field.name, field.type)
+        convert = _value_converter(annotation)
+        names.append(field.name)
+        if convert is None:
+            fields.append(None)
+            continue
+        converters.append((field.name, convert))
+        model = _nested_model(annotation)
+        if model is None:
+            direct = False
+        else:
+            fields.append((_document_plan(model[0]), model[1]))  # type: ignore[arg-type]
+    if direct:
+        plan.direct = (
+            cls,
+            tuple(names),
+            {name: i for i, name in enumerate(names)},
+            tuple(fields),
+        )
+    if not converters and not non_init:
+        return
+
+    def build(document: dict[str, Any]) -> Any:
+        for name, convert in converters:
+            if name in document:
+                document[name] = convert(document[name])
+        if non_init and not non_init.isdisjoint(document):
+            extra = {name: document.pop(name) for name in non_init if name in document}
+            obj = cls(**document)
+            for name, value in extra.items():
+                object.__setattr__(obj, name, value)
+            return obj
+        return cls(**document)
+
+    plan.build = build
+
+
+def _document_plan(document_class: Any) -> Optional[_DocumentPlan]:
+    """Return the plan that builds a document_class instance from a decoded
+    dict, or None if document_class is neither a dataclass nor a Record.
+
+    The field plan of each dataclass is compiled once.
+    """
+    try:
+        return _DOCUMENT_PLANS[document_class]
+    except KeyError:
+        pass
+    except TypeError:
+        # Unhashable generic aliases cannot be dataclasses.
+        return None
+    plan = None
+    if _is_dataclass_type(document_class):
+        plan = _compile_plan(document_class)
+    elif isinstance(document_class, type) and issubclass(document_class, Record):
+        plan = _DocumentPlan(document_class, document_class._from_document, nested=True)
+    _DOCUMENT_PLANS[document_class] = plan
+    return plan
@@ -273,6 +273,73 @@ class BinaryVector:
         return len(self.data)
 
 
+# The little-endian NumPy dtype of the elements of each vector dtype.
+_NUMPY_DTYPES = {
+    BinaryVectorDtype.INT8: "<i1",
+    BinaryVectorDtype.FLOAT32: "<f4",
+    BinaryVectorDtype.PACKED_BIT: "<u1",
+}
+
+
+def _import_numpy() -> Any:
+    try:
+        import numpy as np
+    except ImportError as exc:
+        raise ImportError("Converting vectors with NumPy requires numpy to be installed.") from exc
+    return np
+
+
+def _numpy_vector_dtype(array: Any, dtype: Optional[BinaryVectorDtype]) -> BinaryVectorDtype:
+    """Return the vector dtype of array, inferring it from the array's dtype
+    when dtype is None.
+    """
+    if dtype is not None:
+        if not isinstance(dtype, BinaryVectorDtype):
+            raise TypeError(f"dtype must be a bson.binary.BinaryVectorDtype, not {type(dtype)}")
+        return dtype
+    if array.dtype.kind == "f":
+        return BinaryVectorDtype.FLOAT32
+    if array.dtype.kind == "i" and array.dtype.itemsize == 1:
+        return BinaryVectorDtype.INT8
+    if array.dtype.kind == "u" and array.dtype.itemsize == 1:
+        return BinaryVectorDtype.PACKED_BIT
+    raise ValueError(f"Cannot infer the vector dtype of an array of {array.dtype}, pass dtype.")
+
+
+def _numpy_vector_data(array: Any, dtype: BinaryVectorDtype) -> Any:
+    """Convert array to a C-contiguous array of the elements of dtype."""
+    np = _import_numpy()
+    target = np.dtype(_NUMPY_DTYPES[dtype])
+    if array.dtype == target or not array.size:
+        return np.ascontiguousarray(array, dtype=target)
+    if dtype == BinaryVectorDtype.FLOAT32:
+        with np.errstate(over="ignore"):
+            data = np.ascontiguousarray(array, dtype=target)
+        # Finite values too large for float32 would become infinite.
+        if array.dtype.kind == "f" and (np.isinf(data) & np.isfinite(array)).any():
+            raise ValueError("Values found outside FLOAT32 range.")
+        return data
+    info = np.iinfo(target)
+    if array.min() < info.min or array.max() > info.max:
+        raise ValueError(f"Values found outside {target.name.upper()} range.")
+    return np.ascontiguousarray(array, dtype=target)
+
+
+def _check_padding(data: Any, dtype: BinaryVectorDtype, padding: int) -> None:
+    if not padding:
+        return
+    if dtype != BinaryVectorDtype.PACKED_BIT:
+        raise ValueError(f"padding does not apply to {dtype=}")
+    if not 0 <= padding <= 7:
+        raise ValueError(f"{padding=}. It must be in [0,1, ..7].")
+    if not data.shape[-1]:
+        raise ValueError("Empty vector with non-zero padding.")
+    if (data[..., -1] & ((1 << padding) - 1)).any():
+        raise ValueError(
+            "Vector has a padding P, but bits in the final byte lower than P are non-zero. They must be zero."
+        )
+
+
 class Binary(bytes):
     """Representation of BSON binary data.
 
@@ -608,20 +675,20 @@ class Binary(bytes):
                     "Converting binary to numpy.ndarray requires numpy to be installed."
                 ) from exc
             if dtype == BinaryVectorDtype.INT8:
-                data = np.frombuffer(self[offset:], dtype="int8")
+                data = np.frombuffer(self, dtype="int8", offset=offset)
             elif dtype == BinaryVectorDtype.FLOAT32:
                 if n_bytes % 4:
                     raise ValueError(
                         "Corrupt data. N bytes for a float32 vector must be a multiple of 4."
                     )
-                data = np.frombuffer(self[offset:], dtype="float32")
+                data = np.frombuffer(self, dtype="float32", offset=offset)
             elif dtype == BinaryVectorDtype.PACKED_BIT:
                 # data packed as uint8
                 if padding and not n_bytes:
                     raise ValueError("Corrupt data. Vector has a padding P, but no data.")
                 if padding > 7 or padding < 0:
                     raise ValueError(f"Corrupt data. Padding ({padding}) must be between 0 and 7.")
-                data = np.frombuffer(self[offset:], dtype="uint8")
+                data = np.frombuffer(self, dtype="uint8", offset=offset)
                 if padding and np.unpackbits(data[-1])[-padding:].sum() > 0:
                     warnings.warn(
                         "Vector has a padding P, but bits in the final byte lower than P are non-zero. For pymongo>=5.0, they must be zero.",
@@ -632,6 +699,76 @@ class Binary(bytes):
                 raise NotImplementedError(f"Binary Vector dtype {dtype.name} not yet supported")
             return BinaryVector(data, dtype, padding)
 
+    @classmethod
+    def _from_vector_bytes(cls: type[Binary], data: Any) -> Binary:
+        """Create a Binary of Vector subtype from its complete value."""
+        self = bytes.__new__(cls, data)
+        self.__subtype = VECTOR_SUBTYPE
+        return self
+
+    @classmethod
+    def from_numpy(
+        cls: type[Binary],
+        array: npt.NDArray[np.number],
+        dtype: Optional[BinaryVectorDtype] = None,
+        padding: int = 0,
+    ) -> Binary:
+        """Create a BSON :class:`~bson.binary.Binary` of Vector subtype from a
+        one-dimensional numpy array.
+
+        Unlike :meth:`from_vector`, the data is copied straight from the
+        array's buffer, without converting the values to Python numbers.
+
+        :param array: A one-dimensional numpy array.
+        :param dtype: Data type of the values. By default, it is inferred from
+          the dtype of the array: floating point arrays are stored as
+          ``FLOAT32``, ``int8`` arrays as ``INT8`` and ``uint8`` arrays as
+          ``PACKED_BIT``.
+        :param padding: For ``PACKED_BIT`` vectors, number of bits to ignore at
+          the end of the vector.
+        :return: Binary packed data identified by dtype and padding.
+
+        .. versionadded:: 4.18
+        """
+        np = _import_numpy()
+        if not isinstance(array, np.ndarray):
+            raise TypeError(f"array must be a numpy.ndarray, not {type(array)}")
+        if array.ndim != 1:
+            raise ValueError("from_numpy only supports 1D arrays, see vectors_from_2d.")
+        dtype = _numpy_vector_dtype(array, dtype)
+        data = _numpy_vector_data(array, dtype)
+        _check_padding(data, dtype, padding)
+        return cls._from_vector_bytes(b"".join((struct.pack("<sB", dtype.value, padding), data)))
+
+    def as_numpy(self) -> npt.NDArray[np.number]:
+        """Return the values of this vector as a one-dimensional numpy array.
+
+        The array is a read-only view of this Binary's data, so no values are
+        copied. ``PACKED_BIT`` vectors are returned as an array of the packed
+        ``uint8`` bytes; use :meth:`as_vector` to get the padding too.
+
+        :return: A read-only numpy array of ``float32``, ``int8`` or ``uint8``.
+
+        .. versionadded:: 4.18
+        """
+        np = _import_numpy()
+        dtype, _ = self._vector_header()
+        return np.frombuffer(self, dtype=_NUMPY_DTYPES[dtype], offset=2)
+
+    def _vector_header(self) -> tuple[BinaryVectorDtype, int]:
+        """Validate this vector and return its dtype and padding."""
+        if self.subtype != VECTOR_SUBTYPE:
+            raise ValueError(f"Cannot decode subtype {self.subtype} as a vector")
+        dtype, padding = struct.unpack_from("<sB", self)
+        dtype = BinaryVectorDtype(dtype)
+        if padding and dtype != BinaryVectorDtype.PACKED_BIT:
+            raise ValueError(
+                f"Corrupt data. Padding ({padding}) must be 0 for all but PACKED_BIT dtypes. ({dtype=})"
+            )
+        if dtype == BinaryVectorDtype.FLOAT32 and (len(self) - 2) % 4:
+            raise ValueError("Corrupt data. N bytes for a float32 vector must be a multiple of 4.")
+        return dtype, padding
+
     @property
     def subtype(self) -> int:
         """Subtype of this binary data."""
@@ -663,3 +800,70 @@ class Binary(bytes):
             return f"<Binary(REDACTED, {self.__subtype})>"
         else:
             return f"Binary({bytes.__repr__(self)}, {self.__subtype})"
+
+
+def vectors_from_2d(
+    array: npt.NDArray[np.number],
+    dtype: Optional[BinaryVectorDtype] = None,
+    padding: int = 0,
+) -> list[Binary]:
+    """Create a :class:`Binary` of Vector subtype from each row of a
+    two-dimensional numpy array.
+
+    The whole array is converted to the vector dtype at once, which is much
+    faster than calling :meth:`Binary.from_numpy` on each row.
+
+    :param array: A two-dimensional numpy array, one vector per row.
+    :param dtype: Data type of the values, inferred from the dtype of the
+      array by default, as in :meth:`Binary.from_numpy`.
+    :param padding: For ``PACKED_BIT`` vectors, number of bits to ignore at
+      the end of each vector.
+    :return: A list of Binary vectors, one per row.
+
+    .. versionadded:: 4.18
+    """
+    np = _import_numpy()
+    if not isinstance(array, np.ndarray):
+        raise TypeError(f"array must be a numpy.ndarray, not {type(array)}")
+    if array.ndim != 2:
+        raise ValueError("vectors_from_2d only supports 2D arrays.")
+    dtype = _numpy_vector_dtype(array, dtype)
+    data = _numpy_vector_data(array, dtype)
+    _check_padding(data, dtype, padding)
+    # Lay out every vector, header included, in one buffer and slice it.
+    width = data.shape[1] * data.itemsize + 2
+    rows = np.empty((data.shape[0], width), dtype=np.uint8)
+    rows[:, :2] = np.frombuffer(struct.pack("<sB", dtype.value, padding), dtype=np.uint8)
+    rows[:, 2:] = data.view(np.uint8).reshape(data.shape[0], width - 2)
+    view = memoryview(rows.reshape(-1))
+    return [
+        Binary._from_vector_bytes(view[start : start + width])
+        for start in range(0, len(view), width)
+    ]
+
+
+def vectors_to_2d(vectors: Sequence[Binary]) -> npt.NDArray[np.number]:
+    """Stack Binary vectors of the same dtype, padding and length into a
+    two-dimensional numpy array, one vector per row.
+
+    The data of all the vectors is copied once into the new array, without
+    converting the values to Python numbers. ``PACKED_BIT`` vectors are
+    returned as rows of their packed ``uint8`` bytes.
+
+    :param vectors: A non-empty sequence of Binary vectors.
+    :return: A writable numpy array of ``float32``, ``int8`` or ``uint8``.
+
+    .. versionadded:: 4.18
+    """
+    np = _import_numpy()
+    if not vectors:
+        raise ValueError("vectors must not be empty")
+    first = vectors[0]
+    dtype, _ = first._vector_header()
+    header = first[:2]
+    size = len(first)
+    for vector in vectors:
+        if vector.subtype != VECTOR_SUBTYPE or len(vector) != size or vector[:2] != header:
+            raise ValueError("All vectors must have the same dtype, padding and length.")
+    data = bytearray().join(memoryview(vector)[2:] for vector in vectors)
+    return np.frombuffer(data, dtype=_NUMPY_DTYPES[dtype]).reshape(len(vectors), -1)
@@ -29,6 +29,8 @@ struct buffer {
     char* buffer;
     int size;
     int position;
+    /* Non-zero if `buffer` is owned by the caller and cannot grow. */
+    int fixed;
 };
 
 /* Set Python's error indicator to MemoryError.
@@ -49,6 +51,7 @@ buffer_t pymongo_buffer_new(void) {
 
     buffer->size = INITIAL_BUFFER_SIZE;
     buffer->position = 0;
+    buffer->fixed = 0;
     buffer->buffer = (char*)malloc(sizeof(char) * INITIAL_BUFFER_SIZE);
     if (buffer->buffer == NULL) {
         free(buffer);
@@ -59,6 +62,24 @@ buffer_t pymongo_buffer_new(void) {
     return buffer;
 }
 
+/* Allocate and return a new buffer that writes to the `size` bytes at
+ * `data`, which are owned by the caller. The buffer does not grow.
+ * Return NULL and sets MemoryError on allocation failure. */
+buffer_t pymongo_buffer_new_fixed(char* data, int size) {
+    buffer_t buffer;
+    buffer = (buffer_t)malloc(sizeof(struct buffer));
+    if (buffer == NULL) {
+        set_memory_error();
+        return NULL;
+    }
+
+    buffer->size = size;
+    buffer->position = 0;
+    buffer->fixed = 1;
+    buffer->buffer = data;
+    return buffer;
+}
+
 /* Free the memory allocated for `buffer`.
  * Return non-zero on failure. */
 int pymongo_buffer_free(buffer_t buffer) {
@@ -66,7 +87,7 @@ int pymongo_buffer_free(buffer_t buffer) {
         return 1;
     }
     /* Buffer will be NULL when buffer_grow fails. */
-    if (buffer->buffer != NULL) {
+    if (buffer->buffer != NULL && !buffer->fixed) {
         free(buffer->buffer);
     }
     free(buffer);
@@ -74,7 +95,8 @@ int pymongo_buffer_free(buffer_t buffer) {
 }
 
 /* Grow `buffer` to at least `min_length`.
- * Return non-zero and sets MemoryError on allocation failure. */
+ * Return non-zero and sets MemoryError on allocation failure, or ValueError
+ * if `buffer` is fixed. */
 static int buffer_grow(buffer_t buffer, int min_length) {
     int old_size = 0;
     int size = buffer->size;
@@ -82,6 +104,11 @@ static int buffer_grow(buffer_t buffer, int min_length) {
     if (size >= min_length) {
         return 0;
     }
+    if (buffer->fixed) {
+        PyErr_SetString(PyExc_ValueError,
+                        "buffer is too small for the encoded document");
+        return 1;
+    }
     while (size < min_length) {
         old_size = size;
         size *= 2;
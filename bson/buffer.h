@@ -29,6 +29,11 @@ typedef int buffer_position;
  * Return NULL on allocation failure. */
 buffer_t pymongo_buffer_new(void);
 
+/* Allocate and return a new buffer that writes to the `size` bytes at `data`,
+ * which are owned by the caller. Writing past the end fails with ValueError.
+ * Return NULL on allocation failure. */
+buffer_t pymongo_buffer_new_fixed(char* data, int size);
+
 /* Free the memory allocated for `buffer`.
  * Return non-zero on failure. */
 int pymongo_buffer_free(buffer_t buffer);
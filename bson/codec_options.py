@@ -32,6 +32,7 @@ from typing import (
     cast,
 )
 
+from bson._dataclass_codec import _document_plan
 from bson.binary import (
     ALL_UUID_REPRESENTATIONS,
     UUID_REPRESENTATION_NAMES,
@@ -102,6 +103,7 @@ class TypeCodec(TypeEncoder, TypeDecoder):
 
 _Codec = Union[TypeEncoder, TypeDecoder, TypeCodec]
 _Fallback = Callable[[Any], Any]
+_DocumentDecoder = Callable[[Any], Any]
 
 
 class TypeRegistry:
@@ -116,6 +118,11 @@ class TypeRegistry:
       >>> type_registry = TypeRegistry([Codec1, Codec2, Codec3, ...],
       ...                              fallback_encoder)
 
+    A type encoder also encodes instances of subclasses of its
+    ``python_type``; the encoder of the nearest registered class in the
+    subclass's method resolution order is used. The encoder for each
+    exact type is resolved once and cached in the registry.
+
     See `add codec to the type registry <https://www.mongodb.com/docs/languages/python/pymongo-driver/current/data-formats/custom-types/type-codecs/#add-codec-to-the-type-registry>`_ documentation for an example.
 
     :param type_codecs: iterable of type codec instances. If
@@ -128,21 +135,43 @@ class TypeRegistry:
         unencodable python value and transforms it into a type that
         :mod:`bson` can encode. See `define a fallback encoder <https://www.mongodb.com/docs/languages/python/pymongo-driver/current/data-formats/custom-types/type-codecs/#define-a-fallback-encoder>`_
         documentation for an example.
+    :param document_decoder: callable that accepts each decoded document
+        and returns the object to use in its place. Like the
+        ``object_hook`` of :func:`json.loads`, it is called once per
+        document, including embedded documents, after the document's
+        values have been decoded. Transforming several fields of a
+        document in one call is cheaper than registering a
+        :class:`TypeDecoder` that is called once per value. It is not
+        called for documents decoded as
+        :class:`~bson.raw_bson.RawBSONDocument` or :class:`~bson.dbref.DBRef`.
+
+    .. versionchanged:: 4.18
+       Added the ``document_decoder`` parameter. Type encoders now also
+       encode subclasses of their ``python_type``, unless the subclass is
+       also a subclass of a type BSON encodes natively, such as ``int``.
     """
 
     def __init__(
         self,
         type_codecs: Optional[Iterable[_Codec]] = None,
         fallback_encoder: Optional[_Fallback] = None,
+        document_decoder: Optional[_DocumentDecoder] = None,
     ) -> None:
         self.__type_codecs = list(type_codecs or [])
         self._fallback_encoder = fallback_encoder
+        self._document_decoder = document_decoder
         self._encoder_map: dict[Any, Any] = {}
         self._decoder_map: dict[Any, Any] = {}
+        # Maps each exact type seen while encoding to its resolved encoder,
+        # or None. Filled in by _resolve_encoder.
+        self._encoder_cache: dict[Any, Any] = {}
 
         if self._fallback_encoder is not None:
             if not callable(fallback_encoder):
                 raise TypeError(f"fallback_encoder {fallback_encoder!r} is not a callable")
+        if self._document_decoder is not None:
+            if not callable(document_decoder):
+                raise TypeError(f"document_decoder {document_decoder!r} is not a callable")
 
         for codec in self.__type_codecs:
             is_valid_codec = False
@@ -168,6 +197,41 @@ class TypeRegistry:
         """The fallback encoder in this registry."""
         return self._fallback_encoder
 
+    @property
+    def document_decoder(self) -> Optional[_DocumentDecoder]:
+        """The document decoder in this registry.
+
+        .. versionadded:: 4.18
+        """
+        return self._document_decoder
+
+    def _resolve_encoder(self, python_type: Any) -> Any:
+        """Return the encoder for instances of exactly python_type, or None.
+
+        The method resolution order of python_type is searched for a
+        registered class only the first time a type is seen. Subclasses of
+        the built-in types are always encoded like their built-in type.
+        """
+        from bson import _BUILT_IN_TYPES
+
+        try:
+            return self._encoder_cache[python_type]
+        except KeyError:
+            pass
+        encoder = self._encoder_map.get(python_type)
+        # Subclasses of types with a _type_marker are encoded by their marker.
+        if (
+            encoder is None
+            and not hasattr(python_type, "_type_marker")
+            and not issubclass(python_type, _BUILT_IN_TYPES)
+        ):
+            for base in python_type.__mro__[1:]:
+                encoder = self._encoder_map.get(base)
+                if encoder is not None:
+                    break
+        self._encoder_cache[python_type] = encoder
+        return encoder
+
     def _validate_type_encoder(self, codec: _Codec) -> None:
         from bson import _BUILT_IN_TYPES
 
@@ -180,6 +244,8 @@ class TypeRegistry:
                 raise TypeError(err_msg)
 
     def __repr__(self) -> str:
+        if self._document_decoder is not None:
+            return f"{self.__class__.__name__}(type_codecs={self.__type_codecs!r}, fallback_encoder={self._fallback_encoder!r}, document_decoder={self._document_decoder!r})"
         return f"{self.__class__.__name__}(type_codecs={self.__type_codecs!r}, fallback_encoder={self._fallback_encoder!r})"
 
     def __eq__(self, other: Any) -> Any:
@@ -189,6 +255,7 @@ class TypeRegistry:
             (self._decoder_map == other._decoder_map)
             and (self._encoder_map == other._encoder_map)
             and (self._fallback_encoder == other._fallback_encoder)
+            and (self._document_decoder == other._document_decoder)
         )
 
     __hash__ = None  # type: ignore[assignment]
@@ -314,6 +381,28 @@ else:
               >>> doc._id
               ObjectId('5b3016359110ea14e8c58b93')
 
+            The document class can also be a :mod:`dataclass <dataclasses>`.
+            Documents are decoded directly to instances of it, using a plan
+            of its fields that is compiled once per class. Embedded documents
+            are decoded to the dataclass named by the field's annotation, for
+            fields annotated as ``Model``, ``Optional[Model]`` or
+            ``list[Model]``, and to :class:`dict` otherwise. Documents with
+            fields that the dataclass does not accept raise
+            :exc:`~bson.errors.InvalidBSON`. :func:`bson.encode` accepts
+            dataclass instances, which are encoded from their fields without
+            building a :class:`dict`, unless an encoder of the type registry,
+            or its fallback encoder, encodes them first::
+
+              >>> from dataclasses import dataclass
+              >>> @dataclass(slots=True)
+              ... class Point:
+              ...     x: int
+              ...     y: int
+              ...
+              >>> codec_options = CodecOptions(document_class=Point)
+              >>> bson.decode(bson.encode(Point(1, 2)), codec_options)
+              Point(x=1, y=2)
+
             See `Dates and Times <https://www.mongodb.com/docs/languages/python/pymongo-driver/current/data-formats/dates-and-times/#dates-and-times>`_ for examples using the `tz_aware` and
             `tzinfo` options.
 
@@ -322,7 +411,9 @@ else:
 
             :param document_class: BSON documents returned in queries will be decoded
                 to an instance of this class. Must be a subclass of
-                :class:`~collections.abc.MutableMapping`. Defaults to :class:`dict`.
+                :class:`~collections.abc.MutableMapping`,
+                :class:`~bson.record.Record`, or a dataclass. Defaults to
+                :class:`dict`.
             :param tz_aware: If ``True``, BSON datetimes will be decoded to timezone
                 aware instances of :class:`~datetime.datetime`. Otherwise they will be
                 naive. Defaults to ``False``.
@@ -350,6 +441,10 @@ else:
                 out-of-range and 'datetime_clamp' to clamp to the minimum and
                 maximum possible datetimes. Defaults to 'datetime'.
 
+            .. versionchanged:: 4.18
+               `document_class` can be a dataclass or a
+               :class:`~bson.record.Record`.
+
             .. versionchanged:: 4.0
                The default for `uuid_representation` was changed from
                :const:`~bson.binary.UuidRepresentation.PYTHON_LEGACY` to
@@ -385,10 +480,14 @@ else:
             except TypeError:
                 if hasattr(doc_class, "__origin__"):
                     is_mapping = issubclass(doc_class.__origin__, _MutableMapping)
-            if not (is_mapping or _raw_document_class(doc_class)):
+            if not (
+                is_mapping
+                or _raw_document_class(doc_class)
+                or _document_plan(doc_class) is not None
+            ):
                 raise TypeError(
                     "document_class must be dict, bson.son.SON, "
-                    "bson.raw_bson.RawBSONDocument, or a "
+                    "bson.raw_bson.RawBSONDocument, bson.record.Record, a dataclass, or a "
                     "subclass of collections.abc.MutableMapping"
                 )
             if not isinstance(tz_aware, bool):
@@ -448,6 +547,13 @@ else:
         def __repr__(self) -> str:
             return f"{self.__class__.__name__}({self._arguments_repr()})"
 
+        def __getstate__(self) -> dict[str, Any]:
+            # The C extension caches the parsed options in _compiled_codec,
+            # which cannot be pickled or shared with a copy.
+            state = self.__dict__.copy()
+            state.pop("_compiled_codec", None)
+            return state
+
         def with_options(self, **kwargs: Any) -> CodecOptions:
             """Make a copy of this CodecOptions, overriding some options::
 
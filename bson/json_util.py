@@ -84,6 +84,30 @@ Example usage (with :const:`LEGACY_JSON_OPTIONS`):
    ... )
    '[{"foo": [1, 2]}, {"bar": {"hello": "world"}}, {"code": {"$code": "function x() { return 1; }", "$scope": {}}}, {"bin": {"$binary": "AQIDBA==", "$type": "00"}}]'
 
+To convert between raw BSON and Extended JSON bytes without building Python
+documents, for example when serving query results or bulk loading
+newline-delimited JSON, use :func:`bson_to_json` and :func:`json_to_bson`:
+
+.. code-block:: python
+
+   from bson.json_util import json_to_bson
+   from bson.raw_bson import RawBSONDocument
+
+   with open("documents.json", "rb") as f:
+       collection.insert_many(RawBSONDocument(json_to_bson(line)) for line in f)
+
+:func:`iter_load` and :func:`dump_stream` read and write whole files of
+newline-delimited Extended JSON in chunks, with bounded memory:
+
+.. code-block:: python
+
+   from bson import json_util
+
+   with open("documents.json", "wb") as f:
+       json_util.dump_stream(collection.find(), f)
+   with open("documents.json", "rb") as f:
+       other_collection.insert_many(json_util.iter_load(f, raw=True))
+
 Alternatively, you can manually pass the `default` to :func:`json.dumps`.
 It won't handle :class:`~bson.binary.Binary` and :class:`~bson.code.Code`
 instances (as they are extended strings you can't provide custom defaults),
@@ -104,12 +128,15 @@ from __future__ import annotations
 
 import base64
 import datetime
+import functools
+import io
 import json
 import math
 import re
 import uuid
-from collections.abc import Mapping, MutableMapping, Sequence
+from collections.abc import Iterable, Iterator, Mapping, MutableMapping, Sequence
 from typing import (
+    IO,
     TYPE_CHECKING,
     Any,
     Callable,
@@ -118,9 +145,10 @@ from typing import (
     cast,
 )
 
+from bson import decode, encode
 from bson.binary import ALL_UUID_SUBTYPES, UUID_SUBTYPE, Binary, UuidRepresentation
 from bson.code import Code
-from bson.codec_options import CodecOptions, DatetimeConversion
+from bson.codec_options import _RAW_BSON_DOCUMENT_MARKER, CodecOptions, DatetimeConversion
 from bson.datetime_ms import (
     _MAX_UTC_MS,
     EPOCH_AWARE,
@@ -135,10 +163,17 @@ from bson.max_key import MaxKey
 from bson.min_key import MinKey
 from bson.objectid import ObjectId
 from bson.regex import Regex
-from bson.son import RE_TYPE
+from bson.son import RE_TYPE, SON
 from bson.timestamp import Timestamp
 from bson.tz_util import utc
 
+try:
+    from bson import _cbson  # type: ignore[attr-defined]
+
+    _USE_C = True
+except ImportError:
+    _USE_C = False
+
 _RE_OPT_TABLE = {
     "i": re.I,
     "l": re.L,
@@ -439,6 +474,10 @@ def dumps(obj: Any, *args: Any, **kwargs: Any) -> str:
         encoding of MongoDB Extended JSON types. Defaults to
         :const:`DEFAULT_JSON_OPTIONS`.
 
+    .. versionchanged:: 4.18
+       BSON types are converted by the C extension, when available, unless
+       the ``type_registry`` of ``json_options`` has custom codecs.
+
     .. versionchanged:: 4.0
        Now outputs MongoDB Relaxed Extended JSON by default (using
        :const:`DEFAULT_JSON_OPTIONS`).
@@ -462,6 +501,11 @@ def loads(s: Union[str, bytes, bytearray], *args: Any, **kwargs: Any) -> Any:
         decoding of MongoDB Extended JSON types. Defaults to
         :const:`DEFAULT_JSON_OPTIONS`.
 
+    .. versionchanged:: 4.18
+       Extended JSON objects are detected by the C extension, when
+       available, unless the ``type_registry`` of ``json_options`` has custom
+       codecs.
+
     .. versionchanged:: 4.0
        Now loads :class:`datetime.datetime` instances as naive by default. To
        load timezone aware instances utilize the `json_options` parameter.
@@ -476,22 +520,237 @@ def loads(s: Union[str, bytes, bytearray], *args: Any, **kwargs: Any) -> Any:
        Accepts optional parameter `json_options`. See :class:`JSONOptions`.
     """
     json_options = kwargs.pop("json_options", DEFAULT_JSON_OPTIONS)
+    if _use_c(json_options):
+        hook = functools.partial(_cbson._json_object_hook, _PARSERS, json_options)
+        # Execution time optimization if json_options.document_class is dict
+        if json_options.document_class is dict:
+            kwargs["object_hook"] = hook
+        else:
+            kwargs["object_pairs_hook"] = lambda pairs: hook(json_options.document_class(pairs))
     # Execution time optimization if json_options.document_class is dict
-    if json_options.document_class is dict:
+    elif json_options.document_class is dict:
         kwargs["object_hook"] = lambda obj: object_hook(obj, json_options)
     else:
         kwargs["object_pairs_hook"] = lambda pairs: object_pairs_hook(pairs, json_options)
     return json.loads(s, *args, **kwargs)
 
 
+def bson_to_json(
+    data: Union[bytes, memoryview], json_options: JSONOptions = DEFAULT_JSON_OPTIONS
+) -> bytes:
+    """Convert a BSON document to MongoDB Extended JSON.
+
+    Returns the same UTF-8 encoded JSON as
+    ``dumps(bson.decode(data, json_options), json_options=json_options)``.
+    When the C extension is available the JSON is written directly from the
+    BSON bytes, without decoding the document to Python objects.
+
+    :param data: the BSON bytes of a single document.
+    :param json_options: A :class:`JSONOptions` instance used to modify the
+        encoding of MongoDB Extended JSON types. Defaults to
+        :const:`DEFAULT_JSON_OPTIONS`.
+
+    .. versionadded:: 4.18
+    """
+    if _transcode_in_c(json_options):
+        result = _cbson._bson_to_json(data, json_options)
+        if result is not None:
+            return result
+    return dumps(decode(data, json_options), json_options=json_options).encode()
+
+
+def json_to_bson(
+    data: Union[str, bytes, bytearray], json_options: JSONOptions = DEFAULT_JSON_OPTIONS
+) -> bytes:
+    """Convert a MongoDB Extended JSON document to BSON.
+
+    Returns the same BSON as
+    ``bson.encode(loads(data, json_options=json_options), codec_options=json_options)``.
+    When the C extension is available the BSON is written directly while
+    parsing the JSON, so the result can be wrapped in a
+    :class:`~bson.raw_bson.RawBSONDocument` and inserted without building a
+    Python document.
+
+    Raises the same errors as :func:`loads` and :func:`bson.encode`.
+
+    :param data: a JSON object.
+    :param json_options: A :class:`JSONOptions` instance used to modify the
+        decoding of MongoDB Extended JSON types. Defaults to
+        :const:`DEFAULT_JSON_OPTIONS`.
+
+    .. versionadded:: 4.18
+    """
+    if _transcode_in_c(json_options):
+        result = _cbson._json_to_bson(
+            data, _PARSERS, json_options, functools.partial(loads, json_options=json_options)
+        )
+        if result is not None:
+            return result
+    return encode(loads(data, json_options=json_options), codec_options=json_options)
+
+
+_STREAM_CHUNK_SIZE = 1024 * 1024
+
+
+def iter_load(
+    fp: IO[Any],
+    json_options: JSONOptions = DEFAULT_JSON_OPTIONS,
+    *,
+    raw: bool = False,
+    chunk_size: int = _STREAM_CHUNK_SIZE,
+) -> Iterator[Any]:
+    """Decode newline-delimited MongoDB Extended JSON from a file.
+
+    Reads `fp` in chunks of `chunk_size` and yields one document for each
+    line, so only the chunk being processed and the current line are held
+    in memory. Blank lines are skipped. The documents can be passed to
+    :meth:`~pymongo.collection.Collection.insert_many`::
+
+        with open("documents.json", "rb") as f:
+            collection.insert_many(json_util.iter_load(f, raw=True))
+
+    :param fp: a file object opened for reading, in text or binary mode.
+    :param json_options: A :class:`JSONOptions` instance used to modify the
+        decoding of MongoDB Extended JSON types. Defaults to
+        :const:`DEFAULT_JSON_OPTIONS`.
+    :param raw: if ``True``, yield each document as a
+        :class:`~bson.raw_bson.RawBSONDocument` converted with
+        :func:`json_to_bson`, instead of decoding it with :func:`loads`.
+    :param chunk_size: the number of bytes or characters to read from `fp`
+        at a time.
+
+    .. versionadded:: 4.18
+    """
+    if raw:
+        from bson.raw_bson import RawBSONDocument
+
+        def parse(line: Any) -> Any:
+            return RawBSONDocument(json_to_bson(line, json_options))
+    else:
+        parse = functools.partial(loads, json_options=json_options)
+    # The start of a line that has not been completely read yet.
+    pending: list[Any] = []
+    while True:
+        chunk = fp.read(chunk_size)
+        if not chunk:
+            break
+        lines = chunk.split("\n" if isinstance(chunk, str) else b"\n")
+        if len(lines) == 1:
+            pending.append(chunk)
+            continue
+        if pending:
+            pending.append(lines[0])
+            lines[0] = chunk[:0].join(pending)
+        pending = [lines.pop()]
+        for line in lines:
+            if line and not line.isspace():
+                yield parse(line)
+    if pending:
+        line = pending[0][:0].join(pending)
+        if line and not line.isspace():
+            yield parse(line)
+
+
+def dump_stream(
+    docs: Iterable[Any],
+    fp: IO[Any],
+    json_options: JSONOptions = DEFAULT_JSON_OPTIONS,
+    *,
+    chunk_size: int = _STREAM_CHUNK_SIZE,
+) -> int:
+    """Encode documents to newline-delimited MongoDB Extended JSON.
+
+    Writes one line for each document in `docs`, which can be any iterable,
+    such as a :class:`~pymongo.cursor.Cursor`. Lines are buffered and written
+    to `fp` once `chunk_size` bytes or characters are collected.
+    :class:`~bson.raw_bson.RawBSONDocument` instances are converted with
+    :func:`bson_to_json`, without decoding them::
+
+        with open("documents.json", "wb") as f:
+            json_util.dump_stream(collection.find(), f)
+
+    :param docs: the documents to write.
+    :param fp: a file object opened for writing, in text or binary mode.
+    :param json_options: A :class:`JSONOptions` instance used to modify the
+        encoding of MongoDB Extended JSON types. Defaults to
+        :const:`DEFAULT_JSON_OPTIONS`.
+    :param chunk_size: the number of bytes or characters to buffer before
+        writing to `fp`.
+
+    :return: the number of documents written.
+
+    .. versionadded:: 4.18
+    """
+    text = isinstance(fp, io.TextIOBase)
+    newline: Any = "\n" if text else b"\n"
+    buffered: list[Any] = []
+    size = 0
+    count = 0
+    for doc in docs:
+        if getattr(doc, "_type_marker", None) == _RAW_BSON_DOCUMENT_MARKER:
+            line: Any = bson_to_json(doc.raw, json_options)
+            if text:
+                line = line.decode()
+        else:
+            line = dumps(doc, json_options=json_options)
+            if not text:
+                line = line.encode()
+        buffered.append(line)
+        buffered.append(newline)
+        size += len(line) + 1
+        count += 1
+        if size >= chunk_size:
+            fp.write(newline[:0].join(buffered))
+            buffered.clear()
+            size = 0
+    if buffered:
+        fp.write(newline[:0].join(buffered))
+    return count
+
+
+def _use_c(json_options: Any) -> bool:
+    """Return True if the C extension can convert with json_options.
+
+    Custom type codecs are only supported by the pure Python implementation.
+    """
+    if not _USE_C or not isinstance(json_options, JSONOptions):
+        return False
+    registry = json_options.type_registry
+    return not (
+        registry._encoder_map
+        or registry._decoder_map
+        or registry._fallback_encoder
+        or registry._document_decoder
+    )
+
+
+def _transcode_in_c(json_options: Any) -> bool:
+    """Return True if the C extension can transcode BSON with json_options.
+
+    Documents must decode to dicts and datetimes to UTC.
+    """
+    return (
+        _use_c(json_options)
+        and json_options.document_class in (dict, SON)
+        and (json_options.tzinfo is None or json_options.tzinfo is utc)
+    )
+
+
 def _json_convert(obj: Any, json_options: JSONOptions = DEFAULT_JSON_OPTIONS) -> Any:
     """Recursive helper method that converts BSON types so they can be
     converted into json.
     """
+    if _use_c(json_options):
+        return _cbson._json_convert(obj, json_options, default)
+    return _py_json_convert(obj, json_options)
+
+
+def _py_json_convert(obj: Any, json_options: JSONOptions) -> Any:
+    """Pure Python implementation of :func:`_json_convert`."""
     if hasattr(obj, "items"):
-        return {k: _json_convert(v, json_options) for k, v in obj.items()}
+        return {k: _py_json_convert(v, json_options) for k, v in obj.items()}
     elif hasattr(obj, "__iter__") and not isinstance(obj, (str, bytes)):
-        return [_json_convert(v, json_options) for v in obj]
+        return [_py_json_convert(v, json_options) for v in obj]
     try:
         return default(obj, json_options)
     except TypeError:
@@ -56,9 +56,10 @@ from __future__ import annotations
 from collections.abc import ItemsView, Iterator, Mapping
 from typing import Any, Optional
 
-from bson import _get_object_size, _raw_to_dict
+from bson import _get_object_size, _index_elements, _raw_element, _raw_to_dict
 from bson.codec_options import _RAW_BSON_DOCUMENT_MARKER, CodecOptions
 from bson.codec_options import DEFAULT_CODEC_OPTIONS as DEFAULT
+from bson.json_util import DEFAULT_JSON_OPTIONS, JSONOptions, bson_to_json
 
 
 def _inflate_bson(
@@ -84,7 +85,7 @@ class RawBSONDocument(Mapping[str, Any]):
     RawBSONDocument decode its bytes.
     """
 
-    __slots__ = ("__codec_options", "__inflated_doc", "__raw")
+    __slots__ = ("__codec_options", "__decoded", "__index", "__raw")
     _type_marker = _RAW_BSON_DOCUMENT_MARKER
     __codec_options: CodecOptions[RawBSONDocument]
 
@@ -117,6 +118,11 @@ class RawBSONDocument(Mapping[str, Any]):
             must be :class:`RawBSONDocument`. The default is
             :attr:`DEFAULT_RAW_BSON_OPTIONS`.
 
+        .. versionchanged:: 4.18
+          Accessing a field no longer decodes the whole document. The first
+          access builds an index of the positions of the top-level fields and
+          only the requested field is decoded.
+
         .. versionchanged:: 3.8
           :class:`RawBSONDocument` now validates that the ``bson_bytes``
           passed in represent a single bson document.
@@ -126,7 +132,8 @@ class RawBSONDocument(Mapping[str, Any]):
           `document_class` must be :class:`RawBSONDocument`.
         """
         self.__raw = bson_bytes
-        self.__inflated_doc: Optional[Mapping[str, Any]] = None
+        self.__index: Optional[dict[str, int]] = None
+        self.__decoded: Optional[dict[str, Any]] = None
         # Can't default codec_options to DEFAULT_RAW_BSON_OPTIONS in signature,
         # it refers to this class RawBSONDocument.
         if codec_options is None:
@@ -147,30 +154,57 @@ class RawBSONDocument(Mapping[str, Any]):
 
     def items(self) -> ItemsView[str, Any]:
         """Lazily decode and iterate elements in this document."""
-        return self.__inflated.items()
+        return ItemsView(self)
 
     @property
-    def __inflated(self) -> Mapping[str, Any]:
-        if self.__inflated_doc is None:
-            # We already validated the object's size when this document was
-            # created, so no need to do that again.
-            self.__inflated_doc = self._inflate_bson(self.__raw, self.__codec_options)
-        return self.__inflated_doc
+    def __elements(self) -> dict[str, int]:
+        if self.__index is None:
+            # Map each field name to the position of its element so that
+            # fields can be decoded one at a time.
+            self.__index = _index_elements(self.__raw, self.__codec_options)
+        return self.__index
 
     @staticmethod
-    def _inflate_bson(
-        bson_bytes: bytes | memoryview, codec_options: CodecOptions[RawBSONDocument]
-    ) -> Mapping[str, Any]:
-        return _inflate_bson(bson_bytes, codec_options)
+    def _decode_element(
+        bson_bytes: bytes | memoryview,
+        position: int,
+        codec_options: CodecOptions[RawBSONDocument],
+    ) -> Any:
+        return _raw_element(bson_bytes, position, codec_options)
+
+    def to_json(self, json_options: JSONOptions = DEFAULT_JSON_OPTIONS) -> bytes:
+        """Convert this document to MongoDB Extended JSON.
+
+        Same as :func:`bson.json_util.bson_to_json`, the JSON is written
+        directly from :attr:`raw` without decoding the document when the C
+        extension is available.
+
+        :param json_options: A :class:`~bson.json_util.JSONOptions` instance
+            used to modify the encoding of MongoDB Extended JSON types.
+            Defaults to :const:`~bson.json_util.DEFAULT_JSON_OPTIONS`.
+
+        .. versionadded:: 4.18
+        """
+        return bson_to_json(self.__raw, json_options)
 
     def __getitem__(self, item: str) -> Any:
-        return self.__inflated[item]
+        # Cache decoded values so that repeated lookups return the same object.
+        if self.__decoded is None:
+            self.__decoded = {}
+        elif item in self.__decoded:
+            return self.__decoded[item]
+        value = self._decode_element(self.__raw, self.__elements[item], self.__codec_options)
+        self.__decoded[item] = value
+        return value
+
+    def __contains__(self, item: object) -> bool:
+        return item in self.__elements
 
     def __iter__(self) -> Iterator[str]:
-        return iter(self.__inflated)
+        return iter(self.__elements)
 
     def __len__(self) -> int:
-        return len(self.__inflated)
+        return len(self.__elements)
 
     def __eq__(self, other: Any) -> bool:
         if isinstance(other, RawBSONDocument):
@@ -187,10 +221,12 @@ class _RawArrayBSONDocument(RawBSONDocument):
     """A RawBSONDocument that only expands sub-documents and arrays when accessed."""
 
     @staticmethod
-    def _inflate_bson(
-        bson_bytes: bytes | memoryview, codec_options: CodecOptions[RawBSONDocument]
-    ) -> Mapping[str, Any]:
-        return _inflate_bson(bson_bytes, codec_options, raw_array=True)
+    def _decode_element(
+        bson_bytes: bytes | memoryview,
+        position: int,
+        codec_options: CodecOptions[RawBSONDocument],
+    ) -> Any:
+        return _raw_element(bson_bytes, position, codec_options, raw_array=True)
 
 
 DEFAULT_RAW_BSON_OPTIONS: CodecOptions[RawBSONDocument] = DEFAULT.with_options(
@@ -0,0 +1,115 @@
+# Copyright 2026-present MongoDB, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tools for representing decoded BSON documents compactly.
+
+Decoding to :class:`Record`
+===========================
+
+A :class:`Record` is a read-only mapping that stores the values of a document
+in a tuple and shares its field names with every other record that has the
+same fields. Large result sets of documents with a common schema use much
+less memory as records than as :class:`dict` instances:
+
+.. doctest::
+
+  >>> import bson
+  >>> from bson.codec_options import CodecOptions
+  >>> from bson.record import Record
+  >>> options = CodecOptions(document_class=Record)
+  >>> data = bson.encode({"_id": 1, "item": {"sku": "a1", "qty": 2}})
+  >>> doc = bson.decode(data, options)
+  >>> doc
+  Record({'_id': 1, 'item': Record({'sku': 'a1', 'qty': 2})})
+  >>> doc["item"]["qty"]
+  2
+
+Embedded documents are decoded to records too. Records can be encoded like
+any other mapping, and :class:`dict` converts one back to a mutable document.
+
+.. versionadded:: 4.18
+"""
+
+from __future__ import annotations
+
+from collections.abc import Iterator, Mapping
+from typing import Any
+
+# The maximum number of field layouts shared between records. Records with a
+# layout that does not fit get their own.
+_MAX_LAYOUTS = 1024
+
+# Maps each tuple of field names to the index shared by the records that
+# have those fields.
+_LAYOUTS: dict[tuple[str, ...], dict[str, int]] = {}
+
+
+def _layout(keys: tuple[str, ...]) -> dict[str, int]:
+    """Return the shared index of the field names keys."""
+    try:
+        return _LAYOUTS[keys]
+    except KeyError:
+        pass
+    index = {key: position for position, key in enumerate(keys)}
+    if len(_LAYOUTS) < _MAX_LAYOUTS:
+        _LAYOUTS[keys] = index
+    return index
+
+
+class Record(Mapping[str, Any]):
+    """A compact, read-only BSON document.
+
+    Accepts the same arguments as :class:`dict`. Records with the same field
+    names, in the same order, share a single index of those names.
+    """
+
+    __slots__ = ("__index", "__values")
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        document = dict(*args, **kwargs)
+        self.__index = _layout(tuple(document))
+        self.__values = tuple(document.values())
+
+    @classmethod
+    def _from_document(cls, document: dict[str, Any]) -> Record:
+        """Build a record from a decoded document."""
+        record = cls.__new__(cls)
+        record.__index = _layout(tuple(document))
+        record.__values = tuple(document.values())
+        return record
+
+    def __getitem__(self, key: str) -> Any:
+        return self.__values[self.__index[key]]
+
+    def __contains__(self, key: object) -> bool:
+        return key in self.__index
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.__index)
+
+    def __len__(self) -> int:
+        return len(self.__values)
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, Record) and other.__index is self.__index:
+            return self.__values == other.__values
+        return super().__eq__(other)
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def __reduce__(self) -> tuple[Any, ...]:
+        return self.__class__, (dict(self),)
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({dict(self)!r})"
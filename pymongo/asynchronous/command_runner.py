@@ -60,7 +60,12 @@ if TYPE_CHECKING:
     from pymongo.asynchronous.client_session import AsyncClientSession
     from pymongo.asynchronous.mongo_client import AsyncMongoClient
     from pymongo.asynchronous.pool import AsyncConnection
-    from pymongo.compression_support import SnappyContext, ZlibContext, ZstdContext
+    from pymongo.compression_support import (
+        AdaptiveContext,
+        SnappyContext,
+        ZlibContext,
+        ZstdContext,
+    )
     from pymongo.monitoring import _EventListeners
     from pymongo.pool_options import PoolOptions
     from pymongo.read_concern import ReadConcern
@@ -76,7 +81,7 @@ async def _run_command(
     cmd: MutableMapping[str, Any],
     dbname: str,
     request_id: int,
-    msg: bytes,
+    msg: Union[bytes, list[bytearray]],
     *,
     client: Optional[AsyncMongoClient[Any]],
     session: Optional[AsyncClientSession],
@@ -226,7 +231,7 @@ async def run_bulk_write_command(
     bwc: _BulkWriteContextBase,
     cmd: MutableMapping[str, Any],
     request_id: int,
-    msg: bytes,
+    msg: Union[bytes, list[bytearray]],
     *,
     client: Optional[AsyncMongoClient[Any]],
     orig: Optional[MutableMapping[str, Any]] = None,
@@ -343,7 +348,7 @@ async def run_command(
     read_concern: Optional[ReadConcern] = None,
     parse_write_concern_error: bool = False,
     collation: Optional[_CollationIn] = None,
-    compression_ctx: Union[SnappyContext, ZlibContext, ZstdContext, None] = None,
+    compression_ctx: Union[SnappyContext, ZlibContext, ZstdContext, AdaptiveContext, None] = None,
     unacknowledged: bool = False,
     user_fields: Optional[Mapping[str, Any]] = None,
     exhaust_allowed: bool = False,
@@ -405,7 +410,7 @@ async def run_command(
 
     flags = _OpMsg.MORE_TO_COME if unacknowledged else 0
     flags |= _OpMsg.EXHAUST_ALLOWED if exhaust_allowed else 0
-    request_id, msg, size, max_doc_size = message._op_msg(
+    request_id, msg, size, max_doc_size = message._command_op_msg(
         flags, spec, dbname, read_preference, codec_options, ctx=compression_ctx
     )
     # If this is an unacknowledged write then make sure the encoded doc(s)
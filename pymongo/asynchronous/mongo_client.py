@@ -431,6 +431,17 @@ class AsyncMongoClient(common.BaseObject, Generic[_DocumentType]):
             are -1 through 9. -1 tells the zlib library to use its default
             compression level (usually 6). 0 means no compression. 1 is best
             speed. 9 is best compression. Defaults to -1.
+          - `compressionMinSize`: (int) Enables adaptive wire protocol
+            compression. Must be at least 1. Messages smaller than this many
+            bytes are sent uncompressed, except for find, aggregate and
+            getMore commands, whose replies are only compressed when the
+            command is. Each other message is compressed with whichever
+            negotiated compressor has cost the least, in time and bytes sent,
+            for its kind of message (commands, writes or reads) on that
+            server. The compression achieved is reported by
+            :meth:`~pymongo.asynchronous.mongo_client.AsyncMongoClient.pool_stats`.
+            When it is not set, every message is compressed with the first
+            negotiated compressor.
           - `uuidRepresentation`: The BSON representation to use when encoding
             from and decoding to instances of :class:`~uuid.UUID`. Valid
             values are the strings: "standard", "pythonLegacy", "javaLegacy",
@@ -618,6 +629,9 @@ class AsyncMongoClient(common.BaseObject, Generic[_DocumentType]):
 
         .. seealso:: The MongoDB documentation on `connections <https://dochub.mongodb.org/core/connections>`_.
 
+        .. versionchanged:: 4.18
+           Added the ``compressionMinSize`` URI and keyword argument.
+
         .. versionchanged:: 4.17
            Added the ``max_adaptive_retries`` and ``enable_overload_retargeting`` URI and keyword arguments.
 
@@ -1269,6 +1283,39 @@ class AsyncMongoClient(common.BaseObject, Generic[_DocumentType]):
         description = self._topology.description
         return frozenset(s.address for s in description.known_servers)
 
+    def pool_stats(self) -> dict[_Address, dict[str, Any]]:
+        """Statistics of the connection pool of each currently connected server.
+
+        Maps the (host, port) of each server to a dict of its pool's
+        statistics:
+
+        - ``compression``: the wire compression achieved with the server, when
+          adaptive compression is enabled with the ``compressionMinSize``
+          option, else ``None``. Maps each kind of message (``"command"``,
+          ``"write"`` or ``"read"``) to the negotiated compressors used for
+          it, each with the number of ``messages`` compressed and compressed
+          ``replies`` received, the achieved ``ratio`` of compressed to
+          uncompressed bytes, and the ``compress_time`` and
+          ``decompress_time`` spent in seconds.
+        - ``receive_buffers``: the reuse of the buffers that large replies are
+          read into, else ``None`` on PyPy, which does not reuse them. The
+          number of ``hits`` that reused a pooled buffer and of ``misses``
+          that allocated one, the ``hit_rate``, the number of buffers that
+          were not taken back because raw results still referenced them
+          (``in_use``) or the pool was full (``discarded``), and the
+          ``pooled_bytes`` of the idle buffers.
+
+        >>> client.pool_stats()
+        {('localhost', 27017): {'compression': None, 'receive_buffers': {'hits': 6, 'misses': 2, 'hit_rate': 0.75, 'in_use': 0, 'discarded': 0, 'pooled_bytes': 196608}}}
+
+        Like :attr:`nodes`, the result is empty until the client has connected.
+
+        .. versionadded:: 4.18
+        """
+        if self._topology is None:
+            return {}
+        return self._topology.pool_stats()
+
     @property
     def options(self) -> ClientOptions:
         """The configuration options for this client.
@@ -45,6 +45,7 @@ from pymongo.common import (
     MAX_WRITE_BATCH_SIZE,
     ORDERED_TYPES,
 )
+from pymongo.compression_support import _CompressionStats
 from pymongo.errors import (  # type:ignore[attr-defined]
     AutoReconnect,
     ConfigurationError,
@@ -75,7 +76,13 @@ from pymongo.monitoring import (
     ConnectionCheckOutFailedReason,
     ConnectionClosedReason,
 )
-from pymongo.network_layer import AsyncNetworkingInterface, async_receive_message, async_sendall
+from pymongo.network_layer import (
+    _PYPY,
+    AsyncNetworkingInterface,
+    _ReceiveBufferPool,
+    async_receive_message,
+    async_sendall,
+)
 from pymongo.pool_options import PoolOptions
 from pymongo.pool_shared import (
     SSLErrors,
@@ -96,6 +103,7 @@ if TYPE_CHECKING:
     from pymongo.asynchronous.client_session import AsyncClientSession
     from pymongo.asynchronous.mongo_client import AsyncMongoClient, _MongoClientErrorHandler
     from pymongo.compression_support import (
+        AdaptiveContext,
         SnappyContext,
         ZlibContext,
         ZstdContext,
@@ -148,7 +156,9 @@ class AsyncConnection(_ConnectionTelemetryInfo):
         self.enabled_for_cmap = pool.enabled_for_cmap
         self.enabled_for_logging = pool.enabled_for_logging
         self.compression_settings = pool.opts._compression_settings
-        self.compression_context: Union[SnappyContext, ZlibContext, ZstdContext, None] = None
+        self.compression_context: Union[
+            SnappyContext, ZlibContext, ZstdContext, AdaptiveContext, None
+        ] = None
         self.socket_checker: SocketChecker = SocketChecker()
         self.oidc_token_gen_id: Optional[int] = None
         # Support for mechanism negotiation on the initial handshake.
@@ -177,6 +187,12 @@ class AsyncConnection(_ConnectionTelemetryInfo):
         self.creation_time = time.monotonic()
         # For gossiping $clusterTime from the connection handshake to the client.
         self._cluster_time = None
+        # The pool's reply buffers, and the buffer holding the last reply.
+        self.receive_buffers = pool.receive_buffers
+        self.reply_buffer: Optional[bytearray] = None
+        # The compression achieved by the pool's connections, shared by their
+        # adaptive compression contexts.
+        self.compression_stats = pool.compression_stats
 
     def set_conn_timeout(self, timeout: Optional[float]) -> None:
         """Cache last timeout to avoid duplicate calls to conn.settimeout."""
@@ -306,7 +322,9 @@ class AsyncConnection(_ConnectionTelemetryInfo):
         self.is_standalone = hello.server_type == SERVER_TYPE.Standalone
         self.is_mongos = hello.server_type == SERVER_TYPE.Mongos
         if performing_handshake and self.compression_settings:
-            ctx = self.compression_settings.get_compression_context(hello.compressors)
+            ctx = self.compression_settings.get_compression_context(
+                hello.compressors, self.compression_stats
+            )
             self.compression_context = ctx
 
         self.server_connection_id = hello.connection_id
@@ -423,8 +441,8 @@ class AsyncConnection(_ConnectionTelemetryInfo):
         except BaseException as error:
             await self._raise_connection_failure(error)
 
-    async def send_message(self, message: bytes, max_doc_size: int) -> None:
-        """Send a raw BSON message or raise ConnectionFailure.
+    async def send_message(self, message: Union[bytes, list[bytearray]], max_doc_size: int) -> None:
+        """Send a raw BSON message, or its segments, or raise ConnectionFailure.
 
         If a network exception is raised, the socket is closed.
         """
@@ -440,6 +458,12 @@ class AsyncConnection(_ConnectionTelemetryInfo):
         except BaseException as error:
             await self._raise_connection_failure(error)
 
+    def release_reply_buffer(self) -> None:
+        """Offer the buffer of the last reply back to the pool's reply buffers."""
+        buf, self.reply_buffer = self.reply_buffer, None
+        if buf is not None and self.receive_buffers is not None:
+            self.receive_buffers.release(buf)
+
     async def receive_message(self, request_id: Optional[int]) -> _OpMsg:
         """Receive a raw BSON message or raise ConnectionFailure.
 
@@ -748,6 +772,23 @@ class Pool:
         self.__pinned_sockets: set[AsyncConnection] = set()
         self.ncursors = 0
         self.ntxns = 0
+        # Reusable buffers for reading large replies. Reply buffers are only
+        # reused once they are unreferenced, which PyPy cannot tell cheaply.
+        self.receive_buffers: Optional[_ReceiveBufferPool] = None if _PYPY else _ReceiveBufferPool()
+        # The compression achieved with this server, when adaptive compression
+        # is enabled by the compressionMinSize option.
+        compression_settings = self.opts._compression_settings
+        self.compression_stats: Optional[_CompressionStats] = None
+        if compression_settings and compression_settings.min_size is not None:
+            self.compression_stats = _CompressionStats()
+
+    def stats(self) -> dict[str, Any]:
+        """Return the statistics of this pool, for the client's pool_stats()."""
+        compression, buffers = self.compression_stats, self.receive_buffers
+        return {
+            "compression": compression.stats() if compression is not None else None,
+            "receive_buffers": buffers.stats() if buffers is not None else None,
+        }
 
     async def ready(self) -> None:
         # Take the lock to avoid the race condition described in PYTHON-2699.
@@ -893,6 +934,8 @@ class Pool:
 
     async def close(self) -> None:
         await self._reset(close=True)
+        if self.receive_buffers is not None:
+            self.receive_buffers.clear()
 
     def stale_generation(self, gen: int, service_id: Optional[ObjectId]) -> bool:
         return self.gen.stale(gen, service_id)
@@ -1316,6 +1359,7 @@ class Pool:
 
         :param conn: The connection to check into the pool.
         """
+        conn.release_reply_buffer()
         txn = conn.pinned_txn
         cursor = conn.pinned_cursor
         conn.active = False
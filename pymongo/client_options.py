@@ -170,7 +170,9 @@ def _parse_pool_options(
     driver = options.get("driver")
     server_api = options.get("server_api")
     compression_settings = CompressionSettings(
-        options.get("compressors", []), options.get("zlibcompressionlevel", -1)
+        options.get("compressors", []),
+        options.get("zlibcompressionlevel", -1),
+        options.get("compressionminsize"),
     )
     ssl_context, tls_allow_invalid_hostnames = _parse_ssl_options(options, is_sync)
     load_balanced = options.get("loadbalanced")
@@ -35,6 +35,7 @@ from typing import (
 from urllib.parse import unquote_plus
 
 from bson import SON
+from bson._dataclass_codec import _document_plan
 from bson.binary import UuidRepresentation
 from bson.codec_options import CodecOptions, DatetimeConversion, TypeRegistry
 from bson.raw_bson import RawBSONDocument
@@ -490,10 +491,10 @@ def validate_document_class(
     except TypeError:
         if hasattr(value, "__origin__"):
             is_mapping = issubclass(value.__origin__, abc.MutableMapping)
-    if not is_mapping and not issubclass(value, RawBSONDocument):
+    if not is_mapping and not issubclass(value, RawBSONDocument) and _document_plan(value) is None:
         raise TypeError(
             f"{option} must be dict, bson.son.SON, "
-            "bson.raw_bson.RawBSONDocument, or a "
+            "bson.raw_bson.RawBSONDocument, bson.record.Record, a dataclass, or a "
             "subclass of collections.MutableMapping"
         )
     return value
@@ -687,6 +688,7 @@ URI_OPTIONS_VALIDATOR_MAP: dict[str, Callable[[Any, Any], Any]] = {
     "authmechanismproperties": validate_auth_mechanism_properties,
     "authsource": validate_string,
     "compressors": validate_compressors,
+    "compressionminsize": validate_positive_integer,
     "connecttimeoutms": validate_timeout_or_none_or_zero,
     "directconnection": validate_boolean_or_string,
     "heartbeatfrequencyms": validate_timeout_or_none,
@@ -14,17 +14,34 @@
 from __future__ import annotations
 
 import sys
+import time
 import warnings
 from collections.abc import Iterable
 from typing import Any, Optional, Union
 
 from pymongo.hello import HelloCompat
 from pymongo.helpers_shared import _SENSITIVE_COMMANDS
+from pymongo.lock import _create_lock
 
 _SUPPORTED_COMPRESSORS = {"snappy", "zlib", "zstd"}
 _NO_COMPRESSION = {HelloCompat.CMD, HelloCompat.LEGACY_CMD}
 _NO_COMPRESSION.update(_SENSITIVE_COMMANDS)
 
+# The classes of message that adaptive compression tracks separately.
+_COMMAND_MESSAGE = "command"
+_WRITE_MESSAGE = "write"
+_READ_MESSAGE = "read"
+# Commands whose replies carry documents. The server compresses a reply only
+# when its request was compressed, so these are compressed however small.
+_READ_COMMANDS = frozenset(["find", "aggregate", "getMore"])
+# The assumed cost of sending a byte (about 1Gb/s), to weigh the ratio a
+# compressor achieves against the time it takes.
+_WIRE_SECONDS_PER_BYTE = 8e-9
+# Messages of each class sent with every negotiated compressor before the
+# best one is chosen, and how often the others are sampled again after that.
+_MIN_SAMPLES = 8
+_SAMPLE_INTERVAL = 256
+
 
 def _have_snappy() -> bool:
     try:
@@ -110,27 +127,42 @@ def validate_zlib_compression_level(option: str, value: Any) -> int:
 
 
 class CompressionSettings:
-    def __init__(self, compressors: list[str], zlib_compression_level: int):
+    def __init__(
+        self,
+        compressors: list[str],
+        zlib_compression_level: int,
+        min_size: Optional[int] = None,
+    ) -> None:
         self.compressors = compressors
         self.zlib_compression_level = zlib_compression_level
+        # Adaptive compression is enabled by a minimum message size.
+        self.min_size = min_size
 
     def get_compression_context(
-        self, compressors: Optional[list[str]]
-    ) -> Union[SnappyContext, ZlibContext, ZstdContext, None]:
+        self, compressors: Optional[list[str]], stats: Optional[_CompressionStats] = None
+    ) -> Union[SnappyContext, ZlibContext, ZstdContext, AdaptiveContext, None]:
         if compressors:
-            chosen = compressors[0]
-            if chosen == "snappy":
-                return SnappyContext()
-            elif chosen == "zlib":
-                return ZlibContext(self.zlib_compression_level)
-            elif chosen == "zstd":
-                return ZstdContext()
-            return None
+            if self.min_size is not None and stats is not None:
+                contexts = [ctx for ctx in map(self._get_context, compressors) if ctx is not None]
+                if contexts:
+                    return AdaptiveContext(contexts, self.min_size, stats)
+                return None
+            return self._get_context(compressors[0])
+        return None
+
+    def _get_context(self, compressor: str) -> Union[SnappyContext, ZlibContext, ZstdContext, None]:
+        if compressor == "snappy":
+            return SnappyContext()
+        elif compressor == "zlib":
+            return ZlibContext(self.zlib_compression_level)
+        elif compressor == "zstd":
+            return ZstdContext()
         return None
 
 
 class SnappyContext:
     compressor_id = 1
+    name = "snappy"
 
     @staticmethod
     def compress(data: bytes) -> bytes:
@@ -141,6 +173,7 @@ class SnappyContext:
 
 class ZlibContext:
     compressor_id = 2
+    name = "zlib"
 
     def __init__(self, level: int):
         self.level = level
@@ -153,6 +186,7 @@ class ZlibContext:
 
 class ZstdContext:
     compressor_id = 3
+    name = "zstd"
 
     @staticmethod
     def compress(data: bytes) -> bytes:
@@ -186,3 +220,153 @@ def decompress(data: bytes | memoryview, compressor_id: int) -> bytes:
         return zstd.decompress(data)
     else:
         raise ValueError(f"Unknown compressorId {compressor_id}")
+
+
+_COMPRESSOR_NAMES = {
+    ctx.compressor_id: ctx.name for ctx in (SnappyContext, ZlibContext, ZstdContext)
+}
+
+
+class _CompressorStats:
+    """The compression one compressor achieved for one class of message."""
+
+    __slots__ = (
+        "compress_time",
+        "compressed",
+        "decompress_time",
+        "messages",
+        "replies",
+        "uncompressed",
+    )
+
+    def __init__(self) -> None:
+        self.messages = 0
+        self.replies = 0
+        self.uncompressed = 0
+        self.compressed = 0
+        self.compress_time = 0.0
+        self.decompress_time = 0.0
+
+    @property
+    def ratio(self) -> float:
+        """The compressed size of messages and replies over their uncompressed size."""
+        return self.compressed / self.uncompressed if self.uncompressed else 1.0
+
+    def cost(self) -> float:
+        """The estimated seconds spent per uncompressed byte, on the wire and compressing."""
+        if not self.uncompressed:
+            return 0.0
+        seconds = self.compressed * _WIRE_SECONDS_PER_BYTE
+        return (seconds + self.compress_time + self.decompress_time) / self.uncompressed
+
+
+class _CompressionStats:
+    """The compression achieved with one server, by class of message and compressor.
+
+    Shared by the connections of a pool to choose a compressor for each message.
+    """
+
+    def __init__(self) -> None:
+        self._lock = _create_lock()
+        self._stats: dict[str, dict[str, _CompressorStats]] = {}
+        self._messages: dict[str, int] = {}
+
+    def choose(
+        self, message_class: str, contexts: list[Union[SnappyContext, ZlibContext, ZstdContext]]
+    ) -> Union[SnappyContext, ZlibContext, ZstdContext]:
+        """Return the compressor with the lowest cost for this class of message.
+
+        Every compressor is sampled ``_MIN_SAMPLES`` times first, and the least
+        used one is sampled again every ``_SAMPLE_INTERVAL`` messages.
+        """
+        if len(contexts) == 1:
+            return contexts[0]
+        with self._lock:
+            count = self._messages[message_class] = self._messages.get(message_class, 0) + 1
+            by_name = self._stats.setdefault(message_class, {})
+            stats = [by_name.setdefault(ctx.name, _CompressorStats()) for ctx in contexts]
+            least = min(range(len(contexts)), key=lambda i: stats[i].messages)
+            if stats[least].messages < _MIN_SAMPLES or count % _SAMPLE_INTERVAL == 0:
+                return contexts[least]
+            return contexts[min(range(len(contexts)), key=lambda i: stats[i].cost())]
+
+    def record_compress(
+        self, message_class: str, name: str, uncompressed: int, compressed: int, seconds: float
+    ) -> None:
+        with self._lock:
+            stats = self._stats.setdefault(message_class, {}).setdefault(name, _CompressorStats())
+            stats.messages += 1
+            stats.uncompressed += uncompressed
+            stats.compressed += compressed
+            stats.compress_time += seconds
+
+    def record_decompress(
+        self, message_class: str, name: str, uncompressed: int, compressed: int, seconds: float
+    ) -> None:
+        with self._lock:
+            stats = self._stats.setdefault(message_class, {}).setdefault(name, _CompressorStats())
+            stats.replies += 1
+            stats.uncompressed += uncompressed
+            stats.compressed += compressed
+            stats.decompress_time += seconds
+
+    def stats(self) -> dict[str, dict[str, dict[str, Any]]]:
+        """Return the counters of each class of message and compressor, for monitoring."""
+        with self._lock:
+            return {
+                message_class: {
+                    name: {
+                        "messages": stats.messages,
+                        "replies": stats.replies,
+                        "ratio": stats.ratio,
+                        "compress_time": stats.compress_time,
+                        "decompress_time": stats.decompress_time,
+                    }
+                    for name, stats in by_name.items()
+                }
+                for message_class, by_name in self._stats.items()
+            }
+
+
+class AdaptiveContext:
+    """Compress each message with the negotiated compressor that costs the
+    least for its class of message, and send small messages uncompressed.
+    """
+
+    def __init__(
+        self,
+        contexts: list[Union[SnappyContext, ZlibContext, ZstdContext]],
+        min_size: int,
+        stats: _CompressionStats,
+    ) -> None:
+        self.contexts = contexts
+        self.min_size = min_size
+        self.stats = stats
+        # Replies are recorded under the class of the last compressed message.
+        self._last_class = _COMMAND_MESSAGE
+
+    def compress_message(self, data: bytes, message_class: str) -> Optional[tuple[int, bytes]]:
+        """Return the compressor id and compressed data, or None to send data uncompressed."""
+        if len(data) < self.min_size and message_class != _READ_MESSAGE:
+            return None
+        ctx = self.stats.choose(message_class, self.contexts)
+        start = time.perf_counter()
+        compressed = ctx.compress(data)
+        seconds = time.perf_counter() - start
+        self.stats.record_compress(message_class, ctx.name, len(data), len(compressed), seconds)
+        self._last_class = message_class
+        return ctx.compressor_id, compressed
+
+    def decompress(self, data: bytes | memoryview, compressor_id: int) -> bytes:
+        """Decompress a reply and record the time taken."""
+        start = time.perf_counter()
+        decompressed = decompress(data, compressor_id)
+        seconds = time.perf_counter() - start
+        self.stats.record_decompress(
+            self._last_class,
+            _COMPRESSOR_NAMES[compressor_id],
+            len(decompressed),
+            len(data),
+            seconds,
+        )
+        return decompressed
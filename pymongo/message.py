@@ -22,6 +22,7 @@ MongoDB.
 
 from __future__ import annotations
 
+import os
 import random
 import struct
 from collections.abc import Iterable, Mapping, MutableMapping
@@ -36,7 +37,15 @@ from typing import (
 )
 
 import bson
-from bson import CodecOptions, _dict_to_bson, _make_c_string
+from bson import (
+    CodecOptions,
+    _dict_to_bson,
+    _dict_to_bson_into,
+    _encoded_size,
+    _make_c_string,
+)
+from bson._dataclass_codec import _document_plan
+from bson.codec_options import _raw_document_class
 from bson.raw_bson import (
     _RAW_ARRAY_BSON_OPTIONS,
     DEFAULT_RAW_BSON_OPTIONS,
@@ -51,6 +60,13 @@ try:
     _use_c = True
 except ImportError:
     _use_c = False
+from pymongo.compression_support import (
+    _COMMAND_MESSAGE,
+    _READ_COMMANDS,
+    _READ_MESSAGE,
+    _WRITE_MESSAGE,
+    AdaptiveContext,
+)
 from pymongo.errors import (
     ConfigurationError,
     DocumentTooLarge,
@@ -247,10 +263,23 @@ _COMPRESSION_HEADER_SIZE = 25
 
 
 def _compress(
-    operation: int, data: bytes, ctx: Union[SnappyContext, ZlibContext, ZstdContext]
+    operation: int,
+    data: bytes,
+    ctx: Union[SnappyContext, ZlibContext, ZstdContext, AdaptiveContext],
+    message_class: str = _COMMAND_MESSAGE,
 ) -> tuple[int, bytes]:
-    """Takes message data, compresses it, and adds an OP_COMPRESSED header."""
-    compressed = ctx.compress(data)
+    """Takes message data, compresses it, and adds an OP_COMPRESSED header.
+
+    An :class:`~pymongo.compression_support.AdaptiveContext` picks the
+    compressor for the ``message_class``, or sends small messages uncompressed.
+    """
+    if isinstance(ctx, AdaptiveContext):
+        compressed_message = ctx.compress_message(data, message_class)
+        if compressed_message is None:
+            return __pack_message(operation, data)
+        compressor_id, compressed = compressed_message
+    else:
+        compressor_id, compressed = ctx.compressor_id, ctx.compress(data)
     request_id = _randint()
 
     header = _pack_compression_header(
@@ -260,7 +289,7 @@ def _compress(
         2012,  # operation id
         operation,  # original operation id
         len(data),  # uncompressed message length
-        ctx.compressor_id,
+        compressor_id,
     )  # compressor id
     return request_id, header + compressed
 
@@ -281,6 +310,8 @@ def __pack_message(operation: int, data: bytes) -> tuple[int, bytes]:
 _pack_int = struct.Struct("<i").pack
 _pack_op_msg_flags_type = struct.Struct("<IB").pack
 _pack_byte = struct.Struct("<B").pack
+_pack_int_into = struct.Struct("<i").pack_into
+_unpack_int_from = struct.Struct("<i").unpack_from
 
 
 def _op_msg_no_header(
@@ -296,23 +327,22 @@ def _op_msg_no_header(
     it does not perform batch splitting and the total message size is
     only checked *after* generating the entire message.
     """
+    buf = bytearray(_pack_op_msg_flags_type(flags, 0))
     # Encode the command document in payload 0 without checking keys.
-    encoded = _dict_to_bson(command, False, opts)
-    flags_type = _pack_op_msg_flags_type(flags, 0)
-    total_size = len(encoded)
+    total_size = _dict_to_bson_into(command, buf, len(buf), False, opts)
     max_doc_size = 0
     if identifier and docs is not None:
-        type_one = _pack_byte(1)
-        cstring = _make_c_string(identifier)
-        encoded_docs = [_dict_to_bson(doc, False, opts) for doc in docs]
-        size = len(cstring) + sum(len(doc) for doc in encoded_docs) + 4
-        encoded_size = _pack_int(size)
+        buf += _pack_byte(1)
+        size_location = len(buf)
+        # Save space for size
+        buf += _ZERO_32
+        buf += _make_c_string(identifier)
+        for doc in docs:
+            max_doc_size = max(max_doc_size, _dict_to_bson_into(doc, buf, len(buf), False, opts))
+        size = len(buf) - size_location
+        buf[size_location : size_location + 4] = _pack_int(size)
         total_size += size
-        max_doc_size = max(len(doc) for doc in encoded_docs)
-        data = [flags_type, encoded, type_one, encoded_size, cstring, *encoded_docs]
-    else:
-        data = [flags_type, encoded]
-    return b"".join(data), total_size, max_doc_size
+    return bytes(buf), total_size, max_doc_size
 
 
 def _op_msg_compressed(
@@ -321,11 +351,12 @@ def _op_msg_compressed(
     identifier: str,
     docs: Optional[list[Mapping[str, Any]]],
     opts: CodecOptions[Any],
-    ctx: Union[SnappyContext, ZlibContext, ZstdContext],
+    ctx: Union[SnappyContext, ZlibContext, ZstdContext, AdaptiveContext],
+    message_class: str = _COMMAND_MESSAGE,
 ) -> tuple[int, bytes, int, int]:
     """Internal OP_MSG message helper."""
     msg, total_size, max_bson_size = _op_msg_no_header(flags, command, identifier, docs, opts)
-    rid, msg = _compress(2013, msg, ctx)
+    rid, msg = _compress(2013, msg, ctx, message_class)
     return rid, msg, total_size, max_bson_size
 
 
@@ -346,21 +377,89 @@ if _use_c:
     _op_msg_uncompressed = _cmessage._op_msg
 
 
-def _op_msg(
+# Uncompressed OP_MSG messages whose documents add up to at least this many
+# bytes are built as a list of segments instead of one contiguous message.
+_MIN_SEGMENTED_SIZE = 1024 * 1024
+
+# Batches of documents at least this large are only built as segments when
+# their first document is too, since each segment is encoded separately.
+_MIN_SEGMENTED_DOC_SIZE = 16 * 1024
+
+
+def _encode_segment(doc: Mapping[str, Any], size: int, opts: CodecOptions[Any]) -> bytearray:
+    """Encode a document into a new segment of its measured size."""
+    segment = bytearray(size)
+    try:
+        written = _dict_to_bson_into(doc, memoryview(segment), 0, False, opts)
+    except ValueError:
+        written = -1
+    if written != size:
+        # The document did not encode to its measured size.
+        segment = bytearray(_dict_to_bson(doc, False, opts))
+    return segment
+
+
+def _op_msg_segmented(
     flags: int,
-    command: MutableMapping[str, Any],
-    dbname: str,
-    read_preference: Optional[_ServerMode],
+    command: Mapping[str, Any],
+    identifier: str,
+    docs: list[Mapping[str, Any]],
+    sizes: list[int],
     opts: CodecOptions[Any],
-    ctx: Union[SnappyContext, ZlibContext, ZstdContext, None] = None,
-) -> tuple[int, bytes, int, int]:
-    """Get a OP_MSG message."""
+) -> tuple[int, list[bytearray], int, int]:
+    """Get an uncompressed OP_MSG message as a list of segments.
+
+    The first segment holds the header, the command and the start of the
+    type one payload. Each document is encoded into its own segment of the
+    size in `sizes`, so a large message is never copied into one contiguous
+    buffer.
+    """
+    buf = bytearray(_ZERO_64)
+    # responseTo, opCode
+    buf += b"\x00\x00\x00\x00\xdd\x07\x00\x00"
+    buf += _pack_op_msg_flags_type(flags, 0)
+    # Encode the command document in payload 0 without checking keys.
+    total_size = _dict_to_bson_into(command, buf, len(buf), False, opts)
+    buf += _pack_byte(1)
+    size_location = len(buf)
+    # Save space for size
+    buf += _ZERO_32
+    buf += _make_c_string(identifier)
+    segments: list[bytearray] = [buf]
+    for doc, size in zip(docs, sizes):
+        segments.append(_encode_segment(doc, size, opts))
+    docs_size = sum(len(segment) for segment in segments) - len(buf)
+    payload_size = len(buf) - size_location + docs_size
+    _pack_int_into(buf, size_location, payload_size)
+    request_id = _randint()
+    _pack_int_into(buf, 0, len(buf) + docs_size)
+    _pack_int_into(buf, 4, request_id)
+    max_doc_size = max(len(segment) for segment in segments[1:])
+    return request_id, segments, total_size + payload_size, max_doc_size
+
+
+def _op_msg_fields(
+    command: MutableMapping[str, Any], dbname: str, read_preference: Optional[_ServerMode]
+) -> None:
+    """Add the $db and $readPreference fields of an OP_MSG command."""
     command["$db"] = dbname
     # getMore commands do not send $readPreference.
     if read_preference is not None and "$readPreference" not in command:
         # Only send $readPreference if it's not primary (the default).
         if read_preference.mode:
             command["$readPreference"] = read_preference.document
+
+
+def _op_msg(
+    flags: int,
+    command: MutableMapping[str, Any],
+    dbname: str,
+    read_preference: Optional[_ServerMode],
+    opts: CodecOptions[Any],
+    ctx: Union[SnappyContext, ZlibContext, ZstdContext, AdaptiveContext, None] = None,
+) -> tuple[int, bytes, int, int]:
+    """Get a OP_MSG message."""
+    _op_msg_fields(command, dbname, read_preference)
     name = next(iter(command))
     try:
         identifier = _FIELD_MAP[name]
@@ -370,7 +469,13 @@ def _op_msg(
         docs = None
     try:
         if ctx:
-            return _op_msg_compressed(flags, command, identifier, docs, opts, ctx)
+            if name in _READ_COMMANDS:
+                message_class = _READ_MESSAGE
+            elif identifier:
+                message_class = _WRITE_MESSAGE
+            else:
+                message_class = _COMMAND_MESSAGE
+            return _op_msg_compressed(flags, command, identifier, docs, opts, ctx, message_class)
         return _op_msg_uncompressed(flags, command, identifier, docs, opts)
     finally:
         # Add the field back to the command.
@@ -378,6 +483,54 @@ def _op_msg(
             command[identifier] = docs
 
 
+def _segment_sizes(docs: list[Mapping[str, Any]], opts: CodecOptions[Any]) -> Optional[list[int]]:
+    """Return the encoded sizes of docs if they are large enough to be sent
+    as segments, otherwise None.
+
+    Only batches whose first document is large are measured in full.
+    """
+    first_size = _encoded_size(docs[0], opts)
+    if first_size < _MIN_SEGMENTED_DOC_SIZE or first_size * len(docs) < _MIN_SEGMENTED_SIZE:
+        return None
+    sizes = [first_size]
+    for idx in range(1, len(docs)):
+        sizes.append(_encoded_size(docs[idx], opts))
+    if sum(sizes) < _MIN_SEGMENTED_SIZE:
+        return None
+    return sizes
+
+
+def _command_op_msg(
+    flags: int,
+    command: MutableMapping[str, Any],
+    dbname: str,
+    read_preference: Optional[_ServerMode],
+    opts: CodecOptions[Any],
+    ctx: Union[SnappyContext, ZlibContext, ZstdContext, AdaptiveContext, None] = None,
+) -> tuple[int, Union[bytes, list[bytearray]], int, int]:
+    """Get a OP_MSG message for a command.
+
+    Uncompressed writes with large documents are returned as a list of
+    segments, see :func:`_op_msg_segmented`. Documents are only measured
+    for this with the C extensions, which measure them without encoding
+    them.
+    """
+    identifier = _FIELD_MAP.get(next(iter(command)), "")
+    docs = command.get(identifier) if identifier else None
+    if ctx or not docs or not _use_c:
+        return _op_msg(flags, command, dbname, read_preference, opts, ctx)
+    sizes = _segment_sizes(docs, opts)
+    if sizes is None:
+        return _op_msg(flags, command, dbname, read_preference, opts, ctx)
+    _op_msg_fields(command, dbname, read_preference)
+    del command[identifier]
+    try:
+        return _op_msg_segmented(flags, command, identifier, docs, sizes, opts)
+    finally:
+        # Add the field back to the command.
+        command[identifier] = docs
+
+
 _pack_long_long = struct.Struct("<q").pack
 
 
@@ -397,10 +550,11 @@ def _get_more_compressed(
     collection_name: str,
     num_to_return: int,
     cursor_id: int,
-    ctx: Union[SnappyContext, ZlibContext, ZstdContext],
+    ctx: Union[SnappyContext, ZlibContext, ZstdContext, AdaptiveContext],
 ) -> tuple[int, bytes]:
     """Internal compressed getMore message helper."""
-    return _compress(2005, _get_more_impl(collection_name, num_to_return, cursor_id), ctx)
+    data = _get_more_impl(collection_name, num_to_return, cursor_id)
+    return _compress(2005, data, ctx, _READ_MESSAGE)
 
 
 def _get_more_uncompressed(
@@ -418,7 +572,7 @@ def _get_more(
     collection_name: str,
     num_to_return: int,
     cursor_id: int,
-    ctx: Union[SnappyContext, ZlibContext, ZstdContext, None] = None,
+    ctx: Union[SnappyContext, ZlibContext, ZstdContext, AdaptiveContext, None] = None,
 ) -> tuple[int, bytes]:
     """Get a **getMore** message."""
     if ctx:
@@ -527,7 +681,7 @@ class _BulkWriteContext(_BulkWriteContextBase):
 
     def batch_command(
         self, cmd: MutableMapping[str, Any], docs: list[Mapping[str, Any]]
-    ) -> tuple[int, Union[bytes, dict[str, Any]], list[Mapping[str, Any]]]:
+    ) -> tuple[int, Union[bytes, list[bytearray], dict[str, Any]], list[Mapping[str, Any]]]:
         namespace = self.db_name + ".$cmd"
         request_id, msg, to_send = _do_batched_op_msg(
             namespace, self.op_type, cmd, docs, self.codec, self
@@ -590,37 +744,40 @@ def _batched_op_msg_impl(
     ack: bool,
     opts: CodecOptions[Any],
     ctx: _BulkWriteContext,
-    buf: _BytesIO,
+    buf: bytearray,
 ) -> tuple[list[Mapping[str, Any]], int]:
-    """Create a batched OP_MSG write."""
+    """Create a batched OP_MSG write.
+
+    The command and documents are encoded directly into `buf`.
+    """
     max_bson_size = ctx.max_bson_size
     max_write_batch_size = ctx.max_write_batch_size
     max_message_size = ctx.max_message_size
 
     flags = b"\x00\x00\x00\x00" if ack else b"\x02\x00\x00\x00"
     # Flags
-    buf.write(flags)
+    buf += flags
 
     # Type 0 Section
-    buf.write(b"\x00")
-    buf.write(_dict_to_bson(command, False, opts))
+    buf += b"\x00"
+    _dict_to_bson_into(command, buf, len(buf), False, opts)
 
     # Type 1 Section
-    buf.write(b"\x01")
-    size_location = buf.tell()
+    buf += b"\x01"
+    size_location = len(buf)
     # Save space for size
-    buf.write(b"\x00\x00\x00\x00")
+    buf += b"\x00\x00\x00\x00"
     try:
-        buf.write(_OP_MSG_MAP[operation])
+        buf += _OP_MSG_MAP[operation]
     except KeyError:
         raise InvalidOperation("Unknown command") from None
 
     to_send = []
     for idx, doc in enumerate(docs):
         # Encode the current operation
-        value = _dict_to_bson(doc, False, opts)
-        doc_length = len(value)
-        new_message_size = buf.tell() + doc_length
+        doc_start = len(buf)
+        doc_length = _dict_to_bson_into(doc, buf, doc_start, False, opts)
+        new_message_size = doc_start + doc_length
         # Does first document exceed max_message_size?
         doc_too_large = idx == 0 and (new_message_size > max_message_size)
         # When OP_MSG is used unacknowledged we have to check
@@ -631,20 +788,20 @@ def _batched_op_msg_impl(
         unacked_doc_too_large = not ack and (doc_length > max_bson_size)
         if doc_too_large or unacked_doc_too_large:
             write_op = list(_FIELD_MAP.keys())[operation]
-            _raise_document_too_large(write_op, len(value), max_bson_size)
+            _raise_document_too_large(write_op, doc_length, max_bson_size)
         # We have enough data, return this batch.
         if new_message_size > max_message_size:
+            # Remove the document that does not fit.
+            del buf[doc_start:]
             break
-        buf.write(value)
         to_send.append(doc)
         # We have enough documents, return this batch.
         if idx + 1 == max_write_batch_size:
             break
 
     # Write type 1 section size
-    length = buf.tell()
-    buf.seek(size_location)
-    buf.write(_pack_int(length - size_location))
+    length = len(buf)
+    buf[size_location : size_location + 4] = _pack_int(length - size_location)
 
     return to_send, length
 
@@ -660,10 +817,10 @@ def _encode_batched_op_msg(
     """Encode the next batched insert, update, or delete operation
     as OP_MSG.
     """
-    buf = _BytesIO()
+    buf = bytearray()
 
     to_send, _ = _batched_op_msg_impl(operation, command, docs, ack, opts, ctx, buf)
-    return buf.getvalue(), to_send
+    return bytes(buf), to_send
 
 
 if _use_c:
@@ -684,7 +841,7 @@ def _batched_op_msg_compressed(
     data, to_send = _encode_batched_op_msg(operation, command, docs, ack, opts, ctx)
 
     assert ctx.conn.compression_context is not None
-    request_id, msg = _compress(2013, data, ctx.conn.compression_context)
+    request_id, msg = _compress(2013, data, ctx.conn.compression_context, _WRITE_MESSAGE)
     return request_id, msg, to_send
 
 
@@ -697,29 +854,97 @@ def _batched_op_msg(
     ctx: _BulkWriteContext,
 ) -> tuple[int, bytes, list[Mapping[str, Any]]]:
     """OP_MSG implementation entry point."""
-    buf = _BytesIO()
+    buf = bytearray()
 
     # Save space for message length and request id
-    buf.write(_ZERO_64)
+    buf += _ZERO_64
     # responseTo, opCode
-    buf.write(b"\x00\x00\x00\x00\xdd\x07\x00\x00")
+    buf += b"\x00\x00\x00\x00\xdd\x07\x00\x00"
 
     to_send, length = _batched_op_msg_impl(operation, command, docs, ack, opts, ctx, buf)
 
     # Header - request id and message length
-    buf.seek(4)
     request_id = _randint()
-    buf.write(_pack_int(request_id))
-    buf.seek(0)
-    buf.write(_pack_int(length))
+    buf[4:8] = _pack_int(request_id)
+    buf[0:4] = _pack_int(length)
 
-    return request_id, buf.getvalue(), to_send
+    return request_id, bytes(buf), to_send
 
 
 if _use_c:
     _batched_op_msg = _cmessage._batched_op_msg
 
 
+def _batched_op_msg_segmented(
+    operation: int,
+    command: Mapping[str, Any],
+    docs: list[Mapping[str, Any]],
+    ack: bool,
+    opts: CodecOptions[Any],
+    ctx: _BulkWriteContext,
+) -> tuple[int, list[bytearray], list[Mapping[str, Any]]]:
+    """Create the next batched insert, update, or delete operation with
+    OP_MSG as a list of segments.
+
+    Applies the same batch splitting as :func:`_batched_op_msg_impl`, but
+    each document is encoded into its own segment so a large batch is never
+    copied into one contiguous message.
+    """
+    max_bson_size = ctx.max_bson_size
+    max_write_batch_size = ctx.max_write_batch_size
+    max_message_size = ctx.max_message_size
+
+    buf = bytearray(_ZERO_64)
+    # responseTo, opCode
+    buf += b"\x00\x00\x00\x00\xdd\x07\x00\x00"
+    # Flags
+    buf += b"\x00\x00\x00\x00" if ack else b"\x02\x00\x00\x00"
+    # Type 0 Section
+    buf += b"\x00"
+    _dict_to_bson_into(command, buf, len(buf), False, opts)
+    # Type 1 Section
+    buf += b"\x01"
+    size_location = len(buf)
+    # Save space for size
+    buf += _ZERO_32
+    try:
+        buf += _OP_MSG_MAP[operation]
+    except KeyError:
+        raise InvalidOperation("Unknown command") from None
+
+    segments: list[bytearray] = [buf]
+    length = len(buf)
+    to_send = []
+    for idx, doc in enumerate(docs):
+        doc_length = _encoded_size(doc, opts)
+        new_message_size = length + doc_length
+        # Does first document exceed max_message_size?
+        doc_too_large = idx == 0 and (new_message_size > max_message_size)
+        # See _batched_op_msg_impl.
+        unacked_doc_too_large = not ack and (doc_length > max_bson_size)
+        if doc_too_large or unacked_doc_too_large:
+            write_op = list(_FIELD_MAP.keys())[operation]
+            _raise_document_too_large(write_op, doc_length, max_bson_size)
+        # We have enough data, return this batch.
+        if new_message_size > max_message_size:
+            break
+        segment = _encode_segment(doc, doc_length, opts)
+        segments.append(segment)
+        length += len(segment)
+        to_send.append(doc)
+        # We have enough documents, return this batch.
+        if idx + 1 == max_write_batch_size:
+            break
+
+    # Write type 1 section size
+    _pack_int_into(buf, size_location, length - size_location)
+    # Header - request id and message length
+    request_id = _randint()
+    _pack_int_into(buf, 0, length)
+    _pack_int_into(buf, 4, request_id)
+    return request_id, segments, to_send
+
+
 def _do_batched_op_msg(
     namespace: str,
     operation: int,
@@ -727,7 +952,7 @@ def _do_batched_op_msg(
     docs: list[Mapping[str, Any]],
     opts: CodecOptions[Any],
     ctx: _BulkWriteContext,
-) -> tuple[int, bytes, list[Mapping[str, Any]]]:
+) -> tuple[int, Union[bytes, list[bytearray]], list[Mapping[str, Any]]]:
     """Create the next batched insert, update, or delete operation
     using OP_MSG.
     """
@@ -738,6 +963,12 @@ def _do_batched_op_msg(
         ack = True
     if ctx.conn.compression_context:
         return _batched_op_msg_compressed(operation, command, docs, ack, opts, ctx)
+    if docs:
+        # Estimate the size of the batch from its first document.
+        first_size = _encoded_size(docs[0], opts)
+        batch_size = first_size * min(len(docs), ctx.max_write_batch_size)
+        if first_size >= _MIN_SEGMENTED_DOC_SIZE and batch_size >= _MIN_SEGMENTED_SIZE:
+            return _batched_op_msg_segmented(operation, command, docs, ack, opts, ctx)
     return _batched_op_msg(operation, command, docs, ack, opts, ctx)
 
 
@@ -772,7 +1003,12 @@ class _ClientBulkWriteContext(_BulkWriteContextBase):
         cmd: MutableMapping[str, Any],
         operations: list[tuple[str, Mapping[str, Any]]],
         namespaces: list[str],
-    ) -> tuple[int, Union[bytes, dict[str, Any]], list[Mapping[str, Any]], list[Mapping[str, Any]]]:
+    ) -> tuple[
+        int,
+        Union[bytes, list[bytearray], dict[str, Any]],
+        list[Mapping[str, Any]],
+        list[Mapping[str, Any]],
+    ]:
         request_id, msg, to_send_ops, to_send_ns = _client_do_batched_op_msg(
             cmd, operations, namespaces, self.codec, self
         )
@@ -786,8 +1022,8 @@ _OP_MSG_OVERHEAD = 1000
 
 def _client_construct_op_msg(
     command_encoded: bytes,
-    to_send_ops_encoded: list[bytes],
-    to_send_ns_encoded: list[bytes],
+    to_send_ops_encoded: list[bytearray],
+    to_send_ns_encoded: list[bytearray],
     ack: bool,
     buf: _BytesIO,
 ) -> int:
@@ -832,6 +1068,39 @@ def _client_construct_op_msg(
     return length
 
 
+def _client_construct_op_msg_segments(
+    command_encoded: bytes,
+    to_send_ops_encoded: list[bytearray],
+    to_send_ns_encoded: list[bytearray],
+    ack: bool,
+    segments: list[bytearray],
+) -> int:
+    """Append the client-level bulkWrite OP_MSG to `segments`, which hold
+    the message header. Each encoded document is a segment of its own.
+    """
+    ops_length = sum(len(op_encoded) for op_encoded in to_send_ops_encoded)
+    ns_length = sum(len(ns_encoded) for ns_encoded in to_send_ns_encoded)
+    # Write flags
+    buf = bytearray(b"\x00\x00\x00\x00" if ack else b"\x02\x00\x00\x00")
+
+    # Type 0 Section
+    buf += b"\x00"
+    buf += command_encoded
+
+    # Type 1 Section for ops, its size includes the size itself and "ops\x00".
+    buf += b"\x01"
+    buf += _pack_int(8 + ops_length)
+    buf += b"ops\x00"
+    segments.append(buf)
+    segments.extend(to_send_ops_encoded)
+
+    # Type 1 Section for nsInfo
+    segments.append(bytearray(b"\x01" + _pack_int(11 + ns_length) + b"nsInfo\x00"))
+    segments.extend(to_send_ns_encoded)
+
+    return sum(len(segment) for segment in segments)
+
+
 def _client_batched_op_msg_impl(
     command: Mapping[str, Any],
     operations: list[tuple[str, Mapping[str, Any]]],
@@ -839,9 +1108,13 @@ def _client_batched_op_msg_impl(
     ack: bool,
     opts: CodecOptions[Any],
     ctx: _ClientBulkWriteContext,
-    buf: _BytesIO,
+    buf: Union[_BytesIO, list[bytearray]],
 ) -> tuple[list[Mapping[str, Any]], list[Mapping[str, Any]], int]:
-    """Create a batched OP_MSG write for client-level bulk write."""
+    """Create a batched OP_MSG write for client-level bulk write.
+
+    The message is written to `buf`, or appended to it as segments if it is
+    a list.
+    """
 
     def _check_doc_size_limits(
         op_type: str,
@@ -870,7 +1143,7 @@ def _client_batched_op_msg_impl(
     if command.get("let"):
         abridged_keys.append("let")
     command_abridged = {key: command[key] for key in abridged_keys}
-    command_len_abridged = len(_dict_to_bson(command_abridged, False, opts))
+    command_len_abridged = _encoded_size(command_abridged, opts)
 
     # Maximum combined size of the ops and nsInfo document sequences.
     max_doc_sequences_bytes = max_message_size - (_OP_MSG_OVERHEAD + command_len_abridged)
@@ -878,22 +1151,23 @@ def _client_batched_op_msg_impl(
     ns_info = {}
     to_send_ops: list[Mapping[str, Any]] = []
     to_send_ns: list[Mapping[str, str]] = []
-    to_send_ops_encoded: list[bytes] = []
-    to_send_ns_encoded: list[bytes] = []
+    to_send_ops_encoded: list[bytearray] = []
+    to_send_ns_encoded: list[bytearray] = []
     total_ops_length = 0
     total_ns_length = 0
 
     for idx, ((real_op_type, op_doc), namespace) in enumerate(zip(operations, namespaces)):
         op_type = real_op_type
-        # Check insert/replace document size if unacknowledged.
+        # Check insert/replace document size if unacknowledged, before
+        # encoding the operation.
         if real_op_type == "insert":
             if not ack:
-                doc_size = len(_dict_to_bson(op_doc["document"], False, opts))
+                doc_size = _encoded_size(op_doc["document"], opts)
                 _check_doc_size_limits(real_op_type, doc_size, max_bson_size)
         if real_op_type == "replace":
             op_type = "update"
             if not ack:
-                doc_size = len(_dict_to_bson(op_doc["updateMods"], False, opts))
+                doc_size = _encoded_size(op_doc["updateMods"], opts)
                 _check_doc_size_limits(real_op_type, doc_size, max_bson_size)
 
         ns_doc = None
@@ -908,12 +1182,13 @@ def _client_batched_op_msg_impl(
         # key and the index of its namespace within ns_info as its value.
         op_doc[op_type] = ns_info[namespace]  # type: ignore[index]
 
-        # Encode current operation doc and, if newly added, namespace doc.
-        op_doc_encoded = _dict_to_bson(op_doc, False, opts)
-        op_length = len(op_doc_encoded)
+        # Encode current operation doc and, if newly added, namespace doc,
+        # each into a buffer that can be sent as a segment of its own.
+        op_doc_encoded = bytearray()
+        op_length = _dict_to_bson_into(op_doc, op_doc_encoded, 0, False, opts)
         if ns_doc:
-            ns_doc_encoded = _dict_to_bson(ns_doc, False, opts)
-            ns_length = len(ns_doc_encoded)
+            ns_doc_encoded = bytearray()
+            ns_length = _dict_to_bson_into(ns_doc, ns_doc_encoded, 0, False, opts)
 
         # Check operation document size if unacknowledged.
         if not ack:
@@ -940,9 +1215,14 @@ def _client_batched_op_msg_impl(
             break
 
     # Construct the entire OP_MSG.
-    length = _client_construct_op_msg(
-        command_encoded, to_send_ops_encoded, to_send_ns_encoded, ack, buf
-    )
+    if isinstance(buf, list):
+        length = _client_construct_op_msg_segments(
+            command_encoded, to_send_ops_encoded, to_send_ns_encoded, ack, buf
+        )
+    else:
+        length = _client_construct_op_msg(
+            command_encoded, to_send_ops_encoded, to_send_ns_encoded, ack, buf
+        )
 
     return to_send_ops, to_send_ns, length
 
@@ -982,7 +1262,7 @@ def _client_batched_op_msg_compressed(
     )
 
     assert ctx.conn.compression_context is not None
-    request_id, msg = _compress(2013, data, ctx.conn.compression_context)
+    request_id, msg = _compress(2013, data, ctx.conn.compression_context, _WRITE_MESSAGE)
     return request_id, msg, to_send_ops, to_send_ns
 
 
@@ -993,27 +1273,31 @@ def _client_batched_op_msg(
     ack: bool,
     opts: CodecOptions[Any],
     ctx: _ClientBulkWriteContext,
-) -> tuple[int, bytes, list[Mapping[str, Any]], list[Mapping[str, Any]]]:
-    """OP_MSG implementation entry point for client-level bulkWrite."""
-    buf = _BytesIO()
+) -> tuple[int, Union[bytes, list[bytearray]], list[Mapping[str, Any]], list[Mapping[str, Any]]]:
+    """OP_MSG implementation entry point for client-level bulkWrite.
 
+    Messages whose documents add up to at least _MIN_SEGMENTED_SIZE bytes
+    are returned as a list of segments.
+    """
     # Save space for message length and request id
-    buf.write(_ZERO_64)
+    header = bytearray(_ZERO_64)
     # responseTo, opCode
-    buf.write(b"\x00\x00\x00\x00\xdd\x07\x00\x00")
+    header += b"\x00\x00\x00\x00\xdd\x07\x00\x00"
+    segments: list[bytearray] = [header]
 
     to_send_ops, to_send_ns, length = _client_batched_op_msg_impl(
-        command, operations, namespaces, ack, opts, ctx, buf
+        command, operations, namespaces, ack, opts, ctx, segments
     )
 
     # Header - request id and message length
-    buf.seek(4)
     request_id = _randint()
-    buf.write(_pack_int(request_id))
-    buf.seek(0)
-    buf.write(_pack_int(length))
+    _pack_int_into(header, 4, request_id)
+    _pack_int_into(header, 0, length)
 
-    return request_id, buf.getvalue(), to_send_ops, to_send_ns
+    # The header and the command are the first two segments.
+    if length - len(header) - len(segments[1]) < _MIN_SEGMENTED_SIZE:
+        return request_id, b"".join(segments), to_send_ops, to_send_ns
+    return request_id, segments, to_send_ops, to_send_ns
 
 
 def _client_do_batched_op_msg(
@@ -1022,7 +1306,7 @@ def _client_do_batched_op_msg(
     namespaces: list[str],
     opts: CodecOptions[Any],
     ctx: _ClientBulkWriteContext,
-) -> tuple[int, bytes, list[Mapping[str, Any]], list[Mapping[str, Any]]]:
+) -> tuple[int, Union[bytes, list[bytearray]], list[Mapping[str, Any]], list[Mapping[str, Any]]]:
     """Create the next batched client-level bulkWrite
     operation using OP_MSG.
     """
@@ -1131,6 +1415,62 @@ def _batched_write_command_impl(
     return to_send, length
 
 
+# Cursor replies at least this large have their batch decoded on several
+# threads when the GIL is disabled.
+_PARALLEL_DECODE_MIN_SIZE = 4 * 1024 * 1024
+_PARALLEL_DECODE_WORKERS = min(8, os.cpu_count() or 1)
+
+
+def _embedded_value_span(
+    view: memoryview, start: int, end: int, name: str, element_type: int
+) -> Optional[tuple[int, int]]:
+    """Return the start and end of the value of the embedded document or array
+    field ``name`` in the document at ``view[start:end]``, or None.
+    """
+    position = bson._index_elements(view[start:end], _UNICODE_REPLACE_CODEC_OPTIONS).get(name)
+    if position is None or view[start + position] != element_type:
+        return None
+    value_start = start + position + len(name.encode()) + 2
+    return value_start, value_start + _unpack_int_from(view, value_start)[0]
+
+
+def _decode_cursor_reply(
+    payload: bytes | memoryview, codec_options: CodecOptions[Any], workers: int
+) -> Optional[dict[str, Any]]:
+    """Decode a cursor command reply, decoding the documents of its batch
+    on ``workers`` threads.
+
+    Returns None if the reply is not a cursor reply.
+    """
+    view = memoryview(payload)
+    cursor = _embedded_value_span(view, 0, len(view), "cursor", 0x03)
+    if cursor is None:
+        return None
+    for key in ("firstBatch", "nextBatch"):
+        batch = _embedded_value_span(view, cursor[0], cursor[1], key, 0x04)
+        if batch is not None:
+            break
+    else:
+        return None
+    # Decode the reply with an empty batch and the batch separately.
+    batch_start, batch_end = batch
+    removed = batch_end - batch_start - 5
+    envelope = bytearray(view[:batch_start])
+    envelope += b"\x05\x00\x00\x00\x00"
+    envelope += view[batch_end:]
+    _pack_int_into(envelope, 0, len(view) - removed)
+    _pack_int_into(envelope, cursor[0], cursor[1] - cursor[0] - removed)
+    reply = bson.decode(envelope, codec_options)
+    if not isinstance(reply["cursor"], MutableMapping):
+        return None
+    reply["cursor"][key] = bson.decode_all(
+        bson._array_of_documents_to_buffer(view[batch_start:batch_end]),
+        codec_options,
+        workers=workers,
+    )
+    return reply
+
+
 class _OpMsg:
     """A MongoDB OP_MSG response message."""
 
@@ -1180,6 +1520,21 @@ class _OpMsg:
         """
         # If _OpMsg is in-use, this cannot be a legacy response.
         assert not legacy_response
+        if (
+            user_fields
+            and _PARALLEL_DECODE_WORKERS > 1
+            and len(self.payload_document) >= _PARALLEL_DECODE_MIN_SIZE
+            and not codec_options.type_registry._decoder_map
+            and not codec_options.type_registry._document_decoder
+            and _document_plan(codec_options.document_class) is None
+            and not _raw_document_class(codec_options.document_class)
+            and not bson._gil_enabled()
+        ):
+            reply = _decode_cursor_reply(
+                self.payload_document, codec_options, _PARALLEL_DECODE_WORKERS
+            )
+            if reply is not None:
+                return [reply]
         return bson._decode_all_selective(self.payload_document, codec_options, user_fields)
 
     def command_response(self, codec_options: CodecOptions[Any]) -> dict[str, Any]:
@@ -19,6 +19,7 @@ from __future__ import annotations
 import asyncio
 import collections
 import errno
+import os
 import socket
 import struct
 import sys
@@ -34,8 +35,9 @@ from typing import (
 from pymongo import _csot, ssl_support
 from pymongo._asyncio_task import create_task
 from pymongo.common import MAX_MESSAGE_SIZE
-from pymongo.compression_support import decompress
+from pymongo.compression_support import AdaptiveContext, decompress
 from pymongo.errors import ProtocolError, _OperationCancelled
+from pymongo.lock import _create_lock
 from pymongo.message import _UNPACK_REPLY, _OpMsg
 from pymongo.socket_checker import _errno_from_exception
 
@@ -67,6 +69,16 @@ if TYPE_CHECKING:
 _UNPACK_HEADER = struct.Struct("<iiii").unpack
 _UNPACK_COMPRESSION_HEADER = struct.Struct("<iiB").unpack
 _POLL_TIMEOUT = 0.5
+# socket.sendmsg is not available on Windows.
+_HAVE_SENDMSG = hasattr(socket.socket, "sendmsg")
+try:
+    _IOV_MAX = os.sysconf("SC_IOV_MAX")
+except (AttributeError, OSError, ValueError):
+    _IOV_MAX = -1
+if _IOV_MAX <= 0:
+    _IOV_MAX = 1024
+# Segments smaller than this are joined before being sent over TLS.
+_SEND_COALESCE_SIZE = 64 * 1024
 # Errors raised by sockets (and TLS sockets) when in non-blocking mode.
 BLOCKING_IO_ERRORS = (BlockingIOError, *BLOCKING_IO_LOOKUP_ERROR, *ssl_support.BLOCKING_IO_ERRORS)
 
@@ -236,8 +248,43 @@ else:
         return mv
 
 
-def sendall(sock: Union[socket.socket, _sslConn], buf: bytes) -> None:
-    sock.sendall(buf)
+def _sendmsg_all(sock: socket.socket, segments: list[bytearray]) -> None:
+    """Send every segment with as few scatter-gather writes as possible."""
+    views = [memoryview(segment) for segment in segments if segment]
+    start = 0
+    while start < len(views):
+        sent = sock.sendmsg(views[start : start + _IOV_MAX])
+        # Skip the segments that were sent in full and resume a partial one.
+        while start < len(views) and sent >= len(views[start]):
+            sent -= len(views[start])
+            start += 1
+        if sent:
+            views[start] = views[start][sent:]
+
+
+def sendall(sock: Union[socket.socket, _sslConn], buf: Union[bytes, list[bytearray]]) -> None:
+    if not isinstance(buf, list):
+        sock.sendall(buf)
+    elif _HAVE_SENDMSG and not (_HAVE_SSL and isinstance(sock, (SSLSocket, _sslConn))):
+        # A message built as segments, see message._op_msg_segmented.
+        _sendmsg_all(sock, buf)
+    else:
+        # TLS sockets cannot gather segments, so join the small ones to
+        # avoid sending a record for each of them.
+        pending = bytearray()
+        for segment in buf:
+            if len(segment) < _SEND_COALESCE_SIZE:
+                pending += segment
+                if len(pending) >= _SEND_COALESCE_SIZE:
+                    sock.sendall(pending)
+                    pending = bytearray()
+            else:
+                if pending:
+                    sock.sendall(pending)
+                    pending = bytearray()
+                sock.sendall(segment)
+        if pending:
+            sock.sendall(pending)
 
 
 async def _poll_cancellation(conn: AsyncConnection) -> None:
@@ -323,10 +370,11 @@ def wait_for_read(conn: Connection, deadline: Optional[float]) -> None:
             raise socket.timeout("timed out")
 
 
-def receive_data(conn: Connection, length: int, deadline: Optional[float]) -> memoryview:
-    buf = bytearray(length)
-    mv = memoryview(buf)
-    bytes_read = 0
+def _receive_into(conn: Connection, mv: memoryview, deadline: Optional[float]) -> int:
+    """Read at least one byte into mv and return the number of bytes read.
+
+    The caller restores the connection's timeout.
+    """
     # To support cancelling a network read, we shorten the socket timeout and
     # check for the cancellation signal after each timeout. Alternatively we
     # could close the socket but that does not reliably cancel recv() calls
@@ -334,60 +382,237 @@ def receive_data(conn: Connection, length: int, deadline: Optional[float]) -> me
     # When the timeout has expired we perform one final non-blocking recv.
     # This helps avoid spurious timeouts when the response is actually already
     # buffered on the client.
-    orig_timeout = conn.conn.gettimeout()
-    try:
-        while bytes_read < length:
-            try:
-                # Use the legacy wait_for_read cancellation approach on PyPy due to PYTHON-5011.
-                # also use it on Windows due to PYTHON-5405
-                if _PYPY or _WINDOWS:
-                    wait_for_read(conn, deadline)
-                    if _csot.get_timeout() and deadline is not None:
-                        conn.set_conn_timeout(max(deadline - time.monotonic(), 0))
+    while True:
+        try:
+            # Use the legacy wait_for_read cancellation approach on PyPy due to PYTHON-5011.
+            # also use it on Windows due to PYTHON-5405
+            if _PYPY or _WINDOWS:
+                wait_for_read(conn, deadline)
+                if _csot.get_timeout() and deadline is not None:
+                    conn.set_conn_timeout(max(deadline - time.monotonic(), 0))
+            else:
+                if deadline is not None:
+                    short_timeout = min(max(deadline - time.monotonic(), 0), _POLL_TIMEOUT)
                 else:
-                    if deadline is not None:
-                        short_timeout = min(max(deadline - time.monotonic(), 0), _POLL_TIMEOUT)
-                    else:
-                        short_timeout = _POLL_TIMEOUT
-                    conn.set_conn_timeout(short_timeout)
-
-                chunk_length = conn.conn.recv_into(mv[bytes_read:])
-            except BLOCKING_IO_ERRORS:
-                if conn.cancel_context.cancelled:
-                    raise _OperationCancelled("operation cancelled") from None
+                    short_timeout = _POLL_TIMEOUT
+                conn.set_conn_timeout(short_timeout)
+
+            chunk_length = conn.conn.recv_into(mv)
+        except BLOCKING_IO_ERRORS:
+            if conn.cancel_context.cancelled:
+                raise _OperationCancelled("operation cancelled") from None
+            # We reached the true deadline.
+            raise socket.timeout("timed out") from None
+        except socket.timeout:
+            if conn.cancel_context.cancelled:
+                raise _OperationCancelled("operation cancelled") from None
+            if (
+                _PYPY
+                or _WINDOWS
+                or (not conn.is_sdam and deadline is not None and deadline - time.monotonic() < 0)
+            ):
                 # We reached the true deadline.
-                raise socket.timeout("timed out") from None
-            except socket.timeout:
-                if conn.cancel_context.cancelled:
-                    raise _OperationCancelled("operation cancelled") from None
-                if (
-                    _PYPY
-                    or _WINDOWS
-                    or (
-                        not conn.is_sdam
-                        and deadline is not None
-                        and deadline - time.monotonic() < 0
-                    )
-                ):
-                    # We reached the true deadline.
-                    raise
-                continue
-            except OSError as exc:
-                if conn.cancel_context.cancelled:
-                    raise _OperationCancelled("operation cancelled") from None
-                if _errno_from_exception(exc) == errno.EINTR:
-                    continue
                 raise
-            if chunk_length == 0:
-                raise OSError("connection closed")
+            continue
+        except OSError as exc:
+            if conn.cancel_context.cancelled:
+                raise _OperationCancelled("operation cancelled") from None
+            if _errno_from_exception(exc) == errno.EINTR:
+                continue
+            raise
+        if chunk_length == 0:
+            raise OSError("connection closed")
+        return chunk_length
 
-            bytes_read += chunk_length
-    finally:
-        conn.set_conn_timeout(orig_timeout)
 
+def receive_data(
+    conn: Connection,
+    length: int,
+    deadline: Optional[float],
+    buf: Optional[Union[bytearray, memoryview]] = None,
+) -> memoryview:
+    """Read length bytes into buf, or into a new buffer if buf is None.
+
+    The caller restores the connection's timeout.
+    """
+    if buf is None:
+        buf = bytearray(length)
+    mv = memoryview(buf)[:length]
+    bytes_read = 0
+    while bytes_read < length:
+        bytes_read += _receive_into(conn, mv[bytes_read:], deadline)
     return mv
 
 
+# The size of the buffer each connection reads ahead into. Message headers
+# and bodies up to this size are read with as few recv calls as possible.
+_READ_AHEAD_SIZE = 16 * 1024
+
+
+def _receive_buffered(conn: Connection, length: int, deadline: Optional[float]) -> memoryview:
+    """Return a view of the next length bytes, read through the connection's
+    read-ahead buffer. Each recv reads as much as is available, so the
+    header and body of a small reply usually arrive in a single call.
+
+    The view is only valid until the next read on the connection.
+    """
+    net = conn.conn
+    view = net.read_buffer
+    if view is None:
+        view = net.read_buffer = memoryview(bytearray(_READ_AHEAD_SIZE))
+    start, end = net.read_start, net.read_end
+    if end - start < length:
+        # Move the unread bytes to the front to make room.
+        view[: end - start] = bytes(view[start:end])
+        start, end = 0, end - start
+        while end < length:
+            end += _receive_into(conn, view[end:], deadline)
+        net.read_end = end
+    net.read_start = start + length
+    return view[start : start + length]
+
+
+def _receive_body(
+    conn: Connection,
+    length: int,
+    deadline: Optional[float],
+    buffers: Optional[_ReceiveBufferPool],
+) -> tuple[Union[bytes, memoryview], Optional[bytearray]]:
+    """Read a message body of length bytes.
+
+    Returns the body and the buffer drawn from buffers that holds it, if any.
+    """
+    if length <= _READ_AHEAD_SIZE:
+        return bytes(_receive_buffered(conn, length, deadline)), None
+    buf = buffers.acquire(length) if buffers is not None else bytearray(length)
+    mv = memoryview(buf)[:length]
+    # Start with the bytes that were read ahead and read the rest of a large
+    # body directly into its buffer.
+    net = conn.conn
+    buffered = net.read_end - net.read_start
+    if buffered:
+        assert net.read_buffer is not None
+        mv[:buffered] = net.read_buffer[net.read_start : net.read_end]
+    net.read_start = net.read_end = 0
+    receive_data(conn, length - buffered, deadline, mv[buffered:])
+    return mv, buf if buffers is not None else None
+
+
+# Replies smaller than this are cheap to allocate and are not pooled.
+_RECEIVE_BUFFER_MIN_SIZE = 64 * 1024
+# The number of idle buffers kept for each size class, and in total.
+_RECEIVE_BUFFERS_PER_CLASS = 4
+_RECEIVE_BUFFER_MAX_BYTES = 64 * 1024 * 1024
+
+
+def _decompress(data: bytes | memoryview, compressor_id: int, ctx: Any) -> bytes:
+    """Decompress a reply, recording it with an adaptive compression context."""
+    if isinstance(ctx, AdaptiveContext):
+        return ctx.decompress(data, compressor_id)
+    return decompress(data, compressor_id)
+
+
+def _receive_buffer_size(length: int) -> int:
+    """Round length up to its receive buffer size class.
+
+    There are four size classes for each power of two, so a buffer is at
+    most a quarter larger than the reply it was allocated for.
+    """
+    shift = max((length - 1).bit_length() - 3, 0)
+    return -(-length >> shift) << shift
+
+
+class _ReceiveBufferPool:
+    """A bounded pool of reusable buffers for reading large replies.
+
+    Buffers are bytearrays whose size is a size class, see
+    :func:`_receive_buffer_size`, so a buffer can be reused for any reply of
+    its size class. A buffer is only taken back once nothing has a view of
+    it anymore: decoding a reply copies its values out, but raw results, like :class:`~bson.raw_bson.RawBSONDocument` and
+    :class:`~pymongo.cursor.RawBatchCursor` batches, keep a view of the
+    buffer and it is then left to the garbage collector.
+    """
+
+    def __init__(
+        self,
+        min_size: int = _RECEIVE_BUFFER_MIN_SIZE,
+        per_class: int = _RECEIVE_BUFFERS_PER_CLASS,
+        max_bytes: int = _RECEIVE_BUFFER_MAX_BYTES,
+    ):
+        self.min_size = min_size
+        self.per_class = per_class
+        self.max_bytes = max_bytes
+        self._buffers: dict[int, list[bytearray]] = {}
+        self._size = 0
+        self._lock = _create_lock()
+        self.hits = 0
+        self.misses = 0
+        # Buffers that could not be taken back because they were still in
+        # use, or because the pool was full.
+        self.in_use = 0
+        self.discarded = 0
+
+    @property
+    def hit_rate(self) -> float:
+        """The fraction of pooled allocations that reused a buffer."""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self) -> dict[str, Any]:
+        """Return the counters of this pool, for the client's pool_stats()."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hit_rate,
+                "in_use": self.in_use,
+                "discarded": self.discarded,
+                "pooled_bytes": self._size,
+            }
+
+    def acquire(self, length: int) -> bytearray:
+        """Return a buffer of at least length bytes."""
+        if length < self.min_size:
+            return bytearray(length)
+        size_class = _receive_buffer_size(length)
+        with self._lock:
+            buffers = self._buffers.get(size_class)
+            if buffers:
+                self.hits += 1
+                self._size -= size_class
+                return buffers.pop()
+            self.misses += 1
+        return bytearray(size_class)
+
+    def release(self, buf: bytearray) -> None:
+        """Offer a buffer returned by acquire() back to the pool."""
+        size_class = len(buf)
+        if size_class < self.min_size or size_class != _receive_buffer_size(size_class):
+            return
+        # Resizing a bytearray that is exported to a memoryview raises
+        # BufferError. Shrinking by one byte never reallocates.
+        try:
+            buf.pop()
+        except BufferError:
+            with self._lock:
+                self.in_use += 1
+            return
+        buf.append(0)
+        with self._lock:
+            buffers = self._buffers.setdefault(size_class, [])
+            if len(buffers) >= self.per_class or self._size + size_class > self.max_bytes:
+                self.discarded += 1
+                return
+            buffers.append(buf)
+            self._size += size_class
+
+    def clear(self) -> None:
+        """Drop every idle buffer."""
+        with self._lock:
+            self._buffers.clear()
+            self._size = 0
+
+
 class NetworkingInterfaceBase:
     def __init__(self, conn: Any):
         self.conn = conn
@@ -444,6 +669,10 @@ class AsyncNetworkingInterface(NetworkingInterfaceBase):
 class NetworkingInterface(NetworkingInterfaceBase):
     def __init__(self, conn: Union[socket.socket, _sslConn]):
         super().__init__(conn)
+        # The read-ahead buffer and its unread bytes, see _receive_buffered.
+        self.read_buffer: Optional[memoryview] = None
+        self.read_start = 0
+        self.read_end = 0
 
     def gettimeout(self) -> float | None:
         return self.conn.gettimeout()
@@ -482,7 +711,9 @@ class PyMongoProtocol(BufferedProtocol):
         self._compression_header = memoryview(bytearray(9))
         self._compression_index = 0
         self._message: Optional[memoryview] = None
+        self._message_buffer: Optional[bytearray] = None
         self._message_index = 0
+        self._receive_buffers: Optional[_ReceiveBufferPool] = None
         # State. TODO: replace booleans with an enum?
         self._expecting_header = True
         self._expecting_compression = False
@@ -514,15 +745,30 @@ class PyMongoProtocol(BufferedProtocol):
         self.transport = transport  # type: ignore[assignment]
         self.transport.set_write_buffer_limits(MAX_MESSAGE_SIZE, MAX_MESSAGE_SIZE)
 
-    async def write(self, message: bytes) -> None:
-        """Write a message to this connection's transport."""
+    async def write(self, message: Union[bytes, list[bytearray]]) -> None:
+        """Write a message, or the segments of a message, to this connection's transport."""
         if self.transport.is_closing():
             raise OSError("Connection is closed")
-        self.transport.write(message)
+        if isinstance(message, list):
+            self.transport.writelines(message)
+        else:
+            self.transport.write(message)
         self.transport.resume_reading()
 
-    async def read(self, request_id: Optional[int], max_message_size: int) -> tuple[bytes, int]:
-        """Read a single MongoDB Wire Protocol message from this connection."""
+    async def read(
+        self,
+        request_id: Optional[int],
+        max_message_size: int,
+        receive_buffers: Optional[_ReceiveBufferPool] = None,
+        compression_context: Any = None,
+    ) -> tuple[bytes | memoryview, int, Optional[bytearray]]:
+        """Read a single MongoDB Wire Protocol message from this connection.
+
+        Returns the message body, its op code, and the buffer that holds the
+        body, if it was drawn from receive_buffers. Compressed replies are
+        recorded by an adaptive ``compression_context``.
+        """
+        self._receive_buffers = receive_buffers
         if self.transport:
             try:
                 self.transport.resume_reading()
@@ -543,7 +789,7 @@ class PyMongoProtocol(BufferedProtocol):
                 if read_waiter in self._done_messages:
                     self._done_messages.remove(read_waiter)
         if message:
-            op_code, compressor_id, response_to, data = message
+            op_code, compressor_id, response_to, data, buf = message
             # No request_id for exhaust cursor "getMore".
             if request_id is not None:
                 if request_id != response_to:
@@ -551,8 +797,13 @@ class PyMongoProtocol(BufferedProtocol):
                         f"Got response id {response_to!r} but expected {request_id!r}"
                     )
             if compressor_id is not None:
-                data = decompress(data, compressor_id)
-            return data, op_code
+                compressed = data
+                data = _decompress(compressed, compressor_id, compression_context)
+                compressed.release()
+                if receive_buffers is not None and buf is not None:
+                    receive_buffers.release(buf)
+                buf = None
+            return data, op_code, buf
         raise OSError("connection closed")
 
     def get_buffer(self, sizehint: int) -> memoryview:
@@ -598,7 +849,11 @@ class PyMongoProtocol(BufferedProtocol):
                 except ProtocolError as exc:
                     self.close(exc)
                     return
-                self._message = memoryview(bytearray(self._message_size))
+                if self._receive_buffers is not None:
+                    self._message_buffer = self._receive_buffers.acquire(self._message_size)
+                else:
+                    self._message_buffer = bytearray(self._message_size)
+                self._message = memoryview(self._message_buffer)[: self._message_size]
             return
         if self._expecting_compression:
             self._compression_index += nbytes
@@ -622,7 +877,13 @@ class PyMongoProtocol(BufferedProtocol):
                 return
             # Necessary values to reconstruct and verify message
             result.set_result(
-                (self._op_code, self._compressor_id, self._response_to, self._message)
+                (
+                    self._op_code,
+                    self._compressor_id,
+                    self._response_to,
+                    self._message,
+                    self._message_buffer,
+                )
             )
             self._done_messages.append(result)
             # Reset internal state to expect a new message
@@ -631,6 +892,7 @@ class PyMongoProtocol(BufferedProtocol):
             self._message_index = 0
             self._message_size = 0
             self._message = None
+            self._message_buffer = None
             self._op_code = 0
             self._compressor_id = None
             self._response_to = None
@@ -687,7 +949,7 @@ class PyMongoProtocol(BufferedProtocol):
         await self._closed
 
 
-async def async_sendall(conn: PyMongoProtocol, buf: bytes) -> None:
+async def async_sendall(conn: PyMongoProtocol, buf: Union[bytes, list[bytearray]]) -> None:
     try:
         await asyncio.wait_for(conn.write(buf), timeout=conn.gettimeout)
     except asyncio.TimeoutError as exc:
@@ -716,8 +978,14 @@ async def async_receive_message(
         # timeouts on AWS Lambda and other FaaS environments.
         timeout = max(deadline - time.monotonic(), 0)
 
+    # The previous reply on this connection has been handled by now.
+    conn.release_reply_buffer()
     cancellation_task = create_task(_poll_cancellation(conn))
-    read_task = create_task(conn.conn.get_conn.read(request_id, max_message_size))
+    read_task = create_task(
+        conn.conn.get_conn.read(
+            request_id, max_message_size, conn.receive_buffers, conn.compression_context
+        )
+    )
     tasks = [read_task, cancellation_task]
     try:
         done, pending = await asyncio.wait(
@@ -730,7 +998,7 @@ async def async_receive_message(
         if len(done) == 0:
             raise socket.timeout("timed out")
         if read_task in done:
-            data, op_code = read_task.result()
+            data, op_code, conn.reply_buffer = read_task.result()
             try:
                 unpack_reply = _UNPACK_REPLY[op_code]
             except KeyError:
@@ -758,27 +1026,42 @@ def receive_message(
             deadline = time.monotonic() + timeout
         else:
             deadline = None
-    # Ignore the response's request id.
-    length, _, response_to, op_code = _UNPACK_HEADER(receive_data(conn, 16, deadline))
-    # No request_id for exhaust cursor "getMore".
-    if request_id is not None:
-        if request_id != response_to:
-            raise ProtocolError(f"Got response id {response_to!r} but expected {request_id!r}")
-    if length <= 16:
-        raise ProtocolError(
-            f"Message length ({length!r}) not longer than standard message header size (16)"
-        )
-    if length > max_message_size:
-        raise ProtocolError(
-            f"Message length ({length!r}) is larger than server max "
-            f"message size ({max_message_size!r})"
-        )
     data: memoryview | bytes
-    if op_code == 2012:
-        op_code, _, compressor_id = _UNPACK_COMPRESSION_HEADER(receive_data(conn, 9, deadline))
-        data = decompress(receive_data(conn, length - 25, deadline), compressor_id)
-    else:
-        data = receive_data(conn, length - 16, deadline)
+    buffers = conn.receive_buffers
+    # The previous reply on this connection has been handled by now.
+    conn.release_reply_buffer()
+    # Restore the timeout once the whole message has been read, rather than
+    # after each read.
+    orig_timeout = conn.conn.gettimeout()
+    try:
+        # Ignore the response's request id.
+        length, _, response_to, op_code = _UNPACK_HEADER(_receive_buffered(conn, 16, deadline))
+        # No request_id for exhaust cursor "getMore".
+        if request_id is not None:
+            if request_id != response_to:
+                raise ProtocolError(f"Got response id {response_to!r} but expected {request_id!r}")
+        if length <= 16:
+            raise ProtocolError(
+                f"Message length ({length!r}) not longer than standard message header size (16)"
+            )
+        if length > max_message_size:
+            raise ProtocolError(
+                f"Message length ({length!r}) is larger than server max "
+                f"message size ({max_message_size!r})"
+            )
+        if op_code == 2012:
+            op_code, _, compressor_id = _UNPACK_COMPRESSION_HEADER(
+                _receive_buffered(conn, 9, deadline)
+            )
+            compressed, buf = _receive_body(conn, length - 25, deadline, buffers)
+            data = _decompress(compressed, compressor_id, conn.compression_context)
+            if buffers is not None and buf is not None:
+                compressed.release()  # type: ignore[union-attr]
+                buffers.release(buf)
+        else:
+            data, conn.reply_buffer = _receive_body(conn, length - 16, deadline, buffers)
+    finally:
+        conn.set_conn_timeout(orig_timeout)
 
     try:
         unpack_reply = _UNPACK_REPLY[op_code]
@@ -241,7 +241,7 @@ class _Bulk:
         bwc: _BulkWriteContext,
         cmd: MutableMapping[str, Any],
         request_id: int,
-        msg: bytes,
+        msg: Union[bytes, list[bytearray]],
         docs: list[Mapping[str, Any]],
         client: MongoClient[Any],
     ) -> dict[str, Any]:
@@ -261,7 +261,7 @@ class _Bulk:
         bwc: _BulkWriteContext,
         cmd: MutableMapping[str, Any],
         request_id: int,
-        msg: bytes,
+        msg: Union[bytes, list[bytearray]],
         max_doc_size: int,
         docs: list[Mapping[str, Any]],
         client: MongoClient[Any],
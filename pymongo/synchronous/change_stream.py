@@ -21,6 +21,7 @@ from collections.abc import Mapping
 from typing import TYPE_CHECKING, Any, Generic, Optional, Union
 
 from bson import CodecOptions, _bson_to_dict
+from bson._dataclass_codec import _document_plan
 from bson.raw_bson import RawBSONDocument
 from bson.timestamp import Timestamp
 from pymongo import _csot, common
@@ -130,7 +131,12 @@ class ChangeStream(Generic[_DocumentType]):
 
         self._decode_custom = False
         self._orig_codec_options: CodecOptions[_DocumentType] = target.codec_options
-        if target.codec_options.type_registry._decoder_map:
+        type_registry = target.codec_options.type_registry
+        if (
+            type_registry._decoder_map
+            or type_registry._document_decoder
+            or _document_plan(target.codec_options.document_class) is not None
+        ):
             self._decode_custom = True
             # Keep the type registry so that we support encoding custom types
             # in the pipeline.
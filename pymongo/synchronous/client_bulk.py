@@ -231,7 +231,7 @@ class _ClientBulk:
         bwc: _ClientBulkWriteContext,
         cmd: MutableMapping[str, Any],
         request_id: int,
-        msg: Union[bytes, dict[str, Any]],
+        msg: Union[bytes, list[bytearray], dict[str, Any]],
         op_docs: list[Mapping[str, Any]],
         ns_docs: list[Mapping[str, Any]],
         client: MongoClient[Any],
@@ -258,7 +258,7 @@ class _ClientBulk:
         bwc: _ClientBulkWriteContext,
         cmd: MutableMapping[str, Any],
         request_id: int,
-        msg: bytes,
+        msg: Union[bytes, list[bytearray]],
         op_docs: list[Mapping[str, Any]],
         ns_docs: list[Mapping[str, Any]],
         client: MongoClient[Any],
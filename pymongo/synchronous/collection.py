@@ -950,21 +950,27 @@ class Collection(common.BaseObject, Generic[_DocumentType]):
             or not documents
         ):
             raise TypeError("documents must be a non-empty list")
-        inserted_ids: list[ObjectId] = []
+        documents_with_ids: list[Any] = []
 
         def gen() -> Iterator[tuple[int, Mapping[str, Any]]]:
-            """A generator that validates documents and handles _ids."""
+            """A generator that validates documents."""
             for document in documents:
                 common.validate_is_document_type("document", document)
                 if not isinstance(document, RawBSONDocument):
-                    if "_id" not in document:
-                        document["_id"] = ObjectId()  # type: ignore[index]
-                    inserted_ids.append(document["_id"])
+                    documents_with_ids.append(document)
                 yield (message._INSERT, document)
 
         write_concern = self._write_concern_for(session)
         blk = _Bulk(self, ordered, bypass_document_validation, comment=comment)
         blk.ops = list(gen())
+        # Generate the missing _ids in one batch.
+        missing_ids = [document for document in documents_with_ids if "_id" not in document]
+        oids = iter(ObjectId.batch(len(missing_ids)))
+        for document in missing_ids:
+            # The same document may be inserted more than once.
+            if "_id" not in document:
+                document["_id"] = next(oids)
+        inserted_ids: list[ObjectId] = [document["_id"] for document in documents_with_ids]
         blk.execute(write_concern, session, _Op.INSERT)
         return InsertManyResult(inserted_ids, write_concern.acknowledged)
 
@@ -30,7 +30,7 @@ from typing import (
     overload,
 )
 
-from bson import RE_TYPE, _convert_raw_document_lists_to_streams
+from bson import RE_TYPE, _convert_raw_document_lists_to_streams, decode_columns
 from bson.code import Code
 from bson.son import SON
 from pymongo import helpers_shared
@@ -962,6 +962,47 @@ class Cursor(_CursorBase[_DocumentType]):
 
         return self._collection.distinct(key, session=self._session, **options)
 
+    def to_columns(self, schema: Mapping[str, Any]) -> dict[str, Any]:
+        """Decode fields of all documents in the result set of this query
+        into NumPy arrays.
+
+        The query is run as a raw batch query (see
+        :meth:`~pymongo.collection.Collection.find_raw_batches`)
+        and :func:`bson.decode_columns` decodes the requested fields of each
+        batch directly into the arrays, without creating a document for each
+        result. For example::
+
+          >>> columns = coll.find({}, {"x": 1, "y": 1}).to_columns({"x": "int64", "y": "float64"})
+          >>> columns["x"].tolist()
+          [1, 2, 3]
+
+        Requires `NumPy <https://numpy.org>`_ to be installed. This cursor must
+        not have been iterated yet, and it is left unevaluated.
+
+        :param schema: A mapping of top-level field names to column types. See
+            :func:`bson.decode_columns`.
+
+        .. versionadded:: 4.18
+        """
+        self._check_okay_to_chain()
+        if self._session and not self._session._implicit:
+            session = self._session
+        else:
+            session = None
+        raw = self._clone(False, base=RawBatchCursor(self._collection, session=session))
+        # Decode each batch as it arrives, rather than holding every raw batch.
+        parts = [decode_columns(batch, schema) for batch in raw]
+        if not parts:
+            return decode_columns(b"", schema)
+        if len(parts) == 1:
+            return parts[0]
+        import numpy as np
+
+        return {
+            name: np.ma.concatenate([part[name] for part in parts])  # type: ignore[no-untyped-call]
+            for name in schema
+        }
+
     def _send_message(self, operation: Union[_Query, _GetMore]) -> None:
         """Send a query or getmore operation and handles the response.
 
@@ -624,6 +624,10 @@ class Topology:
         """
         return self._servers.get(address)
 
+    def pool_stats(self) -> dict[_Address, dict[str, Any]]:
+        """Return the statistics of the pool of each server, by address."""
+        return {address: server.pool.stats() for address, server in list(self._servers.items())}
+
     def has_server(self, address: _Address) -> bool:
         return address in self._servers
 
@@ -60,6 +60,7 @@ URI_OPTIONS = frozenset(
         "authMechanismProperties",
         "authSource",
         "compressors",
+        "compressionMinSize",
         "connectTimeoutMS",
         "directConnection",
         "heartbeatFrequencyMS",
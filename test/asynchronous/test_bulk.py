@@ -19,6 +19,7 @@ from __future__ import annotations
 import sys
 import uuid
 from typing import Any, Optional
+from unittest.mock import patch
 
 from pymongo.asynchronous.mongo_client import AsyncMongoClient
 
@@ -27,13 +28,20 @@ sys.path[0:0] = [""]
 from bson.binary import Binary, UuidRepresentation
 from bson.codec_options import CodecOptions
 from bson.objectid import ObjectId
+from pymongo.asynchronous import pool
 from pymongo.asynchronous.collection import AsyncCollection
 from pymongo.common import partition_node
-from pymongo.errors import BulkWriteError, ConfigurationError, InvalidOperation, OperationFailure
+from pymongo.errors import (
+    AutoReconnect,
+    BulkWriteError,
+    ConfigurationError,
+    InvalidOperation,
+    OperationFailure,
+)
 from pymongo.operations import *
 from pymongo.write_concern import WriteConcern
 from test.asynchronous import AsyncIntegrationTest, async_client_context, remove_all_users, unittest
-from test.utils_shared import async_wait_until
+from test.utils_shared import OvertCommandListener, async_wait_until
 
 _IS_SYNC = False
 
@@ -893,6 +901,62 @@ class AsyncTestBulkUnacknowledged(AsyncBulkTestBase):
 
         await async_wait_until(predicate, 'removed {"_id": 1}')
 
+    async def _unacknowledged_insert_many(self, listener, writes, docs, fail_send=False):
+        """Insert docs unordered with w=0, and record the (started, succeeded)
+        event counts at each write of a command in flight in writes.
+        """
+        client = await self.async_rs_or_single_client(event_listeners=[listener])
+        coll_w0 = client[self.db.name].test.with_options(write_concern=WriteConcern(w=0))
+        sendall = pool.async_sendall
+
+        async def recording_sendall(conn, buf):
+            started, succeeded = len(listener.started_events), len(listener.succeeded_events)
+            # Monitor heartbeats publish no command events.
+            if started > succeeded + len(listener.failed_events):
+                writes.append((started, succeeded))
+                if fail_send:
+                    raise OSError("connection reset")
+            await sendall(conn, buf)
+
+        listener.reset()
+        with patch.object(pool, "async_sendall", recording_sendall):
+            await coll_w0.insert_many(docs, ordered=False)
+
+    async def test_unacknowledged_batches_publish_events_in_order(self):
+        listener, writes = OvertCommandListener(), []
+        n_docs = await async_client_context.max_write_batch_size + 1
+        await self._unacknowledged_insert_many(listener, writes, [{} for _ in range(n_docs)])
+        # Each batch is written after its started event, and succeeds before
+        # the next batch starts.
+        self.assertEqual([(1, 0), (2, 1)], writes)
+        self.assertEqual(["insert", "insert"], [e.command_name for e in listener.started_events])
+        self.assertEqual(
+            [e.request_id for e in listener.started_events],
+            [e.request_id for e in listener.succeeded_events],
+        )
+        self.assertEqual([], listener.failed_events)
+
+        async def predicate():
+            return await self.coll.count_documents({}) == n_docs
+
+        await async_wait_until(predicate, f"insert {n_docs} documents")
+
+    async def test_unacknowledged_batch_publishes_failure_when_send_fails(self):
+        listener, writes = OvertCommandListener(), []
+        n_docs = await async_client_context.max_write_batch_size + 1
+        with self.assertRaises(AutoReconnect):
+            await self._unacknowledged_insert_many(
+                listener, writes, [{} for _ in range(n_docs)], fail_send=True
+            )
+        # The first failed write stops the bulk.
+        self.assertEqual([(1, 0)], writes)
+        self.assertEqual(["insert"], [e.command_name for e in listener.started_events])
+        self.assertEqual([], listener.succeeded_events)
+        self.assertEqual(
+            [e.request_id for e in listener.started_events],
+            [e.request_id for e in listener.failed_events],
+        )
+
 
 class AsyncTestBulkAuthorization(AsyncBulkAuthorizationTestBase):
     async def test_readonly(self):
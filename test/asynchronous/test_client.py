@@ -685,6 +685,26 @@ class AsyncClientUnitTest(AsyncUnitTest):
         )
         self.assertTrue(c.options.enable_overload_retargeting)
 
+    async def test_compression_min_size(self):
+        # Assert that adaptive compression is off unless a minimum size is set.
+        c = self.simple_client(connect=False)
+        self.assertIsNone(c.options.pool_options._compression_settings.min_size)
+
+        c = self.simple_client(connect=False, compressionMinSize=1024)
+        self.assertEqual(c.options.pool_options._compression_settings.min_size, 1024)
+
+        c = self.simple_client(host="mongodb://localhost/?compressionMinSize=1024", connect=False)
+        self.assertEqual(c.options.pool_options._compression_settings.min_size, 1024)
+
+        # A minimum size of 0 is rejected rather than treated as unset.
+        with self.assertRaises(ValueError):
+            self.simple_client(connect=False, compressionMinSize=0)
+        with self.assertWarns(UserWarning):
+            c = self.simple_client(host="mongodb://localhost/?compressionMinSize=0", connect=False)
+        self.assertIsNone(c.options.pool_options._compression_settings.min_size)
+        # An unconnected client has no pools.
+        self.assertEqual({}, c.pool_stats())
+
 
 class TestClient(AsyncIntegrationTest):
     def test_multiple_uris(self):
@@ -1727,6 +1747,21 @@ class TestClient(AsyncIntegrationTest):
 
         self.assertIn("heartbeatFrequencyMS", str(context.exception))
 
+    async def test_pool_stats(self):
+        client = await self.async_rs_or_single_client()
+        await client.admin.command("ping")
+        stats = client.pool_stats()
+        self.assertEqual(set(client.topology_description.server_descriptions()), set(stats))
+        for server_stats in stats.values():
+            self.assertIsNone(server_stats["compression"])
+            if server_stats["receive_buffers"] is not None:
+                self.assertIn("hit_rate", server_stats["receive_buffers"])
+
+        client = await self.async_rs_or_single_client(compressors="zlib", compressionMinSize=1)
+        await client.admin.command("ping")
+        for server_stats in client.pool_stats().values():
+            self.assertIsInstance(server_stats["compression"], dict)
+
     async def test_compression(self):
         def compression_settings(client):
             pool_options = client.options.pool_options
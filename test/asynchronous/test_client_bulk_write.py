@@ -24,9 +24,11 @@ sys.path[0:0] = [""]
 from unittest.mock import patch
 
 import pymongo
+from pymongo.asynchronous import pool
 from pymongo.asynchronous.client_bulk import _AsyncClientBulk
 from pymongo.encryption_options import _HAVE_PYMONGOCRYPT, AutoEncryptionOpts
 from pymongo.errors import (
+    AutoReconnect,
     ClientBulkWriteException,
     DocumentTooLarge,
     InvalidOperation,
@@ -623,6 +625,65 @@ class TestClientBulkWriteCRUD(AsyncIntegrationTest):
             await collection.count_documents({}),
         )
 
+    async def _unacknowledged_bulk_write(self, listener, writes, models, fail_send=False):
+        """Run models unordered with w=0, and record the (started, succeeded)
+        event counts at each write of a command in flight in writes.
+        """
+        client = await self.async_rs_or_single_client(event_listeners=[listener])
+        self.addAsyncCleanup(client.db["coll"].drop)
+        sendall = pool.async_sendall
+
+        async def recording_sendall(conn, buf):
+            started, succeeded = len(listener.started_events), len(listener.succeeded_events)
+            # Monitor heartbeats publish no command events.
+            if started > succeeded + len(listener.failed_events):
+                writes.append((started, succeeded))
+                if fail_send:
+                    raise OSError("connection reset")
+            await sendall(conn, buf)
+
+        listener.reset()
+        with patch.object(pool, "async_sendall", recording_sendall):
+            await client.bulk_write(models, ordered=False, write_concern=WriteConcern(w=0))
+
+    @async_client_context.require_version_min(8, 0, 0, -24)
+    async def test_unacknowledged_batches_publish_events_in_order(self):
+        listener, writes = OvertCommandListener(), []
+        models = [
+            InsertOne(namespace="db.coll", document={"a": "b"})
+            for _ in range(self.max_write_batch_size + 1)
+        ]
+        await self._unacknowledged_bulk_write(listener, writes, models)
+        # Each batch is written after its started event, and succeeds before
+        # the next batch starts.
+        self.assertEqual([(1, 0), (2, 1)], writes)
+        self.assertEqual(
+            ["bulkWrite", "bulkWrite"], [e.command_name for e in listener.started_events]
+        )
+        self.assertEqual(
+            [e.request_id for e in listener.started_events],
+            [e.request_id for e in listener.succeeded_events],
+        )
+        self.assertEqual([], listener.failed_events)
+
+    @async_client_context.require_version_min(8, 0, 0, -24)
+    async def test_unacknowledged_batch_publishes_failure_when_send_fails(self):
+        listener, writes = OvertCommandListener(), []
+        models = [
+            InsertOne(namespace="db.coll", document={"a": "b"})
+            for _ in range(self.max_write_batch_size + 1)
+        ]
+        with self.assertRaises(AutoReconnect):
+            await self._unacknowledged_bulk_write(listener, writes, models, fail_send=True)
+        # The first failed write stops the bulk.
+        self.assertEqual([(1, 0)], writes)
+        self.assertEqual(["bulkWrite"], [e.command_name for e in listener.started_events])
+        self.assertEqual([], listener.succeeded_events)
+        self.assertEqual(
+            [e.request_id for e in listener.started_events],
+            [e.request_id for e in listener.failed_events],
+        )
+
 
 # https://github.com/mongodb/specifications/blob/master/source/client-side-operations-timeout/tests/README.md#11-multi-batch-bulkwrites
 class TestClientBulkWriteCSOT(AsyncIntegrationTest):
@@ -31,7 +31,7 @@ from test.asynchronous.utils import async_get_pool, async_is_mongos
 
 sys.path[0:0] = [""]
 
-from bson import encode
+from bson import DocumentTemplate, encode
 from bson.codec_options import CodecOptions
 from bson.objectid import ObjectId
 from bson.raw_bson import RawBSONDocument
@@ -798,6 +798,18 @@ class AsyncTestCollection(AsyncIntegrationTest):
         self.assertFalse(result.acknowledged)
         self.assertEqual(20, await db.test.count_documents({}))
 
+    async def test_insert_document_template(self):
+        coll = self.db.test
+        await coll.drop()
+        template = DocumentTemplate(["_id", "x"], [int, str])
+        result = await coll.insert_many([template.document((i, "foo")) for i in range(5)])
+        self.assertEqual([], result.inserted_ids)
+        await coll.bulk_write([InsertOne(template.document((5, "bar")))])
+        self.assertEqual(
+            [{"_id": i, "x": "foo"} for i in range(5)] + [{"_id": 5, "x": "bar"}],
+            await coll.find().sort("_id").to_list(),
+        )
+
     async def test_insert_many_generator(self):
         coll = self.db.test
         await coll.delete_many({})
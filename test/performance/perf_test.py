@@ -58,7 +58,7 @@ except ImportError:
 
 sys.path[0:0] = [""]
 
-from bson import decode, encode, json_util
+from bson import DocumentTemplate, decode, encode, json_util
 from gridfs import GridFSBucket
 from pymongo import (
     DeleteOne,
@@ -238,6 +238,20 @@ class BsonEncodingTest(MicroTest):
             encode(self.document)
 
 
+class BsonTemplateEncodingTest(BsonEncodingTest):
+    def setUp(self):
+        super().setUp()
+        self.template = DocumentTemplate(
+            list(self.document), [type(value) for value in self.document.values()]
+        )
+        self.values = tuple(self.document.values())
+
+    def do_task(self):
+        encode = self.template.encode
+        for _ in range(NUM_DOCS):
+            encode(self.values)
+
+
 class BsonDecodingTest(MicroTest):
     def setUp(self):
         super().setUp()
@@ -257,10 +271,18 @@ class TestFlatDecoding(BsonDecodingTest, unittest.TestCase):
     dataset = "flat_bson.json"
 
 
+class TestFlatTemplateEncoding(BsonTemplateEncodingTest, unittest.TestCase):
+    dataset = "flat_bson.json"
+
+
 class TestDeepEncoding(BsonEncodingTest, unittest.TestCase):
     dataset = "deep_bson.json"
 
 
+class TestDeepTemplateEncoding(BsonTemplateEncodingTest, unittest.TestCase):
+    dataset = "deep_bson.json"
+
+
 class TestDeepDecoding(BsonDecodingTest, unittest.TestCase):
     dataset = "deep_bson.json"
 
@@ -299,6 +321,16 @@ class JsonDecodingTest(MicroTest):
             json_util.loads(self.document)
 
 
+class PythonJsonTest(MicroTest):
+    """Measure the pure Python json_util implementation."""
+
+    def setUp(self):
+        super().setUp()
+        use_c = json_util._USE_C
+        json_util._USE_C = False
+        self.addCleanup(setattr, json_util, "_USE_C", use_c)
+
+
 class TestJsonFlatEncoding(JsonEncodingTest, unittest.TestCase):
     dataset = "flat_bson.json"
 
@@ -323,6 +355,30 @@ class TestJsonFullDecoding(JsonDecodingTest, unittest.TestCase):
     dataset = "full_bson.json"
 
 
+class TestJsonFlatEncodingPython(PythonJsonTest, JsonEncodingTest, unittest.TestCase):
+    dataset = "flat_bson.json"
+
+
+class TestJsonFlatDecodingPython(PythonJsonTest, JsonDecodingTest, unittest.TestCase):
+    dataset = "flat_bson.json"
+
+
+class TestJsonDeepEncodingPython(PythonJsonTest, JsonEncodingTest, unittest.TestCase):
+    dataset = "deep_bson.json"
+
+
+class TestJsonDeepDecodingPython(PythonJsonTest, JsonDecodingTest, unittest.TestCase):
+    dataset = "deep_bson.json"
+
+
+class TestJsonFullEncodingPython(PythonJsonTest, JsonEncodingTest, unittest.TestCase):
+    dataset = "full_bson.json"
+
+
+class TestJsonFullDecodingPython(PythonJsonTest, JsonDecodingTest, unittest.TestCase):
+    dataset = "full_bson.json"
+
+
 # SINGLE-DOC BENCHMARKS
 class TestRunCommand(PerformanceTest, unittest.TestCase):
     data_size = len(encode({"hello": True})) * NUM_DOCS
@@ -451,6 +507,19 @@ class TestSmallDocBulkInsert(SmallDocInsertTest, unittest.TestCase):
         self.corpus.insert_many(self.documents, ordered=True)
 
 
+class TestSmallDocTemplateBulkInsert(SmallDocInsertTest, unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.template = DocumentTemplate(
+            list(self.document), [type(value) for value in self.document.values()]
+        )
+        self.rows = [tuple(doc.values()) for doc in self.documents]
+
+    def do_task(self):
+        document = self.template.document
+        self.corpus.insert_many([document(row) for row in self.rows], ordered=True)
+
+
 class TestSmallDocCollectionBulkInsert(SmallDocInsertTest, unittest.TestCase):
     def setUp(self):
         super().setUp()
@@ -19,6 +19,7 @@ from __future__ import annotations
 
 import array
 import collections
+import copy
 import datetime
 import importlib.util
 import mmap
@@ -30,7 +31,10 @@ import sys
 import tempfile
 import uuid
 from collections import OrderedDict, abc
+from dataclasses import dataclass, field
 from io import BytesIO
+from typing import Optional
+from unittest.mock import patch
 
 sys.path[0:0] = [""]
 
@@ -44,9 +48,14 @@ from bson import (
     _datetime_to_millis,
     decode,
     decode_all,
+    decode_columns,
     decode_file_iter,
     decode_iter,
+    decode_mmap_iter,
+    decode_vectors,
     encode,
+    encode_into,
+    encoded_size,
     is_valid,
     json_util,
 )
@@ -56,16 +65,21 @@ from bson.binary import (
     BinaryVector,
     BinaryVectorDtype,
     UuidRepresentation,
+    vectors_from_2d,
+    vectors_to_2d,
 )
 from bson.code import Code
-from bson.codec_options import CodecOptions, DatetimeConversion
+from bson.codec_options import CodecOptions, DatetimeConversion, TypeEncoder, TypeRegistry
 from bson.datetime_ms import _DATETIME_ERROR_SUGGESTION
 from bson.dbref import DBRef
+from bson.decimal128 import Decimal128
 from bson.errors import InvalidBSON, InvalidDocument
 from bson.int64 import Int64
 from bson.max_key import MaxKey
 from bson.min_key import MinKey
 from bson.objectid import ObjectId
+from bson.raw_bson import RawBSONDocument
+from bson.record import Record
 from bson.son import SON
 from bson.timestamp import Timestamp
 from bson.tz_util import FixedOffset, utc
@@ -108,6 +122,28 @@ class NotADict(abc.MutableMapping):
         return "NotADict(%s)" % repr(self._dict)
 
 
+@dataclass
+class Item:
+    sku: str
+    qty: int = 1
+
+
+@dataclass
+class Order:
+    _id: int
+    items: list[Item]
+    shipping: Optional[Item] = None
+    meta: dict = field(default_factory=dict)
+    total: int = field(default=0, init=False)
+
+
+@dataclass
+class Node:
+    name: str
+    children: list[Node] = field(default_factory=list)
+    parent: Optional[Node] = None
+
+
 class DSTAwareTimezone(datetime.tzinfo):
     def __init__(self, offset, name, dst_start_month, dst_end_month):
         self.__offset = offset
@@ -342,6 +378,313 @@ class TestBSON(unittest.TestCase):
             mm.seek(0)
             self.assertEqual(doc, decode(mm))
 
+    def test_decode_fields(self):
+        doc = {
+            "_id": 1,
+            "a": "foo",
+            "b": {"c": 2, "d": [1, 2]},
+            "e": [{"c": 1, "x": 2}, 5, {"y": 1}],
+            "f": 1.5,
+        }
+        bs = encode(doc)
+        self.assertEqual({"a": "foo"}, decode(bs, fields=["a"]))
+        self.assertEqual({"_id": 1, "f": 1.5}, decode(bs, fields=("f", "_id")))
+        self.assertEqual({"b": {"c": 2}}, decode(bs, fields=["b.c"]))
+        self.assertEqual({"b": doc["b"]}, decode(bs, fields=["b.c", "b"]))
+        self.assertEqual({"b": doc["b"]}, decode(bs, fields=["b", "b.c"]))
+        # Only documents in an array are kept, like a server projection.
+        self.assertEqual({"e": [{"c": 1}, {}]}, decode(bs, fields=["e.c"]))
+        # A dotted name into a value that is not a document is omitted.
+        self.assertEqual({}, decode(bs, fields=["a.b", "missing"]))
+        self.assertEqual({}, decode(bs, fields=[]))
+        self.assertEqual(doc, decode(bs, fields=doc))
+
+        opts = CodecOptions(document_class=SON)
+        result = decode(bs, opts, fields=["b.c", "a"])
+        self.assertIsInstance(result, SON)
+        self.assertIsInstance(result["b"], SON)
+        self.assertEqual(SON([("a", "foo"), ("b", SON([("c", 2)]))]), result)
+
+        dbref = encode({"ref": DBRef("coll", 1, foo="bar"), "x": 1})
+        self.assertEqual({"ref": DBRef("coll", 1)}, decode(dbref, fields=["ref.$ref", "ref.$id"]))
+
+        docs = [doc, {"a": "bar", "b": 1}]
+        bs = b"".join(map(encode, docs))  # type: ignore[arg-type]
+        expected = [{"a": "foo", "b": {"c": 2}}, {"a": "bar"}]
+        self.assertEqual(expected, decode_all(bs, fields=["a", "b.c"]))
+        self.assertEqual(expected, decode_all(memoryview(bs), opts, ["a", "b.c"]))
+        self.assertEqual(expected, list(decode_iter(bs, fields=["a", "b.c"])))
+        self.assertEqual(expected, list(decode_file_iter(BytesIO(bs), fields=["a", "b.c"])))
+
+    def test_decode_fields_skips_other_values(self):
+        # An unrequested value that cannot be decoded is skipped.
+        bs = encode({"a": 1, "b": datetime.datetime(2020, 1, 1)})
+        bs = bs.replace(b"\x09b\x00" + bs[-9:-1], b"\x09b\x00" + b"\xff" * 7 + b"\x7f")
+        opts = CodecOptions(datetime_conversion=DatetimeConversion.DATETIME)
+        with self.assertRaises(InvalidBSON):
+            decode(bs, opts)
+        self.assertEqual({"a": 1}, decode(bs, opts, fields=["a"]))
+        # Element lengths are still validated.
+        with self.assertRaises(InvalidBSON):
+            decode(encode({"a": 1, "b": "foo"})[:-3] + b"\x00\x00", fields=["a"])
+
+    def test_decode_fields_errors(self):
+        bs = encode({"a": 1})
+        with self.assertRaises(TypeError):
+            decode(bs, fields="a")
+        with self.assertRaises(TypeError):
+            decode(bs, fields=[1])
+        with self.assertRaises(ValueError):
+            decode(bs, CodecOptions(document_class=RawBSONDocument), fields=["a"])
+        with self.assertRaises(ValueError):
+            decode_all(bs, CodecOptions(document_class=RawBSONDocument), fields=["a"])
+
+    def test_decode_all_workers(self):
+        docs = [{"_id": i, "s": "x" * (i % 7), "sub": {"n": [i] * (i % 3)}} for i in range(100)]
+        data = b"".join(map(encode, docs))
+        for workers in (1, 2, 3, 8, 200):
+            self.assertEqual(docs, decode_all(data, workers=workers))
+            self.assertEqual(docs, decode_all(memoryview(data), workers=workers))
+        self.assertEqual([], decode_all(b"", workers=4))
+        self.assertEqual(
+            [{"_id": i} for i in range(100)], decode_all(data, fields=["_id"], workers=4)
+        )
+        opts = CodecOptions(document_class=SON)
+        self.assertEqual(docs, decode_all(data, opts, workers=4))
+        self.assertIsInstance(decode_all(data, opts, workers=4)[-1], SON)
+        raw = decode_all(data, CodecOptions(document_class=RawBSONDocument), workers=4)
+        self.assertEqual(docs, [decode(doc.raw) for doc in raw])
+
+    def test_decode_all_workers_errors(self):
+        data = b"".join(encode({"_id": i}) for i in range(10))
+        for workers in (0, -1):
+            with self.assertRaises(ValueError):
+                decode_all(data, workers=workers)
+        for workers in (1.5, "2", True):
+            with self.assertRaises(TypeError):
+                decode_all(data, workers=workers)  # type: ignore[arg-type]
+        # Invalid data in any part is reported.
+        with self.assertRaises(InvalidBSON):
+            decode_all(data[:-1], workers=4)
+        with self.assertRaises(InvalidBSON):
+            decode_all(data[:20] + b"\xff\xff\xff\x7f" + data[24:], workers=4)
+        with self.assertRaises(InvalidBSON):
+            decode_all(data + b"\x05\x00", workers=4)
+
+    def _bson_file(self, data):
+        fd, path = tempfile.mkstemp()
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        self.addCleanup(os.remove, path)
+        return path
+
+    def test_decode_mmap_iter(self):
+        docs = [{"_id": i, "s": "x" * (i % 7), "sub": {"n": [i] * (i % 3)}} for i in range(100)]
+        path = self._bson_file(b"".join(map(encode, docs)))
+        # Use small regions so that the file is decoded in several parts.
+        with patch.object(bson, "_MMAP_REGION_SIZE", 100):
+            for workers in (None, 1, 2, 8):
+                self.assertEqual(docs, list(decode_mmap_iter(path, workers=workers)))
+            self.assertEqual(
+                [{"_id": i} for i in range(100)], list(decode_mmap_iter(path, fields=["_id"]))
+            )
+            opts = CodecOptions(document_class=SON)
+            son_docs = list(decode_mmap_iter(path, opts, workers=4))
+            self.assertEqual(docs, son_docs)
+            self.assertIsInstance(son_docs[-1], SON)
+            # Stopping early cancels the remaining regions.
+            it = decode_mmap_iter(path, workers=4)
+            self.assertEqual(docs[0], next(it))
+            it.close()
+        raw = list(decode_mmap_iter(path, CodecOptions(document_class=RawBSONDocument)))
+        self.assertIsInstance(raw[0].raw, memoryview)
+        self.assertEqual(docs, [decode(doc.raw) for doc in raw])
+        self.assertEqual([], list(decode_mmap_iter(self._bson_file(b""))))
+
+    def test_decode_mmap_iter_errors(self):
+        data = b"".join(encode({"_id": i}) for i in range(10))
+        path = self._bson_file(data)
+        for workers in (0, -1):
+            with self.assertRaises(ValueError):
+                next(decode_mmap_iter(path, workers=workers))
+        for workers in (1.5, "2", True):
+            with self.assertRaises(TypeError):
+                next(decode_mmap_iter(path, workers=workers))  # type: ignore[arg-type]
+        raw_opts = CodecOptions(document_class=RawBSONDocument)
+        # Documents with invalid sizes are detected before the documents
+        # preceding them are decoded.
+        for bad in (data[:-1], data + b"\x05\x00", data + b"\x04\x00\x00\x00\x00"):
+            path = self._bson_file(bad)
+            for opts in (None, raw_opts):
+                for workers in (None, 4):
+                    docs = []
+                    with self.assertRaises(InvalidBSON):
+                        for doc in decode_mmap_iter(path, opts, workers=workers):
+                            docs.append(doc)
+                    self.assertEqual(len(docs), 9 if bad == data[:-1] else 10)
+        path = self._bson_file(data + b"\x05\x00\x00\x00\x01")
+        for workers in (None, 4):
+            with self.assertRaises(InvalidBSON):
+                list(decode_mmap_iter(path, workers=workers))
+
+    @unittest.skipIf(not _NUMPY_AVAILABLE, "numpy optional-dependency not installed.")
+    def test_decode_columns(self):
+        import numpy as np
+
+        oid = ObjectId()
+        when = datetime.datetime(2020, 1, 2, 3, 4, 5, 6000)
+        docs = [
+            {"i": 1, "q": Int64(2**40), "d": 1.5, "b": True, "t": when, "o": oid},
+            {"i": Int64(7), "q": 3, "d": 2, "b": False, "t": None, "x": {"i": 1}},
+            {"i": Int64(2**40), "q": "foo", "d": Int64(-3), "o": "bar"},
+        ]
+        data = b"".join(map(encode, docs))  # type: ignore[arg-type]
+        schema = {
+            "i": "int32",
+            "q": np.int64,
+            "d": float,
+            "b": bool,
+            "t": datetime.datetime,
+            "o": ObjectId,
+            "missing": "float64",
+        }
+        columns = decode_columns(data, schema)
+        self.assertEqual(list(schema), list(columns))
+        self.assertEqual(np.dtype("<i4"), columns["i"].dtype)
+        self.assertEqual([1, 7, None], columns["i"].tolist())
+        self.assertEqual([2**40, 3, None], columns["q"].tolist())
+        self.assertEqual([1.5, 2.0, -3.0], columns["d"].tolist())
+        self.assertEqual([True, False, None], columns["b"].tolist())
+        self.assertEqual(np.dtype("<M8[ms]"), columns["t"].dtype)
+        self.assertEqual([when, None, None], columns["t"].tolist())
+        self.assertEqual([oid.binary, None, None], columns["o"].tolist())
+        self.assertEqual([None, None, None], columns["missing"].tolist())
+
+        self.assertEqual(
+            [1, 7, None], decode_columns(memoryview(data), {"i": "int32"})["i"].tolist()
+        )
+        self.assertEqual(0, len(decode_columns(b"", {"i": "int32"})["i"]))
+
+    @unittest.skipIf(not _NUMPY_AVAILABLE, "numpy optional-dependency not installed.")
+    def test_decode_columns_byte_order(self):
+        import numpy as np
+
+        when = datetime.datetime(2020, 1, 2, 3, 4, 5)
+        data = encode({"i": 1, "q": 2**40, "d": 1.5, "t": when})
+        # Column types match in any byte order, and always decode to
+        # little-endian arrays.
+        for order in "<>=":
+            schema = {
+                "i": order + "i4",
+                "q": order + "i8",
+                "d": order + "f8",
+                "t": order + "M8[ms]",
+            }
+            columns = decode_columns(data, schema)
+            self.assertEqual([1], columns["i"].tolist())
+            self.assertEqual([2**40], columns["q"].tolist())
+            self.assertEqual([1.5], columns["d"].tolist())
+            self.assertEqual([when], columns["t"].tolist())
+            for name in schema:
+                self.assertEqual(np.dtype(schema[name]).newbyteorder("<"), columns[name].dtype)
+
+    @unittest.skipIf(not _NUMPY_AVAILABLE, "numpy optional-dependency not installed.")
+    def test_decode_columns_nested_and_decimal128(self):
+        import numpy as np
+
+        when = datetime.datetime(2021, 5, 6, 7, 8, 9)
+        docs = [
+            {"trade": {"price": Decimal128("12.34"), "at": when}, "qty": Decimal128("1E+3")},
+            {"trade": {"price": Decimal128("-0.5")}, "qty": Decimal128("-9223372036854775808")},
+            {"trade": {"price": Decimal128("1.005")}, "qty": Decimal128("9223372036854775808")},
+            {"trade": {"price": Decimal128("NaN")}, "qty": Decimal128("Infinity")},
+            {"trade": 1, "qty": 1.5},
+        ]
+        data = b"".join(map(encode, docs))  # type: ignore[arg-type]
+        columns = decode_columns(
+            data,
+            {
+                "trade.price": (Decimal128, 2),
+                "trade.at": "datetime64[ms]",
+                "qty": Decimal128,
+                "trade.price.x": "int64",
+            },
+        )
+        self.assertEqual(np.dtype("<i8"), columns["trade.price"].dtype)
+        self.assertEqual([1234, -50, None, None, None], columns["trade.price"].tolist())
+        self.assertEqual([when, None, None, None, None], columns["trade.at"].tolist())
+        self.assertEqual([1000, -(2**63), None, None, None], columns["qty"].tolist())
+        self.assertEqual([None] * 5, columns["trade.price.x"].tolist())
+        self.assertEqual(
+            [1, None, None, None, None],
+            decode_columns(data, {"qty": (Decimal128, -3)})["qty"].tolist(),
+        )
+        with self.assertRaises(TypeError):
+            decode_columns(data, {"qty": (Decimal128, 1.5)})
+
+    @unittest.skipIf(not _NUMPY_AVAILABLE, "numpy optional-dependency not installed.")
+    def test_decode_columns_errors(self):
+        data = encode({"a": 1, "b": "foo"})
+        with self.assertRaises(TypeError):
+            decode_columns(data, {"a": "U10"})
+        with self.assertRaises(TypeError):
+            decode_columns(data, ["a"])  # type: ignore[arg-type]
+        with self.assertRaises(InvalidBSON):
+            decode_columns(data[:-1], {"a": "int32"})
+        with self.assertRaises(InvalidBSON):
+            decode_columns(data[:-3] + b"\x00\x00", {"a": "int32"})
+        with self.assertRaises(InvalidBSON):
+            decode_columns(data + b"\x05\x00", {"a": "int32"})
+
+    @unittest.skipIf(not _NUMPY_AVAILABLE, "numpy optional-dependency not installed.")
+    def test_decode_vectors(self):
+        import numpy as np
+
+        docs = [
+            {"v": Binary.from_vector([1.5, -2.0, 3.0], BinaryVectorDtype.FLOAT32), "x": 1},
+            {"x": 2},
+            {"v": Binary.from_vector([-1, 2, 127], BinaryVectorDtype.INT8)},
+            {"v": Binary.from_vector([1], BinaryVectorDtype.PACKED_BIT)},
+            {"v": [1.0, 2.0, 3.0]},
+        ]
+        data = b"".join(map(encode, docs))
+        vectors = decode_vectors(data, "v")
+        self.assertEqual(np.dtype("float32"), vectors.dtype)
+        self.assertEqual((5, 3), vectors.shape)
+        self.assertEqual(
+            [[1.5, -2.0, 3.0], [None] * 3, [-1.0, 2.0, 127.0], [None] * 3, [None] * 3],
+            vectors.tolist(),
+        )
+        self.assertEqual(vectors.tolist(), decode_vectors(memoryview(data), "v", 3).tolist())
+        self.assertEqual((2, 0), decode_vectors(encode({}) * 2, "v").shape)
+        self.assertEqual((2, 4), decode_vectors(encode({}) * 2, "v", dim=4).shape)
+        self.assertEqual((0, 0), decode_vectors(b"", "v").shape)
+        # Batches without masked rows do not build a mask.
+        self.assertIs(np.ma.nomask, decode_vectors(data[: len(encode(docs[0]))], "v").mask)
+
+    @unittest.skipIf(not _NUMPY_AVAILABLE, "numpy optional-dependency not installed.")
+    def test_decode_vectors_errors(self):
+        data = encode({"v": Binary.from_vector([1.0, 2.0], BinaryVectorDtype.FLOAT32)})
+        with self.assertRaises(ValueError):
+            decode_vectors(data, "v", dim=3)
+        with self.assertRaises(ValueError):
+            decode_vectors(
+                data + encode({"v": Binary.from_vector([1.0], BinaryVectorDtype.FLOAT32)}), "v"
+            )
+        with self.assertRaises(ValueError):
+            decode_vectors(encode({"v": Binary(b"\x27\x00\x00", 9)}), "v")
+        # The padding is checked before the length.
+        with self.assertRaisesRegex(ValueError, "Padding"):
+            decode_vectors(encode({"v": Binary(b"\x27\x01\x00", 9)}), "v")
+        with self.assertRaises(ValueError):
+            decode_vectors(data, "v", dim=-1)
+        with self.assertRaises(TypeError):
+            decode_vectors(data, b"v")  # type: ignore[arg-type]
+        with self.assertRaises(InvalidBSON):
+            decode_vectors(data[:-1], "v")
+        with self.assertRaises(InvalidBSON):
+            decode_vectors(data + b"\x05\x00", "v")
+
     def test_invalid_decodes(self):
         # Invalid object size (not enough bytes in document for even
         # an object size of first object.
@@ -403,6 +746,127 @@ class TestBSON(unittest.TestCase):
             decode(b"\x13\x00\x00\x00\x11\x74\x65\x73\x74\x00\x14\x00\x00\x00\x04\x00\x00\x00\x00"),
         )
 
+    def test_encode_into(self):
+        docs = [{"a": 1}, {"_id": ObjectId(), "b": ["c", {"d": 1.5}]}, {}]
+        buf = bytearray(b"xx")
+        for doc in docs:
+            self.assertEqual(len(encode(doc)), encode_into(doc, buf))
+        self.assertEqual(b"xx" + b"".join(map(encode, docs)), buf)  # type: ignore[arg-type]
+
+        # Overwrite and extend from an offset.
+        self.assertEqual(12, encode_into({"a": 2}, buf, 2))
+        self.assertEqual({"a": 2}, decode(buf[2:14]))
+        buf = bytearray(4)
+        self.assertEqual(12, encode_into({"a": 1}, buf, 2))
+        self.assertEqual(b"\x00\x00" + encode({"a": 1}), buf)
+
+        raw = RawBSONDocument(encode({"r": 1}))
+        region = bytearray(20)
+        self.assertEqual(12, encode_into(raw, memoryview(region)))
+        self.assertEqual(12, encode_into({"a": 1}, memoryview(region), 8))
+        self.assertEqual(encode({"r": 1})[:8] + encode({"a": 1}), region)
+        ints = array.array("i", [0] * 4)
+        self.assertEqual(12, encode_into({"a": 1}, ints, 4))
+        self.assertEqual(encode({"a": 1}), ints.tobytes()[4:])
+
+    def test_encode_into_errors(self):
+        with self.assertRaises(ValueError):
+            encode_into({"a": 1}, bytearray(4), 5)
+        with self.assertRaises(ValueError):
+            encode_into({"a": 1}, bytearray(4), -1)
+        with self.assertRaises(ValueError):
+            encode_into({"a": 1}, memoryview(bytearray(16)), 8)
+        with self.assertRaises(BufferError):
+            encode_into({"a": 1}, memoryview(b"x" * 16))  # type: ignore[arg-type]
+        with self.assertRaises(TypeError):
+            encode_into(1, bytearray())  # type: ignore[arg-type]
+        with self.assertRaises(InvalidDocument):
+            encode_into({"$a": 1}, bytearray(), check_keys=True)
+        with self.assertRaises(TypeError):
+            encode_into({"a": 1}, bytearray(), codec_options={})  # type: ignore[arg-type]
+
+    def test_encoded_size(self):
+        docs = [
+            {},
+            {"_id": ObjectId(), "i": 1, "l": 2**40, "f": 1.5, "b": True, "n": None},
+            {"\u00e9": "\u00fc" * 10, "by": b"abc", "dt": datetime.datetime(2020, 1, 1)},
+            {"a": [1, ["x", {"y": (2, 3)}]], "s": SON([("k", Int64(1))])},
+            # Values of other types are measured by encoding them.
+            {"u": uuid.uuid4(), "bin": Binary(b"x", 2), "code": Code("f", {"a": 1})},
+            SON([("a", 1)]),
+            RawBSONDocument(encode({"r": 1})),
+        ]
+        opts = CodecOptions(uuid_representation=UuidRepresentation.STANDARD)
+        for doc in docs:
+            self.assertEqual(len(encode(doc, codec_options=opts)), encoded_size(doc, opts))
+
+        registry = TypeRegistry(fallback_encoder=str)
+        opts = CodecOptions(type_registry=registry)
+        doc = {"o": ObjectId(), "obj": object()}
+        self.assertEqual(len(encode(doc, codec_options=opts)), encoded_size(doc, opts))
+
+        # Raises the same errors as encode.
+        for doc in [{"a\x00": 1}, {1: 1}, {"a": {"b": object()}}, {"a": 2**64}]:
+            with self.assertRaises(Exception) as ctx:
+                encode(doc)
+            with self.assertRaises(type(ctx.exception)):
+                encoded_size(doc)
+        with self.assertRaises(TypeError):
+            encoded_size({}, {})  # type: ignore[arg-type]
+
+    def test_document_template(self):
+        when = datetime.datetime(2020, 1, 2, 3, 4, 5, 6000)
+        template = bson.DocumentTemplate(
+            ["_id", "i", "d", "s", "b", "t"], [ObjectId, int, float, str, bool, datetime.datetime]
+        )
+        self.assertEqual(("_id", "i", "d", "s", "b", "t"), template.keys)
+        self.assertEqual((ObjectId, int, float, str, bool, datetime.datetime), template.types)
+        oid = ObjectId()
+        rows = [
+            (oid, 1, 1.5, "foo", True, when),
+            (oid, 2**40, -0.0, "\u00e9\x00", False, None),
+            # Values of other types are encoded like any other value.
+            (oid, Int64(1), 2, None, 1, {"a": [1, 2]}),
+        ]
+        for row in rows:
+            doc = dict(zip(template.keys, row))
+            self.assertEqual(encode(doc), template.encode(row))
+            self.assertEqual(encode(doc), template.encode(list(row)))
+            self.assertEqual(encode(doc), template.encode(doc))
+            raw = template.document(row)
+            self.assertIsInstance(raw, RawBSONDocument)
+            self.assertEqual(encode(doc), raw.raw)
+
+        opts = CodecOptions(tz_aware=True)
+        template = bson.DocumentTemplate(["t"], [datetime.datetime], codec_options=opts)
+        self.assertEqual(utc, template.document([when])["t"].tzinfo)
+
+    def test_document_template_errors(self):
+        with self.assertRaises(ValueError):
+            bson.DocumentTemplate(["a", "b"], [int])
+        with self.assertRaises(ValueError):
+            bson.DocumentTemplate(["a", "a"], [int, int])
+        with self.assertRaises(TypeError):
+            bson.DocumentTemplate([1], [int])  # type: ignore[list-item]
+        with self.assertRaises(TypeError):
+            bson.DocumentTemplate(["a"], ["int"])  # type: ignore[list-item]
+        with self.assertRaises(InvalidDocument):
+            bson.DocumentTemplate(["a\x00"], [int])
+        with self.assertRaises(TypeError):
+            bson.DocumentTemplate(["a"], [int], codec_options={})  # type: ignore[arg-type]
+
+        template = bson.DocumentTemplate(["a", "b"], [int, str])
+        with self.assertRaises(ValueError):
+            template.encode([1])
+        with self.assertRaises(ValueError):
+            template.encode({"a": 1, "b": "x", "c": 2})
+        with self.assertRaises(KeyError):
+            template.encode({"a": 1, "c": 2})
+        with self.assertRaises(OverflowError):
+            template.encode([2**64, "x"])
+        with self.assertRaises(InvalidDocument):
+            template.encode([1, object()])
+
     def test_basic_encode(self):
         self.assertRaises(TypeError, encode, 100)
         self.assertRaises(TypeError, encode, "hello")
@@ -924,6 +1388,74 @@ class TestBSON(unittest.TestCase):
         assert vector.data != list_floats
         assert vector.data == vector_np.data.tolist() == [-1, 1]
 
+    @unittest.skipIf(not _NUMPY_AVAILABLE, "numpy optional-dependency not installed.")
+    def test_vector_numpy_interop(self):
+        import numpy as np
+
+        floats = np.array([1.5, -2.0, 3.25])
+        binary = Binary.from_numpy(floats)
+        self.assertEqual(binary, Binary.from_vector([1.5, -2.0, 3.25], BinaryVectorDtype.FLOAT32))
+        view = binary.as_numpy()
+        self.assertEqual(np.dtype("float32"), view.dtype)
+        self.assertEqual([1.5, -2.0, 3.25], view.tolist())
+        # The array is a view of the Binary's data.
+        self.assertFalse(view.flags.writeable)
+        self.assertFalse(binary.as_vector(return_numpy=True).data.flags.owndata)
+        self.assertEqual(
+            Binary.from_vector([-3, 127], BinaryVectorDtype.INT8),
+            Binary.from_numpy(np.array([-3, 127], dtype=np.int8)),
+        )
+        packed = Binary.from_numpy(np.array([1, 8], dtype=np.uint8), padding=3)
+        self.assertEqual(BinaryVector([1, 8], BinaryVectorDtype.PACKED_BIT, 3), packed.as_vector())
+        self.assertEqual([1, 8], packed.as_numpy().tolist())
+
+        matrix = np.arange(12, dtype=np.float64).reshape(3, 4)
+        vectors = vectors_from_2d(matrix)
+        self.assertEqual([Binary.from_numpy(row) for row in matrix], vectors)
+        stacked = vectors_to_2d(vectors)
+        self.assertEqual(np.dtype("float32"), stacked.dtype)
+        self.assertTrue(stacked.flags.writeable)
+        self.assertTrue((stacked == matrix).all())
+        self.assertEqual([], vectors_from_2d(np.zeros((0, 4))))
+        ints = vectors_from_2d(np.array([[1, -1], [2, -2]]), BinaryVectorDtype.INT8)
+        self.assertEqual([[1, -1], [2, -2]], vectors_to_2d(ints).tolist())
+
+    @unittest.skipIf(not _NUMPY_AVAILABLE, "numpy optional-dependency not installed.")
+    def test_vector_numpy_interop_errors(self):
+        import numpy as np
+
+        with self.assertRaises(ValueError):
+            Binary.from_numpy(np.array([1, 2]))
+        with self.assertRaises(ValueError):
+            Binary.from_numpy(np.array([128]), BinaryVectorDtype.INT8)
+        with self.assertRaisesRegex(ValueError, "outside FLOAT32 range"):
+            Binary.from_numpy(np.array([1.0, 1e39]))
+        with self.assertRaisesRegex(ValueError, "outside FLOAT32 range"):
+            vectors_from_2d(np.array([[1.0], [-1e39]]))
+        # Infinite values stay infinite.
+        self.assertEqual([np.inf], Binary.from_numpy(np.array([np.inf])).as_numpy().tolist())
+        with self.assertRaises(ValueError):
+            Binary.from_numpy(np.zeros((2, 2), dtype=np.float32))
+        with self.assertRaises(ValueError):
+            Binary.from_numpy(np.array([1.0]), padding=1)
+        with self.assertRaises(ValueError):
+            Binary.from_numpy(np.array([1], dtype=np.uint8), padding=1)
+        with self.assertRaises(TypeError):
+            Binary.from_numpy([1.0])  # type: ignore[arg-type]
+        with self.assertRaises(ValueError):
+            Binary(b"\x27\x00").as_numpy()
+        with self.assertRaises(ValueError):
+            vectors_from_2d(np.zeros(4, dtype=np.float32))
+        with self.assertRaises(ValueError):
+            vectors_to_2d([])
+        with self.assertRaises(ValueError):
+            vectors_to_2d(
+                [
+                    Binary.from_numpy(np.zeros(2, np.float32)),
+                    Binary.from_numpy(np.zeros(3, np.float32)),
+                ]
+            )
+
     def test_unicode_regex(self):
         """Tests we do not get a segfault for C extension on unicode RegExs.
         This had been happening.
@@ -1398,6 +1930,177 @@ class TestCodecOptions(unittest.TestCase):
             CodecOptions(unicode_decode_error_handler="junk"),
         )
 
+    def test_dataclass_document_class(self):
+        opts = CodecOptions(document_class=Order)
+        self.assertIs(opts.document_class, Order)
+        order = Order(1, [Item("a", 2), Item("b")], Item("c"), {"note": {"gift": True}})
+        order.total = 3
+        data = encode(order)
+        # _id is written first and embedded documents are dicts when decoded
+        # without the dataclass.
+        self.assertEqual(
+            decode(data, CodecOptions(document_class=SON)),
+            SON(
+                [
+                    ("_id", 1),
+                    ("items", [{"sku": "a", "qty": 2}, {"sku": "b", "qty": 1}]),
+                    ("shipping", {"sku": "c", "qty": 1}),
+                    ("meta", {"note": {"gift": True}}),
+                    ("total", 3),
+                ]
+            ),
+        )
+        decoded = decode(data, opts)
+        self.assertIsInstance(decoded, Order)
+        self.assertEqual(decoded, order)
+        self.assertEqual(decoded.total, 3)
+        self.assertIsInstance(decoded.items[0], Item)
+        self.assertIsInstance(decoded.meta, dict)
+        self.assertEqual(decode_all(data * 2, opts), [order, order])
+        self.assertEqual(list(decode_iter(data, opts)), [order])
+        self.assertEqual(decode(encode(Item("a")), CodecOptions(document_class=Item)), Item("a"))
+
+        # Dataclass instances are encoded as embedded documents too.
+        self.assertEqual(
+            decode(encode({"item": Item("a"), "items": [Item("b", 2)]})),
+            {"item": {"sku": "a", "qty": 1}, "items": [{"sku": "b", "qty": 2}]},
+        )
+
+        # Documents with fields that the dataclass does not have fail.
+        for opts in (CodecOptions(document_class=Item), CodecOptions(document_class=Order)):
+            with self.assertRaisesRegex(InvalidBSON, "unexpected keyword argument"):
+                decode(encode({"_id": 1, "sku": "a", "items": [], "bad": 1}), opts)
+        with self.assertRaisesRegex(InvalidBSON, "missing 1 required positional argument"):
+            decode(encode({"qty": 1}), CodecOptions(document_class=Item))
+        with self.assertRaisesRegex(InvalidBSON, "unexpected keyword argument 'bad'"):
+            decode(encode({"name": "a", "parent": {"bad": 1}}), CodecOptions(document_class=Node))
+        with self.assertRaises(TypeError):
+            CodecOptions(document_class=Item("a"))  # type: ignore[arg-type]
+
+    def test_dataclass_nested_document_class(self):
+        opts = CodecOptions(document_class=Node)
+        root = Node("root", [Node("a"), Node("b", [Node("c")])], Node("up"))
+        data = encode(root)
+        self.assertEqual(decode(data, opts), root)
+        self.assertIsInstance(decode(data, opts).children[1].children[0], Node)
+        self.assertEqual(decode_all(data * 2, opts), [root, root])
+        # Missing fields get their defaults and null or non-document values
+        # are kept as they are.
+        self.assertEqual(decode(encode({"name": "a"}), opts), Node("a"))
+        self.assertEqual(
+            decode(encode({"children": [None, 1], "name": "a", "parent": None}), opts),
+            Node("a", [None, 1]),  # type: ignore[list-item]
+        )
+
+    def test_dataclass_dbref_field(self):
+        # Embedded DBRefs are decoded as DBRefs even in fields annotated with
+        # a dataclass, by the C extension and the pure Python decoder alike.
+        opts = CodecOptions(document_class=Order)
+        data = encode(
+            {
+                "_id": 1,
+                "items": [{"sku": "$ref"}, {"$ref": "c", "$id": 2}],
+                "shipping": {"$ref": "c", "$id": 1, "$db": "d"},
+            }
+        )
+        expected = Order(1, [Item("$ref"), DBRef("c", 2)], DBRef("c", 1, "d"))  # type: ignore[list-item, arg-type]
+        self.assertEqual(decode(data, opts), expected)
+        self.assertEqual(decode_all(data * 2, opts), [expected, expected])
+        self.assertEqual(list(decode_iter(data, opts)), [expected])
+
+    def test_dataclass_fallback_encoder(self):
+        # The fallback encoder and type encoders come before the dataclass
+        # encoder.
+        class ItemEncoder(TypeEncoder):
+            python_type = Item
+
+            def transform_python(self, value):
+                return value.sku
+
+        for registry in (
+            TypeRegistry(fallback_encoder=lambda value: repr(value)),
+            TypeRegistry([ItemEncoder()]),
+        ):
+            opts = CodecOptions(type_registry=registry)
+            doc = decode(encode({"item": Item("a")}, codec_options=opts))
+            self.assertIsInstance(doc["item"], str)
+
+    def test_record_document_class(self):
+        opts = CodecOptions(document_class=Record)
+        doc = {
+            "_id": 1,
+            "item": {"sku": "a", "qty": 2},
+            "items": [{"sku": "b"}, 1],
+            "ref": DBRef("c", 1),
+        }
+        data = encode(doc)
+        decoded = decode(data, opts)
+        self.assertIsInstance(decoded, Record)
+        self.assertIsInstance(decoded["item"], Record)
+        self.assertIsInstance(decoded["items"][0], Record)
+        self.assertIsInstance(decoded["ref"], DBRef)
+        self.assertEqual(decoded, doc)
+        self.assertEqual(list(decoded), ["_id", "item", "items", "ref"])
+        self.assertEqual(encode(decoded), data)
+        self.assertEqual(pickle.loads(pickle.dumps(decoded)), decoded)
+        self.assertEqual(repr(Record(a=1)), "Record({'a': 1})")
+        with self.assertRaises(TypeError):
+            decoded["_id"] = 2  # type: ignore[index]
+
+        # Records with the same fields share their field names.
+        first, second = decode_all(data + encode({**doc, "_id": 2}), opts)
+        self.assertNotEqual(first, second)
+        self.assertIs(first._Record__index, second._Record__index)  # type: ignore[attr-defined]
+
+    @unittest.skipUnless(bson.has_c(), "requires the C extension")
+    def test_decode_all_shares_keys(self):
+        data = encode({"field": 1, "sub": {"field": 2}}) * 2
+        first, second = decode_all(data)
+        for key in (next(iter(second)), next(iter(second["sub"]))):
+            self.assertIs(key, next(iter(first)))
+
+    def test_reused_codec_options(self):
+        # The C extension caches the parsed options on the CodecOptions, the
+        # results must not change when the same options are used again.
+        tz = FixedOffset(60, "one")
+        enc = encode({"keystr": "foobar"})
+        invalid = enc[:18] + b"\xe9" + enc[19:]
+        data = encode({"dt": datetime.datetime(2020, 1, 1), "sub": {"a": 1}})
+
+        def run(opts):
+            doc = decode(data, opts)
+            return doc, decode(invalid, opts), encode(doc, codec_options=opts)
+
+        fallback = TypeRegistry(fallback_encoder=str)
+        options = [
+            CodecOptions(unicode_decode_error_handler="replace", **kwargs)
+            for kwargs in (
+                {},
+                {"tz_aware": True, "tzinfo": tz},
+                {"document_class": SON},
+                {"document_class": RawBSONDocument},
+                {"type_registry": fallback},
+            )
+        ]
+        unknown = object()
+        for _ in range(2):
+            self.assertEqual(
+                encode({"x": str(unknown)}), encode({"x": unknown}, codec_options=options[-1])
+            )
+        for opts in options:
+            with self.subTest(opts=opts):
+                first = run(opts)
+                for _ in range(3):
+                    self.assertEqual(first, run(opts))
+                self.assertEqual(first, run(opts.with_options()))
+                for copied in (
+                    pickle.loads(pickle.dumps(opts)),
+                    copy.copy(opts),
+                    copy.deepcopy(opts),
+                ):
+                    self.assertEqual(first, run(copied))
+        self.assertEqual(decode(data, options[1])["dt"].tzinfo, tz)
+
     def round_trip_pickle(self, obj, pickled_with_older):
         pickled_with_older_obj = pickle.loads(pickled_with_older)
         for protocol in range(pickle.HIGHEST_PROTOCOL + 1):
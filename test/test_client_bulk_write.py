@@ -26,12 +26,14 @@ from unittest.mock import patch
 import pymongo
 from pymongo.encryption_options import _HAVE_PYMONGOCRYPT, AutoEncryptionOpts
 from pymongo.errors import (
+    AutoReconnect,
     ClientBulkWriteException,
     DocumentTooLarge,
     InvalidOperation,
     NetworkTimeout,
 )
 from pymongo.operations import *
+from pymongo.synchronous import pool
 from pymongo.synchronous.client_bulk import _ClientBulk
 from pymongo.write_concern import WriteConcern
 from test import (
@@ -619,6 +621,65 @@ class TestClientBulkWriteCRUD(IntegrationTest):
             collection.count_documents({}),
         )
 
+    def _unacknowledged_bulk_write(self, listener, writes, models, fail_send=False):
+        """Run models unordered with w=0, and record the (started, succeeded)
+        event counts at each write of a command in flight in writes.
+        """
+        client = self.rs_or_single_client(event_listeners=[listener])
+        self.addCleanup(client.db["coll"].drop)
+        sendall = pool.sendall
+
+        def recording_sendall(conn, buf):
+            started, succeeded = len(listener.started_events), len(listener.succeeded_events)
+            # Monitor heartbeats publish no command events.
+            if started > succeeded + len(listener.failed_events):
+                writes.append((started, succeeded))
+                if fail_send:
+                    raise OSError("connection reset")
+            sendall(conn, buf)
+
+        listener.reset()
+        with patch.object(pool, "sendall", recording_sendall):
+            client.bulk_write(models, ordered=False, write_concern=WriteConcern(w=0))
+
+    @client_context.require_version_min(8, 0, 0, -24)
+    def test_unacknowledged_batches_publish_events_in_order(self):
+        listener, writes = OvertCommandListener(), []
+        models = [
+            InsertOne(namespace="db.coll", document={"a": "b"})
+            for _ in range(self.max_write_batch_size + 1)
+        ]
+        self._unacknowledged_bulk_write(listener, writes, models)
+        # Each batch is written after its started event, and succeeds before
+        # the next batch starts.
+        self.assertEqual([(1, 0), (2, 1)], writes)
+        self.assertEqual(
+            ["bulkWrite", "bulkWrite"], [e.command_name for e in listener.started_events]
+        )
+        self.assertEqual(
+            [e.request_id for e in listener.started_events],
+            [e.request_id for e in listener.succeeded_events],
+        )
+        self.assertEqual([], listener.failed_events)
+
+    @client_context.require_version_min(8, 0, 0, -24)
+    def test_unacknowledged_batch_publishes_failure_when_send_fails(self):
+        listener, writes = OvertCommandListener(), []
+        models = [
+            InsertOne(namespace="db.coll", document={"a": "b"})
+            for _ in range(self.max_write_batch_size + 1)
+        ]
+        with self.assertRaises(AutoReconnect):
+            self._unacknowledged_bulk_write(listener, writes, models, fail_send=True)
+        # The first failed write stops the bulk.
+        self.assertEqual([(1, 0)], writes)
+        self.assertEqual(["bulkWrite"], [e.command_name for e in listener.started_events])
+        self.assertEqual([], listener.succeeded_events)
+        self.assertEqual(
+            [e.request_id for e in listener.started_events],
+            [e.request_id for e in listener.failed_events],
+        )
+
 
 # https://github.com/mongodb/specifications/blob/master/source/client-side-operations-timeout/tests/README.md#11-multi-batch-bulkwrites
 class TestClientBulkWriteCSOT(IntegrationTest):
@@ -31,7 +31,7 @@ from test.utils import get_pool, is_mongos
 
 sys.path[0:0] = [""]
 
-from bson import encode
+from bson import DocumentTemplate, encode
 from bson.codec_options import CodecOptions
 from bson.objectid import ObjectId
 from bson.raw_bson import RawBSONDocument
@@ -786,6 +786,18 @@ class TestCollection(IntegrationTest):
         self.assertFalse(result.acknowledged)
         self.assertEqual(20, db.test.count_documents({}))
 
+    def test_insert_document_template(self):
+        coll = self.db.test
+        coll.drop()
+        template = DocumentTemplate(["_id", "x"], [int, str])
+        result = coll.insert_many([template.document((i, "foo")) for i in range(5)])
+        self.assertEqual([], result.inserted_ids)
+        coll.bulk_write([InsertOne(template.document((5, "bar")))])
+        self.assertEqual(
+            [{"_id": i, "x": "foo"} for i in range(5)] + [{"_id": 5, "x": "bar"}],
+            coll.find().sort("_id").to_list(),
+        )
+
     def test_insert_many_generator(self):
         coll = self.db.test
         coll.delete_many({})
@@ -17,15 +17,22 @@
 from __future__ import annotations
 
 import sys
+import zlib
 from unittest.mock import patch
 
 sys.path[0:0] = [""]
 
 from pymongo.compression_support import (
+    _COMMAND_MESSAGE,
+    _MIN_SAMPLES,
+    _READ_MESSAGE,
+    _WRITE_MESSAGE,
+    AdaptiveContext,
     CompressionSettings,
     SnappyContext,
     ZlibContext,
     ZstdContext,
+    _CompressionStats,
     _have_snappy,
     _have_zlib,
     _have_zstd,
@@ -156,6 +163,67 @@ class TestCompressionSettings(unittest.TestCase):
         ctx = settings.get_compression_context(["unknown"])
         self.assertIsNone(ctx)
 
+    def test_get_context_adaptive(self):
+        settings = CompressionSettings([], -1, min_size=100)
+        stats = _CompressionStats()
+        ctx = settings.get_compression_context(["zlib", "unknown", "zstd"], stats)
+        self.assertIsInstance(ctx, AdaptiveContext)
+        self.assertEqual(["zlib", "zstd"], [c.name for c in ctx.contexts])
+        self.assertIs(stats, ctx.stats)
+        self.assertIsNone(settings.get_compression_context(["unknown"], stats))
+        # Without a minimum size the first compressor is always used.
+        self.assertIsInstance(self._make().get_compression_context(["zlib"], stats), ZlibContext)
+
+
+class TestCompressionStats(unittest.TestCase):
+    def test_each_compressor_is_sampled_first(self):
+        stats = _CompressionStats()
+        contexts = [SnappyContext(), ZlibContext(-1)]
+        for _ in range(_MIN_SAMPLES):
+            for ctx in contexts:
+                self.assertIs(ctx, stats.choose(_WRITE_MESSAGE, contexts))
+                stats.record_compress(_WRITE_MESSAGE, ctx.name, 1000, 500, 0.0)
+        self.assertIs(contexts[0], stats.choose(_WRITE_MESSAGE, contexts))
+
+    def test_lowest_cost_is_chosen(self):
+        stats = _CompressionStats()
+        contexts = [SnappyContext(), ZlibContext(-1)]
+        for _ in range(_MIN_SAMPLES):
+            stats.record_compress(_WRITE_MESSAGE, "snappy", 100000, 50000, 0.0)
+            stats.record_compress(_WRITE_MESSAGE, "zlib", 100000, 20000, 0.01)
+            stats.record_compress(_COMMAND_MESSAGE, "snappy", 1000, 500, 0.0)
+            stats.record_compress(_COMMAND_MESSAGE, "zlib", 1000, 400, 0.0)
+        # zlib sends fewer bytes, but takes too long to compress writes.
+        self.assertIs(contexts[0], stats.choose(_WRITE_MESSAGE, contexts))
+        self.assertIs(contexts[1], stats.choose(_COMMAND_MESSAGE, contexts))
+        result = stats.stats()
+        self.assertEqual(0.2, result[_WRITE_MESSAGE]["zlib"]["ratio"])
+        self.assertEqual(_MIN_SAMPLES, result[_WRITE_MESSAGE]["zlib"]["messages"])
+
+
+@unittest.skipUnless(_have_zlib(), "zlib not available")
+class TestAdaptiveContext(unittest.TestCase):
+    def setUp(self):
+        self.ctx = AdaptiveContext([ZlibContext(-1)], 100, _CompressionStats())
+
+    def test_small_messages_are_not_compressed(self):
+        self.assertIsNone(self.ctx.compress_message(b"x" * 99, _COMMAND_MESSAGE))
+        compressor_id, compressed = self.ctx.compress_message(b"x" * 100, _COMMAND_MESSAGE)
+        self.assertEqual(ZlibContext.compressor_id, compressor_id)
+        self.assertEqual(b"x" * 100, zlib.decompress(compressed))
+
+    def test_small_reads_are_compressed(self):
+        self.assertIsNotNone(self.ctx.compress_message(b"x" * 10, _READ_MESSAGE))
+
+    def test_replies_are_recorded_with_their_request(self):
+        self.ctx.compress_message(b"x" * 10, _READ_MESSAGE)
+        reply = zlib.compress(b"y" * 1000)
+        self.assertEqual(b"y" * 1000, self.ctx.decompress(reply, ZlibContext.compressor_id))
+        stats = self.ctx.stats.stats()[_READ_MESSAGE]["zlib"]
+        self.assertEqual(1, stats["messages"])
+        self.assertEqual(1, stats["replies"])
+        self.assertLess(stats["ratio"], 0.1)
+
 
 class TestZlibContext(unittest.TestCase):
     def setUp(self):
@@ -18,6 +18,7 @@ from __future__ import annotations
 
 import copy
 import gc
+import importlib.util
 import itertools
 import os
 import platform
@@ -34,6 +35,7 @@ sys.path[0:0] = [""]
 
 from bson import decode_all
 from bson.code import Code
+from bson.objectid import ObjectId
 from bson.raw_bson import RawBSONDocument
 from pymongo import ASCENDING, DESCENDING
 from pymongo.collation import Collation
@@ -57,6 +59,8 @@ from test.utils_shared import (
 
 _IS_SYNC = True
 
+_NUMPY_AVAILABLE = importlib.util.find_spec("numpy") is not None
+
 
 class TestCursor(IntegrationTest):
     def test_deepcopy_cursor_littered_with_regexes(self):
@@ -1521,6 +1525,23 @@ class TestRawBatchCursor(IntegrationTest):
         self.assertEqual(1, len(batches))
         self.assertEqual(docs, decode_all(batches[0]))
 
+    @unittest.skipIf(not _NUMPY_AVAILABLE, "numpy optional-dependency not installed.")
+    def test_to_columns(self):
+        c = self.db.test
+        oids = [ObjectId() for _ in range(5)]
+        c.insert_many([{"_id": oids[i], "x": i, "y": 1.5 * i} for i in range(5)])
+        c.insert_one({"_id": ObjectId(), "x": "not a number"})
+
+        cursor = c.find(sort=[("_id", ASCENDING)], batch_size=2)
+        columns = cursor.to_columns({"_id": ObjectId, "x": "int64", "y": "float64"})
+        self.assertEqual([oid.binary for oid in oids], columns["_id"][:5].tolist())
+        self.assertEqual([0, 1, 2, 3, 4, None], columns["x"].tolist())
+        self.assertEqual([0.0, 1.5, 3.0, 4.5, 6.0, None], columns["y"].tolist())
+        # The cursor itself is left unevaluated.
+        self.assertEqual(6, len(cursor.to_list()))
+        with self.assertRaises(InvalidOperation):
+            cursor.to_columns({"x": "int64"})
+
     @client_context.require_transactions
     def test_find_raw_transaction(self):
         c = self.db.test
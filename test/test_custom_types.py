@@ -17,6 +17,7 @@
 from __future__ import annotations
 
 import datetime
+import enum
 import sys
 import tempfile
 from collections import OrderedDict
@@ -573,12 +574,19 @@ class TestTypeRegistry(unittest.TestCase):
         r = f"TypeRegistry(type_codecs={codec_instances!r}, fallback_encoder={None!r})"
         self.assertEqual(r, repr(type_registry))
 
+        type_registry = TypeRegistry(codec_instances, document_decoder=dict)
+        r = f"TypeRegistry(type_codecs={codec_instances!r}, fallback_encoder={None!r}, document_decoder={dict!r})"
+        self.assertEqual(r, repr(type_registry))
+
     def test_type_registry_eq(self):
         codec_instances = [codec() for codec in self.codecs]
         self.assertEqual(TypeRegistry(codec_instances), TypeRegistry(codec_instances))
 
         codec_instances_2 = [codec() for codec in self.codecs]
         self.assertNotEqual(TypeRegistry(codec_instances), TypeRegistry(codec_instances_2))
+        self.assertNotEqual(
+            TypeRegistry(codec_instances), TypeRegistry(codec_instances, document_decoder=dict)
+        )
 
     def test_builtin_types_override_fails(self):
         def run_test(base, attrs):
@@ -621,6 +629,98 @@ class TestTypeRegistry(unittest.TestCase):
         run_test(TypeEncoder, {})
         run_test(TypeCodec, {"bson_type": Decimal128, "transform_bson": lambda x: x})
 
+    def test_encode_subclass(self):
+        class MyIntSubType(self.types[0]):  # type: ignore[name-defined]
+            pass
+
+        codec_instances = [codec() for codec in self.codecs]
+        type_registry = TypeRegistry(codec_instances)
+        codecopts = CodecOptions(type_registry=type_registry)
+        document = {"a": self.types[0](1), "b": MyIntSubType(2), "c": [MyIntSubType(3)]}
+        self.assertEqual(
+            decode(encode(document, codec_options=codecopts)), {"a": 1, "b": 2, "c": [3]}
+        )
+        # The encoder of each exact type is resolved once and cached.
+        self.assertEqual(
+            type_registry._encoder_cache,
+            {
+                self.types[0]: codec_instances[0].transform_python,
+                MyIntSubType: codec_instances[0].transform_python,
+            },
+        )
+        self.assertIsNone(type_registry._resolve_encoder(float))
+        self.assertIn(float, type_registry._encoder_cache)
+
+    def test_encode_builtin_subclass(self):
+        # Subclasses of the built-in types are encoded as before even when a
+        # base class has a type encoder, in either order of encoding with and
+        # without the registry.
+        class EnumEncoder(TypeEncoder):
+            python_type = enum.Enum
+
+            def transform_python(self, value):
+                return value.name
+
+        class Shape(enum.Enum):
+            CIRCLE = 1
+
+        class First(enum.IntEnum):
+            RED = 1
+
+        class Second(enum.IntEnum):
+            RED = 1
+
+        codecopts = CodecOptions(type_registry=TypeRegistry([EnumEncoder()]))
+        self.assertEqual(decode(encode({"x": First.RED}, codec_options=codecopts)), {"x": 1})
+        self.assertEqual(decode(encode({"x": First.RED})), {"x": 1})
+        self.assertEqual(decode(encode({"x": Second.RED})), {"x": 1})
+        self.assertEqual(decode(encode({"x": Second.RED}, codec_options=codecopts)), {"x": 1})
+        self.assertEqual(
+            decode(encode({"x": Shape.CIRCLE}, codec_options=codecopts)), {"x": "CIRCLE"}
+        )
+
+    def test_document_decoder(self):
+        decoded = []
+
+        def document_decoder(document):
+            decoded.append(dict(document))
+            return OrderedDict(document)
+
+        type_registry = TypeRegistry(document_decoder=document_decoder)
+        self.assertIs(type_registry.document_decoder, document_decoder)
+        codecopts = CodecOptions(type_registry=type_registry)
+        document = {"a": {"b": 1}, "c": [{"d": 2}], "ref": {"$ref": "coll", "$id": 1}}
+        bson_bytes = encode(document)
+
+        result = decode(bson_bytes, codecopts)
+        self.assertIsInstance(result, OrderedDict)
+        self.assertIsInstance(result["a"], OrderedDict)
+        self.assertIsInstance(result["c"][0], OrderedDict)
+        self.assertEqual(result["ref"].collection, "coll")
+        # Called once per document, embedded documents first.
+        self.assertEqual(decoded, [{"b": 1}, {"d": 2}, decode(bson_bytes)])
+        self.assertEqual(decode_all(bson_bytes * 2, codecopts), [result, result])
+        self.assertEqual(list(decode_iter(bson_bytes, codecopts)), [result])
+
+        # RawBSONDocuments are not passed to the document_decoder.
+        decoded.clear()
+        raw_opts = codecopts.with_options(document_class=RawBSONDocument)
+        self.assertEqual(decode(bson_bytes, raw_opts)["a"]["b"], 1)
+        self.assertEqual(decoded, [])
+
+    def test_document_decoder_fail(self):
+        err_msg = "document_decoder {!r} is not a callable".format("hello")
+        with self.assertRaisesRegex(TypeError, err_msg):
+            TypeRegistry(document_decoder="hello")  # type: ignore[arg-type]
+
+        def document_decoder(document):
+            raise ValueError("cannot decode")
+
+        codecopts = CodecOptions(type_registry=TypeRegistry(document_decoder=document_decoder))
+        # The pure Python decoder re-raises errors as InvalidBSON.
+        with self.assertRaisesRegex(Exception, "cannot decode"):
+            decode(encode({"a": 1}), codecopts)
+
 
 class TestCollectionWCustomType(IntegrationTest):
     def setUp(self):
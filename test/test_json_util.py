@@ -17,18 +17,20 @@
 from __future__ import annotations
 
 import datetime
+import io
 import json
 import re
 import sys
 import uuid
 from collections import OrderedDict
 from typing import Any
+from unittest.mock import patch
 
 from bson.codec_options import CodecOptions, DatetimeConversion
 
 sys.path[0:0] = [""]
 
-from bson import EPOCH_AWARE, EPOCH_NAIVE, SON, DatetimeMS, json_util
+from bson import EPOCH_AWARE, EPOCH_NAIVE, SON, DatetimeMS, decode, encode, json_util
 from bson.binary import (
     ALL_UUID_REPRESENTATIONS,
     MD5_SUBTYPE,
@@ -38,12 +40,15 @@ from bson.binary import (
     UuidRepresentation,
 )
 from bson.code import Code
+from bson.codec_options import TypeCodec, TypeRegistry
 from bson.datetime_ms import _MAX_UTC_MS
 from bson.dbref import DBRef
 from bson.decimal128 import Decimal128
+from bson.errors import InvalidBSON, InvalidDocument
 from bson.int64 import Int64
 from bson.json_util import (
     CANONICAL_JSON_OPTIONS,
+    DEFAULT_JSON_OPTIONS,
     LEGACY_JSON_OPTIONS,
     RELAXED_JSON_OPTIONS,
     DatetimeRepresentation,
@@ -53,6 +58,7 @@ from bson.json_util import (
 from bson.max_key import MaxKey
 from bson.min_key import MinKey
 from bson.objectid import ObjectId
+from bson.raw_bson import RawBSONDocument
 from bson.regex import Regex
 from bson.timestamp import Timestamp
 from bson.tz_util import FixedOffset, utc
@@ -635,6 +641,321 @@ class TestJsonUtil(unittest.TestCase):
         expected_json = json_util.dumps(Binary(b"bin", USER_DEFINED_SUBTYPE))
         self.assertEqual(json_util.dumps(MyBinary(b"bin", USER_DEFINED_SUBTYPE)), expected_json)
 
+    def test_c_extension_output_is_identical(self):
+        if not json_util._USE_C:
+            self.skipTest("C extension not available")
+
+        class MyDict(dict):
+            pass
+
+        oid = ObjectId("65a6dab5f98bc03906ee3597")
+        values = [
+            None,
+            True,
+            False,
+            0,
+            -(2**31),
+            2**31,
+            -(2**63),
+            2**70,
+            1.5,
+            -0.0,
+            1e100,
+            float("nan"),
+            float("inf"),
+            float("-inf"),
+            "str",
+            "\u00e9\u20ac",
+            b"bytes",
+            Int64(5),
+            Int64(-(2**40)),
+            oid,
+            datetime.datetime(2024, 1, 16, 1, 2, 3, 456789),
+            datetime.datetime(2024, 1, 16, 1, 2, 3),
+            datetime.datetime(1969, 12, 31, 23, 59, 59, 999000),
+            datetime.datetime(1, 1, 1),
+            datetime.datetime(9999, 12, 31, 23, 59, 59, 999999),
+            datetime.datetime(2024, 1, 16, 1, 2, 3, 4000, tzinfo=utc),
+            datetime.datetime(2024, 1, 16, 1, 2, 3, tzinfo=datetime.timezone.utc),
+            datetime.datetime(2024, 1, 16, 1, 2, 3, tzinfo=FixedOffset(-90, "x")),
+            datetime.datetime(1960, 1, 16, 1, 2, 3, tzinfo=FixedOffset(330, "y")),
+            DatetimeMS(-1),
+            DatetimeMS(2**62),
+            uuid.UUID("f47ac10b-58cc-4372-a567-0e02b2c3d479"),
+            Binary(b"bin", USER_DEFINED_SUBTYPE),
+            Code("code"),
+            Code("code", {"a": [1, 2.5]}),
+            DBRef("coll", oid, "db", extra=Int64(1)),
+            MaxKey(),
+            MinKey(),
+            Regex("pat", "imsx"),
+            re.compile("pat", re.I),
+            Timestamp(1, 2),
+            Decimal128("0.5"),
+            (1, 2.5),
+            {"a": {"b": [Int64(1), {"c": oid}]}},
+            SON([("z", 1), ("a", 2)]),
+            MyDict(x=1.5),
+            OrderedDict([(1, "int key")]),
+            bytearray(b"ab"),
+            {1, 2},
+            object(),
+        ]
+        all_options = [
+            RELAXED_JSON_OPTIONS,
+            CANONICAL_JSON_OPTIONS,
+            LEGACY_JSON_OPTIONS,
+            STRICT_JSON_OPTIONS,
+            LEGACY_JSON_OPTIONS.with_options(
+                datetime_representation=DatetimeRepresentation.NUMBERLONG
+            ),
+            RELAXED_JSON_OPTIONS.with_options(uuid_representation=STANDARD),
+        ]
+
+        def dumps(doc, opts):
+            try:
+                return json_util.dumps(doc, json_options=opts)
+            except Exception as exc:
+                return type(exc)
+
+        for opts in all_options:
+            for value in values:
+                with self.subTest(value=value, json_mode=opts.json_mode):
+                    doc = {"v": value, "l": [value]}
+                    c_json = dumps(doc, opts)
+                    with patch.object(json_util, "_USE_C", False):
+                        self.assertEqual(c_json, dumps(doc, opts))
+
+    def test_c_extension_loads_is_identical(self):
+        if not json_util._USE_C:
+            self.skipTest("C extension not available")
+        dates = [
+            "2024-01-16T01:02:03Z",
+            "2024-01-16T01:02:03",
+            "2024-01-16T01:02:03.4Z",
+            "2024-01-16T01:02:03.123Z",
+            "2024-01-16T01:02:03.123456789Z",
+            "2024-01-16T01:02:03.9999999Z",
+            "2024-01-16T01:02:03.99999999999999999Z",
+            "2024-01-16T01:02:03.Z",
+            "2024-01-16T01:02:03.123+01:00",
+            "2024-01-16T01:02:03-0130",
+            "2024-01-16T01:02:03+05",
+            "2024-02-30T01:02:03Z",
+            "2024-01-16T24:02:03Z",
+            "2024-01-16t01:02:03Z",
+            "2024-1-16T01:02:03Z",
+            "0000-01-16T01:02:03Z",
+            "9999-12-31T23:59:59.999Z",
+            "\uff12024-01-16T01:02:03Z",
+            "2024-01-16T01:02:03ZZ",
+            "",
+        ]
+        all_options = [
+            RELAXED_JSON_OPTIONS,
+            RELAXED_JSON_OPTIONS.with_options(tz_aware=True),
+            RELAXED_JSON_OPTIONS.with_options(tz_aware=True, tzinfo=FixedOffset(60, "x")),
+            RELAXED_JSON_OPTIONS.with_options(datetime_conversion=DatetimeConversion.DATETIME_MS),
+            RELAXED_JSON_OPTIONS.with_options(document_class=SON),
+            CANONICAL_JSON_OPTIONS,
+        ]
+
+        def loads(value, opts):
+            try:
+                result = json_util.loads(value, json_options=opts)
+            except Exception as exc:
+                return type(exc)
+            return result, type(result["d"]), getattr(result["d"], "tzinfo", None)
+
+        for opts in all_options:
+            for date in dates:
+                for doc in ({"d": {"$date": date}}, {"d": {"$date": date, "x": 1}}):
+                    with self.subTest(doc=doc, tz_aware=opts.tz_aware):
+                        value = json.dumps(doc)
+                        c_result = loads(value, opts)
+                        with patch.object(json_util, "_USE_C", False):
+                            self.assertEqual(c_result, loads(value, opts))
+
+    def test_c_extension_type_registry_fallback(self):
+        class MyType:
+            pass
+
+        class MyCodec(TypeCodec):
+            python_type = MyType
+            bson_type = int
+
+            def transform_python(self, value):
+                return 1
+
+            def transform_bson(self, value):
+                return MyType()
+
+        opts = JSONOptions(type_registry=TypeRegistry([MyCodec()]))
+        self.assertFalse(json_util._use_c(opts))
+        self.assertFalse(json_util._use_c(CodecOptions()))
+        self.assertEqual(json_util._use_c(RELAXED_JSON_OPTIONS), json_util._USE_C)
+        with patch.object(json_util, "_cbson", None, create=True):
+            doc = {"a": Int64(1), "b": {"$oid": "65a6dab5f98bc03906ee3597"}}
+            self.assertEqual(
+                json_util.loads(json_util.dumps(doc, json_options=opts), json_options=opts),
+                {"a": 1, "b": ObjectId("65a6dab5f98bc03906ee3597")},
+            )
+
+    def test_bson_to_json(self):
+        doc = {
+            "_id": ObjectId("65a6dab5f98bc03906ee3597"),
+            "int": 1,
+            "long": Int64(2**40),
+            "double": 1.5,
+            "nan": float("nan"),
+            "str": 'é€\U0001f600\n"',
+            "bin": Binary(b"\x00\xff", 0x80),
+            "uuid": Binary(uuid.UUID("f47ac10b-58cc-4372-a567-0e02b2c3d479").bytes, 4),
+            "legacy_uuid": Binary(b"\x01" * 16, 3),
+            "date": datetime.datetime(2024, 1, 16, 1, 2, 3, 456000),
+            "old_date": datetime.datetime(1960, 1, 1),
+            "regex": Regex("^a.*", "imx"),
+            "ts": Timestamp(1, 2),
+            "code": Code("x", {"y": 1}),
+            "dec": Decimal128("1.10"),
+            "list": [None, True, MinKey(), MaxKey(), {"nested": [1, {}]}],
+        }
+        data = encode(doc)
+        all_options = [
+            DEFAULT_JSON_OPTIONS,
+            CANONICAL_JSON_OPTIONS,
+            LEGACY_JSON_OPTIONS,
+            JSONOptions(json_mode=JSONMode.LEGACY, strict_number_long=True),
+            JSONOptions(uuid_representation=UuidRepresentation.JAVA_LEGACY),
+            JSONOptions(
+                json_mode=JSONMode.LEGACY, datetime_representation=DatetimeRepresentation.NUMBERLONG
+            ),
+            JSONOptions(
+                json_mode=JSONMode.LEGACY,
+                datetime_representation=DatetimeRepresentation.ISO8601,
+                tz_aware=True,
+            ),
+        ]
+        for opts in all_options:
+            with self.subTest(json_mode=opts.json_mode):
+                expected = json_util.dumps(decode(data, opts), json_options=opts).encode()
+                self.assertEqual(json_util.bson_to_json(data, opts), expected)
+                self.assertEqual(json_util.bson_to_json(memoryview(data), opts), expected)
+
+    def test_bson_to_json_fallback(self):
+        # DBRefs and duplicate keys are handled by decoding the document.
+        dbref = encode({"ref": DBRef("coll", 1, "db")})
+        self.assertEqual(json_util.bson_to_json(dbref), json_util.dumps(decode(dbref)).encode())
+        duplicate = b"\x13\x00\x00\x00\x10a\x00\x01\x00\x00\x00\x10a\x00\x02\x00\x00\x00\x00"
+        self.assertEqual(json_util.bson_to_json(duplicate), b'{"a": 2}')
+        self.assertRaises(InvalidBSON, json_util.bson_to_json, b"\x05\x00\x00\x00\x01")
+        self.assertRaises(InvalidBSON, json_util.bson_to_json, encode({"a": 1})[:-1])
+
+    def test_json_to_bson(self):
+        documents = [
+            "{}",
+            '{"_id": {"$oid": "65a6dab5f98bc03906ee3597"}, "a": [1, 2.5, "x", null, true]}',
+            '{"a": 2147483648, "b": -2147483649, "c": 1e400, "d": -0.0, "e": "\\ud83d\\ude00"}',
+            '{"a": {"$numberLong": "5"}, "b": {"$numberInt": "6"}, "c": {"$numberDouble": "NaN"}}',
+            '{"a": {"$date": "2024-01-16T01:02:03.456Z"}, "b": {"$date": {"$numberLong": "-1"}}}',
+            '{"a": {"$date": 1705366923456}, "b": {"$date": "2024-01-16T01:02:03+01:00"}}',
+            '{"a": {"$binary": {"base64": "AP8=", "subType": "80"}}, "b": {"$binary": "AP8=", "$type": "2"}}',
+            '{"a": {"$binary": {"base64": "9HrBC1jMQ3KlZw4CssPUeQ==", "subType": "04"}}}',
+            '{"a": {"$uuid": "f47ac10b-58cc-4372-a567-0e02b2c3d479"}}',
+            '{"a": {"$regularExpression": {"pattern": "^a", "options": "i"}}}',
+            '{"a": {"$timestamp": {"t": 1, "i": 2}}, "b": {"$numberDecimal": "1.10"}}',
+            '{"a": {"$minKey": 1}, "b": {"$maxKey": 1}, "c": {"$code": "x"}}',
+            '{"a": {"$ref": "coll", "$id": 1}, "b": {"$regex": "^a", "$options": "i"}}',
+            '{"a": {"$symbol": "s"}, "b": {"x": {"$numberLong": "1"}, "$y": [{"$undefined": true}]}}',
+        ]
+        all_options = [
+            DEFAULT_JSON_OPTIONS,
+            CANONICAL_JSON_OPTIONS,
+            LEGACY_JSON_OPTIONS,
+            JSONOptions(uuid_representation=UuidRepresentation.JAVA_LEGACY),
+        ]
+        for opts in all_options:
+            for document in documents:
+                with self.subTest(json_mode=opts.json_mode, document=document):
+                    expected = encode(
+                        json_util.loads(document, json_options=opts), codec_options=opts
+                    )
+                    self.assertEqual(json_util.json_to_bson(document, opts), expected)
+                    self.assertEqual(json_util.json_to_bson(document.encode(), opts), expected)
+
+    def test_json_to_bson_fallback(self):
+        # Documents that json.loads handles differently fall back to Python.
+        self.assertEqual(json_util.json_to_bson('{"a": 1, "a": 2}'), encode({"a": 2}))
+        self.assertEqual(json_util.json_to_bson('{"a": 1, "_id": 2}'), encode({"a": 1, "_id": 2}))
+        top_level_wrapper = '{"$oid": "65a6dab5f98bc03906ee3597"}'
+        for invalid in ["", "{", '{"a": }', '{"a": 1} x', "[1]", "1", top_level_wrapper]:
+            with self.subTest(invalid=invalid):
+                try:
+                    encode(json_util.loads(invalid))
+                except Exception as exc:
+                    expected = type(exc)
+                self.assertRaises(expected, json_util.json_to_bson, invalid)
+        self.assertRaises(InvalidDocument, json_util.json_to_bson, '{"a\\u0000": 1}')
+
+    def test_json_to_bson_ndjson(self):
+        docs = [{"_id": i, "x": Int64(i), "s": str(i) * i} for i in range(10)]
+        lines = [json_util.dumps(doc) for doc in docs]
+        raw = [RawBSONDocument(json_util.json_to_bson(line)) for line in lines]
+        self.assertEqual([decode(doc.raw) for doc in raw], docs)
+        self.assertEqual([doc.to_json().decode() for doc in raw], lines)
+
+    def test_iter_load(self):
+        docs = [{"_id": i, "s": "\u00e9" * i, "l": [1.5, {"a": None}]} for i in range(20)]
+        data = "".join(json_util.dumps(doc) + "\n" for doc in docs)
+        for chunk_size in [1, 7, 1024]:
+            with self.subTest(chunk_size=chunk_size):
+                for fp in [io.StringIO(data), io.BytesIO(data.encode())]:
+                    self.assertEqual(list(json_util.iter_load(fp, chunk_size=chunk_size)), docs)
+                raw = list(json_util.iter_load(io.BytesIO(data.encode()), raw=True))
+                self.assertTrue(all(isinstance(doc, RawBSONDocument) for doc in raw))
+                self.assertEqual([decode(doc.raw) for doc in raw], docs)
+        # Blank lines are skipped and the last line does not need a newline.
+        fp = io.StringIO('\n {"a": 1}\r\n  \n{"b": {"$numberLong": "2"}}')
+        self.assertEqual(list(json_util.iter_load(fp)), [{"a": 1}, {"b": Int64(2)}])
+        self.assertEqual(list(json_util.iter_load(io.BytesIO())), [])
+        fp = io.StringIO('{"a": 1}\n{"a": \n')
+        with self.assertRaises(ValueError):
+            list(json_util.iter_load(fp))
+
+    def test_dump_stream(self):
+        docs = [
+            {"_id": i, "x": Int64(i), "d": datetime.datetime(2024, 1, i + 1)} for i in range(20)
+        ]
+        expected = "".join(json_util.dumps(doc) + "\n" for doc in docs)
+        for chunk_size in [1, 7, 1024]:
+            with self.subTest(chunk_size=chunk_size):
+                fp = io.StringIO()
+                self.assertEqual(json_util.dump_stream(docs, fp, chunk_size=chunk_size), 20)
+                self.assertEqual(fp.getvalue(), expected)
+                fp = io.BytesIO()
+                json_util.dump_stream(iter(docs), fp, chunk_size=chunk_size)
+                self.assertEqual(fp.getvalue(), expected.encode())
+        raw = [RawBSONDocument(encode(doc)) for doc in docs]
+        fp = io.BytesIO()
+        json_util.dump_stream(raw, fp, CANONICAL_JSON_OPTIONS)
+        self.assertEqual(
+            fp.getvalue().decode(),
+            "".join(
+                json_util.dumps(doc, json_options=CANONICAL_JSON_OPTIONS) + "\n" for doc in docs
+            ),
+        )
+        fp.seek(0)
+        self.assertEqual(list(json_util.iter_load(fp, CANONICAL_JSON_OPTIONS)), docs)
+
+
+class TestJsonUtilPython(TestJsonUtil):
+    """Run the tests with the pure Python implementation."""
+
+    def setUp(self):
+        patcher = patch.object(json_util, "_USE_C", False)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
 
 if __name__ == "__main__":
     unittest.main()
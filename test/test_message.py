@@ -18,17 +18,26 @@ from __future__ import annotations
 
 import struct
 import sys
+from collections.abc import Mapping
 from typing import Any
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, patch
 
 sys.path[0:0] = [""]
 
 from bson import CodecOptions, encode
-from pymongo.compression_support import ZlibContext, _have_zlib
+from bson.son import SON
+from pymongo import message
+from pymongo.compression_support import (
+    AdaptiveContext,
+    ZlibContext,
+    _CompressionStats,
+    _have_zlib,
+)
 from pymongo.errors import DocumentTooLarge, OperationFailure
 from pymongo.message import (
     _convert_client_bulk_exception,
     _convert_exception,
+    _decode_cursor_reply,
     _gen_find_command,
     _gen_get_more_command,
     _maybe_add_read_preference,
@@ -127,6 +136,147 @@ class TestMessage(unittest.TestCase):
         self.assertIn("documents", cmd)
         self.assertEqual(cmd["documents"], docs)
 
+    @unittest.skipUnless(message._use_c, "requires the C extensions")
+    def test_op_msg_large_documents_are_segmented(self):
+        docs: list[dict[str, Any]] = [{"_id": i, "data": "a" * (i * 10)} for i in range(5)]
+        cmd: dict = {"insert": "col", "documents": docs, "ordered": True}
+        _, expected, size, max_doc_size = _op_msg(0, cmd, "testdb", None, _OPTS)
+        self.assertIsInstance(message._command_op_msg(0, cmd, "testdb", None, _OPTS)[1], bytes)
+        with (
+            patch.object(message, "_MIN_SEGMENTED_SIZE", 0),
+            patch.object(message, "_MIN_SEGMENTED_DOC_SIZE", 0),
+        ):
+            _, segments, segmented_size, segmented_max = message._command_op_msg(
+                0, cmd, "testdb", None, _OPTS
+            )
+        self.assertIsInstance(segments, list)
+        self.assertEqual(len(segments), len(docs) + 1)
+        self.assertEqual([bytes(s) for s in segments[1:]], [encode(d) for d in docs])
+        joined = b"".join(segments)
+        # Only the request ids differ.
+        self.assertEqual(joined[:4] + joined[8:], expected[:4] + expected[8:])
+        self.assertEqual(segmented_size, size)
+        self.assertEqual(segmented_max, max_doc_size)
+        self.assertEqual(cmd["documents"], docs)
+
+    @unittest.skipUnless(message._use_c, "requires the C extensions")
+    def test_op_msg_small_first_document_is_not_segmented(self):
+        docs: list[dict[str, Any]] = [{"_id": i} for i in range(5)]
+        cmd: dict = {"insert": "col", "documents": docs}
+        with (
+            patch.object(message, "_MIN_SEGMENTED_SIZE", 0),
+            patch.object(message, "_encoded_size", wraps=message._encoded_size) as encoded_size,
+        ):
+            msg = message._command_op_msg(0, cmd, "testdb", None, _OPTS)[1]
+        self.assertIsInstance(msg, bytes)
+        # Only the first document is measured.
+        self.assertEqual(encoded_size.call_count, 1)
+
+    # _do_batched_op_msg / _client_do_batched_op_msg
+
+    def _make_bulk_ctx(self, max_message_size=48000000, max_write_batch_size=100000):
+        ctx = MagicMock()
+        ctx.conn.compression_context = None
+        ctx.max_bson_size = 16 * 1024 * 1024
+        ctx.max_message_size = max_message_size
+        ctx.max_write_batch_size = max_write_batch_size
+        return ctx
+
+    def test_batched_op_msg_large_documents_are_segmented(self):
+        docs: list[Mapping[str, Any]] = [{"_id": i, "data": "a" * (i * 10)} for i in range(5)]
+        for max_message_size, max_write_batch_size in (
+            (48000000, 100000),
+            (200, 100000),
+            (1000, 3),
+        ):
+            ctx = self._make_bulk_ctx(max_message_size, max_write_batch_size)
+            cmd: dict = {"insert": "col", "ordered": True}
+            _, expected, expected_sent = message._do_batched_op_msg(
+                "db.$cmd", 0, cmd, docs, _OPTS, ctx
+            )
+            with (
+                patch.object(message, "_MIN_SEGMENTED_SIZE", 0),
+                patch.object(message, "_MIN_SEGMENTED_DOC_SIZE", 0),
+            ):
+                _, segments, sent = message._do_batched_op_msg("db.$cmd", 0, cmd, docs, _OPTS, ctx)
+            self.assertIsInstance(segments, list)
+            self.assertEqual(sent, expected_sent)
+            self.assertEqual([bytes(s) for s in segments[1:]], [encode(d) for d in sent])
+            joined = b"".join(segments)
+            # Only the request ids differ.
+            self.assertEqual(joined[:4] + joined[8:], expected[:4] + expected[8:])
+
+    def test_batched_op_msg_segmented_document_too_large(self):
+        ctx = self._make_bulk_ctx(max_message_size=100)
+        cmd: dict = {"insert": "col"}
+        with patch.object(message, "_MIN_SEGMENTED_DOC_SIZE", 0):
+            with patch.object(message, "_MIN_SEGMENTED_SIZE", 0):
+                with self.assertRaises(DocumentTooLarge):
+                    message._do_batched_op_msg("db.$cmd", 0, cmd, [{"x": "a" * 200}], _OPTS, ctx)
+                cmd["writeConcern"] = {"w": 0}
+                ctx.max_bson_size = 100
+                ctx.max_message_size = 1000
+                with self.assertRaises(DocumentTooLarge):
+                    message._do_batched_op_msg("db.$cmd", 0, cmd, [{"x": "a" * 200}], _OPTS, ctx)
+
+    def test_client_batched_op_msg_large_documents_are_segmented(self):
+        ctx = self._make_bulk_ctx()
+        operations: list[tuple[str, Mapping[str, Any]]] = [
+            ("insert", {"document": {"_id": i, "data": "a" * i}}) for i in range(4)
+        ]
+        namespaces = ["db.a", "db.b", "db.a", "db.c"]
+        cmd: dict = {"bulkWrite": 1, "errorsOnly": True, "ordered": True}
+        _, expected, ops, ns = message._client_do_batched_op_msg(
+            cmd, operations, namespaces, _OPTS, ctx
+        )
+        self.assertIsInstance(expected, bytes)
+        with patch.object(message, "_MIN_SEGMENTED_SIZE", 0):
+            _, segments, _, _ = message._client_do_batched_op_msg(
+                cmd, operations, namespaces, _OPTS, ctx
+            )
+        self.assertIsInstance(segments, list)
+        self.assertEqual(len(segments), 3 + len(ops) + len(ns))
+        self.assertEqual(bytes(segments[3]), encode(ops[1]))
+        joined = b"".join(segments)
+        self.assertEqual(joined[:4] + joined[8:], expected[:4] + expected[8:])
+
+    # _OpMsg.unpack_response
+
+    def test_decode_cursor_reply(self):
+        docs = [{"_id": i, "x": "y" * i} for i in range(50)]
+        for key in ("firstBatch", "nextBatch"):
+            reply = {
+                "cursor": {key: docs, "id": 5, "ns": "db.coll", "after": [1]},
+                "ok": 1.0,
+                "$clusterTime": {"t": 1},
+            }
+            self.assertEqual(_decode_cursor_reply(encode(reply), _OPTS, 4), reply)
+            opts = CodecOptions(document_class=SON)
+            decoded = _decode_cursor_reply(encode(reply), opts, 4)
+            self.assertEqual(decoded, reply)
+            self.assertIsInstance(decoded["cursor"][key][0], SON)  # type: ignore[index]
+        self.assertIsNone(_decode_cursor_reply(encode({"ok": 1}), _OPTS, 4))
+        self.assertIsNone(_decode_cursor_reply(encode({"cursor": {"id": 0}, "ok": 1}), _OPTS, 4))
+
+    def test_unpack_response_parallel_decode(self):
+        reply = {"cursor": {"firstBatch": [{"_id": i} for i in range(20)], "id": 0}, "ok": 1}
+        response = message._OpMsg(0, encode(reply))
+        fields = {"cursor": {"firstBatch": 1, "nextBatch": 1}}
+        with (
+            patch.object(message, "_PARALLEL_DECODE_MIN_SIZE", 0),
+            patch.object(message, "_PARALLEL_DECODE_WORKERS", 4),
+            patch("bson._gil_enabled", return_value=False),
+            patch.object(
+                message, "_decode_cursor_reply", wraps=_decode_cursor_reply
+            ) as decode_cursor_reply,
+        ):
+            self.assertEqual(response.unpack_response(codec_options=_OPTS), [reply])
+            decode_cursor_reply.assert_not_called()
+            self.assertEqual(
+                response.unpack_response(codec_options=_OPTS, user_fields=fields), [reply]
+            )
+            decode_cursor_reply.assert_called_once()
+
     @unittest.skipUnless(_have_zlib(), "zlib not available")
     def test_op_msg_compressed_zlib_header(self):
         # Verify the compressed path is taken and produces a valid OP_COMPRESSED frame.
@@ -140,6 +290,20 @@ class TestMessage(unittest.TestCase):
         self.assertEqual(original_opcode, 2013)  # OP_MSG
         self.assertEqual(msg[24], ZlibContext.compressor_id)  # compressor_id == 2
 
+    @unittest.skipUnless(_have_zlib(), "zlib not available")
+    def test_op_msg_adaptive_compression(self):
+        ctx = AdaptiveContext([ZlibContext(6)], 1024, _CompressionStats())
+        _, msg, _, _ = _op_msg(0, {"ping": 1}, "testdb", None, _OPTS, ctx=ctx)
+        self.assertEqual(2013, struct.unpack_from("<i", msg, 12)[0])  # Sent as OP_MSG
+        _, msg, _, _ = _op_msg(0, {"find": "coll"}, "testdb", None, _OPTS, ctx=ctx)
+        self.assertEqual(2012, struct.unpack_from("<i", msg, 12)[0])  # OP_COMPRESSED
+        docs = [{"x": "a" * 1000}]
+        _, msg, _, _ = _op_msg(
+            0, {"insert": "coll", "documents": docs}, "testdb", None, _OPTS, ctx=ctx
+        )
+        self.assertEqual(2012, struct.unpack_from("<i", msg, 12)[0])
+        self.assertEqual({"read", "write"}, set(ctx.stats.stats()))
+
     # _raise_document_too_large
 
     def test_raise_document_too_large_insert_includes_sizes(self):
@@ -0,0 +1,267 @@
+# Copyright 2026-present MongoDB, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Unit tests for network_layer.py."""
+
+from __future__ import annotations
+
+import asyncio
+import socket
+import struct
+import sys
+import zlib
+from unittest.mock import MagicMock, patch
+
+sys.path[0:0] = [""]
+
+from bson import CodecOptions, encode
+from pymongo import network_layer
+from pymongo.network_layer import (
+    NetworkingInterface,
+    PyMongoProtocol,
+    _receive_buffer_size,
+    _ReceiveBufferPool,
+    receive_message,
+    sendall,
+)
+from pymongo.synchronous.pool import Connection
+from test import unittest
+
+
+class TestReceiveBufferPool(unittest.TestCase):
+    def test_small_buffers_are_not_pooled(self):
+        pool = _ReceiveBufferPool(min_size=1024)
+        buf = pool.acquire(100)
+        self.assertEqual(100, len(buf))
+        pool.release(buf)
+        self.assertEqual(0, pool.misses)
+        self.assertEqual(0, pool.stats()["pooled_bytes"])
+
+    def test_reuse(self):
+        pool = _ReceiveBufferPool(min_size=1024)
+        buf = pool.acquire(3000)
+        self.assertEqual(3072, len(buf))
+        pool.release(buf)
+        self.assertIs(buf, pool.acquire(2561))
+        self.assertEqual(3072, len(buf))
+        self.assertIsNot(buf, pool.acquire(3073))
+        self.assertEqual(1, pool.hits)
+        self.assertEqual(2, pool.misses)
+        self.assertAlmostEqual(1 / 3, pool.hit_rate)
+
+    def test_size_classes(self):
+        for length, size in (
+            (1, 1),
+            (2048, 2048),
+            (2049, 2560),
+            (4_100_000, 4 * 1024 * 1024),
+            (4_200_000, 5_242_880),
+        ):
+            self.assertEqual(size, _receive_buffer_size(length))
+            self.assertEqual(size, _receive_buffer_size(size))
+        for length in range(1, 10000):
+            size = _receive_buffer_size(length)
+            self.assertGreaterEqual(size, length)
+            self.assertLessEqual(size, length * 1.25 + 1)
+
+    def test_buffers_outside_size_classes_are_not_pooled(self):
+        pool = _ReceiveBufferPool(min_size=1024)
+        pool.release(bytearray(2049))
+        self.assertEqual(0, pool.stats()["pooled_bytes"])
+
+    def test_buffers_in_use_are_not_pooled(self):
+        pool = _ReceiveBufferPool(min_size=1024)
+        buf = pool.acquire(2048)
+        view = memoryview(buf)[:10]
+        pool.release(buf)
+        self.assertEqual(1, pool.in_use)
+        self.assertEqual(2048, len(buf))
+        self.assertIsNot(buf, pool.acquire(2048))
+        view.release()
+        pool.release(buf)
+        self.assertIs(buf, pool.acquire(2048))
+
+    def test_bounded(self):
+        pool = _ReceiveBufferPool(min_size=1024, per_class=2, max_bytes=5000)
+        buffers = [pool.acquire(2048) for _ in range(3)]
+        for buf in buffers:
+            pool.release(buf)
+        self.assertEqual(1, pool.discarded)
+        self.assertEqual(4096, pool.stats()["pooled_bytes"])
+        pool.release(pool.acquire(4096))
+        self.assertEqual(2, pool.discarded)
+        pool.clear()
+        self.assertEqual(0, pool.stats()["pooled_bytes"])
+
+
+class TestReceiveMessage(unittest.TestCase):
+    def setUp(self):
+        self.client_sock, self.server_sock = socket.socketpair()
+        self.addCleanup(self.client_sock.close)
+        self.addCleanup(self.server_sock.close)
+        self.conn = MagicMock()
+        self.conn.conn = NetworkingInterface(self.client_sock)
+        self.conn.cancel_context.cancelled = False
+        self.conn.receive_buffers = _ReceiveBufferPool(min_size=1024)
+        self.conn.reply_buffer = None
+        self.conn.release_reply_buffer = lambda: Connection.release_reply_buffer(self.conn)
+
+    def send_reply(self, document):
+        body = struct.pack("<IB", 0, 0) + encode(document)
+        self.server_sock.sendall(struct.pack("<iiii", 16 + len(body), 0, 1, 2013) + body)
+
+    def test_reply_buffers_are_reused(self):
+        self.send_reply({"x": "a" * 30000})
+        reply = receive_message(self.conn, 1)
+        self.assertEqual({"x": "a" * 30000}, reply.command_response(CodecOptions()))
+        buf = self.conn.reply_buffer
+        self.assertEqual(32768, len(buf))
+        del reply
+
+        self.send_reply({"y": "b" * 30000})
+        reply = receive_message(self.conn, 1)
+        self.assertIs(buf, self.conn.reply_buffer)
+        self.assertEqual({"y": "b" * 30000}, reply.command_response(CodecOptions()))
+        self.assertEqual(1, self.conn.receive_buffers.hits)
+
+    def test_referenced_reply_buffers_are_not_reused(self):
+        self.send_reply({"x": "a" * 30000})
+        raw = receive_message(self.conn, 1).raw_command_response()
+        buf = self.conn.reply_buffer
+
+        self.send_reply({"y": "b" * 30000})
+        receive_message(self.conn, 1)
+        self.assertIsNot(buf, self.conn.reply_buffer)
+        self.assertEqual(1, self.conn.receive_buffers.in_use)
+        self.assertEqual(encode({"x": "a" * 30000}), bytes(raw))
+
+    def test_small_replies_are_read_ahead(self):
+        self.send_reply({"x": 1})
+        self.send_reply({"y": 2})
+        with patch.object(self.conn.conn, "recv_into", wraps=self.conn.conn.recv_into) as recv:
+            first = receive_message(self.conn, 1)
+            second = receive_message(self.conn, 1)
+        self.assertEqual(1, recv.call_count)
+        self.assertEqual({"x": 1}, first.command_response(CodecOptions()))
+        self.assertEqual({"y": 2}, second.command_response(CodecOptions()))
+        self.assertIsNone(self.conn.reply_buffer)
+
+    def test_compressed_reply(self):
+        body = struct.pack("<IB", 0, 0) + encode({"x": "a" * 100})
+        compressed = zlib.compress(body)
+        header = struct.pack("<iiB", 2013, len(body), 2)
+        length = 16 + len(header) + len(compressed)
+        self.server_sock.sendall(struct.pack("<iiii", length, 0, 1, 2012) + header + compressed)
+        reply = receive_message(self.conn, 1)
+        self.assertEqual({"x": "a" * 100}, reply.command_response(CodecOptions()))
+
+    def test_large_reply_after_read_ahead(self):
+        self.send_reply({"x": 1})
+        self.send_reply({"y": "b" * 30000})
+        self.assertEqual({"x": 1}, receive_message(self.conn, 1).command_response(CodecOptions()))
+        reply = receive_message(self.conn, 1)
+        self.assertEqual({"y": "b" * 30000}, reply.command_response(CodecOptions()))
+        self.assertEqual(0, self.conn.conn.read_end - self.conn.conn.read_start)
+
+
+class TestPyMongoProtocol(unittest.IsolatedAsyncioTestCase):
+    def feed(self, protocol, data):
+        view = memoryview(data)
+        while view:
+            buf = protocol.get_buffer(len(view))
+            n = min(len(buf), len(view))
+            buf[:n] = view[:n]
+            protocol.buffer_updated(n)
+            view = view[n:]
+
+    async def read_reply(self, protocol, pool, document):
+        body = struct.pack("<IB", 0, 0) + encode(document)
+        read = asyncio.ensure_future(protocol.read(1, network_layer.MAX_MESSAGE_SIZE, pool))
+        await asyncio.sleep(0)
+        self.feed(protocol, struct.pack("<iiii", 16 + len(body), 0, 1, 2013) + body)
+        data, op_code, buf = await read
+        self.assertEqual(2013, op_code)
+        self.assertEqual(body, bytes(data))
+        del data, read
+        # Let the loop drop the finished read task, which holds the reply.
+        await asyncio.sleep(0)
+        return buf
+
+    async def test_read_uses_receive_buffers(self):
+        pool = _ReceiveBufferPool(min_size=1024)
+        protocol = PyMongoProtocol()
+        transport = MagicMock()
+        transport.is_closing.return_value = False
+        protocol.connection_made(transport)
+        buf = await self.read_reply(protocol, pool, {"x": "a" * 3000})
+        self.assertEqual(_receive_buffer_size(len(buf)), len(buf))
+        self.assertEqual(1, pool.misses)
+        pool.release(buf)
+        self.assertIs(buf, await self.read_reply(protocol, pool, {"y": "b" * 3000}))
+        self.assertEqual(1, pool.hits)
+        # Small replies are not drawn from the pool.
+        await self.read_reply(protocol, pool, {"z": 1})
+        self.assertEqual((1, 1), (pool.hits, pool.misses))
+
+
+class TestSendall(unittest.TestCase):
+    def setUp(self):
+        self.client_sock, self.server_sock = socket.socketpair()
+        self.addCleanup(self.client_sock.close)
+        self.addCleanup(self.server_sock.close)
+
+    def receive(self, length):
+        data = bytearray()
+        while len(data) < length:
+            data += self.server_sock.recv(length - len(data))
+        return bytes(data)
+
+    @unittest.skipUnless(network_layer._HAVE_SENDMSG, "requires socket.sendmsg")
+    def test_segments_are_gathered(self):
+        segments = [bytearray(b"head"), bytearray(), bytearray(b"a" * 10), bytearray(b"b" * 20)]
+        with patch.object(network_layer, "_IOV_MAX", 2):
+            sendall(self.client_sock, segments)
+        self.assertEqual(b"".join(segments), self.receive(34))
+
+    @unittest.skipUnless(network_layer._HAVE_SENDMSG, "requires socket.sendmsg")
+    def test_partial_sends_are_resumed(self):
+        segments = [bytearray(b"abc"), bytearray(b"defgh"), bytearray(b"ijklmnop")]
+        sock = MagicMock(spec=socket.socket)
+        sent = bytearray()
+
+        def sendmsg(buffers):
+            # Send at most 4 bytes per call.
+            data = b"".join(buffers)[:4]
+            sent.extend(data)
+            return len(data)
+
+        sock.sendmsg.side_effect = sendmsg
+        sendall(sock, segments)
+        self.assertEqual(b"abcdefghijklmnop", bytes(sent))
+        self.assertEqual(4, sock.sendmsg.call_count)
+
+    def test_small_segments_are_joined_without_sendmsg(self):
+        sock = MagicMock(spec=socket.socket)
+        segments = [bytearray(c * n) for c, n in ((b"a", 10), (b"b", 10), (b"c", 30), (b"d", 5))]
+        with (
+            patch.object(network_layer, "_HAVE_SENDMSG", False),
+            patch.object(network_layer, "_SEND_COALESCE_SIZE", 20),
+        ):
+            sendall(sock, segments)
+        sent = [bytes(call.args[0]) for call in sock.sendall.call_args_list]
+        self.assertEqual([b"a" * 10 + b"b" * 10, b"c" * 30, b"d" * 5], sent)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -20,9 +20,11 @@ import datetime
 import pickle
 import struct
 import sys
+from unittest.mock import patch
 
 sys.path[0:0] = [""]
 
+from bson import objectid
 from bson.errors import InvalidId
 from bson.objectid import _MAX_COUNTER_VALUE, ObjectId
 from bson.tz_util import FixedOffset, utc
@@ -164,6 +166,37 @@ class TestObjectId(unittest.TestCase):
         ObjectId()
         self.assertEqual(ObjectId._inc, 0)
 
+    def test_batch(self):
+        for use_c in (True, False):
+            with patch.object(objectid, "_USE_C", use_c and objectid._USE_C):
+                ObjectId._inc = _MAX_COUNTER_VALUE - 1
+                oids = ObjectId.batch(4)
+                self.assertEqual(ObjectId._inc, 2)
+                self.assertEqual(
+                    [oid.binary[9:] for oid in oids],
+                    [b"\xff\xff\xfe", b"\xff\xff\xff", b"\x00\x00\x00", b"\x00\x00\x01"],
+                )
+                self.assertTrue(all(type(oid) is ObjectId for oid in oids))
+                self.assertTrue(all(oid_generated_on_process(oid) for oid in oids))
+                self.assertEqual(len({oid.binary[:9] for oid in oids}), 1)
+                self.assertLess(ObjectId(), ObjectId.batch(1)[0])
+                self.assertEqual([], ObjectId.batch(0))
+                self.assertEqual(oids, [ObjectId(str(oid)) for oid in oids])
+                self.assertEqual(oids, pickle.loads(pickle.dumps(oids)))
+
+        class MyObjectId(ObjectId):
+            pass
+
+        oids = MyObjectId.batch(2)
+        self.assertTrue(all(type(oid) is MyObjectId for oid in oids))
+        self.assertNotEqual(oids[0], oids[1])
+        for n in (-1, _MAX_COUNTER_VALUE + 2):
+            with self.assertRaises(ValueError):
+                ObjectId.batch(n)
+        for n in (1.0, "1", True, None):
+            with self.assertRaises(TypeError):
+                ObjectId.batch(n)  # type: ignore[arg-type]
+
     def test_timestamp_values(self):
         # Spec-test to check timestamp field is interpreted correctly.
         TEST_DATA = {
@@ -19,10 +19,11 @@ import uuid
 
 sys.path[0:0] = [""]
 
-from bson import Code, DBRef, decode, encode
+from bson import Code, DBRef, decode, encode, json_util
 from bson.binary import JAVA_LEGACY, Binary, UuidRepresentation
 from bson.codec_options import CodecOptions
 from bson.errors import InvalidBSON
+from bson.json_util import CANONICAL_JSON_OPTIONS
 from bson.raw_bson import DEFAULT_RAW_BSON_OPTIONS, RawBSONDocument
 from bson.son import SON
 from test import IntegrationTest, client_context, unittest
@@ -59,6 +60,36 @@ class TestRawBSONDocument(IntegrationTest):
         with self.assertRaises(KeyError):
             doc["does-not-exist"]
 
+    def test_lazy_field_access(self):
+        # An undecodable string must not prevent access to the other fields.
+        raw = bytearray(encode({"a": 1, "bad": "xx", "sub": {"b": 2}}))
+        raw[raw.index(b"xx")] = 0xFF
+        doc = RawBSONDocument(bytes(raw))
+        self.assertEqual(3, len(doc))
+        self.assertEqual(["a", "bad", "sub"], list(doc))
+        self.assertIn("bad", doc)
+        self.assertNotIn("missing", doc)
+        self.assertEqual(1, doc["a"])
+        self.assertIsInstance(doc["sub"], RawBSONDocument)
+        self.assertEqual(2, doc["sub"]["b"])
+        self.assertIs(doc["sub"], doc["sub"])
+        with self.assertRaises(InvalidBSON):
+            doc["bad"]
+
+    def test_memoryview(self):
+        doc = RawBSONDocument(memoryview(self.bson_string))
+        self.assertEqual("Sherlock", doc["name"])
+        self.assertEqual(decode(self.bson_string), decode(encode(doc)))
+
+    def test_to_json(self):
+        self.assertEqual(
+            json_util.dumps(decode(self.bson_string)).encode(), self.document.to_json()
+        )
+        self.assertEqual(
+            json_util.dumps(decode(self.bson_string), json_options=CANONICAL_JSON_OPTIONS).encode(),
+            self.document.to_json(CANONICAL_JSON_OPTIONS),
+        )
+
     def test_invalid_bson_sequence(self):
         bson_byte_sequence = encode({"a": 1}) + encode({})
         with self.assertRaisesRegex(InvalidBSON, "invalid object length"):